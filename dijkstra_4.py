@@ -25,146 +25,211 @@
 
 import sys
 import heapq
-from math import sin, cos, asin, sqrt, radians
+from math import sin, cos, asin, sqrt, radians, floor
 
 RADIUS = 6367.   # radius of earth in km
+CELL = 0.1   # size (degrees) of the cells the line segments are indexed by
+TOLERANCE = 0.0001   # how close (crossproduct) a point must be to be on a segment
 
 
-class Vertex:
-    def __init__(self, node):
-        self.id = node
-        self.adjacent = {}
-         # Set distance to infinity for all nodes
-        self.distance = float(sys.maxsize)
-         # Mark all nodes unvisited
-        self.visited = False
-         # Predecessor
-        self.previous = None
-
-    # defining comparators less_than and equals
-    # clued from https://stackoverflow.com/questions/47912064/typeerror-not-supported-between-instances-of-heapnode-and-heapnode
-    def __lt__(self, other):
-        return self.distance < other.distance
-
-    def add_neighbor(self, neighbor, weight=0):
-        self.adjacent[neighbor] = weight
-
-    def get_connections(self):
-        return list(self.adjacent.keys())
-
-    def get_id(self):
-        return self.id
-
-    def get_weight(self, neighbor):
-        return self.adjacent[neighbor]
-
-    def set_distance(self, dist):
-        self.distance = dist
-        return
-
-    def get_distance(self):
-        return self.distance
-
-    def set_previous(self, prev):
-        self.previous = prev
-
-    def set_visited(self):
-        self.visited = True
-
-#    def __str__(self):
-#        return str(self.id) + ' adjacent: ' + str([x.id for x in self.adjacent])
-
-
-class Graph:
-    def __init__(self):
-        self.vert_dict = {}
-        self.num_vertices = 0
-
-    def __iter__(self):
-        return iter(list(self.vert_dict.values()))
-
-    def add_vertex(self, node):
-        self.num_vertices = self.num_vertices + 1
-        new_vertex = Vertex(node)
-        self.vert_dict[node] = new_vertex
-        return new_vertex
-
-    def get_vertex(self, n):
-        if n in self.vert_dict:
-            return self.vert_dict[n]
-        else:
+class GridGraph:
+    # The grid lines as a graph of integer vertices. It is built once for the grid and then
+    # extended as (station) lines are appended. Lines from grid on are new lines and the end
+    # of a new line is joined to any line it lies on. If lines have been removed the graph
+    # is made again from the existing grid lines
+    def __init__(self, lines, grid):
+        self.lines = lines
+        self.grid = grid # existing grid lines count
+        self.base = None
+        self.reset()
+
+    def reset(self):
+        self.done = []   # the lines in the graph
+        self.vertex = {}   # coordinates to vertex
+        self.points = []   # vertex to coordinates
+        self.adjacent = []   # {vertex: distance} for each vertex
+        self.edges = {}   # (vertex, vertex) to line for the line segments
+        self.joins = {}   # (vertex, vertex) to [(new line, line), line] for new lines joined to lines
+        self.cells = {}   # cell to [line, point] for the segments near it
+        self.wide = []   # [line, point] for segments near too many cells
+        self.ends = {}   # cell to the new lines ending in it
+
+    def save(self):
+        # keep the graph for the existing grid lines
+        self.base = [self.done[:], dict(self.vertex), self.points[:], [dict(adj) for adj in self.adjacent],
+                     dict(self.edges), dict(self.joins), dict((cell, segs[:]) for cell, segs in self.cells.items()),
+                     self.wide[:]]
+
+    def restore(self):
+        self.reset()
+        self.done = self.base[0][:]
+        self.vertex = dict(self.base[1])
+        self.points = self.base[2][:]
+        self.adjacent = [dict(adj) for adj in self.base[3]]
+        self.edges = dict(self.base[4])
+        self.joins = dict(self.base[5])
+        self.cells = dict((cell, segs[:]) for cell, segs in self.base[6].items())
+        self.wide = self.base[7][:]
+
+    def update(self):
+        # add the lines appended since last time
+        same = 0
+        while same < len(self.done) and same < len(self.lines) and self.lines[same] is self.done[same]:
+            same += 1
+        if same < len(self.done):   # some removed
+            if same >= self.grid and self.base is not None:
+                self.restore()
+            else:
+                self.base = None
+                self.reset()
+        for li in range(len(self.done), len(self.lines)):
+            if li == self.grid and self.base is None:
+                self.save()
+            self.addLine(li)
+        if len(self.done) == self.grid and self.base is None:
+            self.save()
+
+    def getVertex(self, point):
+        key = (point[0], point[1])
+        if key not in self.vertex:
+            self.vertex[key] = len(self.points)
+            self.points.append(key)
+            self.adjacent.append({})
+        return self.vertex[key]
+
+    def addEdge(self, frm, to, cost):
+        self.adjacent[frm][to] = cost
+        self.adjacent[to][frm] = cost
+
+    def cellRange(self, a, b):
+        # the cells a segment could have a point on it in (see isBetween), or None if too many
+        dy = b[0] - a[0]
+        dx = b[1] - a[1]
+        margin = TOLERANCE / sqrt(dy * dy + dx * dx) * 1.01 + 1e-9
+        rows = range(int(floor((min(a[0], b[0]) - margin) / CELL)), int(floor((max(a[0], b[0]) + margin) / CELL)) + 1)
+        cols = range(int(floor((min(a[1], b[1]) - margin) / CELL)), int(floor((max(a[1], b[1]) + margin) / CELL)) + 1)
+        if len(rows) * len(cols) > 64:
             return None
+        return [(row, col) for row in rows for col in cols]
 
-    def add_edge(self, frm, to, cost=0):
-        if frm not in self.vert_dict:
-            self.add_vertex(frm)
-        if to not in self.vert_dict:
-            self.add_vertex(to)
-        self.vert_dict[frm].add_neighbor(self.vert_dict[to], cost)
-        self.vert_dict[to].add_neighbor(self.vert_dict[frm], cost)
-
-    def get_vertices(self):
-        return list(self.vert_dict.keys())
-
-    def set_previous(self, current):
-        self.previous = current
+    def cellOf(self, point):
+        return (int(floor(point[0] / CELL)), int(floor(point[1] / CELL)))
 
-    def get_previous(self, current):
-        return self.previous
-
-
-def shortest(v, path):
-    ''' make shortest path from v.previous'''
-    if v.previous:
-        path.append(v.previous.get_id())
-        shortest(v.previous, path)
-    return
-
-
-def dijkstra(aGraph, start):
-   #  print '''Dijkstra's shortest path'''
-     # Set the distance for the start node to zero
-    start.set_distance(0)
-
-     # Put tuple pair into the priority queue
-    unvisited_queue = [(v.get_distance(), v) for v in aGraph]
-    heapq.heapify(unvisited_queue)
-
-    while len(unvisited_queue):
-         # Pops a vertex with the smallest distance
-        uv = heapq.heappop(unvisited_queue)
-        current = uv[1]
-        current.set_visited()
-
-        for next in current.adjacent:
-             # if visited, skip
-            if next.visited:
+    def onLine(self, end, l2, pts):
+        # the first segment (of those in pts) of line l2 that end lies on
+        coords = self.lines[l2].coordinates
+        for pt in pts:
+            if coords[pt - 1] == end or coords[pt] == end:
                 continue
-            new_dist = current.get_distance() + current.get_weight(next)
-
-            if new_dist < next.get_distance():
-                next.set_distance(new_dist)
-                next.set_previous(current)
-#                print 'updated : current = %s next = %s new_dist = %s' \
-#                        %(current.get_id(), next.get_id(), str(next.get_distance()))
-#            else:
-#                print 'not updated : current = %s next = %s new_dist = %s' \
-#                        %(current.get_id(), next.get_id(), str(next.get_distance()))
-
-         # Rebuild heap
-         # 1. Pop every item
-        while len(unvisited_queue):
-            heapq.heappop(unvisited_queue)
-         # 2. Put all vertices not visited into the queue
-        unvisited_queue = [(v.get_distance(), v) for v in aGraph if not v.visited]
-        heapq.heapify(unvisited_queue)
-    return
-
+            if self.isBetween(coords[pt - 1], coords[pt], end):
+                return pt
+        return None
+
+    def join(self, li, l2, pt):
+        # join the end of new line li to the ends of segment pt of line l2
+        end = self.lines[li].coordinates[-1]
+        vert2 = self.getVertex(end)
+        for p in [pt - 1, pt]:
+            point = self.lines[l2].coordinates[p]
+            vert1 = self.getVertex(point)
+            self.addEdge(vert1, vert2, self.actualDistance(point[0], point[1], end[0], end[1]))
+            if (vert1, vert2) not in self.joins or self.joins[(vert1, vert2)][0] < (li, l2):
+                self.joins[(vert1, vert2)] = [(li, l2), l2]
+
+    def addLine(self, li):
+        coords = self.lines[li].coordinates
+        vert1 = self.getVertex(coords[0])
+        for pt in range(1, len(coords)):
+            vert2 = self.getVertex(coords[pt])
+            dist = self.actualDistance(coords[pt][0], coords[pt][1], coords[pt - 1][0], coords[pt - 1][1])
+            self.addEdge(vert1, vert2, dist)
+            self.edges[(vert1, vert2)] = li
+            vert1 = vert2
+        if li >= self.grid:   # join the end to the lines it lies on
+            near = {}
+            for l2, pt in self.cells.get(self.cellOf(coords[-1]), []) + self.wide:
+                if l2 not in near:
+                    near[l2] = []
+                near[l2].append(pt)
+            for l2 in sorted(near.keys()):
+                pt = self.onLine(coords[-1], l2, sorted(near[l2]))
+                if pt is not None:
+                    self.join(li, l2, pt)
+        ends = set()
+        for pt in range(1, len(coords)):
+            if coords[pt - 1] == coords[pt]:
+                continue   # no length so nothing is on it
+            cells = self.cellRange(coords[pt - 1], coords[pt])
+            if cells is None:
+                self.wide.append([li, pt])
+                ends.update(range(self.grid, li))
+                continue
+            for cell in cells:
+                if cell not in self.cells:
+                    self.cells[cell] = []
+                self.cells[cell].append([li, pt])
+                ends.update(self.ends.get(cell, []))
+        for l1 in sorted(ends):   # join earlier new lines that end on this line
+            pt = self.onLine(self.lines[l1].coordinates[-1], li, range(1, len(coords)))
+            if pt is not None:
+                self.join(l1, li, pt)
+        if li >= self.grid:
+            cell = self.cellOf(coords[-1])
+            if cell not in self.ends:
+                self.ends[cell] = []
+            self.ends[cell].append(li)
+        self.done.append(self.lines[li])
+
+    def getLine(self, frm, to):
+        for key in [(frm, to), (to, frm)]:
+            if key in self.joins:
+                return self.joins[key][1]
+            if key in self.edges:
+                return self.edges[key]
+        return None
+
+    def paths(self, source, targets):
+        # shortest paths (vertices from the target back to source) from source to each target.
+        # A target not on the grid has no path and one that can't be reached just itself
+        self.update()
+        start = self.getVertex(source)
+        want = []
+        for target in targets:
+            want.append(self.vertex.get((target[0], target[1])))
+        todo = set(want)
+        todo.discard(None)
+        distance = {start: 0.}
+        previous = {}
+        visited = set()
+        queue = [(0., start)]
+        while len(queue) and len(todo):
+            dist, current = heapq.heappop(queue)
+            if current in visited:
+                continue
+            visited.add(current)
+            todo.discard(current)
+            for next, weight in self.adjacent[current].items():
+                if next in visited:
+                    continue
+                new_dist = dist + weight
+                if new_dist < distance.get(next, float(sys.maxsize)):
+                    distance[next] = new_dist
+                    previous[next] = current
+                    heapq.heappush(queue, (new_dist, next))
+        the_paths = []
+        for vert in want:
+            if vert is None:
+                the_paths.append([])
+                continue
+            path = [vert]
+            while path[-1] in previous:
+                path.append(previous[path[-1]])
+            the_paths.append(path)
+        return the_paths
 
-class Shortest:
     def isBetween(self, a, b, c):
         crossproduct = (c[1] - a[1]) * (b[0] - a[0]) - (c[0] - a[0]) * (b[1] - a[1])
-        if abs(crossproduct) > 0.0001:  # sys.float_info.epsilon:
+        if abs(crossproduct) > TOLERANCE:  # sys.float_info.epsilon:
             return False    # (or != 0 if using integers)
         dotproduct = (c[0] - a[0]) * (b[0] - a[0]) + (c[1] - a[1]) * (b[1] - a[1])
         if dotproduct < 0:
@@ -189,81 +254,30 @@ class Shortest:
         dst = self.Distance(y1, x1, y2, x2)
         return round(abs(dst) * RADIUS, 2)
 
-    def __init__(self, lines, source, target, grid):
+
+class Shortest:
+    def __init__(self, lines, source, target, grid, graph=None):
         self.source = source
         self.target = target
         self.lines = lines
         self.grid = grid # existing grid lines count
-        self.edges = {}
-        self.g = Graph()
-        for li in range(len(self.lines)):
-            vert1 = str(self.lines[li].coordinates[0])
-            for pt in range(1, len(self.lines[li].coordinates)):
-                vert2 = str(self.lines[li].coordinates[pt])
-                dist = self.actualDistance(self.lines[li].coordinates[pt][0], self.lines[li].coordinates[pt][1],
-                       self.lines[li].coordinates[pt - 1][0], self.lines[li].coordinates[pt - 1][1])
-                self.g.add_edge(vert1, vert2, dist)
-                self.edges[vert1 + vert2] = li
-                vert1 = vert2
-        for li in range(self.grid, len(self.lines)):
-            for l2 in range(len(self.lines)):
-                if li == l2:
-                    continue
-                for pt in range(1, len(self.lines[l2].coordinates)):
-                    if self.lines[l2].coordinates[pt - 1] == self.lines[li].coordinates[-1] or \
-                      self.lines[l2].coordinates[pt] == self.lines[li].coordinates[-1]:
-                        continue
-                    if self.isBetween(self.lines[l2].coordinates[pt - 1], self.lines[l2].coordinates[pt],
-                      self.lines[li].coordinates[-1]):
-                        dist = self.actualDistance(self.lines[l2].coordinates[pt - 1][0], self.lines[l2].coordinates[pt - 1][1],
-                               self.lines[li].coordinates[-1][0], self.lines[li].coordinates[-1][1])
-                        vert1 = str(self.lines[l2].coordinates[pt - 1])
-                        vert2 = str(self.lines[li].coordinates[-1])
-                        self.g.add_edge(vert1, vert2, dist)
-                        self.edges[vert1 + vert2] = l2
-                        dist = self.actualDistance(self.lines[l2].coordinates[pt][0], self.lines[l2].coordinates[pt][1],
-                               self.lines[li].coordinates[-1][0], self.lines[li].coordinates[-1][1])
-                        vert1 = str(self.lines[l2].coordinates[pt])
-                        vert2 = str(self.lines[li].coordinates[-1])
-                        self.g.add_edge(vert1, vert2, dist)
-                        self.edges[vert1 + vert2] = l2
-                        break
-     #    print 'Graph data:'
-      #   print 'source', self.source, 'target', self.target
-       #  for v in self.g:
-        #     for w in v.get_connections():
-         #        vid = v.get_id()
-          #       wid = w.get_id()
-           #      print '(%s ,%s, %s)'  % (vid, wid, str(v.get_weight(w)))
-        if self.g.get_vertex(str(self.source)) is None:
-            self.g.add_vertex(str(self.source))
-        dijkstra(self.g, self.g.get_vertex(str(self.source)))
-        target = self.g.get_vertex(str(self.target))
-        try:
-            self.path = [target.get_id()]
-            shortest(target, self.path)
-        except:
-            self.path = []
+        if graph is None:
+            graph = GridGraph(lines, grid)
+        self.graph = graph
+        self.path = self.graph.paths(self.source, [self.target])[0]
 
     def getPath(self):
         the_path = []
-        for i in range(len(self.path)):
-            it = self.path[i].replace('[', '')
-            it = it.replace(']', '')
-            it = it.replace(' ', '')
-            bit = it.split(',')
-            the_path.append([float(bit[0]), float(bit[1])])
+        for vert in self.path:
+            point = self.graph.points[vert]
+            the_path.append([float(point[0]), float(point[1])])
         return the_path
 
     def getLines(self):
         the_lines = []
         for i in range(1, len(self.path)):
-            try:
-                the_lines.append(self.edges[self.path[i - 1] + self.path[i]])
-            except:
-                try:
-                    the_lines.append(self.edges[self.path[i] + self.path[i - 1]])
-                except:
-                    pass
+            line = self.graph.getLine(self.path[i - 1], self.path[i])
+            if line is not None:
+                the_lines.append(line)
         the_lines = list(set(the_lines))
         return the_lines
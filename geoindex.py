@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2015-2024 Sustainable Energy Now Inc., Angus King
+#
+#  geoindex.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+
+import numpy as np
+try:
+    from scipy.spatial import cKDTree
+except:
+    cKDTree = None
+
+
+def unitVectors(lat, lon):
+    # lat and lon in radians
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class GeoIndex:
+    # Nearest item and lookup by name for a list of objects with lat and lon (degrees), such
+    # as stations or towns. Nearest by chord on the unit sphere is nearest by great circle so
+    # the points are held in a KD-tree (or just as unit vectors without scipy). nearest()
+    # returns every item close enough to the nearest to be it after rounding so the caller
+    # can still pick one with its own haversine. The index is built again on the next query
+    # after changed() is called or the number of items changes; whoever moves or renames
+    # items in place (or swaps one for another) calls changed()
+    MARGIN = 1e-6   # relative
+    NEAR = 1e-9     # on the unit sphere, about 6 mm
+
+    def __init__(self, items, keys=['name'], skip=None):
+        self.items = items
+        self.keys = keys
+        self.skip = skip   # items nearest() can leave out, e.g. fossil stations
+        self.dirty = True
+        self.count = None
+
+    def changed(self):
+        self.dirty = True
+
+    def refresh(self):
+        if not self.dirty and self.count == len(self.items):
+            return
+        self.dirty = False
+        self.count = len(self.items)
+        self.lookup = {}
+        for key in self.keys:
+            self.lookup[key] = {}
+        self.positions = {}
+        for i in range(len(self.items)):
+            for key in self.keys:
+                value = getattr(self.items[i], key)
+                if value not in self.lookup[key]:
+                    self.lookup[key][value] = self.items[i]
+            try:
+                self.positions[getattr(self.items[i], self.keys[0])].append(i)
+            except:
+                self.positions[getattr(self.items[i], self.keys[0])] = [i]
+        self.skipped = None
+        if self.skip is not None:
+            self.skipped = np.array([bool(self.skip(item)) for item in self.items], dtype=bool)
+        self.trees = {}
+        try:
+            lats = np.radians(np.array([item.lat for item in self.items], dtype=np.float64))
+            lons = np.radians(np.array([item.lon for item in self.items], dtype=np.float64))
+            self.vectors = unitVectors(lats, lons).reshape(-1, 3)
+            if not np.all(np.isfinite(self.vectors)):
+                self.vectors = None
+        except:
+            self.vectors = None
+
+    def tree(self, skip=False):
+        # positions of the items searched and their tree (or unit vectors)
+        if skip not in self.trees:
+            if skip and self.skipped is not None:
+                positions = np.nonzero(~self.skipped)[0]
+            else:
+                positions = np.arange(len(self.items))
+            vectors = self.vectors[positions]
+            tree = None
+            if cKDTree is not None and len(positions) > 0:
+                try:
+                    tree = cKDTree(vectors)
+                except:
+                    pass
+            self.trees[skip] = [positions, tree, vectors]
+        return self.trees[skip]
+
+    def get(self, value, key=None, check=True):
+        # first item with the value; check=False straight after nearest()
+        if check:
+            self.refresh()
+        if key is None:
+            key = self.keys[0]
+        try:
+            return self.lookup[key][value]
+        except:
+            return None
+
+    def nearest(self, lat, lon, skip=False, ignore=None):
+        # positions (ascending) of the items that may be nearest, leaving out skipped items and
+        # any with the name to ignore
+        self.refresh()
+        ignored = []
+        if ignore is not None and ignore in self.positions:
+            ignored = self.positions[ignore]
+        try:
+            point = unitVectors(np.radians(np.array([lat], dtype=np.float64)),
+                                np.radians(np.array([lon], dtype=np.float64)))[0]
+            if self.vectors is None or not np.all(np.isfinite(point)):
+                raise ValueError
+        except:
+            # check them all
+            near = []
+            for i in range(len(self.items)):
+                if skip and self.skipped is not None and self.skipped[i]:
+                    continue
+                if i in ignored:
+                    continue
+                near.append(i)
+            return near
+        positions, tree, vectors = self.tree(skip)
+        if len(positions) == 0:
+            return []
+        if tree is not None:
+            k = min(len(ignored) + 1, len(positions))
+            dists, found = tree.query(point, k=[j + 1 for j in range(k)])
+            best = None
+            for j in range(len(found)):
+                if positions[found[j]] not in ignored:
+                    best = dists[j]
+                    break
+            if best is None:
+                return []
+            within = tree.query_ball_point(point, best * (1. + self.MARGIN) + self.NEAR)
+            near = positions[np.array(within, dtype=np.int64)]
+        else:
+            dists = np.sqrt(np.sum((vectors - point)**2, axis=1))
+            if len(ignored) > 0:
+                dists[np.isin(positions, ignored)] = np.inf
+            best = np.min(dists)
+            if best == np.inf:
+                return []
+            near = positions[dists <= best * (1. + self.MARGIN) + self.NEAR]
+        return [int(i) for i in np.sort(near) if i not in ignored]
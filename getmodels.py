@@ -20,7 +20,10 @@
 #
 
 import os
-from PyQt5 import QtGui, QtWidgets
+try:
+    from PyQt5 import QtGui, QtWidgets
+except: # allow non-GUI use, e.g. pmcore.py
+    pass
 from shutil import copy
 import sys
 
@@ -19,6 +19,7 @@
 #  <http://www.gnu.org/licenses/>.
 #
 
+import hashlib
 import os
 import io
 import sys
@@ -26,10 +27,10 @@ from math import sin, cos, radians, asin, acos, atan2, sqrt, degrees
 import zipfile
 
 import configparser   # decode .ini file
-from xml.etree.ElementTree import ElementTree, fromstring
+import numpy as np
+from xml.etree.ElementTree import ElementTree, fromstring, iterparse
 
-from getmodels import getModelFile
-from senutils import getParents, getUser
+from senutils import getConfig
 
 RADIUS = 6367.   # radius of earth in km
 
@@ -51,6 +52,38 @@ def within_map(y, x, poly):
     return inside
 
 
+def polygon_edges(poly):
+    # the edges of a polygon ([y1, x1, y2, x2] from each point to the next) for within_map_points
+    n = len(poly)
+    edges = np.zeros((n, 4))
+    for i in range(n):
+        edges[i] = [poly[i - 1][0], poly[i - 1][1], poly[i][0], poly[i][1]]
+    return edges
+
+
+def within_map_points(y, x, edges, bounds=None):
+    # within_map for arrays of points; edges from polygon_edges and bounds [min x, max x, max y]
+    inside = np.zeros(len(y), dtype=bool)
+    if len(edges) == 0:
+        return inside
+    if bounds is None:
+        bounds = [min(edges[:, 1].min(), edges[:, 3].min()), max(edges[:, 1].max(), edges[:, 3].max()),
+                  max(edges[:, 0].max(), edges[:, 2].max())]
+    near = np.nonzero((x > bounds[0]) & (x <= bounds[1]) & (y <= bounds[2]))[0]
+    p1y, p1x, p2y, p2x = edges.T
+    step = max(1, 1000000 // len(edges))
+    for c in range(0, len(near), step):
+        pts = near[c:c + step]
+        py = y[pts][:, None]
+        px = x[pts][:, None]
+        cross = (px > np.minimum(p1x, p2x)) & (px <= np.maximum(p1x, p2x)) & (py <= np.maximum(p1y, p2y))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yints = (px - p1x) * (p2y - p1y) / (p2x - p1x) + p1y
+        cross &= (p1y == p2y) | (py <= yints)
+        inside[pts] = np.count_nonzero(cross, axis=1) % 2 == 1
+    return inside
+
+
 def dust(pyd, pxd, y1d, x1d, y2d, x2d):   # debug
     if y1d == y2d and x1d == x2d:
         return [-1]
@@ -76,6 +109,164 @@ def dust(pyd, pxd, y1d, x1d, y2d, x2d):   # debug
     return [round(abs(dist) * RADIUS, 3), round(degrees(y), 6), round(degrees(x), 6)]
 
 
+def distancesPointLines(py, px, y1, x1, y2, x2):
+    # DistancePointLine (in km, not rounded) for arrays of segments (in radians)
+    def bearings(y1, x1, y2, x2):
+        return np.arctan2(np.sin(x2 - x1) * np.cos(y2), np.cos(y1) * np.sin(y2) - np.sin(y1) * np.cos(y2) * np.cos(x2 - x1))
+
+    def distances(y1, x1, y2, x2):
+        ra13 = np.sin((y2 - y1) / 2.) ** 2 + np.cos(y1) * np.cos(y2) * np.sin((x2 - x1) / 2.) ** 2
+        return 2 * np.arcsin(np.minimum(1, np.sqrt(ra13)))
+
+    b13 = bearings(y1, x1, py, px)
+    b12 = bearings(y1, x1, y2, x2)
+    d13 = distances(y1, x1, py, px)
+    d23 = distances(y2, x2, py, px)
+    dxt = np.arcsin(np.clip(np.sin(d13) * np.sin(b13 - b12), -1, 1))
+    dat = np.arccos(np.clip(np.cos(d13) / np.cos(dxt), -1, 1))
+    iy = np.arcsin(np.clip(np.sin(y1) * np.cos(dat) + np.cos(y1) * np.sin(dat) * np.cos(b12), -1, 1))
+    ix = x1 + np.arctan2(np.sin(b12) * np.sin(dat) * np.cos(y1), np.cos(dat) - np.sin(y1) * np.sin(iy))
+    outside = (np.abs(ix - x1) > np.abs(x1 - x2)) | (np.abs(iy - y1) > np.abs(y1 - y2))
+    dst = np.where(outside, d13, np.minimum(distances(iy, ix, py, px), d13))
+    return np.minimum(dst, d23) * RADIUS
+
+
+def dusts(py, px, y1, x1, y2, x2):
+    # dust (in km, not rounded) for arrays of segments (in radians); -1 if no length
+    p_x = x2 - x1
+    p_y = y2 - y1
+    something = p_x * p_x + p_y * p_y
+    u = np.clip(((px - x1) * p_x + (py - y1) * p_y) / np.where(something == 0, 1., something), 0, 1)
+    dst = np.sqrt((x1 + u * p_x - px) ** 2 + (y1 + u * p_y - py) ** 2) * RADIUS
+    return np.where(something == 0, -1., dst)
+
+
+class SegmentIndex:
+    # The line segments packed (sort-tile-recursive) into leaves of LEAF segments with their
+    # bounding boxes. The boxes hold any point DistancePointLine (or dust) can return for a
+    # segment so leaves too far away can be skipped. Lines appended after the index is built
+    # are just checked; if the indexed lines change it is built again
+    LEAF = 16
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.build()
+
+    def build(self):
+        self.indexed = self.lines[:]
+        seg_line = []
+        seg_pt = []
+        ends = []
+        for l in range(len(self.indexed)):
+            coords = self.indexed[l].coordinates
+            for i in range(len(coords) - 1):
+                seg_line.append(l)
+                seg_pt.append(i)
+                ends.append([coords[i][0], coords[i][1], coords[i + 1][0], coords[i + 1][1]])
+        self.seg_line = np.array(seg_line, dtype=np.int64)
+        self.seg_pt = np.array(seg_pt, dtype=np.int64)
+        self.ends = np.radians(np.array(ends, dtype=np.float64).reshape(-1, 4))
+        segs = len(self.seg_line)
+        self.seg_leaf = np.zeros(segs, dtype=np.int64)
+        self.boxes = np.zeros((0, 4))
+        if segs == 0:
+            return
+        # boxes around the first point as big as the segment (see DistancePointLine)
+        y1, x1, y2, x2 = self.ends.T
+        dy = np.abs(y2 - y1)
+        dx = np.abs(x2 - x1)
+        seg_boxes = np.stack([y1 - dy, y1 + dy, x1 - dx, x1 + dx], axis=1)
+        leaves = int(np.ceil(segs / float(self.LEAF)))
+        slices = int(np.ceil(np.sqrt(leaves)))
+        order = np.argsort(x1, kind='stable')
+        per_slice = slices * self.LEAF
+        leaf = 0
+        for s in range(0, segs, per_slice):
+            members = order[s:s + per_slice]
+            members = members[np.argsort(y1[members], kind='stable')]
+            for m in range(0, len(members), self.LEAF):
+                self.seg_leaf[members[m:m + self.LEAF]] = leaf
+                leaf += 1
+        self.boxes = np.zeros((leaf, 4))
+        self.boxes[:, 0] = np.inf
+        self.boxes[:, 2] = np.inf
+        self.boxes[:, 1] = -np.inf
+        self.boxes[:, 3] = -np.inf
+        np.minimum.at(self.boxes[:, 0], self.seg_leaf, seg_boxes[:, 0])
+        np.maximum.at(self.boxes[:, 1], self.seg_leaf, seg_boxes[:, 1])
+        np.minimum.at(self.boxes[:, 2], self.seg_leaf, seg_boxes[:, 2])
+        np.maximum.at(self.boxes[:, 3], self.seg_leaf, seg_boxes[:, 3])
+
+    def lowerBounds(self, py, px, boxes, planar=False):
+        # least distance (km) from the point to anywhere in the boxes
+        dlat = np.maximum(0, np.maximum(boxes[:, 0] - py, py - boxes[:, 1]))
+        dlon = np.maximum(0, np.maximum(boxes[:, 2] - px, px - boxes[:, 3]))
+        if planar:
+            return np.sqrt(dlat * dlat + dlon * dlon) * RADIUS
+        dlon = np.minimum(dlon, np.maximum(0, 2 * np.pi - dlon))
+        cosine = np.maximum(0, np.minimum(np.cos(py), np.minimum(np.cos(boxes[:, 0]), np.cos(boxes[:, 1]))))
+        across = 2 * np.arcsin(np.minimum(1, cosine * np.sin(np.minimum(dlon, np.pi) / 2.)))
+        return np.maximum(dlat, across) * RADIUS
+
+    def segments(self, lat, lon, planar=False, ignore=[]):
+        # the segments ([line, point] in line order) that could be nearest the point
+        if self.lines[:len(self.indexed)] != self.indexed:
+            self.build()
+        py = radians(lat)
+        px = radians(lon)
+        seg_line = self.seg_line
+        seg_pt = self.seg_pt
+        ends = self.ends
+        if len(self.lines) > len(self.indexed):   # lines added since
+            seg_line = [seg_line]
+            seg_pt = [seg_pt]
+            ends = [ends]
+            for l in range(len(self.indexed), len(self.lines)):
+                coords = self.lines[l].coordinates
+                if len(coords) < 2:
+                    continue
+                seg_line.append(np.full(len(coords) - 1, l, dtype=np.int64))
+                seg_pt.append(np.arange(len(coords) - 1, dtype=np.int64))
+                ends.append(np.radians(np.array([[coords[i][0], coords[i][1], coords[i + 1][0], coords[i + 1][1]]
+                                                 for i in range(len(coords) - 1)], dtype=np.float64)))
+            added = len(self.seg_line)
+            seg_line = np.concatenate(seg_line)
+            seg_pt = np.concatenate(seg_pt)
+            ends = np.concatenate(ends)
+        else:
+            added = len(seg_line)
+        if len(seg_line) == 0:
+            return []
+        use = np.ones(len(seg_line), dtype=bool)
+        if len(ignore) > 0:
+            use &= ~np.isin(seg_line, ignore)
+        if len(self.boxes) > 0:
+            # an upper limit from the nearest leaf (and the added lines), then the leaves within that
+            bounds = self.lowerBounds(py, px, self.boxes, planar=planar)
+            near = np.zeros(len(seg_line), dtype=bool)
+            near[:added] = self.seg_leaf == np.argmin(bounds)
+            near[added:] = True
+            best = self.distances(py, px, ends[near & use], planar)
+            best = best[best >= 0]
+            if len(best) > 0:
+                within = bounds <= best.min() + 0.02
+                use[:added] &= within[self.seg_leaf]
+        ids = np.nonzero(use)[0]
+        dists = self.distances(py, px, ends[ids], planar)
+        ok = dists >= 0
+        ids = ids[ok]
+        dists = dists[ok]
+        if len(ids) == 0:
+            return []
+        ids = ids[dists <= dists.min() + 0.02]
+        return [[l, i] for l, i in zip(seg_line[ids].tolist(), seg_pt[ids].tolist())]
+
+    def distances(self, py, px, ends, planar):
+        if planar:
+            return dusts(py, px, ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3])
+        return distancesPointLines(py, px, ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3])
+
+
 class Line:
     def __init__(self, name, style, coordinates, length=0., connector=-1, dispatchable=None, line_cost=None, peak_load=None,
                  peak_dispatchable=None, peak_loss=None, line_table=None, substation_cost=None, initial=None):
@@ -190,44 +381,22 @@ class Grid:
         return new_lines
 
     def get_config(self):
-        config = configparser.RawConfigParser()
-        if len(sys.argv) > 1:
-            config_file = sys.argv[1]
-        else:
-            config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
+        config = getConfig()
+        self.base_year = config.base_year
         try:
-            self.base_year = config.get('Base', 'year')
-        except:
-            self.base_year = '2012'
-        parents = []
-        try:
-            parents = getParents(aparents = config.items('Parents'))
-        except:
-            pass
-        try:
-            self.kml_file = config.get('Files', 'grid_network')
-            for key, value in parents:
-                self.kml_file = self.kml_file.replace(key, value)
-            self.kml_file = self.kml_file.replace('$USER$', getUser())
-            self.kml_file = self.kml_file.replace('$YEAR$', self.base_year)
+            self.kml_file = config.getFile('Files', 'grid_network')
         except:
             self.kml_file = ''
         self.kml_file2 = ''
         try:
-            self.kml_file2 = config.get('Files', 'grid2_network')
+            self.kml_file2 = config.getFile('Files', 'grid2_network')
         except configparser.NoOptionError:
             try:
-                self.kml_file2 = config.get('Files', 'grid_network2')
+                self.kml_file2 = config.getFile('Files', 'grid_network2')
             except:
                 pass
         except:
             pass
-        if self.kml_file2 != '':
-            for key, value in parents:
-                self.kml_file2 = self.kml_file2.replace(key, value)
-            self.kml_file2 = self.kml_file2.replace('$USER$', getUser())
-            self.kml_file2 = self.kml_file2.replace('$YEAR$', self.base_year)
         try:
             mapc = config.get('Map', 'map_choice')
         except:
@@ -355,6 +524,7 @@ class Grid:
     def __init__(self, grid2=False):
         self.get_config()
         self.lines = []
+        self.index = SegmentIndex(self.lines)
         if grid2:
             kml_file = self.kml_file2
         else:
@@ -365,6 +535,33 @@ class Grid:
             else:
                 self.kml_file = ''
             return
+        cache_file = kml_file + ('.grid2' if grid2 else '.grid') + '.npz'
+        key = self.cacheKey(kml_file, grid2)
+        if not self.readCache(cache_file, key):
+            if not self.readKml(kml_file, grid2):
+                return
+            self.saveCache(cache_file, key)
+        self.index.build()
+     # connect together
+     # if load_centres connect closest end to closest load centre
+     #    for i in range(len(self.lines)):
+     #        connect = []
+     #        con = -1
+     #        connect.append(self.gridConnect(self.lines[i].coordinates[0][0], self.lines[i].coordinates[0][1], \
+     #                       ignore=[i]))
+     #        connect.append(self.gridConnect(self.lines[i].coordinates[-1][0], self.lines[i].coordinates[-1][1], \
+     #                       ignore=[i]))
+     #        if connect[0][0] > 0:
+     #            if connect[1][0] < connect[0][0]:
+     #                con = connect[1][2]
+     #                self.lines[i].coordinates.append([connect[1][1], connect[1][2]])
+     #            else:
+     #                con = connect[0][2]
+     #                self.lines[i].coordinates.insert(0, [connect[0][1], connect[0][2]])
+     #        self.lines[i].connector = con
+
+    def readKml(self, kml_file, grid2):
+        # stream the KML (elements are dropped once used) keeping the lines within the map
         style = {}
         styl = ''
         zipped = False
@@ -377,32 +574,40 @@ class Grid:
                     inner_file = name
                     break
             if inner_file == '':
-                return
-            memory_file = io.BytesIO()
-            memory_file.write(zf.open(inner_file).read())
-            root = ElementTree(fromstring(memory_file.getvalue()))
+                zf.close()
+                return False
+            kml_data = zf.open(inner_file)
         else:
             kml_data = open(kml_file, 'rb')
-            root = ElementTree(fromstring(kml_data.read()))
-         # Create an iterator
-        if sys.version_info[1] < 9: # before python 3.9
-            iterat = root.getiterator()
-        else:
-            iterat = root.iter()
+        map_bounds = [min([pt[1] for pt in self.map_polygon]), max([pt[1] for pt in self.map_polygon]),
+                      max([pt[0] for pt in self.map_polygon])]
         placemark_id = ''
         line_names = []
         stylm = ''
-        for element in iterat:
+        parents = []
+        # attributes are there at the start of an element and text at the end
+        for event, element in iterparse(kml_data, events=('start', 'end')):
             elem = element.tag[element.tag.find('}') + 1:]
-            if elem == 'Style':
-                for name, value in list(element.items()):
-                    if name == 'id':
-                        styl = value
-            elif elem == 'StyleMap':
-                for name, value in list(element.items()):
-                    if name == 'id':
-                        stylm = value
-            elif elem == 'color':
+            if event == 'start':
+                parents.append(element)
+                if elem == 'Style':
+                    for name, value in list(element.items()):
+                        if name == 'id':
+                            styl = value
+                elif elem == 'StyleMap':
+                    for name, value in list(element.items()):
+                        if name == 'id':
+                            stylm = value
+                elif elem == 'Placemark' and grid2:
+                    for key, value in list(element.items()):
+                        if key == 'id':
+                            if value[:4] == 'kml_':
+                                placemark_id = value[3:]
+                            else:
+                                placemark_id = value
+                continue
+            parents.pop()
+            if elem == 'color':
                 if styl in self.colors:
                     style[styl] = self.colors[styl]
                 else:
@@ -417,13 +622,6 @@ class Grid:
                 if placemark_id != '':
                     line_name += placemark_id
                     placemark_id = ''
-            elif elem == 'Placemark' and grid2:
-                for key, value in list(element.items()):
-                    if key == 'id':
-                        if value[:4] == 'kml_':
-                            placemark_id = value[3:]
-                        else:
-                            placemark_id = value
             elif elem == 'SimpleData' and grid2:
                 for key, value in list(element.items()):
                     if key == 'name' and value in ['CAPACITY_kV', 'CAPACITYKV', 'kv']:
@@ -439,8 +637,9 @@ class Grid:
                 for i in range(len(coordinates)):
                     coords.append([float(coordinates[i].split(',')[1]), float(coordinates[i].split(',')[0])])
                 inmap = False
-                for coord in coords:
-                    if within_map(coord[0], coord[1], self.map_polygon):
+                for coord in coords:   # only points within the map's bounds can be in it
+                    if coord[1] > map_bounds[0] and coord[1] <= map_bounds[1] and coord[0] <= map_bounds[2] \
+                      and within_map(coord[0], coord[1], self.map_polygon):
                         inmap = True
                         break
                 if inmap:
@@ -469,44 +668,84 @@ class Grid:
                         except:
                             style[styl] = '#FFFFFF'
                             self.lines.append(Line(line_name, style[styl], coords, length=grid_len))
+            if len(parents) > 0:
+                del parents[-1][-1]   # finished with it
+        kml_data.close()
         if zipped:
-            memory_file.close()
             zf.close()
-        else:
-            kml_data.close()
-     # connect together
-     # if load_centres connect closest end to closest load centre
-     #    for i in range(len(self.lines)):
-     #        connect = []
-     #        con = -1
-     #        connect.append(self.gridConnect(self.lines[i].coordinates[0][0], self.lines[i].coordinates[0][1], \
-     #                       ignore=[i]))
-     #        connect.append(self.gridConnect(self.lines[i].coordinates[-1][0], self.lines[i].coordinates[-1][1], \
-     #                       ignore=[i]))
-     #        if connect[0][0] > 0:
-     #            if connect[1][0] < connect[0][0]:
-     #                con = connect[1][2]
-     #                self.lines[i].coordinates.append([connect[1][1], connect[1][2]])
-     #            else:
-     #                con = connect[0][2]
-     #                self.lines[i].coordinates.insert(0, [connect[0][1], connect[0][2]])
-     #        self.lines[i].connector = con
+        return True
+
+    def cacheKey(self, kml_file, grid2):
+        # what the lines from a KML file depend on
+        stat = os.stat(kml_file)
+        parts = [os.path.abspath(kml_file), stat.st_mtime_ns, stat.st_size, grid2, self.map_polygon,
+                 self.default_length, sorted(self.colors.items()), sorted(self.grid2_colors.items())]
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def readCache(self, cache_file, key):
+        # the lines saved (by saveCache) beside the KML file if it hasn't changed
+        try:
+            cache = np.load(cache_file)
+            if str(cache['key']) != key:
+                return False
+            names = cache['names'].tolist()
+            styles = cache['styles'].tolist()
+            initials = cache['initials'].tolist()
+            has_initial = cache['has_initial'].tolist()
+            lengths = cache['lengths'].tolist()
+            ends = np.cumsum(cache['counts']).tolist()
+            coords = cache['coords'].tolist()
+        except:
+            return False
+        strt = 0
+        for l in range(len(names)):
+            if self.default_length >= 0:
+                grid_len = lengths[l]
+            else:
+                grid_len = self.default_length
+            self.lines.append(Line(names[l], styles[l], coords[strt:ends[l]], length=grid_len))
+            if has_initial[l]:
+                self.lines[-1].initial = initials[l]
+            strt = ends[l]
+        return True
+
+    def saveCache(self, cache_file, key):
+        # keep the lines (a KML file can take a while to read)
+        for line in self.lines:
+            if not isinstance(line.name, str) or not isinstance(line.style, str):
+                return
+        coords = [coord for line in self.lines for coord in line.coordinates]
+        try:
+            temp_file = cache_file + '.' + str(os.getpid()) + '.tmp'
+            with open(temp_file, 'wb') as npz:
+                np.savez(npz, key=np.array(key),
+                         names=np.array([line.name for line in self.lines], dtype=str),
+                         styles=np.array([line.style for line in self.lines], dtype=str),
+                         initials=np.array([line.initial if line.initial is not None else '' for line in self.lines],
+                                           dtype=str),
+                         has_initial=np.array([line.initial is not None for line in self.lines], dtype=bool),
+                         lengths=np.array([line.length for line in self.lines], dtype=np.float64),
+                         counts=np.array([len(line.coordinates) for line in self.lines], dtype=np.int64),
+                         coords=np.array(coords, dtype=np.float64).reshape(-1, 2))
+            os.replace(temp_file, cache_file)
+        except:
+            try:
+                os.remove(temp_file)
+            except:
+                pass
 
     def gridConnect(self, lat, lon, ignore=[]):
         shortest = [99999, -1., -1., -1]
-        for l in range(len(self.lines)):
-            if l in ignore:
-                continue
-            for i in range(len(self.lines[l].coordinates) - 1):
-                if self.dummy_fix:
-                    dist = dust(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
-                           self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
-                else:
-                    dist = self.DistancePointLine(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
-                           self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
-                if dist[0] >= 0 and dist[0] < shortest[0]:
-                    shortest = dist[:]
-                    shortest.append(l)
+        for l, i in self.index.segments(lat, lon, planar=self.dummy_fix, ignore=ignore):
+            if self.dummy_fix:
+                dist = dust(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
+                       self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
+            else:
+                dist = self.DistancePointLine(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
+                       self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
+            if dist[0] >= 0 and dist[0] < shortest[0]:
+                shortest = dist[:]
+                shortest.append(l)
         if shortest[0] == 99999:
              shortest[0] = -1
         return shortest   # length, lat, lon, line#
@@ -605,21 +844,8 @@ class Grid:
 
 class Grid_Area:
     def get_config(self):
-        config = configparser.RawConfigParser()
-        if len(sys.argv) > 1:
-            config_file = sys.argv[1]
-        else:
-            config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
-        try:
-            self.base_year = config.get('Base', 'year')
-        except:
-            self.base_year = '2012'
-        parents = []
-        try:
-            parents = getParents(config.items('Parents'))
-        except:
-            pass
+        config = getConfig()
+        self.base_year = config.base_year
         self.kml_file = []
         if self.area == 'grid_areas':
             suffix = ['', '1', '2', '3', '4', '5']
@@ -629,11 +855,7 @@ class Grid_Area:
             suffix = ['']
         for s in suffix:
             try:
-                kml_file = config.get('Files', self.area + s)
-                for key, value in parents:
-                    kml_file = kml_file.replace(key, value)
-                    kml_file = kml_file.replace('$USER$', getUser())
-                    kml_file = kml_file.replace('$YEAR$', self.base_year)
+                kml_file = config.getFile('Files', self.area + s)
                 self.kml_file.append(kml_file)
             except:
                 pass
@@ -767,10 +989,19 @@ class Grid_Zones(Grid_Area):
 
     def __init__(self):
         Grid_Area.__init__(self, 'grid_zones')
+        self.index = SegmentIndex(self.lines)
+        self.edges = []
+        self.bounds = []
+        for line in self.lines:
+            self.edges.append(polygon_edges(line.coordinates))
+            self.bounds.append([min(self.edges[-1][:, 1]), max(self.edges[-1][:, 1]), max(self.edges[-1][:, 0])])
+        self.zones = {}   # zone for each (lat, lon) worked out
 
     def getZone(self, coords1, coords2):
         if len(self.lines) < 1:
             return 'No zones defined'
+        if (coords1, coords2) in self.zones:
+            return self.zones[(coords1, coords2)]
         for line in self.lines:
             if within_map(coords1, coords2, line.coordinates):
                 return(line.name)
@@ -778,15 +1009,37 @@ class Grid_Zones(Grid_Area):
         nearest = self.nearestZone(coords1, coords2)
         return self.lines[nearest[3]].name
 
+    def getZones(self, lats, lons):
+        # getZone for a lot of points at once; getZone then has them too
+        if len(self.lines) < 1:
+            return ['No zones defined'] * len(lats)
+        y = np.array(lats, dtype=np.float64)
+        x = np.array(lons, dtype=np.float64)
+        zone = np.full(len(y), -1, dtype=np.int64)
+        for l in range(len(self.lines)):
+            todo = np.nonzero(zone < 0)[0]
+            if len(todo) == 0:
+                break
+            inside = within_map_points(y[todo], x[todo], self.edges[l], self.bounds[l])
+            zone[todo[inside]] = l
+        zones = []
+        for p in range(len(y)):
+            if zone[p] >= 0:
+                name = self.lines[zone[p]].name
+            else:   # find nearest zone
+                name = self.lines[self.nearestZone(lats[p], lons[p])[3]].name
+            self.zones[(lats[p], lons[p])] = name
+            zones.append(name)
+        return zones
+
     def nearestZone(self, lat, lon):
         shortest = [99999, -1., -1., -1]
-        for l in range(len(self.lines)):
-            for i in range(len(self.lines[l].coordinates) - 1):
-                dist = self.DistancePointLine(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
-                       self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
-                if dist[0] >= 0 and dist[0] < shortest[0]:
-                    shortest = dist[:]
-                    shortest.append(l)
+        for l, i in self.index.segments(lat, lon):
+            dist = self.DistancePointLine(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
+                   self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
+            if dist[0] >= 0 and dist[0] < shortest[0]:
+                shortest = dist[:]
+                shortest.append(l)
         if shortest[0] == 99999:
              shortest[0] = -1
         return shortest   # length, lat, lon, line#
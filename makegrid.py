@@ -31,6 +31,7 @@ import displayobject
 from credits import fileVersion
 from floaters import ProgressBar
 from getmodels import getModelFile
+from resourcestore import listResources, readLines
 from senutils import ClickableQLabel, getParents, getUser, ssCol
 
 
@@ -149,20 +150,14 @@ class makeFile():
             daily_values = {}
         for i in range(len(the_days)):
             the_hour.append(the_hour[-1] + the_days[i] * 24)
-        fils = os.listdir(self.src_dir)
+        fils = listResources(self.src_dir)
         for fil in fils:
             if fil[-4:] == '.csv' or fil[-4:] == '.smw':
+                lines = readLines(self.src_dir, fil)
                 if fil[-4:] == '.csv':
-                    tf = open(self.src_dir + '/' + fil, 'r')
-                    line = tf.readline()
-                    if line.find('Latitude') < 0 or line.find('Longitude') < 0 \
-                      or line.find('Time Zone') < 0:
-                        tf.close()
+                    if len(lines) == 0 or lines[0].find('Latitude') < 0 or lines[0].find('Longitude') < 0 \
+                      or lines[0].find('Time Zone') < 0:
                         continue
-                    tf.seek(0)
-                tf = open(self.src_dir + '/' + fil, 'r')
-                lines = tf.readlines()
-                tf.close()
                 valu = []
                 cell = []
                 for j in range(len(the_cols)):
@@ -282,7 +277,7 @@ class makeFile():
                     daily_values[key] = vald
 # now get 50m wind speed
         self.show_progress('Collected solar data')
-        fils = os.listdir(self.wind_dir)
+        fils = listResources(self.wind_dir)
         val_col = the_cols.index('Wind @ 50m')
         wind_values = {}
         if self.hourly:
@@ -305,9 +300,7 @@ class makeFile():
                     vald.append([])
                     for j in range(365):
                         vald[-1].append(0.)
-            tf = open(self.wind_dir + '/' + fil, 'r')
-            lines = tf.readlines()
-            tf.close()
+            lines = readLines(self.wind_dir, fil)
             fst_row = len(lines) - 8760
             bits = lines[0].split(',')
             src_lat = float(bits[5])
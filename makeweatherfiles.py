@@ -21,11 +21,15 @@
 from datetime import datetime, timedelta
 import gzip
 from math import *
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
 import time
 from netCDF4 import Dataset
 import configparser   # decode .ini file
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 if sys.platform == 'win32' or sys.platform == 'cygwin':
     from win32api import GetFileVersionInfo, LOWORD, HIWORD
@@ -33,8 +37,9 @@ if sys.platform == 'win32' or sys.platform == 'cygwin':
 from credits import fileVersion
 from editini import SaveIni
 from getmodels import getModelFile
+from resourcestore import ResourceStore, storeFolder, textLines
 from senutils import ClickableQLabel, getUser, extrapolateWind
-from sammodels import getDNI, getDHI
+from sammodels import getDNIs, getDHIs
 
 
 class ShowHelp(QtWidgets.QDialog):
@@ -132,168 +137,302 @@ class ShowHelp(QtWidgets.QDialog):
         self.close()
 
 
+# values from a netCDF variable or array as an array
+def gridValues(var):
+    return np.ma.getdata(var[:])
+
+# data type numpy gives a value of values combined with other
+def elementType(values, other):
+    return np.result_type(type(values.dtype.type(1) + other))
+
+# round as python round() does; np.round can differ for values close to .5
+def roundAsFloat(values, digits):
+    rounded = np.round(values, digits)
+    scaled = np.abs(values) * 10. ** digits
+    for ndx in zip(*np.nonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)):
+        rounded[ndx] = round(float(values[ndx]), digits)
+    return rounded
+
+
+class HourlyGrid():
+    # values for each hour over a latitude, longitude grid. Space for the year
+    # is allocated when the first file is read and each file fills its hours.
+    # Files with a different grid (or type) change it to a list of hours.
+    # A grid on disk is a (lat, lon, hour) file so each location's hours are
+    # together and only the parts being used need to be in memory. Wind speeds
+    # and directions (python_values) used to be python numbers so are worked in
+    # the type of what they're combined with
+    def __init__(self, hours=8784 + 48, python_values=False):
+        self.hours = hours
+        self.python_values = python_values
+        self.data = None
+        self.size = 0
+        self.disk = False
+        self.folder = None
+        self.file = None
+
+    def useDisk(self, folder=None):
+        self.disk = True
+        self.folder = folder
+
+    def allocate(self, hours, shape, dtype):
+        if not self.disk:
+            return np.empty((hours, ) + shape, dtype=dtype), None
+        fil = tempfile.TemporaryFile(dir=self.folder, suffix='.grid')   # goes when closed
+        data = np.memmap(fil, dtype=dtype, mode='w+', shape=shape + (hours, ))
+        return np.asarray(data), fil
+
+    def capacity(self):
+        if self.disk:
+            return self.data.shape[-1]
+        return len(self.data)
+
+    def append(self, values):
+        if self.data is None:
+            self.data, self.file = self.allocate(max(self.hours, len(values)), values.shape[1:], values.dtype)
+        elif isinstance(self.data, list) or values.shape[1:] != self.grid() or values.dtype != self.data.dtype:
+            if not isinstance(self.data, list):
+                self.data = [np.array(self[hr]) for hr in range(self.size)]
+                self.file = None
+            self.data.extend(list(values))
+            self.size = len(self.data)
+            return
+        elif self.size + len(values) > self.capacity():
+            data, fil = self.allocate(self.size + len(values) + self.hours // 12, self.grid(), self.data.dtype)
+            if self.disk:
+                for lat in range(len(data)):   # a latitude at a time
+                    data[lat, :, :self.size] = self.data[lat, :, :self.size]
+            else:
+                data[:self.size] = self.data[:self.size]
+            self.data, self.file = data, fil
+        if self.disk:
+            self.data[:, :, self.size:self.size + len(values)] = np.moveaxis(values, 0, -1)
+        else:
+            self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def grid(self):
+        if self.disk:
+            return self.data.shape[:-1]
+        return self.data.shape[1:]
+
+    def keep(self, start=None, stop=None):
+        # keep just these hours (as for a slice)
+        if self.data is None:
+            return
+        if isinstance(self.data, list):
+            self.data = self.data[:self.size][start:stop]
+            self.size = len(self.data)
+            return
+        start, stop, step = slice(start, stop).indices(self.size)
+        size = max(0, stop - start)
+        if self.disk:
+            for lat in range(len(self.data)):
+                self.data[lat, :, :size] = self.data[lat, :, start:stop].copy()
+        else:
+            self.data[:size] = self.data[start:stop].copy()
+        self.size = size
+
+    def cell(self, lat, lon, hours):
+        # values of a grid cell for some hours (a slice or array of hours)
+        if isinstance(self.data, list):
+            return np.array([self.data[hr][lat][lon] for hr in range(self.size)])[hours]
+        if self.disk:
+            return self.data[lat, lon, :self.size][hours]
+        return self.data[:self.size][hours, lat, lon]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, hour):
+        if isinstance(hour, slice):
+            if self.disk:
+                return np.moveaxis(self.data[:, :, :self.size][:, :, hour], -1, 0)
+            return self.data[:self.size][hour]
+        if hour < 0:
+            hour += self.size
+        if hour < 0 or hour >= self.size:
+            raise IndexError('hour out of range')
+        if self.disk:
+            return self.data[:, :, hour]
+        return self.data[hour]
+
+
+# Weather files are written a site at a time. makeWeather works out the values
+# for each site (a task) and writeSiteFile formats a column at a time and writes
+# the file, in worker processes if [makeweatherfiles] workers is more than one
+def siteParts(task):
+    # the task's parts with GHI,DNI,DHI (None) worked out; text or [values, format]
+    parts = []
+    for part in task['parts']:
+        if isinstance(part, str):
+            parts.append(part)
+        elif part is not None:
+            parts.append([part, None])
+        else:
+            lat, lon, zone, hours, ghis, press, decimals = task['solar']
+            if decimals:
+                fmt = '{:0.1f}'
+            else:
+                fmt = 'int'
+            if len(hours) > 0:   # values and location in the types read, as getDNI had them
+                dnis = getDNIs(ghis, hours, lat, lon, press, zone)
+                dhis = getDHIs(ghis, dnis, hours, lat)
+            else:
+                dnis = dhis = []
+            parts += [[ghis, fmt], ',', [dnis, fmt], ',', [dhis, fmt]]
+    return parts
+
+def writeSiteFile(task):
+    # Returns extrapolateWind() result if done and, for the resource store, the parts
+    parts = siteParts(task)
+    updated = False
+    if task['text'] and task['patch'] is not None:   # replace the rows in the file
+        tf = open(task['file'], 'r')
+        lines = tf.readlines()
+        tf.close()
+        hdr = task['header'].count('\n')
+        for row, line in zip(task['patch'].tolist(), textLines(parts)):
+            lines[hdr + row] = line
+        tf = open(task['file'], 'w')
+        tf.write(''.join(lines))
+        tf.close()
+    elif task['text']:
+        lines = textLines(parts)
+        for hr in task['gaps']:
+            lines.insert(hr, ',,,,,,,,\n')
+        tf = open(task['file'], 'w')
+        tf.write(task['header'] + ''.join(lines))
+        tf.close()
+        if task['remove']:
+            os.remove(task['file'])
+        elif task['hub_height'] > 0:
+            updated = extrapolateWind(task['file'], task['hub_height'], law=task['law'], replace=True)
+    if task['store']:
+        return [updated, parts]
+    return [updated, None]
+
+
 class makeWeather():
 
     def unZip(self, inp_file):
+        # a .gz file is decompressed into memory or, if bigger than memory_limit,
+        # into a scratch file that is removed when closed (closeCDF)
         if inp_file is None:
             self.log += 'Terminating as file not found - %s\n' % inp_file
             self.return_code = 12
             return None
-        if inp_file[-3:] == '.gz':
-            if not os.path.exists(inp_file):
-                self.log += 'Terminating as file not found - %s\n' % inp_file
-                self.return_code = 4
-                return None
-            out_file = inp_file + '.nc'
-            if os.path.exists(out_file):
-                pass
-            else:
-                fin = gzip.open(inp_file, 'rb')
-                file_content = fin.read()
-                fin.close()
-                fou = open(out_file, 'wb')
-                fou.write(file_content)
-                fou.close()
-            return out_file
-        else:
-            if not os.path.exists(inp_file):
-                self.log += 'Terminating as file not found - %s\n' % inp_file
-                self.return_code = 4
-                return None
+        if not os.path.exists(inp_file):
+            self.log += 'Terminating as file not found - %s\n' % inp_file
+            self.return_code = 4
+            return None
+        if inp_file[-3:] != '.gz':
             return inp_file
+        if os.path.exists(inp_file + '.nc'):   # already decompressed
+            return inp_file + '.nc'
+        # read it a chunk at a time (the gzip trailer only has the size modulo 4 GB) until
+        # it ends or passes memory_limit, then the rest goes with it to the scratch file
+        fin = gzip.open(inp_file, 'rb')
+        if self.memory_limit <= 0:
+            data = fin.read()
+            fin.close()
+            return data
+        data = bytearray()
+        while len(data) <= self.memory_limit * 1048576:
+            chunk = fin.read(1048576)
+            if len(chunk) == 0:
+                fin.close()
+                return data
+            data += chunk
+        fou = tempfile.NamedTemporaryFile(dir=self.scratch_folder, suffix='.nc', delete=False)
+        fou.write(data)
+        del data
+        shutil.copyfileobj(fin, fou, 1048576)
+        fou.close()
+        fin.close()
+        self.scratch_file = fou.name
+        return fou.name
 
-    def getSpeed(self, vmi, umi):
+    def openCDF(self, inp_file):
+        unzip_file = self.unZip(inp_file)
+        if self.return_code != 0:
+            return None
         try:
-            um = umi.data
-            vm = vmi.data
+            if not isinstance(unzip_file, str):   # decompressed into memory
+                return Dataset(inp_file, 'r', memory=unzip_file)
+            return Dataset(unzip_file, 'r')
         except:
-            um = umi[:]
-            vm = vmi[:]
-        sm = []
-        for hr in range(len(um)):   # 24 hours
-            hm = []
-            for lat in range(len(um[hr])):   # n latitudes
-                lm = []
-                for lon in range(len(um[hr][lat])):   # m longitudes
-                    lm.append(round(sqrt(um[hr][lat][lon] * um[hr][lat][lon] +
-                                    vm[hr][lat][lon] * vm[hr][lat][lon]), 4))
-                hm.append(lm)
-            sm.append(hm)
-        return sm
+            self.decodeError(inp_file)
+            return None
+
+    def closeCDF(self, cdf_file):
+        cdf_file.close()
+        if self.scratch_file is not None:
+            try:
+                os.remove(self.scratch_file)
+            except:
+                pass
+            self.scratch_file = None
+
+    def getSpeed(self, vmi, umi):
+        um = gridValues(umi)
+        vm = gridValues(vmi)
+        # sum of squares in the data type then square root as a (python) float
+        return roundAsFloat(np.sqrt((um * um + vm * vm).astype(np.float64)), 4)
 
     def getDirn(self, vmi, umi):
-        try:
-            um = umi.data
-            vm = vmi.data
-        except:
-            um = umi[:]
-            vm = vmi[:]
-        dm = []
-        for hr in range(len(um)):   # 24 hours
-            hm = []
-            for lat in range(len(um[hr])):   # n latitudes
-                lm = []
-                for lon in range(len(um[hr][lat])):   # m longitudes
+        um = gridValues(umi)
+        vm = gridValues(vmi)
      # Calculate the wind direction
-                    if abs(vm[hr][lat][lon]) < 0.000001:   # No v-component of velocity
-                        if vm[hr][lat][lon] >= 0:
-                            lm.append(270)
-                        else:
-                            lm.append(90)
-                    else:   # Calculate angle and convert to degrees
-                        theta = atan(um[hr][lat][lon] / vm[hr][lat][lon])
-                        theta = degrees(theta)
-                        if vm[hr][lat][lon] > 0:
-                            lm.append(int(theta + 180.0))
-                        else:   # Make sure angle is positive
-                            theta = theta + 360.0
-                            lm.append(int(theta % 360.0))
-                hm.append(lm)
-            dm.append(hm)
-        return dm
-
-    def getTemp(self, tmi):
-        try:
-            tm = tmi.data
-        except:
-            tm = tmi[:]
-        tmp = []
-        for hr in range(len(tm)):   # 24 hours
-            ht = []
-            for lat in range(len(tm[hr])):   # n latitudes
-                lt = []
-                for lon in range(len(tm[hr][lat])):   # m longitudes
-                    lt.append(round(tm[hr][lat][lon] - 273.15, 1))   # K to C
-                ht.append(lt)
-            tmp.append(ht)
-        return tmp
-
-    def getPress(self, pmi):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            theta = np.degrees(np.arctan((um / vm).astype(np.float64)))
+        dm = np.where(vm > 0, theta + 180.0, (theta + 360.0) % 360.0)
+        dm = np.where(np.abs(vm) < 0.000001, np.where(vm >= 0, 270, 90), dm)   # No v-component of velocity
+        return dm.astype(np.int64)
+
+    def getTemp(self, tmi, exact=False):
+        tm = gridValues(tmi)
+        if exact:
+            return roundAsFloat(tm - 273.15, 1)   # K to C
+        return np.round(tm.astype(elementType(tm, 273.15)) - 273.15, 1)   # K to C
+
+    def getPress(self, pmi, exact=False):
         if self.fmat == 'srw':
             div = 101325   # Pa to atm
             rnd = 6
         else:
             div = 100.   # Pa to mbar (hPa)
             rnd = 0
-        try:
-            pm = pmi.data
-        except:
-            pm = pmi[:]
-        ps = []
-        for hr in range(len(pm)):   # 24 hours
-            hp = []
-            for lat in range(len(pm[hr])):   # n latitudes
-                lp = []
-                for lon in range(len(pm[hr][lat])):   # m longitudes
-                    lp.append(round(pm[hr][lat][lon] / div, rnd))   # Pa to mbar
-                hp.append(lp)
-            ps.append(hp)
-        return ps
+        pm = gridValues(pmi)
+        if exact:
+            return roundAsFloat(pm / div, rnd)
+        return np.round(pm.astype(elementType(pm, div)) / div, rnd)
 
     def getGHI(self, pmi, watts=True):
-        try:
-            pm = pmi.data
-        except:
-            pm = pmi[:]
-        ps = []
-        for hr in range(len(pm)):   # 24 or 8760 hours
-            hp = []
-            for lat in range(len(pm[hr])):   # n latitudes
-                lp = []
-                for lon in range(len(pm[hr][lat])):   # m longitudes
-                    if watts:
-                        lp.append(pm[hr][lat][lon])
-                    else:
-                        lp.append(pm[hr][lat][lon] / 3600) # joules so / seconds in an hour
-                hp.append(lp)
-            ps.append(hp)
-        return ps
+        pm = gridValues(pmi)
+        if watts:
+            return pm
+        return pm.astype(elementType(pm, 3600)) / 3600 # joules so / seconds in an hour
 
     def getAlbedo(self, alb1, alb2i=None):
-        try:
-            alb = alb1.data
-        except:
-            alb = alb1[:]
-        if alb2i is not None:
-            try:
-                alb2 = alb2i.data
-            except:
-                alb2 = alb2i[:]
-            do_2 = True
+        alb = gridValues(alb1)
+        if alb2i is None:
+            return alb
+        alb2 = gridValues(alb2i)
+        return (alb + alb2).astype(elementType(alb, 2)) / 2
+
+    def getExpver(self, var, t1, t2):
+        # ERA5 (first expver) value if there else ERA5T (second expver)
+        tmi = var[t1 : t2]
+        mask = np.ma.getmaskarray(tmi[:, 1])
+        if isinstance(tmi.dtype.type(0), float):
+            use_0 = ~np.ma.getmaskarray(tmi[:, 0])
+            tmp_var = np.where(use_0, np.ma.getdata(tmi[:, 0]), np.ma.getdata(tmi[:, 1])).astype(np.float64)
+            mask = mask & ~use_0
         else:
-            do_2 = false
-        tmp = []
-        for hr in range(len(alb)):   # 24 or 8760 hours
-            at = []
-            for lat in range(len(alb[hr])):   # n latitudes
-                ap = []
-                for lon in range(len(alb[hr][lat])):   # m longitudes
-                    ap.append(alb[hr][lat][lon])
-                    if do_2:
-                        ap[-1] = (ap[-1] + alb2[hr][lat][lon]) / 2
-                at.append(ap)
-            tmp.append(at)
-        return tmp
+            tmp_var = np.ma.getdata(tmi[:, 1]).astype(np.float64)
+        tmp_var[mask] = 0.
+        return tmp_var
 
     def decodeError(self, inp_file):
         self.log += 'Terminating as error with - %s\n' % inp_file
@@ -330,14 +469,557 @@ class makeWeather():
                 lat_rat * (1.0 - lon_rat) * data[lat1][lon1 + 1] +
                 (1.0 - lat_rat) * (1.0 - lon_rat) * data[lat1 + 1][lon1 + 1])
 
-    def get_data(self, inp_file):
-        unzip_file = self.unZip(inp_file)
-        if self.return_code != 0:
+    def siteWeights(self, lat, lon, hours):
+        # grid cell and ratios for a location for each grid layout (lat_lon_ndx) used
+        weights = {}
+        for ndx in set(self.lat_lon_ndx[:hours]):
+            lati = self.lati[ndx]
+            longi = self.longi[ndx]
+            for lat2 in range(len(lati)):
+                if lat <= lati[lat2]:
+                    break
+            for lon2 in range(len(longi)):
+                if lon <= longi[lon2]:
+                    break
+            if self.longrange[0] is None:
+                self.longrange[0] = longi[lon2]
+            elif longi[lon2] < self.longrange[0]:
+                self.longrange[0] = longi[lon2]
+            if self.longrange[1] is None:
+                self.longrange[1] = longi[lon2]
+            elif longi[lon2] > self.longrange[1]:
+                self.longrange[1] = longi[lon2]
+            lat1 = lat2 - 1
+            lat_rat = (lati[lat2] - lat) / (lati[lat2] - lati[lat1])
+            lon1 = lon2 - 1
+            lon_rat = (longi[lon2] - lon) / (longi[lon2] - longi[lon1])
+            weights[ndx] = [lat1, lon1, lat_rat, lon_rat]
+        return weights
+
+    def ratioValues(self, data, values, weights):
+        # values as valu combines them with the weights' ratios
+        if data.python_values:   # (python numbers) in the ratios' type
+            return values.astype(np.result_type(type(weights[2] * weights[3])))
+        return values
+
+    def siteValues(self, data, weights, hours, rnd=4):
+        # valu for each hour using the location's weights; all hours of a grid layout at once
+        if isinstance(data.data, list):
+            return [self.valu(self.ratioValues(data, data[hr], weights[self.lat_lon_ndx[hr]]),
+                    *weights[self.lat_lon_ndx[hr]], rnd=rnd) for hr in range(hours)]
+        lat_lon_ndx = np.asarray(self.lat_lon_ndx[:hours])
+        values = None
+        for ndx, (lat1, lon1, lat_rat, lon_rat) in weights.items():
+            if len(weights) > 1:
+                hrs = np.nonzero(lat_lon_ndx == ndx)[0]
+            else:
+                hrs = slice(0, hours)
+            cells = [self.ratioValues(data, data.cell(lat1 + la, lon1 + lo, hrs), weights[ndx])
+                     for la, lo in [[0, 0], [1, 0], [0, 1], [1, 1]]]
+            valu = lat_rat * lon_rat * cells[0] + \
+                   (1.0 - lat_rat) * lon_rat * cells[1] + \
+                   lat_rat * (1.0 - lon_rat) * cells[2] + \
+                   (1.0 - lat_rat) * (1.0 - lon_rat) * cells[3]
+            if rnd > 0:
+                valu = np.round(valu, rnd)
+            else:
+                valu = valu.astype(np.int64)
+            if values is None:
+                values = np.empty(hours, dtype=valu.dtype)
+            values[hrs] = valu
+        return values
+
+    def siteRows(self, la, lo, hours, solar=False):
+        # hours lats[la], lons[lo] is in the data, hours it isn't (gaps) and its grid cells
+        # ([lat, lon] in the solar grid then [lat, lon]) for each grid layout
+        cells = {}
+        for ndx in set(self.lat_lon_ndx[:hours]):
+            try:
+                cell = [self.lati[ndx].index(self.lats[la]), self.longi[ndx].index(self.lons[lo])]
+                if solar:
+                    cell = [self.latsi[ndx].index(self.lats[la]), self.longsi[ndx].index(self.lons[lo])] + cell
+                else:
+                    cell = cell + cell
+                cells[ndx] = cell
+            except:
+                pass
+        lat_lon_ndx = np.asarray(self.lat_lon_ndx[:hours])
+        missing = np.ones(hours, dtype=bool)
+        missing[:len(lat_lon_ndx)] = ~np.isin(lat_lon_ndx, list(cells.keys()))
+        gaps = np.nonzero(missing)[0]
+        if self.gaps:
+            return np.nonzero(~missing)[0], gaps.tolist(), False, cells
+        if len(gaps) > 0:   # up to the first missing hour
+            return np.arange(gaps[0]), [], True, cells
+        return np.arange(hours), [], False, cells
+
+    def cellValues(self, data, cells, hrs, solar=False):
+        # values for the hours from the site's cells (for the solar grid if solar)
+        if solar:
+            c = 0
+        else:
+            c = 2
+        lat_lon_ndx = np.asarray(self.lat_lon_ndx)[hrs]
+        if isinstance(data.data, list):
+            return [data[hr][cells[ndx][c]][cells[ndx][c + 1]] for hr, ndx in zip(hrs.tolist(), lat_lon_ndx.tolist())]
+        if len(cells) == 1:
+            cell = list(cells.values())[0]
+            return data.cell(cell[c], cell[c + 1], hrs)
+        values = None
+        for ndx, cell in cells.items():
+            pick = np.nonzero(lat_lon_ndx == ndx)[0]
+            valu = data.cell(cell[c], cell[c + 1], hrs[pick])
+            if values is None:
+                values = np.empty(len(hrs), dtype=valu.dtype)
+            values[pick] = valu
+        if values is None:
+            return []
+        return values
+
+    def yearHours(self, hrs):
+        # rows (hours) of the weather files for the hours read
+        if self.row_map is None:
+            return hrs
+        return self.row_map[hrs]
+
+    def dateText(self, rows, pad=False):
+        # year,month,day,hour, for the rows from the start of the year (or those being updated)
+        dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+        hrs = rows
+        if self.row_map is not None:
+            hrs = int(self.row_map[:rows].max()) + 1
+        if pad:
+            fmt = '{:02d}'
+        else:
+            fmt = '{}'
+        text = []
+        mth = 0
+        day = 1
+        hour = 0
+        for hr in range(hrs):
+            text.append(str(self.src_year) + ',' + fmt.format(mth + 1) + ',' + fmt.format(day) + ',' +
+                        fmt.format(hour) + ',')
+            hour += 1
+            if hour > 23:
+                hour = 0
+                day += 1
+                if day > dys[mth]:
+                    mth += 1
+                    day = 1
+                    hour = 0
+        if self.row_map is not None:
+            return [text[hr] for hr in self.row_map[:rows].tolist()]
+        return text
+
+    def siteTask(self, out_file, hdr, parts, solar=None, gaps=[], missing=False, remove=True, wind=False):
+        # a file for writeSiteFile; not kept (if remove) if data is missing or there are too many gaps
+        task = {'file': out_file, 'header': hdr, 'parts': parts, 'solar': solar, 'gaps': gaps,
+                'with_gaps': len(gaps), 'missing': missing, 'remove': False, 'hub_height': 0, 'law': self.law,
+                'text': True, 'store': False, 'patch': self.row_map}
+        if missing or len(gaps) >= 504:
+            task['remove'] = remove
+        elif wind:
+            task['hub_height'] = self.hub_height
+        # only complete sites go in the resource store; not wind extrapolated to hub height
+        if self.resource_store != '' and not missing and len(gaps) == 0 and task['hub_height'] == 0:
+            task['store'] = True
+            task['text'] = self.resource_store != 'only'
+        if self.row_map is not None and out_file[out_file.rfind('/') + 1:] not in self.manifest[2]:
+            task['text'] = False   # only files already made are updated
+        return task
+
+    def windHeader(self):
+        if self.era5:
+            return 'Wind data derived from ERA5 reanalysis-era5-single-levels\n' + \
+                   'Temperature,Pressure,Direction,Speed,Direction,Speed\n' + \
+                   'C,atm,degrees,m/s,degrees,m/s\n' + \
+                   '2,0,10,10,100,100\n'
+        if len(self.s10m) > 0:
+            return 'Wind data derived from MERRA-2 tavg1_2d_slv_Nx\n' + \
+                   'Temperature,Pressure,Direction,Speed,Temperature,Direction,Speed,Direction,Speed\n' + \
+                   'C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s\n' + \
+                   '2,0,2,2,10,10,10,50,50\n'
+        return 'Wind data derived from MERRA-2 tavg1_2d_slv_Nx\n' + \
+               'Temperature,Pressure,Direction,Speed,Direction,Speed\n' + \
+               'C,atm,degrees,m/s,degrees,m/s\n' + \
+               '2,0,2,2,50,50\n'
+
+    def windPointTask(self, i):
+        out_file = self.tgt_dir + 'wind_weather_' + str(self.src_lat[i]) + '_' + \
+                   str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
+        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
+              round(self.src_lat[i], 4), round(self.src_lon[i], 4))
+        if self.era5:
+            hours = len(self.s100m)
+            columns = [[self.t_2m, 1], [self.p_s, 6], [self.d10m, 0], [self.s10m, 4], [self.d100m, 0],
+                       [self.s100m, 4]]
+        elif len(self.s10m) > 0:
+            hours = len(self.s50m)
+            columns = [[self.t_2m, 1], [self.p_s, 6], [self.d2m, 0], [self.s2m, 4], [self.t_10m, 1],
+                       [self.s10m, 4], [self.d50m, 0], [self.s50m, 4]]
+        else:
+            hours = len(self.s50m)
+            columns = [[self.t_2m, 1], [self.p_s, 6], [self.d2m, 0], [self.s2m, 4], [self.d50m, 0],
+                       [self.s50m, 4]]
+        weights = self.siteWeights(self.src_lat[i], self.src_lon[i], hours)
+        parts = []
+        for data, rnd in columns:
+            parts += [self.siteValues(data, weights, hours, rnd=rnd), ',']
+        parts[-1] = '\n'
+        return self.siteTask(out_file, hdr + self.windHeader(), parts, wind=True)
+
+    def windGridTask(self, la, lo):
+        out_file = self.tgt_dir + 'wind_weather_' + '{:0.4f}'.format(self.lats[la]) + \
+                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.srw'
+        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
+              round(self.lats[la], 4), round(self.lons[lo], 4))
+        if self.era5:
+            hours = len(self.s100m)
+            columns = [self.t_2m, self.p_s, self.d10m, self.s10m, self.d100m, self.s100m]
+        elif len(self.s10m) > 0:
+            hours = len(self.s50m)
+            columns = [self.t_2m, self.p_s, self.d2m, self.s2m, self.t_10m, self.d10m, self.s10m,
+                       self.d50m, self.s50m]
+        else:
+            hours = len(self.s50m)
+            columns = [self.t_2m, self.p_s, self.d2m, self.s2m, self.d50m, self.s50m]
+        hrs, gaps, missing, cells = self.siteRows(la, lo, hours)
+        if not self.era5 and len(self.s10m) == 0:
+            gaps = []   # these hours are just left out
+        parts = []
+        for data in columns:
+            parts += [self.cellValues(data, cells, hrs), ',']
+        parts[-1] = '\n'
+        return self.siteTask(out_file, hdr + self.windHeader(), parts, gaps=gaps, missing=missing, wind=True)
+
+    def solarHeader(self, lat, lon):
+        if self.fmat == 'csv':
+            return 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
+                   'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(lat, 4),
+                   round(lon, 4), str(self.src_zone)) + \
+                   'Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n'
+        return 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
+               round(lat, 4), round(lon, 4), str(self.src_year))
+
+    def solarPointTask(self, i):
+        out_file = self.tgt_dir + 'solar_weather_' + \
+                   str(self.src_lat[i]) + '_' + str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
+        if self.era5:
+            t_2m = self.t_2m
+        else:
+            t_2m = self.t_10m
+        hours = len(self.s10m)
+        weights = self.siteWeights(self.src_lat[i], self.src_lon[i], hours)
+        ghis = self.siteValues(self.ghi, weights, hours)
+        p_s = self.siteValues(self.p_s, weights, hours, rnd=0)
+        if self.fmat == 'csv':
+            parts = [self.dateText(hours), None, ',',
+                     self.siteValues(t_2m, weights, hours, rnd=1), ',',
+                     p_s, ',',
+                     self.siteValues(self.s10m, weights, hours), ',',
+                     self.siteValues(self.d10m, weights, hours, rnd=0), '\n']
+        else:
+            if len(self.alb) > 0:
+                alb = self.siteValues(self.alb, weights, hours)
+            else:
+                alb = '-999'
+            parts = [self.siteValues(t_2m, weights, hours, rnd=1), ',-999,-999,-999,',
+                     self.siteValues(self.s10m, weights, hours), ',',
+                     self.siteValues(self.d10m, weights, hours, rnd=0), ',',
+                     self.siteValues(self.p_s, weights, hours, rnd=1), ',', None, ',', alb, ',-999,\n']
+        solar = [self.src_lat[i], self.src_lon[i], self.src_zone, self.yearHours(np.arange(hours)) + 1, ghis, p_s,
+                 False]
+        return self.siteTask(out_file, self.solarHeader(self.src_lat[i], self.src_lon[i]), parts, solar=solar)
+
+    def solarGridTask(self, la, lo):
+        out_file = self.tgt_dir + 'solar_weather_' + '{:0.4f}'.format(self.lats[la]) + \
+                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.' + self.fmat
+        if self.era5:
+            t_2m = self.t_2m
+        else:
+            t_2m = self.t_10m
+        # MERRA-2 solar values are from the solar (rad) grid
+        hrs, gaps, missing, cells = self.siteRows(la, lo, len(self.s10m), solar=not self.era5)
+        if self.fmat == 'csv':
+            parts = [self.dateText(len(hrs), pad=True), None, ',',
+                     self.cellValues(t_2m, cells, hrs), ',',
+                     self.cellValues(self.p_s, cells, hrs), ',',
+                     self.cellValues(self.s10m, cells, hrs), ',',
+                     self.cellValues(self.d10m, cells, hrs), '\n']
+        else:
+            alb = '-999'
+            if not self.era5 and len(self.alb) > 0:
+                albs = hrs[hrs < len(self.alb)]
+                alb = list(self.cellValues(self.alb, cells, albs, solar=True)) + ['-999'] * (len(hrs) - len(albs))
+            parts = [self.cellValues(t_2m, cells, hrs), ',-999,-999,-999,',
+                     self.cellValues(self.s10m, cells, hrs), ',',
+                     self.cellValues(self.d10m, cells, hrs), ',',
+                     self.cellValues(self.p_s, cells, hrs), ',', None, ',', alb, ',-999,\n']
+        solar = [self.lats[la], self.lons[lo], self.src_zone, self.yearHours(hrs) + 1,
+                 self.cellValues(self.ghi, cells, hrs, solar=True),
+                 self.cellValues(self.p_s, cells, hrs, solar=True), self.fmat == 'csv']
+        return self.siteTask(out_file, self.solarHeader(self.lats[la], self.lons[lo]), parts, solar=solar,
+                             gaps=gaps, missing=missing, remove=not self.era5)
+
+    def writeSites(self, tasks, sites):
+        # write the files for the tasks (a few at a time so only some sites' values are held)
+        workers = self.workers
+        pool = None
+        self.store = None
+        self.store_sites = sites
+        if workers > 1 and sites > 1:
+            try:   # spawn so workers don't inherit the GUI
+                pool = multiprocessing.get_context('spawn').Pool(min(workers, sites))
+            except Exception as err:
+                self.logMsg('Weather file processes not started - ' + str(err))
+                pool = None
+        site = 0
+        batch = []
+        for task in tasks:
+            batch.append(task)
+            if pool is None or len(batch) >= workers * 4:
+                pool = self.writeBatch(pool, batch, site)
+                site += len(batch)
+                batch = []
+        if len(batch) > 0:
+            pool = self.writeBatch(pool, batch, site)
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if self.store is not None:
+            self.store.close()
+            if len(self.store.names) > 0:
+                self.log += '%s has %s sites\n' % (os.path.basename(self.store.folder), len(self.store.names))
+            self.store = None
+
+    def writeBatch(self, pool, batch, site):
+        results = None
+        if pool is not None:
+            try:
+                results = pool.map(writeSiteFile, batch)
+            except Exception as err:
+                self.logMsg('Weather file processes failed - ' + str(err))
+                pool.terminate()
+                pool = None
+        if results is None:
+            results = map(writeSiteFile, batch)
+        for task, (ok, parts) in zip(batch, results):
+            out_file = task['file'][task['file'].rfind('/') + 1:]
+            if parts is not None:
+                self.storeSite(task, parts)
+            if task['patch'] is not None:
+                if task['text']:
+                    self.log += '%s updated for %s hours\n' % (out_file, len(task['patch']))
+            elif not task['text']:
+                self.log += '%s stored\n' % out_file
+            elif task['with_gaps'] > 0 and task['with_gaps'] < 504:
+                self.log += '%s created with gaps (%s days)\n' % (out_file, str(int(task['with_gaps'] / 24)))
+            elif task['missing'] or task['with_gaps'] > 0:
+                self.gaplog += '%s not created due to data gaps\n' % out_file
+            else:
+                self.log += '%s created\n' % out_file
+            if ok:
+                self.log += '%s updated\n' % out_file
+            if task['text'] and not task['remove'] and task['patch'] is None:
+                self.outputs.append(out_file)
+            if self.show_progress:
+                self.caller.daybar.setValue(site)
+                QtCore.QCoreApplication.processEvents()
+            site += 1
+        return pool
+
+    def storeSite(self, task, parts):
+        # add a site to the resource store; if it doesn't fit the store the file is written
+        if self.store is None:
+            self.store = ResourceStore(storeFolder(task['file']), sites=self.store_sites)
+        try:
+            if self.store.addSite(task['file'], task['header'], parts):
+                return
+        except Exception as err:
+            self.logMsg('Resource store error - ' + str(err))
+        if not task['text']:
+            task['text'] = True
+            tf = open(task['file'], 'w')
+            tf.write(task['header'] + ''.join(textLines(parts)))
+            tf.close()
+
+    def checkMemory(self, cells):
+        # once the first file is read see if the year's hourly values fit in memory_limit
+        # if not they go to scratch files and ERA5 variables are read a few hours at a time
+        if self.memory_checked:
+            return
+        self.memory_checked = True
+        grids = [self.s10m, self.d10m, self.t_10m, self.p_s, self.ghi, self.alb]
+        if self.make_wind:
+            grids += [self.s2m, self.s50m, self.s100m, self.d2m, self.d50m, self.d100m, self.t_2m]
+        size = cells * (8784 + 48) * 8. * len(grids) / 1048576
+        if self.memory_limit <= 0 or size <= self.memory_limit:
             return
+        for grid in grids:
+            grid.useDisk(self.scratch_folder)
+        self.chunk_hours = max(24, int(self.memory_limit * 1048576 / (cells * 8. * 64)))
+        if self.scratch_folder is None:
+            folder = tempfile.gettempdir()
+        else:
+            folder = self.scratch_folder
+        self.logMsg('Hourly values (%s MB) over memory_limit so using scratch files in %s' %
+                    ('{:0.0f}'.format(size), folder))
+
+    def chunks(self, t1, t2):
+        # hours to read at a time
+        if self.chunk_hours <= 0 or t1 < 0 or t2 - t1 <= self.chunk_hours:
+            return [[t1, t2]]
+        return [[t, min(t + self.chunk_hours, t2)] for t in range(t1, t2, self.chunk_hours)]
+
+    def manifestFile(self):
+        # records the ERA5 files (and hours) the weather files were made from
+        if self.make_wind:
+            kind = 'wind'
+        else:
+            kind = 'solar'
+        return '%s%s_weather_%s_%s.manifest' % (self.tgt_dir, kind, self.src_year, self.fmat)
+
+    def manifestSettings(self):
+        return {'folder': self.src_dir_s, 'year': str(self.src_year), 'zone': str(self.src_zone),
+                'format': self.fmat, 'swg': self.swg, 'wrap': str(self.wrap), 'gaps': str(self.gaps),
+                'coordinates': str(self.src_lat_lon)}
+
+    def era5Info(self, inp_file, frst_hour, last_hour):
+        # hours, grid and whether ERA5T data is in a file without reading its values
+        cdf_file = self.openCDF(inp_file)
+        if cdf_file is None:
+            return None
+        t1, t2 = self.timeRange(cdf_file.variables['time'][:], frst_hour, last_hour)
+        info = [t2 - t1, self.gridText(cdf_file), 'expver' in cdf_file.variables.keys()]
+        self.closeCDF(cdf_file)
+        return info
+
+    def checkManifest(self):
+        # the ERA5 files (and hours) that are new or have changed since the weather files were
+        # made. These rows of the files can be replaced if the files are otherwise the same
+        # (same hours and grid). None if the files need to be made again
+        if self.hub_height > 0 or self.resource_store != '':
+            return None
+        config = configparser.RawConfigParser()
         try:
-            cdf_file = Dataset(unzip_file, 'r')
+            if len(config.read(self.manifestFile())) == 0:
+                return None
+            settings = dict(config.items('Settings'))
+            for key, value in self.manifestSettings().items():
+                if settings[key] != value:
+                    return None
+            grid = settings['grid']
+            outputs = config.get('Outputs', 'files').split()
+            done = []
+            for s in range(int(settings['segments'])):
+                section = 'Segment' + str(s + 1)
+                done.append([config.get(section, 'file'), int(config.get(section, 'first_hour')),
+                             int(config.get(section, 'last_hour')), int(config.get(section, 'rows')),
+                             config.get(section, 'expver') == 'True', grid,
+                             [int(config.get(section, 'modified')), int(config.get(section, 'size'))]])
         except:
-            self.decodeError(inp_file)
+            return None
+        if grid == '' or len(outputs) == 0:
+            return None
+        for out_file in outputs:
+            if not os.path.exists(self.tgt_dir + out_file):
+                return None
+        log = self.log
+        self.era5_plan = []
+        complete = self.readEra5()
+        plan = self.era5_plan
+        self.era5_plan = None
+        self.log = log
+        if not complete:
+            return None
+        # segments read before, by file and hours, and the weather file rows they went to
+        rows = 0
+        before = {}
+        for old in done:
+            before[tuple(old[:3])] = [old, rows]
+            rows += old[3]
+        segments = []
+        patch = []
+        positions = []
+        row_map = []
+        rows = 0
+        for p in range(len(plan)):
+            inp_file, frst_hour, last_hour = plan[p]
+            try:
+                stat = os.stat(inp_file)
+                stamp = [stat.st_mtime_ns, stat.st_size]
+            except:
+                return None
+            old = before.get(tuple(plan[p]))
+            if old is not None and old[0][6] == stamp and old[1] == rows:
+                segments.append(old[0])
+                rows += old[0][3]
+                continue
+            info = self.era5Info(inp_file, frst_hour, last_hour)
+            if info is None or info[1] != grid:
+                return None
+            if old is not None and old[0][4] and not info[2]:
+                self.logMsg('ERA5T data for %s to be replaced by ERA5' % inp_file[inp_file.rfind('/') + 1:])
+            segments.append(None)
+            patch.append([inp_file, frst_hour, last_hour])
+            positions.append(p)
+            row_map.extend(range(rows, rows + info[0]))
+            rows += info[0]
+        if rows != sum([old[3] for old in done]):
+            return None
+        self.manifest = [settings, segments, outputs, positions]
+        if len(patch) > 0:
+            self.row_map = np.array(row_map)
+        return patch
+
+    def saveManifest(self, patch):
+        # save what the weather files were made from (or update it for the files read)
+        if self.return_code != 0:
+            return
+        if patch is None:
+            segments = self.era5_segments
+            outputs = self.outputs
+        else:
+            segments = self.manifest[1][:]
+            outputs = self.manifest[2]
+            for p, segment in zip(self.manifest[3], self.era5_segments):
+                segments[p] = segment
+        grids = set([segment[5] for segment in segments])
+        if len(grids) == 1:
+            grid = grids.pop()
+        else:
+            grid = ''   # the files will be made again
+        config = configparser.RawConfigParser()
+        config.add_section('Settings')
+        for key, value in self.manifestSettings().items():
+            config.set('Settings', key, value)
+        config.set('Settings', 'grid', grid)
+        config.set('Settings', 'segments', str(len(segments)))
+        for s in range(len(segments)):
+            section = 'Segment' + str(s + 1)
+            inp_file, frst_hour, last_hour, rows, expver = segments[s][:5]
+            try:
+                stat = os.stat(inp_file)
+                stamp = [stat.st_mtime_ns, stat.st_size]
+            except:
+                stamp = [0, 0]
+            config.add_section(section)
+            config.set(section, 'file', inp_file)
+            config.set(section, 'first_hour', str(frst_hour))
+            config.set(section, 'last_hour', str(last_hour))
+            config.set(section, 'rows', str(rows))
+            config.set(section, 'expver', str(expver))
+            config.set(section, 'modified', str(stamp[0]))
+            config.set(section, 'size', str(stamp[1]))
+        config.add_section('Outputs')
+        config.set('Outputs', 'files', '\n'.join(outputs))
+        tf = open(self.manifestFile(), 'w')
+        config.write(tf)
+        tf.close()
+
+    def get_data(self, inp_file):
+        cdf_file = self.openCDF(inp_file)
+        if cdf_file is None:
             return
 
      #   Variable Description                                          Units
@@ -371,31 +1053,45 @@ class makeWeather():
                 self.lons.index(lon)
             except:
                 self.lons.append(lon)
+        self.checkMemory(len(lats) * len(lons))
         if self.vars['u10m'] in cdf_file.variables:
-            self.s10m += self.getSpeed(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']])
-            self.d10m += self.getDirn(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']])
-            self.t_10m += self.getTemp(cdf_file.variables[self.vars['t10m']])
+            self.s10m.append(self.getSpeed(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']]))
+            self.d10m.append(self.getDirn(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']]))
+            self.t_10m.append(self.getTemp(cdf_file.variables[self.vars['t10m']]))
         else:
-            self.s10m += self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.d10m += self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.t_10m += self.getTemp(cdf_file.variables[self.vars['t2m']])
-        self.p_s += self.getPress(cdf_file.variables[self.vars['ps']])
+            self.s10m.append(self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']]))
+            self.d10m.append(self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']]))
+            self.t_10m.append(self.getTemp(cdf_file.variables[self.vars['t2m']]))
+        self.p_s.append(self.getPress(cdf_file.variables[self.vars['ps']]))
         if self.make_wind:
-            self.s2m += self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.d2m += self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.t_2m += self.getTemp(cdf_file.variables[self.vars['t2m']])
-            self.s50m += self.getSpeed(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']])
-            self.d50m += self.getDirn(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']])
-        cdf_file.close()
+            self.s2m.append(self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']]))
+            self.d2m.append(self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']]))
+            self.t_2m.append(self.getTemp(cdf_file.variables[self.vars['t2m']]))
+            self.s50m.append(self.getSpeed(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']]))
+            self.d50m.append(self.getDirn(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']]))
+        self.closeCDF(cdf_file)
+
+    def timeRange(self, tims, frst_hour, last_hour):
+        # the times to read from a file
+        t1 = -1
+        t2 = len(tims)
+        for hr in range(len(tims)):
+            if t1 < 0 and tims[hr] >= frst_hour:
+                t1 = hr
+            if tims[hr] >= last_hour:
+                t2 = hr
+                break
+        return t1, t2
+
+    def gridText(self, cdf_file):
+        # latitudes and longitudes of a file (to check files are the same grid)
+        lats = cdf_file.variables[self.vars['latitude']][:]
+        lons = cdf_file.variables[self.vars['longitude']][:]
+        return '%s,%s,%s,%s,%s,%s' % (len(lats), lats[0], lats[-1], len(lons), lons[0], lons[-1])
 
     def get_era5_data(self, inp_file, frst_hour, last_hour):
-        unzip_file = self.unZip(inp_file)
-        if self.return_code != 0:
-            return
-        try:
-            cdf_file = Dataset(unzip_file, 'r')
-        except:
-            self.decodeError(inp_file)
+        cdf_file = self.openCDF(inp_file)
+        if cdf_file is None:
             return
 
      #   Variable Description                            Units
@@ -415,14 +1111,8 @@ class makeWeather():
             self.logMsg('ERA5 and ERA5T data in {}'.format(inp_file[inp_file.rfind('/') + 1:]))
             expver = True
         self.tims = cdf_file.variables['time'][:]
-        t1 = -1
-        t2 = len(self.tims)
-        for hr in range(len(self.tims)):
-            if t1 < 0 and self.tims[hr] >= frst_hour:
-                t1 = hr
-            if self.tims[hr] >= last_hour:
-                t2 = hr
-                break
+        t1, t2 = self.timeRange(self.tims, frst_hour, last_hour)
+        self.era5_segments.append([inp_file, frst_hour, last_hour, t2 - t1, expver, self.gridText(cdf_file)])
         self.lat_lon_ndx += [len(self.lati)] * (t2 - t1 + 1)
         lats = cdf_file.variables[self.vars['latitude']][:]
         self.lati.append([])
@@ -442,204 +1132,103 @@ class makeWeather():
                 self.lons.index(lon)
             except:
                 self.lons.append(lon)
+        self.checkMemory(len(lats) * len(lons))
+        chunks = self.chunks(t1, t2)
         if self.show_progress:
             self.caller.daybar.setValue(0)
-            self.caller.daybar.setMaximum(7)
+            self.caller.daybar.setMaximum(7 * len(chunks))
             QtCore.QCoreApplication.processEvents()
-        if expver:
-            # need to find valid value in the two expver dimensions
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file.variables[self.vars['t2m']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-            self.t_2m += self.getTemp(tmp_var)
-            if self.show_progress:
-                self.caller.daybar.setValue(1)
-                QtCore.QCoreApplication.processEvents()
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file.variables[self.vars['v10']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-            tmp_var2 = []
-            for t in range(len(self.tims)):
-                tmp_var2.append([])
-                for la in range(len(self.lats)):
-                    tmp_var2[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var2[-1][-1].append([])
-            tmi = cdf_file.variables[self.vars['u10']][t1 : t2]
-            for t in range(len(tmp_var2)):
-                for la in range(len(tmp_var2[t])):
-                    for lo in range(len(tmp_var2[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var2[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var2[t][la][lo] = float(tmi[t][1][la][lo])
-            self.s10m += self.getSpeed(tmp_var, tmp_var2)
-            if self.show_progress:
-                self.caller.daybar.setValue(2)
-                QtCore.QCoreApplication.processEvents()
-            self.d10m += self.getDirn(tmp_var, tmp_var2)
-            if self.show_progress:
-                self.caller.daybar.setValue(3)
-                QtCore.QCoreApplication.processEvents()
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file.variables[self.vars['sp']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-            self.p_s += self.getPress(tmp_var)
-            if self.show_progress:
-                self.caller.daybar.setValue(4)
-                QtCore.QCoreApplication.processEvents()
-            try:
-                if self.vars[self.swg] not in cdf_file.variables.keys():
-                    self.swg = 'swgnt'
-                tmp_var = []
-                for t in range(len(self.tims)):
-                    tmp_var.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var[-1][-1].append([])
-                tmi = cdf_file.variables[self.vars[self.swg]][t1 : t2]
-                for t in range(len(tmp_var)):
-                    for la in range(len(tmp_var[t])):
-                        for lo in range(len(tmp_var[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-                self.ghi += self.getGHI(tmp_var, watts=False)
+        for c in range(len(chunks)):
+            c1, c2 = chunks[c]
+            if expver:
+                # need to find valid value in the two expver dimensions
+                self.t_2m.append(self.getTemp(self.getExpver(cdf_file.variables[self.vars['t2m']], c1, c2), exact=True))
                 if self.show_progress:
-                    self.caller.daybar.setValue(5)
+                    self.caller.daybar.setValue(c * 7 + 1)
                     QtCore.QCoreApplication.processEvents()
-            except:
-                pass
-            if self.make_wind:
-                tmp_var = []
-                for t in range(len(self.tims)):
-                    tmp_var.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var[-1][-1].append([])
-                tmi = cdf_file.variables[self.vars['v100']][t1 : t2]
-                for t in range(len(tmp_var)):
-                    for la in range(len(tmp_var[t])):
-                        for lo in range(len(tmp_var[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-                tmp_var2 = []
-                for t in range(len(self.tims)):
-                    tmp_var2.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var2[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var2[-1][-1].append([])
-                tmi = cdf_file.variables[self.vars['u100']][t1 : t2]
-                for t in range(len(tmp_var2)):
-                    for la in range(len(tmp_var2[t])):
-                        for lo in range(len(tmp_var2[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var2[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var2[t][la][lo] = float(tmi[t][1][la][lo])
-                self.s100m += self.getSpeed(tmp_var, tmp_var2)
+                tmp_var = self.getExpver(cdf_file.variables[self.vars['v10']], c1, c2)
+                tmp_var2 = self.getExpver(cdf_file.variables[self.vars['u10']], c1, c2)
+                self.s10m.append(self.getSpeed(tmp_var, tmp_var2))
                 if self.show_progress:
-                    self.caller.daybar.setValue(6)
+                    self.caller.daybar.setValue(c * 7 + 2)
                     QtCore.QCoreApplication.processEvents()
-                self.d100m += self.getDirn(tmp_var, tmp_var2)
+                self.d10m.append(self.getDirn(tmp_var, tmp_var2))
                 if self.show_progress:
-                    self.caller.daybar.setValue(7)
+                    self.caller.daybar.setValue(c * 7 + 3)
                     QtCore.QCoreApplication.processEvents()
-        else:
-            self.t_2m += self.getTemp(cdf_file.variables[self.vars['t2m']][t1 : t2])
-            if self.show_progress:
-                self.caller.daybar.setValue(1)
-                QtCore.QCoreApplication.processEvents()
-            self.s10m += self.getSpeed(cdf_file.variables[self.vars['v10']][t1 : t2] , cdf_file.variables[self.vars['u10']][t1 : t2])
-            if self.show_progress:
-                self.caller.daybar.setValue(2)
-                QtCore.QCoreApplication.processEvents()
-            self.d10m += self.getDirn(cdf_file.variables[self.vars['v10']][t1 : t2], cdf_file.variables[self.vars['u10']][t1 : t2])
-            if self.show_progress:
-                self.caller.daybar.setValue(3)
-                QtCore.QCoreApplication.processEvents()
-            self.p_s += self.getPress(cdf_file.variables[self.vars['sp']][t1 : t2])
-            if self.show_progress:
-                self.caller.daybar.setValue(4)
-                QtCore.QCoreApplication.processEvents()
-            try:
-                if self.vars[self.swg] not in cdf_file.variables.keys():
-                    self.swg = 'swgnt'
-                self.ghi += self.getGHI(cdf_file.variables[self.vars[self.swg]][t1 : t2], watts=False)
+                self.p_s.append(self.getPress(self.getExpver(cdf_file.variables[self.vars['sp']], c1, c2), exact=True))
                 if self.show_progress:
-                    self.caller.daybar.setValue(5)
+                    self.caller.daybar.setValue(c * 7 + 4)
                     QtCore.QCoreApplication.processEvents()
-            except:
-                pass
-            if self.make_wind:
-                self.s100m += self.getSpeed(cdf_file.variables[self.vars['v100']][t1 : t2], cdf_file.variables[self.vars['u100']][t1 : t2])
+                try:
+                    if self.vars[self.swg] not in cdf_file.variables.keys():
+                        self.swg = 'swgnt'
+                    self.ghi.append(self.getGHI(self.getExpver(cdf_file.variables[self.vars[self.swg]], c1, c2),
+                                    watts=False))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 5)
+                        QtCore.QCoreApplication.processEvents()
+                except:
+                    pass
+                if self.make_wind:
+                    tmp_var = self.getExpver(cdf_file.variables[self.vars['v100']], c1, c2)
+                    tmp_var2 = self.getExpver(cdf_file.variables[self.vars['u100']], c1, c2)
+                    self.s100m.append(self.getSpeed(tmp_var, tmp_var2))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 6)
+                        QtCore.QCoreApplication.processEvents()
+                    self.d100m.append(self.getDirn(tmp_var, tmp_var2))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 7)
+                        QtCore.QCoreApplication.processEvents()
+            else:
+                self.t_2m.append(self.getTemp(cdf_file.variables[self.vars['t2m']][c1 : c2]))
+                if self.show_progress:
+                    self.caller.daybar.setValue(c * 7 + 1)
+                    QtCore.QCoreApplication.processEvents()
+                self.s10m.append(self.getSpeed(cdf_file.variables[self.vars['v10']][c1 : c2] , cdf_file.variables[self.vars['u10']][c1 : c2]))
                 if self.show_progress:
-                    self.caller.daybar.setValue(6)
+                    self.caller.daybar.setValue(c * 7 + 2)
                     QtCore.QCoreApplication.processEvents()
-                self.d100m += self.getDirn(cdf_file.variables[self.vars['v100']][t1 : t2], cdf_file.variables[self.vars['u100']][t1 : t2])
+                self.d10m.append(self.getDirn(cdf_file.variables[self.vars['v10']][c1 : c2], cdf_file.variables[self.vars['u10']][c1 : c2]))
                 if self.show_progress:
-                    self.caller.daybar.setValue(7)
+                    self.caller.daybar.setValue(c * 7 + 3)
                     QtCore.QCoreApplication.processEvents()
+                self.p_s.append(self.getPress(cdf_file.variables[self.vars['sp']][c1 : c2]))
+                if self.show_progress:
+                    self.caller.daybar.setValue(c * 7 + 4)
+                    QtCore.QCoreApplication.processEvents()
+                try:
+                    if self.vars[self.swg] not in cdf_file.variables.keys():
+                        self.swg = 'swgnt'
+                    self.ghi.append(self.getGHI(cdf_file.variables[self.vars[self.swg]][c1 : c2], watts=False))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 5)
+                        QtCore.QCoreApplication.processEvents()
+                except:
+                    pass
+                if self.make_wind:
+                    self.s100m.append(self.getSpeed(cdf_file.variables[self.vars['v100']][c1 : c2], cdf_file.variables[self.vars['u100']][c1 : c2]))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 6)
+                        QtCore.QCoreApplication.processEvents()
+                    self.d100m.append(self.getDirn(cdf_file.variables[self.vars['v100']][c1 : c2], cdf_file.variables[self.vars['u100']][c1 : c2]))
+                    if self.show_progress:
+                        self.caller.daybar.setValue(c * 7 + 7)
+                        QtCore.QCoreApplication.processEvents()
       #      else:
        #         if self.vars['alb'] in cdf_file.variables.keys():
         #            if self.vars['alb2'] in cdf_file.variables.keys():
-         #               self.alb += self.getAlbedo(cdf_file.variables[self.vars['alb']][t1 : t2], cdf_file.variables[self.vars['alb2']][t1 : t2])
+         #               self.alb.append(self.getAlbedo(cdf_file.variables[self.vars['alb']][t1 : t2], cdf_file.variables[self.vars['alb2']][t1 : t2]))
           #          else:
-           #             self.alb += self.getAlbedo(cdf_file.variables[self.vars['alb']][t1 : t2])
+           #             self.alb.append(self.getAlbedo(cdf_file.variables[self.vars['alb']][t1 : t2]))
             #    elif self.vars['alb2'] in cdf_file.variables.keys():
-             #       self.alb += self.getAlbedo(cdf_file.variables[self.vars['alb2']][t1 : t2])
-        cdf_file.close()
+             #       self.alb.append(self.getAlbedo(cdf_file.variables[self.vars['alb2']][t1 : t2]))
+        self.closeCDF(cdf_file)
 
     def get_rad_data(self, inp_file):
-        unzip_file = self.unZip(inp_file)
-        if self.return_code != 0:
-            return
-        try:
-            cdf_file = Dataset(unzip_file, 'r')
-        except:
-            self.decodeError(inp_file)
+        cdf_file = self.openCDF(inp_file)
+        if cdf_file is None:
             return
      #   Variable Description                          Units
      #   -------- ------------------------------------ --------
@@ -655,14 +1244,15 @@ class makeWeather():
         self.longsi.append([])
         for lon in lons:
             self.longsi[-1].append(lon)
+        self.checkMemory(len(lats) * len(lons))
         if self.vars[self.swg] in cdf_file.variables:
-            self.ghi += self.getGHI(cdf_file.variables[self.vars[self.swg]])
+            self.ghi.append(self.getGHI(cdf_file.variables[self.vars[self.swg]]))
         else:
             self.swg = 'swgnt'
-            self.ghi += self.getGHI(cdf_file.variables[self.vars['swgnt']])
+            self.ghi.append(self.getGHI(cdf_file.variables[self.vars['swgnt']]))
         if self.vars['alb'] in cdf_file.variables:
-            self.alb += self.getAlbedo(cdf_file.variables[self.vars['alb']])
-        cdf_file.close()
+            self.alb.append(self.getAlbedo(cdf_file.variables[self.vars['alb']]))
+        self.closeCDF(cdf_file)
 
     def checkZone(self):
         self.return_code = 0
@@ -762,13 +1352,12 @@ class makeWeather():
                 return
         if not os.path.exists(inp_file):
             return
-        unzip_file = self.unZip(inp_file)
-        if self.return_code != 0:
+        cdf_file = self.openCDF(inp_file)
+        if cdf_file is None:
             return
-        cdf_file = Dataset(unzip_file, 'r')
-        i = unzip_file.rfind('/')
+        i = inp_file.rfind('/')
         self.log += '\nFile:\n    '
-        self.log += unzip_file[i + 1:] + '\n'
+        self.log += inp_file[i + 1:] + '\n'
         self.log += ' Format:\n    '
         try:
             self.log += cdf_file.Format + '\n'
@@ -829,15 +1418,19 @@ class makeWeather():
             for key, value in zones.items():
                 self.log += str(key) + ' (' + str(value) + ')  '
             self.log += '\n'
-        cdf_file.close()
+        self.closeCDF(cdf_file)
         return
 
-    def process_era5(self):
+    def era5Segment(self, inp_file, frst_hour, last_hour):
+        # read the hours from a file or, if working out what to read, just note them
+        if self.era5_plan is None:
+            self.get_era5_data(inp_file, frst_hour, last_hour)
+        else:
+            self.era5_plan.append([inp_file, frst_hour, last_hour])
+
+    def readEra5(self):
+        # read the ERA5 files for the year; False if they're not all there
         dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        if self.show_progress:
-            self.caller.daybar.setValue(0)
-            self.caller.progresslabel.setText('Reading input data')
-            QtCore.QCoreApplication.processEvents()
         date_1900 = datetime(1900, 1, 1, 0)
         year_strt = datetime(self.src_year, 1, 1)
         year_end = datetime(self.src_year + 1, 1, 1)
@@ -856,10 +1449,10 @@ class makeWeather():
                     inp_strt = '{:04d}'.format(self.src_year - 1) + '1231'
                     inp_file = self.findFile(inp_strt, quiet=True)
             if inp_file is None:
-                return
-            self.get_era5_data(inp_file, frst_hour, last_hour)
+                return False
+            self.era5Segment(inp_file, frst_hour, last_hour)
             if self.return_code != 0:
-                return
+                return False
         inp_strt = '{:04d}'.format(self.src_year)
         inp_file = self.findFile(inp_strt, quiet=True)
         if inp_file is None: # monthly files
@@ -869,12 +1462,13 @@ class makeWeather():
                 yrs = 2
             year = self.src_year
             for mt in range(12):
-                self.logMsg('Processing month %s' % str(mt + 1), mt / 12.)
+                if self.era5_plan is None:
+                    self.logMsg('Processing month %s' % str(mt + 1), mt / 12.)
                 inp_strt = '{:04d}{:02d}'.format(year, mt + 1)
                 inp_file = self.findFile(inp_strt, quiet=True)
                 if inp_file is None:
                     if yrs == 2:
-                        return
+                        return False
                     yrs == 2
                     year -= 1
                     self.logMsg('Wrapping to prior year - %.4d-%.2d-%.2d' % (year, mt + 1, 1))
@@ -888,7 +1482,7 @@ class makeWeather():
                         inp_strt = '{:04d}'.format(year)
                         inp_file = self.findFile(inp_strt, quiet=True)
                         if inp_file is None:
-                            return
+                            return False
                         self.logMsg('Processing months %s to 12' % str(mt + 1))
                         frst_hour = datetime(year, mt + 1, 1)
                         frst_hour = frst_hour - date_1900
@@ -898,15 +1492,15 @@ class makeWeather():
                             last_hour += timedelta(hours=1)
                             last_hour = last_hour - date_1900
                             last_hour = int(last_hour.days) * 24
-                            self.get_era5_data(inp_file, frst_hour, last_hour)
+                            self.era5Segment(inp_file, frst_hour, last_hour)
                             if self.return_code != 0:
-                                return
+                                return False
                             frst_hour = datetime(year, 3, 1)
                             frst_hour = frst_hour - date_1900
                             frst_hour = int(frst_hour.days) * 24
-                        self.get_era5_data(inp_file, frst_hour, last_hour)
+                        self.era5Segment(inp_file, frst_hour, last_hour)
                         if self.return_code != 0:
-                            return
+                            return False
                         break
                 fst_hour = datetime(year, mt + 1, 1)
                 fst_hour = fst_hour - date_1900
@@ -916,22 +1510,22 @@ class makeWeather():
                 lst_hour = fst_hour + dys[mt] * 24
                 if lst_hour > last_hour:
                     lst_hour = last_hour
-                self.get_era5_data(inp_file, fst_hour, lst_hour)
+                self.era5Segment(inp_file, fst_hour, lst_hour)
                 if self.return_code != 0:
-                    return
+                    return False
         else: # year file
             if (last_hour - frst_hour) > 8760: # leap year?
                 last_prt1 = frst_hour + 59 * 24
-                self.get_era5_data(self.findFile(inp_strt), frst_hour, last_prt1)
+                self.era5Segment(self.findFile(inp_strt), frst_hour, last_prt1)
                 if self.return_code != 0:
-                    return
-                self.get_era5_data(self.findFile(inp_strt), last_prt1 + 24, last_hour)
+                    return False
+                self.era5Segment(self.findFile(inp_strt), last_prt1 + 24, last_hour)
                 if self.return_code != 0:
-                    return
+                    return False
             else:
-                self.get_era5_data(self.findFile(inp_strt), frst_hour, last_hour)
+                self.era5Segment(self.findFile(inp_strt), frst_hour, last_hour)
                 if self.return_code != 0:
-                    return
+                    return False
         if self.src_zone < 0: # go forward to next year if needed
             inp_strt = '{:04d}'.format(self.src_year + 1) + '01'
             inp_file = self.findFile(inp_strt, quiet=True)
@@ -942,10 +1536,33 @@ class makeWeather():
                     inp_strt = '{:04d}'.format(self.src_year + 1) + '0101'
                     inp_file = self.findFile(inp_strt, quiet=True)
             if inp_file is None:
-                return
-            self.get_era5_data(inp_file, frst_hour, last_hour)
+                return False
+            self.era5Segment(inp_file, frst_hour, last_hour)
             if self.return_code != 0:
+                return False
+        return True
+
+    def process_era5(self):
+        if self.show_progress:
+            self.caller.daybar.setValue(0)
+            self.caller.progresslabel.setText('Reading input data')
+            QtCore.QCoreApplication.processEvents()
+        if self.incremental:
+            patch = self.checkManifest()
+        else:
+            patch = None
+        if patch is None:
+            if not self.readEra5():
                 return
+        elif len(patch) == 0:
+            self.logMsg('Weather files in %s are up to date' % self.tgt_dir)
+            return
+        else:   # just the new or changed files
+            for inp_file, frst_hour, last_hour in patch:
+                self.logMsg('Updating from %s' % inp_file[inp_file.rfind('/') + 1:])
+                self.get_era5_data(inp_file, frst_hour, last_hour)
+                if self.return_code != 0:
+                    return
         self.longrange = [self.lons[0], self.lons[-1]]
         self.checkZone()
         if self.make_wind:
@@ -959,120 +1576,19 @@ class makeWeather():
                 self.log += 'mkdir %s\n' % target_dir
                 os.makedirs(target_dir)
             if self.src_lat is not None:   # specific location(s)
-                for i in range(len(self.src_lat)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(i)
-                        QtCore.QCoreApplication.processEvents()
-                    out_file = self.tgt_dir + 'wind_weather_' + str(self.src_lat[i]) + '_' + \
-                               str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    with_gaps = 0
-                    missing = False
-                    hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                          round(self.src_lat[i], 4), round(self.src_lon[i], 4))
-                    tf.write(hdr)
-                    tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                    tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed\n')
-                    tf.write('C,atm,degrees,m/s,degrees,m/s\n')
-                    tf.write('2,0,10,10,100,100\n')
-                    for hr in range(len(self.s100m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                 str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                 str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                 str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                 str(self.valu(self.d100m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                 str(self.valu(self.s100m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    tf.close()
-                    self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                    if self.hub_height > 0:
-                        ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                        if ok:
-                            self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+                self.writeSites((self.windPointTask(i) for i in range(len(self.src_lat))), len(self.src_lat))
             else: # all locations
                 if self.show_progress:
                     self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
                     QtCore.QCoreApplication.processEvents()
-                for la in range(len(self.lats)):
-                    for lo in range(len(self.lons)):
-                        if self.show_progress:
-                            self.caller.daybar.setValue(len(self.lats) * la + lo)
-                            QtCore.QCoreApplication.processEvents()
-                        with_gaps = 0
-                        missing = False
-                        out_file = self.tgt_dir + 'wind_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.srw'
-                        tf = open(out_file, 'w')
-                        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                              round(self.lats[la], 4), round(self.lons[lo], 4))
-                        tf.write(hdr)
-                        tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                        tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed\n')
-                        tf.write('C,atm,degrees,m/s,degrees,m/s\n')
-                        tf.write('2,0,10,10,100,100\n')
-                        for hr in range(len(self.s100m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            try:
-                                tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                         str(self.d10m[hr][lat][lon]) + ',' + str(self.s10m[hr][lat][lon]) + ',' +
-                                         str(self.d100m[hr][lat][lon]) + ',' + str(self.s100m[hr][lat][lon]) + '\n')
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                        tf.close()
-                        if with_gaps > 0 and with_gaps < 504:
-                            self.log += '%s created with gaps (%s days)\n' % ( \
-                                        out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                        elif missing or with_gaps > 0:
-                            os.remove(out_file)
-                            self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                            continue
-                        else:
-                            self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                        if self.hub_height > 0:
-                            ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                            if ok:
-                                self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+                self.writeSites((self.windGridTask(la, lo) for la in range(len(self.lats))
+                                for lo in range(len(self.lons))), len(self.lats) * len(self.lons))
             if self.show_progress:
                 self.caller.daybar.setValue(self.caller.daybar.maximum())
                 self.caller.progresslabel.setText('All done')
                 QtCore.QCoreApplication.processEvents()
+            if self.incremental:
+                self.saveManifest(patch)
             return # that's it for wind
         #for solar we already have the data - same file (format)
         if self.show_progress:
@@ -1088,217 +1604,19 @@ class makeWeather():
             if self.show_progress:
                 self.caller.daybar.setMaximum(len(self.src_lat) - 1)
                 QtCore.QCoreApplication.processEvents()
-            for i in range(len(self.src_lat)):
-                if self.show_progress:
-                    self.caller.daybar.setValue(i)
-                    QtCore.QCoreApplication.processEvents()
-                out_file = self.tgt_dir + 'solar_weather_' + \
-                           str(self.src_lat[i]) + '_' + str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                tf = open(out_file, 'w')
-                if self.fmat == 'csv':
-                    hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                          'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_zone))
-                    tf.write(hdr)
-                    tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                    mth = 0
-                    day = 1
-                    hour = 0
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1,
-                              lon1, lat_rat, lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        tf.write(str(self.src_year) + ',' + str(mth + 1) + ',' +
-                        str(day) + ',' + str(hour) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' +
-                        str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + '\n')
-                        hour += 1
-                        if hour > 23:
-                            hour = 0
-                            day += 1
-                            if day > dys[mth]:
-                                mth += 1
-                                day = 1
-                                hour = 0
-                else:
-                    hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                          round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_year))
-                    tf.write(hdr)
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1, lon1, lat_rat,
-                              lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        if len(self.alb) > 0:
-                            alb = str(self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat))
-                        else:
-                            alb = '-999'
-                        tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) +
-                        ',-999,-999,-999,' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                tf.close()
-                self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeSites((self.solarPointTask(i) for i in range(len(self.src_lat))), len(self.src_lat))
         else: # all locations
             if self.show_progress:
                 self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
                 QtCore.QCoreApplication.processEvents()
-            for la in range(len(self.lats)):
-                for lo in range(len(self.lons)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(len(self.lats) * la + lo)
-                        QtCore.QCoreApplication.processEvents()
-                    with_gaps = 0
-                    missing = False
-                    out_file = self.tgt_dir + 'solar_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                            '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    if self.fmat == 'csv':
-                        hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                              'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_zone))
-                        tf.write(hdr)
-                        tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                        mth = 0
-                        day = 1
-                        hour = 0
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.src_year) + ',' + '{:02d}'.format(mth + 1) + ',' +
-                                '{:02d}'.format(day) + ',' + '{:02d}'.format(hour) + ',' +
-                                '{:0.1f}'.format(ghi) + ',' + '{:0.1f}'.format(dni) + ',' +
-                                '{:0.1f}'.format(dhi) + ',' +
-                                str(self.t_2m[hr][lat][lon]) + ',' +
-                                str(self.p_s[hr][lat][lon]) + ',' +
-                                str(self.s10m[hr][lat][lon]) + ',' +
-                                str(self.d10m[hr][lat][lon]) + '\n')
-                            hour += 1
-                            if hour > 23:
-                                hour = 0
-                                day += 1
-                                if day > dys[mth]:
-                                    mth += 1
-                                    day = 1
-                                    hour = 0
-                    else:
-                        hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                              round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_year))
-                        tf.write(hdr)
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat],
-                                      lon=self.longi[self.lat_lon_ndx[hr]][lon],
-                                      press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat])
-                            if len(self.alb) > 0:
-                                try: # bug here but let's fix later
-                                    alb = str(self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat))
-                                except:
-                                    alb = '-999'
-                            else:
-                                alb = '-999'
-                            tf.write(str(self.t_2m[hr][lat][lon]) +
-                                ',-999,-999,-999,' +
-                                str(self.s10m[hr][lat][lon]) + ',' +
-                                str(self.d10m[hr][lat][lon]) + ',' +
-                                str(self.p_s[hr][lat][lon]) + ',' +
-                                str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                    tf.close()
-                    if with_gaps > 0 and with_gaps < 504:
-                        self.log += '%s created with gaps (%s days)\n' % ( \
-                                    out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                    elif missing or with_gaps > 0:
-                  #      os.remove(out_file)
-                        self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                        continue
-                    else:
-                        self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeSites((self.solarGridTask(la, lo) for la in range(len(self.lats))
+                            for lo in range(len(self.lons))), len(self.lats) * len(self.lons))
         if self.show_progress:
             self.caller.daybar.setValue(self.caller.daybar.maximum())
             self.caller.progresslabel.setText('All done')
             QtCore.QCoreApplication.processEvents()
+        if self.incremental:
+            self.saveManifest(patch)
         return
 
     def __init__(self, caller, src_year, src_zone, src_dir_s, src_dir_w, tgt_dir, fmat, swg='swgdn',
@@ -1327,6 +1645,51 @@ class makeWeather():
         self.swg = swg
         self.hub_height = hub_height
         self.law = law
+        self.memory_limit = 1024   # MB of hourly values to hold in memory
+        self.scratch_folder = None
+        self.chunk_hours = 0
+        self.memory_checked = False
+        self.scratch_file = None
+        config = configparser.RawConfigParser()
+        config.read(getModelFile('getfiles.ini'))
+        try:
+            self.memory_limit = float(config.get('makeweatherfiles', 'memory_limit'))
+        except:
+            pass
+        try:
+            self.scratch_folder = config.get('makeweatherfiles', 'scratch_folder')
+            if not os.path.isdir(self.scratch_folder):
+                self.scratch_folder = None
+        except:
+            pass
+        self.workers = 1   # processes to write weather files
+        try:
+            self.workers = int(config.get('makeweatherfiles', 'workers'))
+            if self.workers <= 0:
+                self.workers = os.cpu_count()
+        except:
+            pass
+        self.incremental = False   # just read new or changed ERA5 files and update the weather files
+        try:
+            if config.get('makeweatherfiles', 'incremental').lower() in ['true', 'on', 'yes']:
+                self.incremental = True
+        except:
+            pass
+        self.era5_plan = None   # ERA5 files (and hours) to read
+        self.era5_segments = []   # and those read
+        self.manifest = None
+        self.row_map = None   # weather file rows for the hours read when updating
+        self.outputs = []
+        self.resource_store = ''   # also (or only) put the values in a resource store
+        self.store = None
+        try:
+            variable = config.get('makeweatherfiles', 'resource_store').lower()
+            if variable == 'only':
+                self.resource_store = 'only'
+            elif variable in ['true', 'on', 'yes']:
+                self.resource_store = 'true'
+        except:
+            pass
         self.wrap = False
         if wrap is None or wrap == '':
             pass
@@ -1439,10 +1802,9 @@ class makeWeather():
                 inp_strt = '{:04d}'.format(self.src_year) + '0101'
                 inp_file = self.findFile(inp_strt, True, quiet=True)
              # get longitude from "wind" file
-            unzip_file = self.unZip(self.findFile(inp_strt, True))
-            if self.return_code != 0:
+            cdf_file = self.openCDF(self.findFile(inp_strt, True))
+            if cdf_file is None:
                 return
-            cdf_file = Dataset(unzip_file, 'r')
             longitude = cdf_file.variables[self.vars['longitude']][:]
             self.src_zone = int(round(longitude[0] / 15))
             if str(self.src_zone).lower() == 'best':
@@ -1458,7 +1820,7 @@ class makeWeather():
                     self.src_zone = max(zones, key=lambda k: zones[k])
             self.log += 'Time zone: %s based on %s (west) longitude (%s to %s)\n' % (str(self.src_zone),
                         self.dataset, '{:0.4f}'.format(longitude[0]), '{:0.4f}'.format(longitude[-1]))
-            cdf_file.close()
+            self.closeCDF(cdf_file)
         else:
             self.src_zone = int(self.src_zone)
           #  self.auto_zone = False
@@ -1507,19 +1869,19 @@ class makeWeather():
         self.lat_lon_ndx = []
         self.longrange = [None, None]
         self.tims = []
-        self.s10m = []
-        self.d10m = []
-        self.t_10m = []
-        self.p_s = []
-        self.ghi = []
-        self.s2m = []
-        self.s50m = []
-        self.s100m = []
-        self.d2m = []
-        self.d50m = []
-        self.d100m = []
-        self.t_2m = []
-        self.alb = []
+        self.s10m = HourlyGrid(python_values=True)
+        self.d10m = HourlyGrid(python_values=True)
+        self.t_10m = HourlyGrid()
+        self.p_s = HourlyGrid()
+        self.ghi = HourlyGrid()
+        self.s2m = HourlyGrid(python_values=True)
+        self.s50m = HourlyGrid(python_values=True)
+        self.s100m = HourlyGrid(python_values=True)
+        self.d2m = HourlyGrid(python_values=True)
+        self.d50m = HourlyGrid(python_values=True)
+        self.d100m = HourlyGrid(python_values=True)
+        self.t_2m = HourlyGrid()
+        self.alb = HourlyGrid()
         dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
         if self.era5:
             self.process_era5()
@@ -1536,22 +1898,22 @@ class makeWeather():
         if self.src_zone != 0:
             # need last self.src_zone hours of either last day of previous year
             # or first day of this year
-            self.p_s = self.p_s[-self.src_zone:]
+            self.p_s.keep(-self.src_zone)
             self.lat_lon_ndx = self.lat_lon_ndx[-self.src_zone:]
             self.lati = self.lati[-self.src_zone:]
             self.longi = self.longi[-self.src_zone:]
             if len(self.s10m) > 0:
-                self.s10m = self.s10m[-self.src_zone:]
-                self.d10m = self.d10m[-self.src_zone:]
-                self.t_10m = self.t_10m[-self.src_zone:]
+                self.s10m.keep(-self.src_zone)
+                self.d10m.keep(-self.src_zone)
+                self.t_10m.keep(-self.src_zone)
             if self.make_wind:
-                self.s2m = self.s2m[-self.src_zone:]
-                self.s50m = self.s50m[-self.src_zone:]
-                self.d2m = self.d2m[-self.src_zone:]
-                self.d50m = self.d50m[-self.src_zone:]
-                self.t_2m = self.t_2m[-self.src_zone:]
+                self.s2m.keep(-self.src_zone)
+                self.s50m.keep(-self.src_zone)
+                self.d2m.keep(-self.src_zone)
+                self.d50m.keep(-self.src_zone)
+                self.t_2m.keep(-self.src_zone)
             if len(self.alb) > 0:
-                self.alb = self.alb[-self.src_zone:]
+                self.alb.keep(-self.src_zone)
         if self.wrap:
             yrs = 2
         else:
@@ -1596,26 +1958,26 @@ class makeWeather():
             if self.return_code != 0:
                 return
         if len(self.p_s) > 8760: # will be the case if src_zone != 0
-            del self.p_s[len(self.p_s) - (len(self.p_s) - 8760):]
+            self.p_s.keep(0, 8760)
             del self.lat_lon_ndx[len(self.lat_lon_ndx) - (len(self.lat_lon_ndx) - 8760):]
             del self.lati[len(self.lati) - (len(self.lati) - 8760):]
             del self.longi[len(self.longi) - (len(self.longi) - 8760):]
             if len(self.s10m) > 0:
-                del self.s10m[len(self.s10m) - (len(self.s10m) - 8760):]
-                del self.d10m[len(self.d10m) - (len(self.d10m) - 8760):]
+                self.s10m.keep(0, 8760)
+                self.d10m.keep(0, 8760)
                 try:
-                    del self.t_10m[len(self.t_10m) - (len(self.t_10m) - 8760):]
+                    self.t_10m.keep(0, 8760)
                 except:
                     pass
             if self.make_wind:
                 try:
-                    del self.s2m[len(self.s2m) - (len(self.s2m) - 8760):]
-                    del self.s50m[len(self.s50m) - (len(self.s50m) - 8760):]
-                    del self.d2m[len(self.d2m) - (len(self.d2m) - 8760):]
-                    del self.d50m[len(self.d50m) - (len(self.d50m) - 8760):]
+                    self.s2m.keep(0, 8760)
+                    self.s50m.keep(0, 8760)
+                    self.d2m.keep(0, 8760)
+                    self.d50m.keep(0, 8760)
                 except:
                     pass
-                del self.t_2m[len(self.t_2m) - (len(self.t_2m) - 8760):]
+                self.t_2m.keep(0, 8760)
         self.longrange = [self.lons[0], self.lons[-1]]
         self.checkZone()
         if self.make_wind:
@@ -1629,182 +1991,13 @@ class makeWeather():
                 self.log += 'mkdir %s\n' % target_dir
                 os.makedirs(target_dir)
             if self.src_lat is not None:   # specific location(s)
-                for i in range(len(self.src_lat)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(i)
-                        QtCore.QCoreApplication.processEvents()
-                    out_file = self.tgt_dir + 'wind_weather_' + str(self.src_lat[i]) + '_' + \
-                               str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                          round(self.src_lat[i], 4), round(self.src_lon[i], 4))
-                    tf.write(hdr)
-                    tf.write('Wind data derived from MERRA-2 tavg1_2d_slv_Nx' + '\n')
-                    if len(self.s10m) > 0:
-                        tf.write('Temperature,Pressure,Direction,Speed,Temperature,Direction,Speed,' +
-                                 'Direction,Speed' + '\n')
-                        tf.write('C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s' + '\n')
-                        tf.write('2,0,2,2,10,10,10,50,50' + '\n')
-                        for hr in range(len(self.s50m)):
-                            for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                                if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                    break
-                            for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                                if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                    break
-                            if self.longrange[0] is None:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                    self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            if self.longrange[1] is None:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                    self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            lat1 = lat2 - 1
-                            lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                      (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                            lon1 = lon2 - 1
-                            lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                      (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                            tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                str(self.valu(self.d2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s2m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.d50m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s50m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    else:
-                        tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed' + '\n')
-                        tf.write('C,atm,degrees,m/s,degrees,m/s' + '\n')
-                        tf.write('2,0,2,2,50,50' + '\n')
-                        for hr in range(len(self.s50m)):
-                            for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                                if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                    break
-                            for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                                if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                    break
-                            if self.longrange[0] is None:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                    self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            if self.longrange[1] is None:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                    self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            lat1 = lat2 - 1
-                            lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                            lon1 = lon2 - 1
-                            lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                            tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                str(self.valu(self.d2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s2m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.d50m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s50m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    tf.close()
-                    self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                    if self.hub_height > 0:
-                        ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                        if ok:
-                            self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+                self.writeSites((self.windPointTask(i) for i in range(len(self.src_lat))), len(self.src_lat))
             else: # all locations
                 if self.show_progress:
                     self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
                     QtCore.QCoreApplication.processEvents()
-                for la in range(len(self.lats)):
-                    for lo in range(len(self.lons)):
-                        if self.show_progress:
-                            self.caller.daybar.setValue(len(self.lats) * la + lo)
-                            QtCore.QCoreApplication.processEvents()
-                        with_gaps = 0
-                        missing = False
-                        out_file = self.tgt_dir + 'wind_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.srw'
-                        tf = open(out_file, 'w')
-                        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                              round(self.lats[la], 4), round(self.lons[lo], 4))
-                        tf.write(hdr)
-                        if self.era5:
-                            tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                        else:
-                            tf.write('Wind data derived from MERRA-2 tavg1_2d_slv_Nx' + '\n')
-                        if len(self.s10m) > 0:
-                            tf.write('Temperature,Pressure,Direction,Speed,Temperature,Direction,' +
-                                     'Speed,Direction,Speed' + '\n')
-                            tf.write('C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s' + '\n')
-                            tf.write('2,0,2,2,10,10,10,50,50' + '\n')
-                            for hr in range(len(self.s50m)):
-                                try:
-                                    lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                    lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                                try:
-                                    tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                        str(self.d2m[hr][lat][lon]) + ',' + str(self.s2m[hr][lat][lon]) + ',' +
-                                        str(self.t_10m[hr][lat][lon]) + ',' + str(self.d10m[hr][lat][lon]) + ',' +
-                                        str(self.s10m[hr][lat][lon]) + ',' +
-                                        str(self.d50m[hr][lat][lon]) + ',' + str(self.s50m[hr][lat][lon]) + '\n')
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                        else:
-                            tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed' + '\n')
-                            tf.write('C,atm,degrees,m/s,degrees,m/s' + '\n')
-                            tf.write('2,0,2,2,50,50' + '\n')
-                            for hr in range(len(self.s50m)):
-                                try:
-                                    lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                    lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                except:
-                                    if self.gaps:
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                                try:
-                                    tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                        str(self.d2m[hr][lat][lon]) + ',' + str(self.s2m[hr][lat][lon]) + ',' +
-                                        str(self.d50m[hr][lat][lon]) + ',' + str(self.s50m[hr][lat][lon]) + '\n')
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                        tf.close()
-                        if with_gaps > 0 and with_gaps < 504:
-                            self.log += '%s created with gaps (%s days)\n' % ( \
-                                        out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                        elif missing or with_gaps > 0:
-                            os.remove(out_file)
-                            self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                            continue
-                        else:
-                            self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                        if self.hub_height > 0:
-                            ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                            if ok:
-                                self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+                self.writeSites((self.windGridTask(la, lo) for la in range(len(self.lats))
+                                for lo in range(len(self.lons))), len(self.lats) * len(self.lons))
             return  # that's it for wind
         # get variable from solar files
         if self.src_zone > 0:
@@ -1819,7 +2012,7 @@ class makeWeather():
             # or first day of this year
             self.latsi = self.latsi[-self.src_zone:]
             self.longsi = self.longsi[-self.src_zone:]
-            self.ghi = self.ghi[-self.src_zone:]
+            self.ghi.keep(-self.src_zone)
         self.the_year = self.src_year  # start with their year
         if self.wrap:
             yrs = 2
@@ -1865,7 +2058,7 @@ class makeWeather():
             if self.return_code != 0:
                 return
         if len(self.ghi) > 8760: # will be the case if src_zone != 0
-            del self.ghi[len(self.ghi) - (len(self.ghi) - 8760):]
+            self.ghi.keep(0, 8760)
             del self.latsi[len(self.latsi) - (len(self.latsi) - 8760):]
             del self.longsi[len(self.longsi) - (len(self.longsi) - 8760):]
         if self.show_progress:
@@ -1881,218 +2074,13 @@ class makeWeather():
             if self.show_progress:
                 self.caller.daybar.setMaximum(len(self.src_lat) - 1)
                 QtCore.QCoreApplication.processEvents()
-            for i in range(len(self.src_lat)):
-                if self.show_progress:
-                    self.caller.daybar.setValue(i)
-                    QtCore.QCoreApplication.processEvents()
-                out_file = self.tgt_dir + 'solar_weather_' + \
-                           str(self.src_lat[i]) + '_' + str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                tf = open(out_file, 'w')
-                if self.fmat == 'csv':
-                    hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                          'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_zone))
-                    tf.write(hdr)
-                    tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                    mth = 0
-                    day = 1
-                    hour = 0
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if len(self.alb) > 0:
-                            try: # bug here but let's fix later
-                                    alb = self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat)
-                            except:
-                                    alb = '-999'
-                        else:
-                            alb = -999
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1,
-                              lon1, lat_rat, lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        tf.write(str(self.src_year) + ',' + str(mth + 1) + ',' +
-                        str(day) + ',' + str(hour) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' +
-                        str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + '\n')
-                        hour += 1
-                        if hour > 23:
-                            hour = 0
-                            day += 1
-                            if day > dys[mth]:
-                                mth += 1
-                                day = 1
-                                hour = 0
-                else:
-                    hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                          round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_year))
-                    tf.write(hdr)
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1, lon1, lat_rat,
-                              lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        if len(self.alb) > 0:
-                            alb = self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat)
-                        else:
-                            alb = '-999'
-                        tf.write(str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) +
-                        ',-999,-999,-999,' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                tf.close()
-                self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeSites((self.solarPointTask(i) for i in range(len(self.src_lat))), len(self.src_lat))
         else: # all locations
             if self.show_progress:
                 self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
                 QtCore.QCoreApplication.processEvents()
-            for la in range(len(self.lats)):
-                for lo in range(len(self.lons)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(len(self.lats) * la + lo)
-                        QtCore.QCoreApplication.processEvents()
-                    with_gaps = 0
-                    missing = False
-                    out_file = self.tgt_dir + 'solar_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                            '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    if self.fmat == 'csv':
-                        hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                              'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_zone))
-                        tf.write(hdr)
-                        tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                        mth = 0
-                        day = 1
-                        hour = 0
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.latsi[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longsi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longsi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.src_year) + ',' + '{:02d}'.format(mth + 1) + ',' +
-                                '{:02d}'.format(day) + ',' + '{:02d}'.format(hour) + ',' +
-                                '{:0.1f}'.format(ghi) + ',' + '{:0.1f}'.format(dni) + ',' +
-                                '{:0.1f}'.format(dhi) + ',' +
-                                str(self.t_10m[hr][la2][lo2]) + ',' +
-                                str(self.p_s[hr][la2][lo2]) + ',' +
-                                str(self.s10m[hr][la2][lo2]) + ',' +
-                                str(self.d10m[hr][la2][lo2]) + '\n')
-                            hour += 1
-                            if hour > 23:
-                                hour = 0
-                                day += 1
-                                if day > dys[mth]:
-                                    mth += 1
-                                    day = 1
-                                    hour = 0
-                    else:
-                        hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                              round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_year))
-                        tf.write(hdr)
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.latsi[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longsi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            if len(self.alb) > 0:
-                                try:
-                                    alb = self.alb[hr][lat][lon]
-                                except:
-                                    alb = '-999'
-                            else:
-                                alb = '-999'
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longsi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.t_10m[hr][la2][lo2]) +
-                                ',-999,-999,-999,' +
-                                str(self.s10m[hr][la2][lo2]) + ',' +
-                                str(self.d10m[hr][la2][lo2]) + ',' +
-                                str(self.p_s[hr][la2][lo2]) + ',' +
-                                str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                    tf.close()
-                    if with_gaps > 0 and with_gaps < 504:
-                        self.log += '%s created with gaps (%s days)\n' % ( \
-                                    out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                    elif missing or with_gaps > 0:
-                        os.remove(out_file)
-                        self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                        continue
-                    else:
-                        self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeSites((self.solarGridTask(la, lo) for la in range(len(self.lats))
+                            for lo in range(len(self.lons))), len(self.lats) * len(self.lons))
         if self.show_progress:
             self.caller.daybar.setValue(self.caller.daybar.maximum())
             self.caller.progresslabel.setText('All done')
@@ -2620,6 +2608,7 @@ class RptDialog(QtWidgets.QDialog):
 
 
 if "__main__" == __name__:
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     if len(sys.argv) > 1:  # arguments
         src_lat_lon = ''
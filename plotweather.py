@@ -34,6 +34,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 import displaytable
 from getmodels import getModelFile
+from resourcestore import listResources, siteStore
 from zoompan import ZoomPanX
 from senutils import getParents, getUser, WorkBook
 from sammodels import getZenith
@@ -161,7 +162,7 @@ class PlotWeather():
             folder = self.solar_files
         if folder != '':
             if index_file == '':
-                fils = os.listdir(folder)
+                fils = listResources(folder)
                 for fil in fils:
                     if fil[-4:] in filetype:
                         bit = fil.split('_')
@@ -860,10 +861,16 @@ class PlotWeather():
         self.windy = adjust_wind
        # find closest solar file
         self.solar_file, dist, lat, lon = self.find_closest(latitude, longitude)
-        if os.path.exists(self.solar_files + '/' + self.solar_file):
+        self.solar_store = None   # or the resource store with the file
+        if not os.path.exists(self.solar_files + '/' + self.solar_file):
+            self.solar_store = siteStore(self.solar_files, self.solar_file)
+        if os.path.exists(self.solar_files + '/' + self.solar_file) or self.solar_store is not None:
             comment = 'Solar: %s\n            at %s, %s (%s Km away)' % (self.solar_file, lat, lon, '{:0,.0f}'.format(dist))
         self.wind_file, dist, lat, lon = self.find_closest(latitude, longitude, wind=True)
-        if os.path.exists(self.wind_files + '/' + self.wind_file):
+        self.wind_store = None
+        if not os.path.exists(self.wind_files + '/' + self.wind_file):
+            self.wind_store = siteStore(self.wind_files, self.wind_file)
+        if os.path.exists(self.wind_files + '/' + self.wind_file) or self.wind_store is not None:
             if comment != '':
                 comment += '\n'
             comment += 'Wind: %s\n            at %s, %s (%s Km away)' % (self.wind_file, lat, lon, '{:0,.0f}'.format(dist))
@@ -916,11 +923,15 @@ class PlotWeather():
         self.text = ''
         rain_col = -1
         if self.plots['dhi'] or self.plots['dni'] or self.plots['ghi'] or self.plots['temp'] or self.plots['rain']:
-            if os.path.exists(self.solar_files + '/' + self.solar_file):
-                tf = open(self.solar_files + '/' + self.solar_file, 'r')
-                lines = tf.readlines()
-                tf.close()
-                fst_row = len(lines) - 8760
+            if os.path.exists(self.solar_files + '/' + self.solar_file) or self.solar_store is not None:
+                if self.solar_store is None:
+                    tf = open(self.solar_files + '/' + self.solar_file, 'r')
+                    lines = tf.readlines()
+                    tf.close()
+                    fst_row = len(lines) - 8760
+                else:   # the values come from the store
+                    lines = self.solar_store.header(self.solar_file)
+                    fst_row = len(lines)
                 if self.plots['dhi']:
                     self.ly['dhi'] = []
                 if self.plots['dni']:
@@ -974,6 +985,22 @@ class PlotWeather():
                             wind_col = i
                         elif cols[i].lower() in ['rain', 'rainfall', 'rainfall (mm)']:
                             rain_col = i
+                if self.solar_store is not None and (ghi_col >= 0 or not self.plots['ghi']):
+                    # a year for the site is a slice of each variable
+                    if self.plots['dhi']:
+                        self.ly['dhi'] = self.solar_store.field(self.solar_file, dhi_col).tolist()
+                    if self.plots['dni']:
+                        self.ly['dni'] = self.solar_store.field(self.solar_file, dni_col).tolist()
+                    if self.plots['ghi']:
+                        self.ly['ghi'] = self.solar_store.field(self.solar_file, ghi_col).tolist()
+                    if self.plots['temp']:
+                        self.ly['temp'] = self.solar_store.field(self.solar_file, temp_col).tolist()
+                    if self.plots['wind'] and wind_col >= 0:
+                        self.ly['wind'] = self.solar_store.field(self.solar_file, wind_col).tolist()
+                    if self.plots['rain'] and rain_col >= 0:
+                        self.ly['rain'] = self.solar_store.field(self.solar_file, rain_col).tolist()
+                elif self.solar_store is not None:
+                    lines = self.solar_store.lines(self.solar_file)
                 for i in range(fst_row, len(lines)):
                     bits = lines[i].split(',')
                     if self.plots['dhi']:
@@ -1005,11 +1032,15 @@ class PlotWeather():
                 return
         if self.plots['wind']:
             if self.wind_file != '':
-                if os.path.exists(self.wind_files + '/' + self.wind_file):
-                    tf = open(self.wind_files + '/' + self.wind_file, 'r')
-                    lines = tf.readlines()
-                    tf.close()
-                    fst_row = len(lines) - 8760
+                if os.path.exists(self.wind_files + '/' + self.wind_file) or self.wind_store is not None:
+                    if self.wind_store is None:
+                        tf = open(self.wind_files + '/' + self.wind_file, 'r')
+                        lines = tf.readlines()
+                        tf.close()
+                        fst_row = len(lines) - 8760
+                    else:
+                        lines = self.wind_store.header(self.wind_file)
+                        fst_row = len(lines)
                     self.ly['wind'] = []  # we'll override any wind from the solar file
                     if self.windy is None:
                         pass
@@ -1040,6 +1071,15 @@ class PlotWeather():
                                 col = cols[0][1]
                         else:
                             col = col[0][1]
+                        if self.wind_store is not None:
+                            wind = self.wind_store.field(self.wind_file, col)
+                            self.ly['wind'] = wind.tolist()
+                            if col2 > 0:
+                                self.ly['wind2'] = self.wind_store.field(self.wind_file, col2).tolist()
+                            elif self.windy is None:
+                                pass
+                            else:
+                                self.ly['wind2'] = (wind * (self.windy[1] / self.windy[0]) ** 0.143).tolist()
                         for i in range(fst_row, len(lines)):
                             bits = lines[i].split(',')
                             self.ly['wind'].append(float(bits[col]))
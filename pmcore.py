@@ -0,0 +1,1969 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2024 Sustainable Energy Now Inc., Angus King
+#
+#  pmcore.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Powermatch without the GUI. The worksheet loaders and the Summary, Optimise
+# and Batch dispatch used by powermatch.py are here so they can be imported
+# without PyQt5 (e.g. on a server or in worker processes). Run from the
+# command line as:
+#   python pmcore.py [SIREN.ini] [option=summary|batch] [load_year=2022] [results=file.csv]
+import configparser  # decode .ini file
+import csv
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+import openpyxl as oxl
+import pmdispatch
+from senutils import getParents, getUser, techClean, WorkBook
+from getmodels import getModelFile
+
+tech_names = ['Load', 'Onshore Wind', 'Offshore Wind', 'Rooftop PV', 'Fixed PV', 'Single Axis PV',
+              'Dual Axis PV', 'Biomass', 'Geothermal', 'Other1', 'CST', 'Shortfall']
+# initialise tech_names from .ini file
+#            add dispatchable for re from [Grid] dispatchable?
+# load data file. If not in data file then include in order and flag as RE
+# tracking_pv is a synonym form dual_axis_pv
+# phes is a synonym for pumped_hydro
+# other1 is a synonym for other - or the other way around
+# [Grid]
+# dispatchable=pumped_hydro geothermal biomass solar_thermal cst
+# consider: hydrogen bess
+# [Power]
+# technologies=backtrack_pv bess biomass cst fixed_pv geothermal offshore_wind rooftop_pv single_axis_pv solar_thermal tracking_pv wave wind other other_wave
+#              add pumped_hydro hydrogen
+#              maybe drop bess?
+# fossil_technologies=fossil_ccgt fossil_coal fossil_cogen fossil_distillate fossil_gas fossil_mixed fossil_ocgt
+target_keys = ['lcoe', 'load_pct', 'surplus_pct', 're_pct', 'cost', 'co2']
+target_names = ['LCOE', 'Load%', 'Surplus%', 'RE%', 'Cost', 'CO2']
+target_fmats = ['$%.2f', '%.1f%%', '%.1f%%', '%.1f%%', '$%.1fpwr_chr', '%.1fpwr_chr']
+target_titles = ['LCOE ($)', 'Load met %', 'Surplus %', 'RE %', 'Total Cost ($)', 'tCO2e']
+headers = ['Facility', 'Capacity\n(Gen, MW;\nStor, MWh)', 'To meet\nLoad (MWh)',
+           'Subtotal\n(MWh)', 'CF', 'Cost ($/yr)', 'LCOG\nCost\n($/MWh)', 'LCOE\nCost\n($/MWh)',
+           'Emissions\n(tCO2e)', 'Emissions\nCost', 'LCOE With\nCO2 Cost\n($/MWh)', 'Max.\nMWH',
+           'Max.\nBalance', 'Capital\nCost', 'Lifetime\nCost', 'Lifetime\nEmissions',
+           'Lifetime\nEmissions\nCost', 'Area (km^2)', 'Reference\nLCOE', 'Reference\nCF']
+# set up columns for summary table. Hopefully to make it easier to add / alter columns
+st_fac = 0 # Facility
+st_cap = 1 # Capacity\n(Gen, MW;\nStor, MWh)
+st_tml = 2 # To meet\nLoad (MWh)
+st_sub = 3 # Subtotal\n(MWh)
+st_cfa = 4 # CF
+st_cst = 5 # Cost ($/yr)
+st_lcg = 6 # LCOG\nCost\n($/MWh)
+st_lco = 7 # LCOE\nCost\n($/MWh)
+st_emi = 8 # Emissions\n(tCO2e)
+st_emc = 9 # Emissions\nCost
+st_lcc = 10 # LCOE With\nCO2 Cost\n($/MWh)
+st_max = 11 # Max.\nMWH
+st_bal = 12 # Max.\nBalance'
+st_cac = 13 # Capital\nCost'
+st_lic = 14 # Lifetime\nCost'
+st_lie = 15 # Lifetime\nEmissions
+st_lec = 16 # Lifetime\nEmissions\nCost
+st_are = 17 # Area (km^2)
+st_rlc = 18 # Reference\nLCOE
+st_rcf = 19 # Reference\nCF
+
+# same order as self.file_labels
+C = 0 # Constraints - xls or xlsx
+G = 1 # Generators - xls or xlsx
+O = 2 # Optimisation - xls or xlsx
+D = 3 # Data - xlsx
+R = 4 # Results - xlsx
+B = 5 # Batch input - xlsx
+T = 6 # Transition input - xlsx
+S = 'S' # Summary
+O1 = 'O1'
+
+class Constraint:
+    def __init__(self, name, category, capacity_min, capacity_max, rampup_max, rampdown_max,
+                 recharge_max, recharge_loss, discharge_max, discharge_loss, parasitic_loss,
+                 min_run_time, warm_time):
+        self.name = name.strip()
+        self.category = category
+        try:
+            self.capacity_min = float(capacity_min) # minimum run_rate for generator; don't drain below for storage
+        except:
+            self.capacity_min = 0.
+        try:
+            self.capacity_max = float(capacity_max) # maximum run_rate for generator; don't drain more than this for storage
+        except:
+            self.capacity_max = 1.
+        try:
+            self.recharge_max = float(recharge_max) # can't charge more than this per hour
+        except:
+            self.recharge_max = 1.
+        try:
+            self.recharge_loss = float(recharge_loss)
+        except:
+            self.recharge_loss = 0.
+        try:
+            self.discharge_max = float(discharge_max) # can't discharge more than this per hour
+        except:
+            self.discharge_max = 1.
+        try:
+            self.discharge_loss = float(discharge_loss)
+        except:
+            self.discharge_loss = 0.
+        try:
+            self.parasitic_loss = float(parasitic_loss) # daily parasitic loss / hourly ?
+        except:
+            self.parasitic_loss = 0.
+        try:
+            self.rampup_max = float(rampup_max)
+        except:
+            self.rampup_max = 1.
+        try:
+            self.rampdown_max = float(rampdown_max)
+        except:
+            self.rampdown_max = 1.
+        try:
+            self.min_run_time = int(min_run_time)
+        except:
+            self.min_run_time = 0
+        try:
+            self.warm_time = float(warm_time)
+            if self.warm_time >= 1:
+                self.warm_time = self.warm_time / 60
+                if self.warm_time > 1:
+                    self.warm_time = 1
+            elif self.warm_time > 0:
+                if self.warm_time <= 1 / 24.:
+                    self.warm_time = self.warm_time * 24
+        except:
+            self.warm_time = 0
+
+
+class Facility:
+    def __init__(self, **kwargs):
+        kwargs = {**kwargs}
+      #  return
+        self.name = ''
+        self.constraint = ''
+        self.order = 0
+        self.lifetime = 20
+        self.area = None
+        for attr in ['capacity', 'lcoe', 'lcoe_cf', 'emissions', 'initial', 'capex',
+                     'fixed_om', 'variable_om', 'fuel', 'disc_rate', 'lifetime', 'area']:
+            setattr(self, attr, 0.)
+        for key, value in kwargs.items():
+            if value != '' and value is not None:
+                if key == 'lifetime' and value == 0:
+                    setattr(self, key, 20)
+                else:
+                    setattr(self, key, value)
+
+class PM_Facility:
+    def __init__(self, name, generator, capacity, fac_type, col, multiplier):
+        self.name = name
+        if name.find('.') > 0:
+            self.zone = name[:name.find('.')]
+        else:
+            self.zone = ''
+        self.generator = generator
+        self.capacity = capacity
+        self.fac_type = fac_type
+        self.col = col
+        self.multiplier = multiplier
+
+
+class Optimisation:
+    def __init__(self, name, approach, values): #capacity=None, cap_min=None, cap_max=None, cap_step=None, caps=None):
+        self.name = name.strip()
+        self.approach = approach
+        if approach == 'Discrete':
+            caps = values.split()
+            self.capacities = []
+            cap_max = 0.
+            for cap in caps:
+                try:
+                    self.capacities.append(float(cap))
+                    cap_max += float(cap)
+                except:
+                    pass
+            self.capacity_min = 0
+            self.capacity_max = round(cap_max, 3)
+            self.capacity_step = None
+        elif approach == 'Range':
+            caps = values.split()
+            try:
+                self.capacity_min = float(caps[0])
+            except:
+                self.capacity_min = 0.
+            try:
+                self.capacity_max = float(caps[1])
+            except:
+                self.capacity_max = 0.
+            try:
+                self.capacity_step = float(caps[2])
+            except:
+                self.capacity_step = 0.
+            self.capacities = None
+        else:
+            self.capacity_min = 0.
+            self.capacity_max = 0.
+            self.capacity_step = 0.
+            self.capacities = None
+        self.capacity = 0.
+
+
+
+def calcLCOE(annual_output, capital_cost, annual_operating_cost, discount_rate, lifetime):
+    # Compute levelised cost of electricity
+    if discount_rate > 0:
+        annual_cost_capital = capital_cost * discount_rate * pow(1 + discount_rate, lifetime) / \
+                              (pow(1 + discount_rate, lifetime) - 1)
+    else:
+        annual_cost_capital = capital_cost / lifetime
+    total_annual_cost = annual_cost_capital + annual_operating_cost
+    try:
+        return total_annual_cost / annual_output
+    except:
+        return total_annual_cost
+
+
+def get_load_data(load_file):
+    try:
+        tf = open(load_file, 'r')
+        lines = tf.readlines()
+        tf.close()
+    except:
+        return None
+    load_data = []
+    bit = lines[0].rstrip().split(',')
+    if len(bit) > 0: # multiple columns
+        for b in range(len(bit)):
+            if bit[b][:4].lower() == 'load':
+                if bit[b].lower().find('kwh') > 0: # kWh not MWh
+                    for i in range(1, len(lines)):
+                        bit = lines[i].rstrip().split(',')
+                        load_data.append(float(bit[b]) * 0.001)
+                else:
+                    for i in range(1, len(lines)):
+                        bit = lines[i].rstrip().split(',')
+                        load_data.append(float(bit[b]))
+    else:
+        for i in range(1, len(lines)):
+            load_data.append(float(lines[i].rstrip()))
+    return load_data
+
+
+# Optimise fitness worker processes. Each worker is given its own copy of the
+# dispatch settings and hourly data when the pool starts and then only
+# receives the multipliers for each chromosome
+fitness_core = None
+fitness_args = None
+
+def initFitness(settings, year, pmss_details, pmss_data, re_order, dispatch_order):
+    global fitness_core, fitness_args
+    fitness_core = PowermatchCore()
+    for key, value in settings.items():
+        setattr(fitness_core, key, value)
+    fitness_args = [year, pmss_details, pmss_data, re_order, dispatch_order]
+
+def optimiseFitness(multipliers):
+    year, pmss_details, pmss_data, re_order, dispatch_order = fitness_args
+    for fac, multiplier in multipliers.items():
+        pmss_details[fac].multiplier = multiplier
+    multi_value, sp_data, extra = fitness_core.summaryDispatch(year, O, pmss_details, pmss_data,
+                                  re_order, dispatch_order)
+    return multi_value
+
+
+class PowermatchCore:
+    # settings and worksheets used for dispatch; powerMatch (the GUI) and
+    # Powermatch (below) set these from SIREN.ini
+    file_labels = ['Constraints', 'Generators', 'Optimisation', 'Data', 'Results', 'Batch']
+    scenarios = ''
+    constraints = None
+    generators = None
+    optimisation = None
+    pm_array = None # pmss_data as an array for dispatch
+    adjusted_lcoe = True
+    carbon_price = 0.
+    discount_rate = 0.
+    remove_cost = True
+    show_correlation = False
+    surplus_sign = 1
+    underlying = ['Rooftop PV']
+    operational = []
+    optimise_workers = 1 # processes for Optimise fitness; 0 = one per cpu
+    batch_chunk = 500 # maximum Batch models to dispatch together
+    batch_minimum = 100 # without Numba fewer models are quicker dispatched one at a time
+    dispatch_settings = ['adjusted_lcoe', 'carbon_price', 'constraints', 'discount_rate', 'generators',
+                         'operational', 'remove_cost', 'show_correlation', 'underlying']
+
+    def setStatus(self, text):
+        print(text)
+
+    def dispatchProgress(self, value):
+        return
+
+    def get_filename(self, filename):
+        if filename.find('/') == 0: # full directory in non-Windows
+            return filename
+        elif (sys.platform == 'win32' or sys.platform == 'cygwin') \
+          and filename[1:2] == ':/': # full directory for Windows
+            return filename
+        elif filename[:3] == '../': # directory upwards of scenarios
+            ups = filename.split('../')
+            scens = self.scenarios.split('/')
+            scens = scens[: -(len(ups) - 1)]
+            scens.append(ups[-1])
+            return '/'.join(scens)
+        else: # subdirectory of scenarios
+            return self.scenarios + filename
+
+    def fitnessPool(self, year, pmss_details, pmss_data, re_order, dispatch_order):
+        # process pool to calculate Optimise fitness; None to run in this process
+        workers = self.optimise_workers
+        if workers <= 0:
+            workers = os.cpu_count()
+        if workers is None or workers < 2:
+            return None
+        settings = {}
+        for key in self.dispatch_settings:
+            settings[key] = getattr(self, key)
+        try:
+            # spawn rather than fork so workers don't inherit the GUI
+            pool = multiprocessing.get_context('spawn').Pool(workers, initializer=initFitness,
+                   initargs=(settings, year, pmss_details, pmss_data, re_order, dispatch_order))
+        except Exception as err:
+            self.setStatus('Optimise processes not started - ' + str(err))
+            return None
+        return pool
+
+    def getConstraints(self, ws):
+        if ws is None:
+            self.constraints = {}
+            self.constraints['<name>'] = Constraint('<name>', '<category>', 0., 1.,
+                                              1., 1., 1., 0., 1., 0., 0., 0, 0)
+            return
+        wait_col = -1
+        warm_col = -1
+        min_run_time = 0
+        warm_time = 0
+        if ws.cell_value(1, 0) == 'Name' and ws.cell_value(1, 1) == 'Category':
+            cat_col = 1
+            for col in range(ws.ncols):
+                if ws.cell_value(0, col)[:8] == 'Capacity':
+                    cap_col = [col, col + 1]
+                elif ws.cell_value(0, col)[:9] == 'Ramp Rate':
+                    ramp_col = [col, col + 1]
+                elif ws.cell_value(0, col)[:8] == 'Recharge':
+                    rec_col = [col, col + 1]
+                elif ws.cell_value(0, col)[:9] == 'Discharge':
+                    dis_col = [col, col + 1]
+                elif ws.cell_value(1, col)[:9] == 'Parasitic':
+                    par_col = col
+                elif ws.cell_value(1, col)[:9] == 'Wait Time':
+                    wait_col = col
+                elif ws.cell_value(1, col)[:11] == 'Warmup Time':
+                    warm_col = col
+            strt_row = 2
+        elif ws.cell_value(0, 0) == 'Name': # saved file
+            cap_col = [-1, -1]
+            ramp_col = [-1, -1]
+            rec_col = [-1, -1]
+            dis_col = [-1, -1]
+            for col in range(ws.ncols):
+                if ws.cell_value(0, col)[:8] == 'Category':
+                    cat_col = col
+                elif ws.cell_value(0, col)[:8] == 'Capacity':
+                    if ws.cell_value(0, col)[-3:] == 'Min':
+                        cap_col[0] = col
+                    else:
+                        cap_col[1] = col
+                elif ws.cell_value(0, col)[:6] == 'Rampup':
+                    ramp_col[0] = col
+                elif ws.cell_value(0, col)[:8] == 'Rampdown':
+                    ramp_col[1] = col
+                elif ws.cell_value(0, col)[:8] == 'Recharge':
+                    if ws.cell_value(0, col)[-3:] == 'Max':
+                        rec_col[0] = col
+                    else:
+                        rec_col[1] = col
+                elif ws.cell_value(0, col)[:9] == 'Discharge':
+                    if ws.cell_value(0, col)[-3:] == 'Max':
+                        dis_col[0] = col
+                    else:
+                        dis_col[1] = col
+                elif ws.cell_value(0, col)[:9] == 'Parasitic':
+                    par_col = col
+                elif ws.cell_value(0, col)[:9] == 'Wait Time':
+                    wait_col = col
+                elif ws.cell_value(0, col)[:12] == 'Min Run Time':
+                    wait_col = col
+                elif ws.cell_value(0, col)[:11] == 'Warmup Time':
+                    warm_col = col
+            strt_row = 1
+        else:
+            self.setStatus('Not a ' + self.file_labels[C] + ' worksheet.')
+            return
+        try:
+            cat_col = cat_col
+        except:
+            self.setStatus('Not a ' + self.file_labels[C] + ' worksheet.')
+            return
+        self.constraints = {}
+        for row in range(strt_row, ws.nrows):
+            if wait_col >= 0:
+                min_run_time = ws.cell_value(row, wait_col)
+            if warm_col >= 0:
+                warm_time = ws.cell_value(row, warm_col)
+            self.constraints[str(ws.cell_value(row, 0))] = Constraint(str(ws.cell_value(row, 0)),
+                                     str(ws.cell_value(row, cat_col)),
+                                     ws.cell_value(row, cap_col[0]), ws.cell_value(row, cap_col[1]),
+                                     ws.cell_value(row, ramp_col[0]), ws.cell_value(row, ramp_col[1]),
+                                     ws.cell_value(row, rec_col[0]), ws.cell_value(row, rec_col[1]),
+                                     ws.cell_value(row, dis_col[0]), ws.cell_value(row, dis_col[1]),
+                                     ws.cell_value(row, par_col), min_run_time, warm_time)
+        return
+
+    def getGenerators(self, ws):
+        if ws is None:
+            self.generators = {}
+            args = {'name': '<name>', 'constraint': '<constraint>'}
+            self.generators['<name>'] = Facility(**args)
+            return
+        if ws.cell_value(0, 0) != 'Name':
+            self.setStatus('Not a ' + self.file_labels[G] + ' worksheet.')
+            return
+        args = ['name', 'order', 'constraint', 'capacity', 'lcoe', 'lcoe_cf', 'emissions', 'initial',
+                'capex', 'fixed_om', 'variable_om', 'fuel', 'disc_rate', 'lifetime', 'area']
+        possibles = {'name': 0}
+        for col in range(ws.ncols):
+            try:
+                arg = ws.cell_value(0, col).lower()
+            except:
+                continue
+            if arg in args:
+                possibles[arg] = col
+            elif ws.cell_value(0, col)[:9] == 'Capital':
+                possibles['capex'] = col
+            elif ws.cell_value(0, col)[:8] == 'Discount':
+                possibles['disc_rate'] = col
+            elif ws.cell_value(0, col)[:8] == 'Dispatch':
+                possibles['order'] = col
+            elif ws.cell_value(0, col)[:9] == 'Emissions':
+                possibles['emissions'] = col
+            elif ws.cell_value(0, col) == 'FOM':
+                possibles['fixed_om'] = col
+            elif ws.cell_value(0, col) == 'LCOE CF':
+                possibles['lcoe_cf'] = col
+            elif ws.cell_value(0, col)[:4] == 'LCOE':
+                possibles['lcoe'] = col
+            elif ws.cell_value(0, col) == 'VOM':
+                possibles['variable_om'] = col
+        self.generators = {}
+        for row in range(1, ws.nrows):
+            if ws.cell_value(row, 0) is None:
+                continue
+            in_args = {}
+            for key, value in possibles.items():
+                in_args[key] = ws.cell_value(row, value)
+            self.generators[str(ws.cell_value(row, 0))] = Facility(**in_args)
+        return
+
+    def getOptimisation(self, ws):
+        if ws is None:
+            self.optimisation = {}
+            self.optimisation['<name>'] = Optimisation('<name>', 'None', None)
+            return
+        if ws.cell_value(0, 0) != 'Name':
+            self.setStatus('Not an ' + self.file_labels[O] + ' worksheet.')
+            return
+        cols = ['Name', 'Approach', 'Values', 'Capacity Max', 'Capacity Min',
+                'Capacity Step', 'Capacities']
+        coln = [-1] * len(cols)
+        for col in range(ws.ncols):
+            try:
+                i = cols.index(ws.cell_value(0, col))
+                coln[i] = col
+            except:
+                pass
+        if coln[0] < 0:
+            self.setStatus('Not an ' + self.file_labels[O] + ' worksheet.')
+            return
+        self.optimisation = {}
+        for row in range(1, ws.nrows):
+            tech = ws.cell_value(row, 0)
+            if tech is None:
+                continue
+            if coln[2] > 0: # values format
+                self.optimisation[tech] = Optimisation(tech,
+                                     ws.cell_value(row, coln[1]),
+                                     ws.cell_value(row, coln[2]))
+            else:
+                if ws.cell_value(row, coln[1]) == 'Discrete': # fudge values format
+                    self.optimisation[tech] = Optimisation(tech,
+                                         ws.cell_value(row, coln[1]),
+                                         ws.cell_value(row, coln[-1]))
+                else:
+                    self.optimisation[tech] = Optimisation(tech, '', '')
+                    for col in range(1, len(coln)):
+                        if coln[col] > 0:
+                            attr = cols[col].lower().replace(' ', '_')
+                            setattr(self.optimisation[tech], attr,
+                                    ws.cell_value(row, coln[col]))
+            try:
+                self.optimisation[tech].capacity = self.generators[tech].capacity
+            except:
+                pass
+        return
+
+    def getBatch(self, ws, option):
+        global columns, rows, values
+        def recurse(lvl):
+            if lvl >= len(rows) - 1:
+                return
+            for i in range(len(values[lvl])):
+                columns[lvl] = columns[lvl] + [values[lvl][i]] * cols[lvl+1]
+                recurse(lvl + 1)
+
+        def step_split(steps):
+            bits = steps.split(',')
+            if len(bits) == 1:
+                bits = steps.split(';')
+            try:
+                strt = int(bits[0])
+            except:
+                return 0, 0, 0, -1
+            try:
+                stop = int(bits[1])
+                step = int(bits[2])
+                try:
+                    frst = int(bits[3])
+                except:
+                    frst = -1
+            except:
+                return strt, strt, strt, frst
+            return strt, stop, step, frst
+
+        if ws is None:
+            self.setStatus(self.file_labels[B] + ' worksheet missing.')
+            return False
+        istrt = 0
+        year_row = -1
+        for row in range(3):
+            if ws.cell_value(row, 0) in ['Model', 'Model Label', 'Technology']:
+                istrt = row + 1
+                break
+        else:
+            self.setStatus('Not a ' + self.file_labels[B] + ' worksheet.')
+            return False
+        self.batch_models = [{}] # cater for a range of capacities
+        self.batch_report = [['Capacity (MW/MWh)', 1]]
+        self.batch_tech = []
+        istop = ws.nrows
+        inrows = False
+        for row in range(istrt, ws.nrows):
+            tech = ws.cell_value(row, 0)
+            if tech is not None and tech != '':
+                if year_row < 0 and tech[:4].lower() == 'year':
+                    year_row = row
+                    continue
+                inrows = True
+                if tech[:8].lower() != 'capacity':
+                    if tech.find('.') > 0:
+                        tech = tech[tech.find('.') + 1:]
+                    if tech != 'Total' and tech not in self.generators.keys():
+                        self.setStatus('Unknown technology - ' + tech + ' - in batch file.')
+                        return False
+                    self.batch_tech.append(ws.cell_value(row, 0))
+                else:
+                    self.batch_report[0][1] = row + 1
+            elif inrows:
+                istop = row
+                break
+            if tech[:5] == 'Total':
+                istop = row + 1
+                break
+        if len(self.batch_tech) == 0:
+            self.setStatus('No input technologies found in ' + self.file_labels[B] + ' worksheet (try opening and re-saving the workbook).')
+            return False
+        carbon_row = -1
+        discount_row = -1
+        for row in range(istop, ws.nrows):
+            if ws.cell_value(row, 0) is not None and ws.cell_value(row, 0) != '':
+                if ws.cell_value(row, 0).lower() in ['chart', 'graph', 'plot']:
+                    self.batch_report.append(['Chart', row + 1])
+                    break
+                if ws.cell_value(row, 0).lower() in ['carbon price', 'carbon price ($/tco2e)']:
+                    carbon_row = row
+                if ws.cell_value(row, 0).lower() == 'discount rate' or ws.cell_value(row, 0).lower() == 'wacc':
+                    discount_row = row
+                self.batch_report.append([techClean(ws.cell_value(row, 0), full=True), row + 1])
+        range_rows = {}
+        for col in range(1, ws.ncols):
+            model = ws.cell_value(istrt - 1, col)
+            if model is None:
+                break
+            self.batch_models[0][col] = {'name': model}
+            if option == T and year_row < 0:
+                self.batch_models[0][col]['year'] = str(model)
+            for row in range(istrt, istop):
+                if row == year_row:
+                    if ws.cell_value(row, col) is not None and ws.cell_value(row, col) != '':
+                        self.batch_models[0][col]['year'] = str(ws.cell_value(row, col))
+                    continue
+                tech = ws.cell_value(row, 0)
+                try:
+                    if ws.cell_value(row, col) > 0:
+                        self.batch_models[0][col][tech] = ws.cell_value(row, col)
+                except:
+                    if ws.cell_value(row, col) is None:
+                        pass
+                    elif ws.cell_value(row, col).find(',') >= 0 or ws.cell_value(row, col).find(';') >= 0:
+                        try:
+                            range_rows[col].append(row)
+                        except:
+                            range_rows[col] = [row]
+                        try:
+                            strt, stop, step, frst = step_split(ws.cell_value(row, col))
+                            self.batch_models[0][col][tech] = strt
+                            if frst >= 0 and len(range_rows[col]) > 1:
+                                del range_rows[col][-1]
+                                range_rows[col].insert(0, row)
+                        except:
+                            pass
+                    pass
+            if carbon_row >= 0:
+                if isinstance(ws.cell_value(carbon_row, col), float):
+                    self.batch_models[0][col]['Carbon Price'] = ws.cell_value(carbon_row, col)
+                elif isinstance(ws.cell_value(carbon_row, col), int):
+                    self.batch_models[0][col]['Carbon Price'] = float(ws.cell_value(carbon_row, col))
+            if discount_row >= 0:
+                if isinstance(ws.cell_value(discount_row, col), float):
+                    self.batch_models[0][col]['Discount Rate'] = ws.cell_value(discount_row, col)
+                elif isinstance(ws.cell_value(discount_row, col), int):
+                    self.batch_models[0][col]['Discount Rate'] = float(ws.cell_value(discount_row, col))
+        if len(self.batch_models[0]) == 0:
+            self.setStatus('No models found in ' + self.file_labels[B] + ' worksheet (try opening and re-saving the workbook).')
+            return False
+        if len(range_rows) == 0:
+            return True
+        # cater for ranges - so multiple batch_models lists
+        for rcol, ranges in range_rows.items():
+            rows = {}
+            for rw in ranges:
+                rows[rw] = ws.cell_value(rw, rcol)
+            if len(ranges) > 1: # create sheet for each range else one sheet
+                values = []
+                cols = [1]
+                for i in range(len(ranges) -1, 0, -1):
+                    strt, stop, step, frst = step_split(rows[ranges[i]])
+                    values.insert(0, [])
+                    for stp in range(strt, stop + step, step):
+                        values[0].append(stp)
+                    cols.insert(0, cols[0] * len(values[0]))
+                columns = [[]] * len(rows)
+                recurse(0)
+                my_tech = ws.cell_value(ranges[0], 0)
+                tech_2 = ws.cell_value(ranges[1], 0)
+              # produce new batch_models entry for first range tech
+                techs = {}
+                for c in range(1, len(ranges)):
+                    techs[ws.cell_value(ranges[c], 0)] = c - 1
+                bits = my_tech.split('.')
+                strt, stop, step, frst = step_split(rows[ranges[0]])
+                for sht in range(strt, stop + step, step):
+                    self.batch_models.append({})
+                    for c2 in range(len(columns[0])):
+                        self.batch_models[-1][c2] = {}
+                        for key, value in self.batch_models[0][rcol].items():
+                            self.batch_models[-1][c2][key] = value
+                        self.batch_models[-1][c2][my_tech] = sht
+                        for key, value in techs.items():
+                            self.batch_models[-1][c2][key] = columns[value][c2]
+                        self.batch_models[-1][c2]['name'] = f'{bits[-1]}_{sht}_{tech_2}'
+            else:
+                my_tech = ws.cell_value(ranges[0], 0)
+                self.batch_models.append({})
+                strt, stop, step, frst = step_split(rows[ranges[0]])
+                c2 = -1
+                for ctr in range(strt, stop + step, step):
+                    c2 += 1
+                    self.batch_models[-1][c2] = {}
+                    if c2 == 0:
+                        self.batch_models[-1][c2]['hdr'] = ws.cell_value(ranges[0], 0) # fudge to get header name
+                    for key, value in self.batch_models[0][rcol].items():
+                        self.batch_models[-1][c2][key] = value
+                    self.batch_models[-1][c2][my_tech] = ctr
+                #    for key, value in techs.items():
+                 #       self.batch_models[-1][c2][key] = columns[value][c2]
+                    self.batch_models[-1][c2]['name'] = f'Model {c2 + 1}'
+        return True
+
+    def addGenerator(self, pmss_details, key, gen, capacity):
+        if self.generators[gen].constraint in self.constraints and \
+          self.constraints[self.generators[gen].constraint].category == 'Generator':
+            typ = 'G'
+        else:
+            typ = 'S'
+        pmss_details[key] = PM_Facility(key, gen, capacity, typ, -1, 1)
+
+    def setBatchModel(self, year, capacities, pmss_details, pmss_data, re_order, load_columns):
+        # set multipliers (and load) for a Batch model; returns its dispatch order
+        # load_columns is the pmss_data column for each load year
+        for fac in pmss_details.keys():
+            if fac == 'Load':
+                pmss_details['Load'].capacity = sum(pmss_data[load_columns[year]])
+                pmss_details['Load'].col = load_columns[year]
+                continue
+            pmss_details[fac].multiplier = 0
+        dispatch_order = []
+        for key, capacity in capacities.items(): # cater for zones
+            if key in ['Carbon Price', 'Discount Rate', 'Total', 'name', 'hdr']:
+                continue
+            if key == 'year':
+                if capacity not in load_columns.keys():
+                    load_columns[capacity] = len(pmss_data)
+                    pmss_data.append(get_load_data(self.load_files.replace('$YEAR$', capacity)))
+                pmss_details['Load'].col = load_columns[capacity]
+                pmss_details['Load'].capacity = sum(pmss_data[pmss_details['Load'].col])
+                continue
+            if key not in re_order:
+                dispatch_order.append(key)
+            if key not in pmss_details.keys():
+                gen = key[key.find('.') + 1:]
+                if gen in re_order:
+                    pmss_details[key] = PM_Facility(key, gen, capacity, 'R', -1, 1)
+                else:
+                    self.addGenerator(pmss_details, key, gen, capacity)
+        for fac in pmss_details.keys():
+            if fac == 'Load':
+                continue
+            try:
+                pmss_details[fac].multiplier = capacities[fac] * 1.0 / pmss_details[fac].capacity
+            except:
+                pass
+        return dispatch_order
+
+    def batchDispatch(self, year, pmss_details, pmss_data, re_order, models, load_columns):
+        # dispatch all the models in a Batch sheet together. Returns the dispatch results for
+        # each model (to pass to summaryDispatch) or None if they should be done one at a time
+        if len(models) < self.batch_minimum and pmdispatch.compiledKernel is None:
+            return None
+        saved = {}
+        for fac, details in pmss_details.items():
+            saved[fac] = [details.multiplier, details.col, details.capacity]
+        scenarios = []
+        for model, capacities in models.items():
+            dispatch_order = self.setBatchModel(year, capacities, pmss_details, pmss_data, re_order,
+                                                load_columns)
+            multipliers = {}
+            for fac in pmss_details.keys():
+                multipliers[fac] = pmss_details[fac].multiplier
+            scenarios.append([model, multipliers, dispatch_order, pmss_details['Load'].col])
+        for fac, details in saved.items():
+            pmss_details[fac].multiplier, pmss_details[fac].col, pmss_details[fac].capacity = details
+        # combined dispatch order that keeps each model's order; zero capacity facilities
+        # don't change the shortfall so the others can go anywhere
+        follows = {} # facilities that come after each facility
+        for scenario in scenarios:
+            for i in range(len(scenario[2])):
+                if scenario[2][i] not in follows.keys():
+                    follows[scenario[2][i]] = []
+                if i > 0 and scenario[2][i] not in follows[scenario[2][i - 1]]:
+                    follows[scenario[2][i - 1]].append(scenario[2][i])
+        preceded = {}
+        for gen in follows.keys():
+            preceded[gen] = 0
+        for gen in follows.keys():
+            for nxt in follows[gen]:
+                preceded[nxt] += 1
+        ready = [gen for gen in follows.keys() if preceded[gen] == 0]
+        order = []
+        while len(ready) > 0:
+            gen = ready.pop(0)
+            order.append(gen)
+            for nxt in follows[gen]:
+                preceded[nxt] -= 1
+                if preceded[nxt] == 0:
+                    ready.append(nxt)
+        if len(order) < len(follows): # models have different orders
+            return None
+        pm_array = self.dispatchData(pmss_data)
+        fac_tml_keys, underlying_facs = self.underlyingFacilities(re_order)
+        results = {}
+        for strt in range(0, len(scenarios), self.batch_chunk):
+            chunk = scenarios[strt:strt + self.batch_chunk]
+
+            def multipliers(fac):
+                return np.array([scenario[1].get(fac, 0.) for scenario in chunk])
+
+            load_cols = [scenario[3] for scenario in chunk]
+            re_facs = []
+            for fac in fac_tml_keys.keys():
+                re_facs.append([fac, pmss_details[fac].col, multipliers(fac)])
+            shortfall, fac_tml = pmdispatch.reShortfallBatch(pm_array, load_cols, multipliers('Load'),
+                                                             re_facs, underlying_facs)
+            re_shortfall = shortfall.copy()
+            if self.show_correlation:
+                corr_src = pmdispatch.loadContribution(pm_array.data[load_cols], shortfall)
+            else:
+                corr_src = None
+            short_taken = {}
+            for gen in order:
+                if pmss_details[gen].fac_type == 'G': # generators
+                    try:
+                        const = self.generators[gen].constraint
+                    except:
+                        try:
+                            g2 = gen[gen.find('.') + 1:]
+                            const = self.generators[g2].constraint
+                        except:
+                            continue
+                    if self.constraints[const].capacity_min != 0:
+                        short_taken[gen] = pmss_details[gen].capacity * multipliers(gen) * \
+                                           self.constraints[const].capacity_min
+                        shortfall -= short_taken[gen][:, None]
+            dispatched = {}
+            for gen in order:
+                if gen not in self.generators.keys():
+                    continue
+                capacity = pmss_details[gen].capacity * multipliers(gen)
+                if self.generators[gen].constraint in self.constraints and \
+                  self.constraints[self.generators[gen].constraint].category == 'Storage': # storage
+                    storage, recharge, discharge, parasite, min_run_time, warm_time, in_run = \
+                        self.storageSettings(gen, capacity, multipliers(gen))
+                    dispatched[gen] = pmdispatch.storageDispatchBatch(shortfall, storage, recharge, discharge,
+                                      parasite, min_run_time, warm_time, in_run, corr_src)
+                else: # generator
+                    try:
+                        if self.constraints[self.generators[gen].constraint].capacity_max > 0:
+                            cap_capacity = capacity * self.constraints[self.generators[gen].constraint].capacity_max
+                        else:
+                            cap_capacity = capacity
+                    except:
+                        cap_capacity = capacity
+                    if gen in short_taken.keys():
+                        shortfall += short_taken[gen][:, None]
+                        min_gen = short_taken[gen]
+                    else:
+                        min_gen = 0
+                    dispatched[gen] = pmdispatch.generatorDispatchBatch(shortfall, cap_capacity, min_gen)
+            for m in range(len(chunk)):
+                result = {'re_shortfall': re_shortfall[m], 'shortfall': shortfall[m], 'corr_src': None,
+                          'fac_tml': {}}
+                if corr_src is not None:
+                    result['corr_src'] = corr_src[m]
+                for fac in fac_tml.keys():
+                    result['fac_tml'][fac] = float(fac_tml[fac][m])
+                for gen, values in dispatched.items():
+                    result[gen] = []
+                    for value in values:
+                        result[gen].append(float(value[m]))
+                results[chunk[m][0]] = result
+        return results
+
+    def underlyingFacilities(self, re_order):
+        # RE facilities (for fac_tml) and those contributing to underlying load
+        underlying_facs = []
+        fac_tml = {}
+        for fac in re_order:
+            if fac == 'Load':
+                continue
+            fac_tml[fac] = 0.
+            if fac in self.operational:
+              #  operational_facs.append(fac)
+                continue
+            if fac.find('.') > 0:
+                if fac[fac.find('.') + 1:] in self.underlying:
+                    underlying_facs.append(fac)
+                    continue
+            elif fac in self.underlying:
+                underlying_facs.append(fac)
+                continue
+        return fac_tml, underlying_facs
+
+    def dispatchData(self, pmss_data):
+        # hourly data as an array; only build it once for a set of pmss_data
+        if self.pm_array is None or self.pm_array.source is not pmss_data:
+            self.pm_array = pmdispatch.DispatchData(pmss_data)
+        else:
+            self.pm_array.refresh()
+        return self.pm_array
+
+    def storageSettings(self, gen, capacity, multiplier):
+        # storage, recharge, discharge, parasitic loss, min. run and warmup time and initial run state
+        # capacity and multiplier can be arrays (for batchDispatch)
+        constraint = self.constraints[self.generators[gen].constraint]
+        storage = [0., 0., 0., 0.] # capacity, initial, min level, max drain
+        storage[0] = capacity
+        try:
+            storage[1] = self.generators[gen].initial * multiplier
+        except:
+            storage[1] = self.generators[gen].initial
+        if constraint.capacity_min > 0:
+            storage[2] = capacity * constraint.capacity_min
+        if constraint.capacity_max > 0:
+            storage[3] = capacity * constraint.capacity_max
+        else:
+            storage[3] = capacity
+        recharge = [0., 0.] # cap, loss
+        if constraint.recharge_max > 0:
+            recharge[0] = capacity * constraint.recharge_max
+        else:
+            recharge[0] = capacity
+        if constraint.recharge_loss > 0:
+            recharge[1] = constraint.recharge_loss
+        discharge = [0., 0.] # cap, loss
+        if constraint.discharge_max > 0:
+            discharge[0] = capacity * constraint.discharge_max
+        if constraint.discharge_loss > 0:
+            discharge[1] = constraint.discharge_loss
+        if constraint.parasitic_loss > 0:
+            parasite = constraint.parasitic_loss / 24.
+        else:
+            parasite = 0.
+        in_run = [False, False]
+        min_run_time = constraint.min_run_time
+        in_run[0] = True # start off in_run
+        if min_run_time > 0 and self.generators[gen].initial == 0:
+            in_run[0] = False
+        warm_time = constraint.warm_time
+        return storage, recharge, discharge, parasite, min_run_time, warm_time, in_run
+
+    def summaryDispatch(self, year, option, pmss_details, pmss_data, re_order, dispatch_order,
+                        dispatched=None):
+        def format_period(per):
+            hr = per % 24
+            day = int((per - hr) / 24)
+            mth = 0
+            while day > the_days[mth] - 1:
+                day -= the_days[mth]
+                mth += 1
+            return '{}-{:02d}-{:02d} {:02d}:00'.format(year, mth+1, day+1, hr)
+
+        def summary_totals(title=''):
+            sp_d = [' '] * len(headers)
+            sp_d[st_fac] = title + 'Total'
+            sp_d[st_cap] = cap_sum
+            sp_d[st_tml] = tml_sum
+            sp_d[st_sub] = gen_sum
+            sp_d[st_cst] = cost_sum
+            sp_d[st_lcg] = gs
+            sp_d[st_lco] = gsw
+            sp_d[st_emi] = co2_sum
+            sp_d[st_emc] = co2_cost_sum
+            sp_d[st_lcc] = gswc
+            sp_d[st_cac] = capex_sum
+            sp_d[st_lic] = lifetime_sum
+            sp_d[st_lie] = lifetime_co2_sum
+            sp_d[st_lec] = lifetime_co2_cost
+            sp_d[st_are] = total_area
+            sp_data.append(sp_d)
+            if (self.carbon_price > 0 or option == B or option == T):
+                sp_d = [' '] * len(headers)
+                cc = co2_sum * self.carbon_price
+                cl = cc * max_lifetime
+                sp_d[st_fac] = title + 'Total incl. Carbon Cost'
+                sp_d[st_cst] = cost_sum + cc
+                sp_d[st_lic] = lifetime_sum + cl
+                sp_data.append(sp_d)
+            if tml_sum > 0:
+                sp_d = [' '] * len(headers)
+             #   sp_d[st_fac] = 'RE Direct Contribution to ' + title + 'Load'
+                sp_d[st_fac] = 'RE %age'
+                re_pct = (tml_sum - sto_sum - ff_sum) / tml_sum
+                sp_d[st_cap] = '{:.1f}%'.format(re_pct * 100.)
+                sp_d[st_tml] = tml_sum - ff_sum - sto_sum
+                sp_data.append(sp_d)
+                if sto_sum > 0:
+                    sp_d = [' '] * len(headers)
+                 #   sp_d[st_fac] = 'RE Contribution to ' + title + 'Load via Storage'
+                    sp_d[st_fac] = 'Storage %age'
+                    sp_d[st_cap] = '{:.1f}%'.format(sto_sum * 100. / tml_sum)
+                    sp_d[st_tml] = sto_sum
+                    sp_data.append(sp_d)
+            sp_data.append([' '])
+            sp_data.append([title + 'Load Analysis'])
+            if sp_load != 0:
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = title + 'Load met'
+                load_pct = (sp_load - sf_sums[0]) / sp_load
+                sp_d[st_cap] = '{:.1f}%'.format(load_pct * 100)
+                sp_d[st_tml] = sp_load - sf_sums[0]
+                sp_data.append(sp_d)
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = 'Shortfall'
+                sp_d[st_cap] = '{:.1f}%'.format(sf_sums[0] * 100 / sp_load)
+                sp_d[st_tml] = sf_sums[0]
+                sp_data.append(sp_d)
+                if option == B or option == T:
+                    sp_d = [' '] * len(headers)
+                    sp_d[st_fac] = title + 'Total Load'
+                    sp_d[st_tml] = sp_load
+                    if title == '':
+                        sp_d[st_max] = load_max
+                    sp_data.append(sp_d)
+                else:
+                    load_mult = ''
+                    try:
+                        mult = round(pmss_details['Load'].multiplier, 3)
+                        if mult != 1:
+                            load_mult = ' x ' + str(mult)
+                    except:
+                        pass
+                    sp_d = [' '] * len(headers)
+                    sp_d[st_fac] = 'Total ' + title + 'Load - ' + year + load_mult
+                    sp_d[st_tml] = sp_load
+                    if title == '' or option == S:
+                        sp_d[st_max] = load_max
+                        sp_d[st_bal] = ' (' + format_period(load_hr)[5:] + ')'
+                    sp_data.append(sp_d)
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = 'RE %age of Total ' + title + 'Load'
+                sp_d[st_cap] = '{:.1f}%'.format((sp_load - sf_sums[0] - ff_sum) * 100. / sp_load)
+                sp_data.append(sp_d)
+                sp_data.append(' ')
+                if tot_sto_loss != 0:
+                    sp_d = [' '] * len(headers)
+                    sp_d[st_fac] = 'Storage losses'
+                    sp_d[st_sub] = tot_sto_loss
+                    sp_data.append(sp_d)
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = title + 'Surplus'
+                surp_pct = -sf_sums[1] / sp_load
+                sp_d[st_cap] = '{:.1f}%'.format(surp_pct * 100)
+                sp_d[st_sub] = -sf_sums[1]
+                sp_data.append(sp_d)
+            else:
+                load_pct = 0
+                surp_pct = 0
+                re_pct = 0
+            max_short = pmdispatch.maxHour(shortfall)
+            if max_short[0] > 0:
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = 'Largest Shortfall'
+                sp_d[st_sub] = round(max_short[0], 2)
+                sp_d[st_cfa] = ' (' + format_period(max_short[1])[5:] + ')'
+                sp_data.append(sp_d)
+            if option == O or option == O1:
+                return load_pct, surp_pct, re_pct
+
+    # Dispatch for Summary, Optimise, Batch and Transition (the Detail
+    # spreadsheet is produced by powerMatch.doDispatch)
+    # Note: For Batch pmss_data is reused so don't update it in summaryDispatch
+    # dispatched is this model's results from batchDispatch (if any)
+        the_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+        max_lifetime = 0
+        # find max. lifetime years for all technologies selected
+        for key in pmss_details.keys():
+            if key == 'Load'or key == 'Total':
+                continue
+            if pmss_details[key].capacity * pmss_details[key].multiplier > 0:
+             #   gen = key.split('.')[-1]
+                gen = pmss_details[key].generator
+                max_lifetime = max(max_lifetime, self.generators[gen].lifetime)
+        fac_tml, underlying_facs = self.underlyingFacilities(re_order)
+        load_col = pmss_details['Load'].col
+        self.dispatchData(pmss_data)
+        re_facs = []
+        for fac in fac_tml.keys():
+            re_facs.append([fac, pmss_details[fac].col, pmss_details[fac].multiplier])
+        if dispatched is None:
+            shortfall, fac_tml = pmdispatch.reShortfall(self.pm_array, load_col, pmss_details['Load'].multiplier,
+                                                        re_facs, underlying_facs)
+        else:
+            shortfall = dispatched['re_shortfall'].copy()
+            fac_tml = dispatched['fac_tml']
+        fac_tml_sum = 0
+        for fac in fac_tml.keys():
+            fac_tml_sum += fac_tml[fac]
+        if self.show_correlation:
+            col = pmss_details['Load'].col
+            if pmss_details['Load'].multiplier == 1:
+                df1 = pmss_data[col]
+            else:
+                tgt = []
+                for h in range(len(pmss_data[col])):
+                    tgt.append(pmss_data[col][h] * pmss_details['Load'].multiplier)
+                df1 = tgt
+            corr_src = pmdispatch.loadContribution(self.pm_array.column(col), np.asarray(shortfall))
+            try:
+                corr = np.corrcoef(df1, corr_src)
+                if np.isnan(corr.item((0, 1))):
+                    corr = 0
+                else:
+                    corr = corr.item((0, 1))
+            except:
+                corr = 0
+            corr_data = [['Correlation To Load']]
+            corr_data.append(['RE Contribution', corr])
+        else:
+            corr_data = None
+            corr_src = None
+        sp_data = []
+        sp_load = 0. # load from load curve
+        load_max = 0
+        load_hr = 0
+        try:
+            load_col = pmss_details['Load'].col
+        except:
+            load_col = 0
+        if (option == B or option == T) and len(underlying_facs) > 0:
+            load_facs = underlying_facs[:]
+            load_facs.insert(0, 'Load')
+            amt = self.pm_array.column(pmss_details['Load'].col, pmss_details['Load'].multiplier)
+            for fac in underlying_facs:
+                amt = amt + self.pm_array.column(pmss_details[fac].col, pmss_details[fac].multiplier)
+            load_max, load_hr = pmdispatch.maxHour(amt)
+            sp_load = float(np.sum(amt))
+            underlying_facs = []
+        else:
+            fac = 'Load'
+            sp_load = sum(pmss_data[load_col]) * pmss_details[fac].multiplier
+            load_max, load_hr = pmdispatch.maxHour(self.pm_array.column(load_col, pmss_details[fac].multiplier))
+        for fac in re_order:
+            if fac == 'Load' or fac in underlying_facs:
+                continue
+            if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
+                continue
+            sp_d = [' '] * len(headers)
+            sp_d[st_fac] = fac
+            sp_d[st_cap] = pmss_details[fac].capacity * pmss_details[fac].multiplier
+            try:
+                sp_d[st_tml] = fac_tml[fac]
+            except:
+                pass
+            sp_d[st_sub] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+            sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+            sp_data.append(sp_d)
+        if option not in [O, O1, B, T]:
+            self.dispatchProgress(6)
+        storage_names = []
+        # find any minimum generation for generators
+        short_taken = {}
+        short_taken_tot = 0
+        for gen in dispatch_order:
+            if pmss_details[gen].fac_type == 'G': # generators
+                try:
+                    const = self.generators[gen].constraint
+                except:
+                    try:
+                        g2 = gen[gen.find('.') + 1:]
+                        const = self.generators[g2].constraint
+                    except:
+                        continue
+                if self.constraints[const].capacity_min != 0:
+                    try:
+                        short_taken[gen] = pmss_details[gen].capacity * pmss_details[gen].multiplier * \
+                            self.constraints[const].capacity_min
+                    except:
+                        short_taken[gen] = pmss_details[gen].capacity * \
+                            self.constraints[const].capacity_min
+                    short_taken_tot += short_taken[gen]
+                    shortfall -= short_taken[gen]
+        tot_sto_loss = 0.
+        for gen in dispatch_order:
+         #   min_after = [0, 0, -1, 0, 0, 0] # initial, low balance, period, final, low after, period
+         #  Min_after is there to see if storage is as full at the end as at the beginning
+            try:
+                capacity = pmss_details[gen].capacity * pmss_details[gen].multiplier
+            except:
+                try:
+                    capacity = pmss_details[gen].capacity
+                except:
+                    continue
+            if gen not in self.generators.keys():
+                continue
+            if self.generators[gen].constraint in self.constraints and \
+              self.constraints[self.generators[gen].constraint].category == 'Storage': # storage
+                storage_names.append(gen)
+                storage, recharge, discharge, parasite, min_run_time, warm_time, in_run = \
+                    self.storageSettings(gen, capacity, pmss_details[gen].multiplier)
+                if dispatched is None:
+                    storage_can, use_max, sto_max, sto_loss = pmdispatch.storageDispatch(shortfall, storage,
+                            recharge, discharge, parasite, min_run_time, warm_time, in_run, corr_src)
+                else:
+                    storage_can, use_max, sto_max, sto_loss = dispatched[gen]
+                tot_sto_loss += sto_loss
+                if storage[0] == 0:
+                    continue
+           #     tml_tot += storage_can
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = gen
+                sp_d[st_cap] = storage[0]
+                sp_d[st_tml] = storage_can
+                sp_d[st_max] = use_max
+                sp_d[st_bal] = sto_max
+                sp_data.append(sp_d)
+            else: # generator
+                try:
+                    if self.constraints[self.generators[gen].constraint].capacity_max > 0:
+                        cap_capacity = capacity * self.constraints[self.generators[gen].constraint].capacity_max
+                    else:
+                        cap_capacity = capacity
+                except:
+                    cap_capacity = capacity
+                if gen in short_taken.keys():
+                    shortfall += short_taken[gen]
+                    short_taken_tot -= short_taken[gen]
+                    min_gen = short_taken[gen]
+                else:
+                    min_gen = 0
+                if dispatched is None:
+                    gen_can, gen_max = pmdispatch.generatorDispatch(shortfall, cap_capacity, min_gen)
+                else:
+                    gen_can, gen_max = dispatched[gen]
+                if capacity == 0:
+                    continue
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = gen
+                sp_d[st_cap] = capacity
+                sp_d[st_tml] = gen_can
+                sp_d[st_sub] = gen_can
+                sp_d[st_max] = gen_max
+                sp_data.append(sp_d)
+        if dispatched is not None: # shortfall after all dispatch
+            shortfall = dispatched['shortfall']
+            corr_src = dispatched['corr_src']
+        if option not in [O, O1, B, T]:
+            self.dispatchProgress(8)
+        if corr_data is not None:
+            try:
+                corr = np.corrcoef(df1, corr_src)
+                if np.isnan(corr.item((0, 1))):
+                    corr = 0
+                else:
+                    corr = corr.item((0, 1))
+            except:
+                corr = 0
+            corr_data.append(['RE plus Storage', corr])
+            col = pmss_details['Load'].col
+            corr_src = pmdispatch.loadContribution(self.pm_array.column(col), np.asarray(shortfall))
+            try:
+                corr = np.corrcoef(df1, corr_src)
+                if np.isnan(corr.item((0, 1))):
+                    corr = 0
+                else:
+                    corr = corr.item((0, 1))
+            except:
+                corr = 0
+            corr_data.append(['To Meet Load', corr])
+            for c in range(1, len(corr_data)):
+                if abs(corr_data[c][1]) < 0.1:
+                    corr_data[c].append('None')
+                elif abs(corr_data[c][1]) < 0.3:
+                    corr_data[c].append('Little if any')
+                elif abs(corr_data[c][1]) < 0.5:
+                    corr_data[c].append('Low')
+                elif abs(corr_data[c][1]) < 0.7:
+                    corr_data[c].append('Moderate')
+                elif abs(corr_data[c][1]) < 0.9:
+                    corr_data[c].append('High')
+                else:
+                    corr_data[c].append('Very high')
+        load_col = pmss_details['Load'].col
+        cap_sum = 0.
+        gen_sum = 0.
+        re_sum = 0.
+        tml_sum = 0.
+        ff_sum = 0.
+        sto_sum = 0.
+        cost_sum = 0.
+        co2_sum = 0.
+        co2_cost_sum = 0.
+        capex_sum = 0.
+        lifetime_sum = 0.
+        lifetime_co2_sum = 0.
+        lifetime_co2_cost = 0.
+        total_area = 0.
+        for sp in range(len(sp_data)):
+            gen = sp_data[sp][st_fac]
+            if gen in storage_names:
+                sto_sum += sp_data[sp][2]
+            else:
+                try:
+                    gen2 = gen[gen.find('.') + 1:]
+                except:
+                    gen2 = gen
+                if gen in tech_names or gen2 in tech_names:
+                    re_sum += sp_data[sp][st_sub]
+        for sp in range(len(sp_data)):
+            gen = sp_data[sp][st_fac]
+            if gen in storage_names:
+                ndx = 2
+            else:
+                if gen in self.generators.keys():
+                    pass
+                else:
+                    try:
+                        gen = gen[gen.find('.') + 1:]
+                    except:
+                        pass
+                ndx = 3
+            try:
+                if sp_data[sp][st_cap] > 0:
+                    cap_sum += sp_data[sp][st_cap]
+                    if self.generators[gen].lcoe > 0:
+                        sp_data[sp][st_cfa] = sp_data[sp][ndx] / sp_data[sp][st_cap] / 8760 # need number for now
+                    else:
+                        sp_data[sp][st_cfa] = '{:.1f}%'.format(sp_data[sp][ndx] / sp_data[sp][st_cap] / 8760 * 100)
+                gen_sum += sp_data[sp][st_sub]
+            except:
+                pass
+            try:
+                tml_sum += sp_data[sp][st_tml]
+            except:
+                pass
+            if gen not in self.generators.keys():
+                continue
+            ndx = 3
+            if gen in storage_names:
+                ndx = 2
+            else:
+                try:
+                    gen2 = gen[gen.find('.') + 1:]
+                except:
+                    gen2 = gen
+                if gen not in tech_names and gen2 not in tech_names:
+                    ff_sum += sp_data[sp][ndx]
+            if self.generators[gen].capex > 0 or self.generators[gen].fixed_om > 0 \
+              or self.generators[gen].variable_om > 0 or self.generators[gen].fuel > 0:
+                if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
+                    sp_data[sp][st_cst] = 0
+                    continue
+                capex = sp_data[sp][st_cap] * self.generators[gen].capex
+                capex_sum += capex
+                opex = sp_data[sp][st_cap] * self.generators[gen].fixed_om \
+                       + sp_data[sp][ndx] * self.generators[gen].variable_om \
+                       + sp_data[sp][ndx] * self.generators[gen].fuel
+                disc_rate = self.generators[gen].disc_rate
+                if disc_rate == 0:
+                    disc_rate = self.discount_rate
+                lifetime = self.generators[gen].lifetime
+                sp_data[sp][st_lcg] = calcLCOE(sp_data[sp][ndx], capex, opex, disc_rate, lifetime)
+                sp_data[sp][st_cst] = sp_data[sp][ndx] * sp_data[sp][st_lcg]
+                if gen in tech_names or gen2 in tech_names:
+                    sp_data[sp][st_lco] = sp_data[sp][st_cst] / (sp_data[sp][st_tml] + (sto_sum * sp_data[sp][st_tml] / fac_tml_sum))
+                else:
+                    sp_data[sp][st_lco] = sp_data[sp][st_lcg]
+                cost_sum += sp_data[sp][st_cst]
+                sp_data[sp][st_cac] = capex
+            elif self.generators[gen].lcoe > 0:
+                if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
+                    sp_data[sp][st_cst] = 0
+                    continue
+                if self.generators[gen].lcoe_cf > 0:
+                    lcoe_cf = self.generators[gen].lcoe_cf
+                else:
+                    lcoe_cf = sp_data[sp][st_cfa]
+                sp_data[sp][st_cst] = self.generators[gen].lcoe * lcoe_cf * 8760 * sp_data[sp][st_cap]
+                if sp_data[sp][st_cfa] > 0:
+                    sp_data[sp][st_lcg] = sp_data[sp][st_cst] / sp_data[sp][ndx]
+                    sp_data[sp][st_lco] = sp_data[sp][st_lcg]
+                sp_data[sp][st_cfa] = '{:.1f}%'.format(sp_data[sp][st_cfa] * 100.)
+                cost_sum += sp_data[sp][st_cst]
+                sp_data[sp][st_rlc] = self.generators[gen].lcoe
+                sp_data[sp][st_rcf] = '{:.1f}%'.format(lcoe_cf * 100.)
+            elif self.generators[gen].lcoe_cf == 0: # no cost facility
+                if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
+                    sp_data[sp][st_cst] = 0
+                    continue
+                lcoe_cf = sp_data[sp][st_cfa]
+                sp_data[sp][st_cst] = 0
+                cost_sum += sp_data[sp][st_cst]
+            sp_data[sp][st_lic] = sp_data[sp][st_cst] * max_lifetime
+            lifetime_sum += sp_data[sp][st_lic]
+            if self.generators[gen].emissions > 0 and sp_data[sp][st_tml]> 0:
+                sp_data[sp][st_emi] = sp_data[sp][ndx] * self.generators[gen].emissions
+                co2_sum += sp_data[sp][st_emi]
+                sp_data[sp][st_emc] = sp_data[sp][st_emi] * self.carbon_price
+                if sp_data[sp][st_cst] == 0:
+                    sp_data[sp][st_lcc] = sp_data[sp][st_emc] / sp_data[sp][st_tml]
+                else:
+                    sp_data[sp][st_lcc] = sp_data[sp][st_lco] * ((sp_data[sp][st_cst] + sp_data[sp][st_emc]) / sp_data[sp][st_cst])
+                co2_cost_sum += sp_data[sp][st_emc]
+                sp_data[sp][st_lie] = sp_data[sp][st_emi] * max_lifetime
+                lifetime_co2_sum += sp_data[sp][st_lie]
+                sp_data[sp][st_lec] = sp_data[sp][st_lie] * self.carbon_price
+                lifetime_co2_cost += sp_data[sp][st_lec]
+            else:
+                sp_data[sp][st_lcc] = sp_data[sp][st_lco]
+            if self.generators[gen].area > 0:
+                sp_data[sp][st_are] = sp_data[sp][st_cap] * self.generators[gen].area
+                total_area += sp_data[sp][st_are]
+        sf_sums = pmdispatch.shortfallSums(shortfall, self.pm_array.column(load_col,
+                                           pmss_details['Load'].multiplier))
+        if gen_sum > 0:
+            gs = cost_sum / gen_sum
+        else:
+            gs = ''
+        if tml_sum > 0:
+            gsw = cost_sum / tml_sum # LCOE
+            gswc = (cost_sum + co2_cost_sum) / tml_sum
+        else:
+            gsw = ''
+            gswc = ''
+        if option == O or option == O1:
+            load_pct, surp_pct, re_pct = summary_totals()
+        else:
+            summary_totals()
+        do_underlying = False
+        if len(underlying_facs) > 0:
+            for fac in underlying_facs:
+                if pmss_details[fac].capacity * pmss_details[fac].multiplier > 0:
+                    do_underlying = True
+                    break
+        if do_underlying:
+            sp_data.append(' ')
+            sp_data.append('Additional Underlying Load')
+            for fac in underlying_facs:
+                if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
+                    continue
+                if fac in self.generators.keys():
+                    gen = fac
+                else:
+                    gen = pmss_details[fac].generator
+                col = pmss_details[fac].col
+                sp_d = [' '] * len(headers)
+                sp_d[st_fac] = fac
+                sp_d[st_cap] = pmss_details[fac].capacity * pmss_details[fac].multiplier
+                cap_sum += sp_d[st_cap]
+                sp_d[st_tml] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+                tml_sum += sp_d[st_tml]
+                sp_d[st_sub] = sp_d[st_tml]
+                gen_sum += sp_d[st_tml]
+                sp_load += sp_d[st_tml]
+                sp_d[st_cfa] = '{:.1f}%'.format(sp_d[st_sub] / sp_d[st_cap] / 8760 * 100.)
+                sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+                if self.generators[gen].capex > 0 or self.generators[gen].fixed_om > 0 \
+                  or self.generators[gen].variable_om > 0 or self.generators[gen].fuel > 0:
+                    capex = sp_d[st_cap] * self.generators[gen].capex
+                    capex_sum += capex
+                    opex = sp_d[st_cap] * self.generators[gen].fixed_om \
+                           + sp_d[st_tml] * self.generators[gen].variable_om \
+                           + sp_d[st_tml] * self.generators[gen].fuel
+                    disc_rate = self.generators[gen].disc_rate
+                    if disc_rate == 0:
+                        disc_rate = self.discount_rate
+                    lifetime = self.generators[gen].lifetime
+                    sp_d[st_lcg] = calcLCOE(sp_d[st_tml], capex, opex, disc_rate, lifetime)
+                    sp_d[st_cst] = sp_d[st_tml] * sp_d[st_lcg]
+                    cost_sum += sp_d[st_cst]
+                    sp_d[st_lco] = sp_d[st_lcg]
+                    sp_d[st_cac] = capex
+                elif self.generators[gen].lcoe > 0:
+                    if self.generators[gen].lcoe_cf > 0:
+                        lcoe_cf = self.generators[gen].lcoe_cf
+                    else:
+                        lcoe_cf = sp_d[st_cfa]
+                    sp_d[st_cst] = self.generators[gen].lcoe * lcoe_cf * 8760 * sp_d[st_cap]
+                    cost_sum += sp_d[st_cst]
+                    if sp_d[st_cfa] > 0:
+                        sp_d[st_lcg] = sp_d[st_cst] / sp_d[st_tml]
+                        sp_d[st_lco] = sp_d[st_lcg]
+                    sp_d[st_cfa] = '{:.1f}%'.format(sp_d[st_cfa] * 100.)
+                    sp_d[st_rlc] = self.generators[gen].lcoe
+                    sp_d[st_rcf] = '{:.1f}%'.format(lcoe_cf * 100.)
+                elif self.generators[gen].lcoe_cf == 0: # no cost facility
+                    sp_d[st_cst] = 0
+                    sp_d[st_lcg] = 0
+                    sp_d[st_lco] = 0
+                    sp_d[st_rlc] = self.generators[gen].lcoe
+                sp_d[st_lic] = sp_d[st_cst] * max_lifetime
+                lifetime_sum += sp_d[st_lic]
+                if self.generators[gen].emissions > 0:
+                    sp_d[st_emi] = sp_d[st_tml] * self.generators[gen].emissions
+                    co2_sum += sp_d[st_emi]
+                    sp_d[st_emc] = sp_d[st_emi] * self.carbon_price
+                    if sp_d[st_cst] > 0:
+                        sp_d[st_lcc] = sp_d[st_lco] * ((sp_d[st_cst] + sp_d[st_emc]) / sp_d[st_cst])
+                    else:
+                        sp_d[st_lcc] = sp_d[st_emc] / sp_d[st_tml]
+                    co2_cost_sum += sp_d[st_emc]
+                    sp_d[st_lie] = sp_d[st_emi] * max_lifetime
+                    lifetime_co2_sum += sp_d[st_lie]
+                    sp_d[st_lec] = sp_d[st_lie] * self.carbon_price
+                    lifetime_co2_cost += sp_d[st_lec]
+                else:
+                    sp_d[st_lcc] = sp_d[st_lco]
+                if self.generators[gen].area > 0:
+                    sp_d[st_are] = sp_d[st_cap] * self.generators[gen].area
+                sp_data.append(sp_d)
+            if gen_sum > 0:
+                gs = cost_sum / gen_sum
+            else:
+                gs = ''
+            if tml_sum > 0:
+                gsw = cost_sum / tml_sum # LCOE
+                gswc = (cost_sum + co2_cost_sum) / tml_sum
+            else:
+                gsw = ''
+                gswc = ''
+            # find maximum underlying load
+            if option == S:
+                load_max = 0
+                load_hr = 0
+                load_col = pmss_details['Load'].col
+                for h in range(len(pmss_data[load_col])):
+                    amt = pmss_data[load_col][h] * pmss_details['Load'].multiplier
+                    for fac in underlying_facs:
+                        amt += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
+                    if amt > load_max:
+                        load_max = amt
+                        load_hr = h
+            summary_totals('Underlying ')
+        if corr_data is not None:
+            sp_data.append(' ')
+            sp_data = sp_data + corr_data
+        sp_data.append(' ')
+        sp_data.append(['Static Variables'])
+        if self.carbon_price > 0:
+            sp_d = [' '] * len(headers)
+            sp_d[st_fac] = 'Carbon Price ($/tCO2e)'
+            sp_d[st_cap] = self.carbon_price
+            sp_data.append(sp_d)
+        sp_d = [' '] * len(headers)
+        sp_d[st_fac] = 'Lifetime (years)'
+        sp_d[st_cap] = max_lifetime
+        sp_data.append(sp_d)
+        sp_d = [' '] * len(headers)
+        sp_d[st_fac] = 'Discount Rate'
+        sp_d[st_cap] = '{:.2%}'.format(self.discount_rate)
+        sp_data.append(sp_d)
+        if option == B or option == T:
+            return sp_data
+        if option == O or option == O1:
+            op_load_tot = pmss_details['Load'].capacity * pmss_details['Load'].multiplier
+            if gswc != '':
+                lcoe = gswc
+            elif self.adjusted_lcoe:
+                lcoe = gsw # target is lcoe
+            else:
+                lcoe = gs
+            if gen_sum == 0:
+                re_pct = 0
+                load_pct = 0
+                re_pct = 0
+            multi_value = {'lcoe': lcoe, #lcoe. lower better
+                'load_pct': load_pct, #load met. 100% better
+                'surplus_pct': surp_pct, #surplus. lower better
+                're_pct': re_pct, # RE pct. higher better
+                'cost': cost_sum, # cost. lower better
+                'co2': co2_sum} # CO2. lower better
+            if option == O:
+                if multi_value['lcoe'] == '':
+                    multi_value['lcoe'] = 0
+                return multi_value, sp_data, None
+            else:
+                extra = [gsw, op_load_tot, sto_sum, re_sum, re_pct, sf_sums]
+                return multi_value, sp_data, extra
+        return sp_data
+
+
+class Powermatch(PowermatchCore):
+    # Summary and Batch from SIREN.ini without the GUI
+    def __init__(self, config_file=None):
+        config = configparser.RawConfigParser()
+        if config_file is None:
+            config_file = getModelFile('SIREN.ini')
+        config.read(config_file)
+        parents = []
+        try:
+            parents = getParents(config.items('Parents'))
+        except:
+            pass
+        try:
+            base_year = config.get('Base', 'year')
+        except:
+            base_year = '2012'
+        try:
+            scenario_prefix = config.get('Files', 'scenario_prefix')
+        except:
+            scenario_prefix = ''
+        try:
+            self.scenarios = config.get('Files', 'scenarios')
+            if scenario_prefix != '' :
+                self.scenarios += '/' + scenario_prefix
+            for key, value in parents:
+                self.scenarios = self.scenarios.replace(key, value)
+            self.scenarios = self.scenarios.replace('$USER$', getUser())
+            self.scenarios = self.scenarios.replace('$YEAR$', base_year)
+            self.scenarios = self.scenarios[: self.scenarios.rfind('/') + 1]
+            if self.scenarios[:3] == '../':
+                ups = self.scenarios.split('../')
+                me = os.getcwd().split(os.sep)
+                me = me[: -(len(ups) - 1)]
+                me.append(ups[-1])
+                self.scenarios = '/'.join(me)
+        except:
+            self.scenarios = ''
+        try:
+            self.load_files = config.get('Files', 'load')
+            for key, value in parents:
+                self.load_files = self.load_files.replace(key, value)
+            self.load_files = self.load_files.replace('$USER$', getUser())
+        except:
+            self.load_files = ''
+        self.files = [''] * len(self.file_labels)
+        self.sheets = self.file_labels[:]
+        del self.sheets[-2:]
+        self.load_year = 'n/a'
+        self.dispatchable = ['Biomass', 'Geothermal', 'Pumped Hydro', 'Solar Thermal', 'CST'] # RE dispatchable
+        self.underlying = ['Rooftop PV'] # technologies contributing to underlying (but not operational) load
+        self.operational = []
+        self.iorder = []
+        try:
+            dts = config.get('Grid', 'dispatchable').split(' ')
+            dispatchable = []
+            for dt in dts:
+                dispatchable.append(techClean(dt.replace('_', ' ').title()))
+            self.dispatchable = dispatchable
+        except:
+            pass
+        try:
+            items = config.items('Powermatch')
+        except:
+            items = []
+        for key, value in items:
+            try:
+                if key == 'adjusted_lcoe' or key == 'corrected_lcoe':
+                    if value.lower() in ['false', 'no', 'off']:
+                        self.adjusted_lcoe = False
+                elif key == 'batch_new_file':
+                    continue
+                elif key == 'carbon_price':
+                    self.carbon_price = float(value)
+                elif key == 'discount_rate':
+                    self.discount_rate = float(value)
+                elif key == 'dispatch_order':
+                    self.iorder = value.split(',')
+                elif key == 'load':
+                    self.load_files = value
+                    for ky, valu in parents:
+                        self.load_files = self.load_files.replace(ky, valu)
+                    self.load_files = self.load_files.replace('$USER$', getUser())
+                elif key == 'load_year':
+                    self.load_year = value
+                elif key == 'remove_cost':
+                    if value.lower() in ['false', 'off', 'no']:
+                        self.remove_cost = False
+                elif key == 'shortfall_sign':
+                    if value[0] == '+' or value[0].lower() == 'p':
+                        self.surplus_sign = -1
+                elif key == 'show_correlation':
+                    if value.lower() in ['true', 'on', 'yes']:
+                        self.show_correlation = True
+                elif key == 'underlying':
+                    self.underlying = value.split(',')
+                elif key == 'operational':
+                    self.operational = value.split(',')
+                elif key[-5:] == '_file':
+                    ndx = self.file_labels.index(key[:-5].title())
+                    self.files[ndx] = value.replace('$USER$', getUser())
+                elif key[-6:] == '_sheet':
+                    ndx = self.file_labels.index(key[:-6].title())
+                    self.sheets[ndx] = value
+            except:
+                print('PME1: Error with', key)
+
+    def getWorksheets(self, option):
+        # constraints, generators and (for Batch) batch models
+        for it, loader in [[C, self.getConstraints], [G, self.getGenerators]]:
+            try:
+                ts = WorkBook()
+                ts.open_workbook(self.get_filename(self.files[it]))
+                ws = ts.sheet_by_name(self.sheets[it])
+                loader(ws)
+                ts.close()
+                del ts
+            except FileNotFoundError:
+                return self.file_labels[it] + ' file not found - ' + self.files[it]
+            except:
+                return 'Error accessing ' + self.file_labels[it]
+            if (it == C and self.constraints is None) or (it == G and self.generators is None):
+                return 'Not a ' + self.file_labels[it] + ' worksheet'
+        if option == B:
+            try:
+                ts = WorkBook()
+                ts.open_workbook(self.get_filename(self.files[B]))
+                ws = ts.sheet_by_index(0)
+                ok = self.getBatch(ws, option)
+                ts.close()
+                del ts
+                if not ok:
+                    return 'Batch file not processed'
+            except FileNotFoundError:
+                return 'Batch file not found - ' + self.files[B]
+            except Exception as e:
+                return 'Error accessing Batch file ' + str(e)
+        return ''
+
+    def setOrder(self):
+        # RE capacities and dispatch order as per powerMatch.setOrder
+        self.re_capacity = {}
+        order = []
+        zero = []
+        for key, value in self.generators.items():
+            if key in tech_names and key not in self.dispatchable:
+                self.re_capacity[key] = value.capacity
+                continue
+            try:
+                gen = key[key.find('.') + 1:]
+                if gen in tech_names and gen not in self.dispatchable:
+                    self.re_capacity[key] = value.capacity
+                    continue
+            except:
+                pass
+            try:
+                o = int(value.order)
+                if o > 0:
+                    while len(order) <= o:
+                        order.append([])
+                    order[o - 1].append(key)
+                elif o == 0:
+                    zero.append(key)
+            except:
+                pass
+        order.append(zero)
+        self.order = []
+        for cat in order:
+            for stn in cat:
+                self.order.append(stn)
+        if len(self.iorder) > 0:
+            self.order = self.iorder[:]
+
+    def getData(self, load_year=None):
+        # hourly data from the Powermatch data file (and load file)
+        if load_year is None:
+            load_year = self.load_year
+        pm_data_file = self.get_filename(self.files[D])
+        if pm_data_file[-5:] != '.xlsx': #xlsx format only
+            self.setStatus('Not a Powermatch data spreadsheet (1)')
+            return None
+        try:
+            ts = oxl.load_workbook(pm_data_file)
+        except FileNotFoundError:
+            self.setStatus('Data file not found - ' + self.files[D])
+            return None
+        except:
+            self.setStatus('Error accessing Data file - ' + self.files[D])
+            return None
+        ws = ts.worksheets[0]
+        top_row = ws.max_row - 8760
+        if top_row < 1 or (ws.cell(row=top_row, column=1).value != 'Hour' \
+                           or ws.cell(row=top_row, column=2).value != 'Period'):
+            self.setStatus(f'Not a Powermatch data spreadsheet (2; {top_row})')
+            return None
+        typ_row = top_row - 1
+        while typ_row > 0:
+            if ws.cell(row=typ_row, column=3).value in tech_names:
+                break
+            typ_row -= 1
+        else:
+            self.setStatus('no suitable data')
+            return None
+        do_zone = False
+        zone_row = typ_row - 1
+        try:
+            if ws.cell(row=zone_row, column=1).value.lower() == 'zone':
+                do_zone = True
+        except:
+            pass
+        icap_row = typ_row + 1
+        while icap_row < top_row:
+            if ws.cell(row=icap_row, column=1).value[:8] == 'Capacity':
+                break
+            icap_row += 1
+        else:
+            self.setStatus('no capacity data')
+            return None
+        year = ws.cell(row=top_row + 1, column=2).value[:4]
+        pmss_details = {} # contains name, generator, capacity, fac_type, col, multiplier
+        pmss_data = []
+        re_order = [] # order for re technology
+        load_col = -1
+        strt_col = 3
+        if load_year != 'n/a':
+            load_data = get_load_data(self.load_files.replace('$YEAR$', load_year))
+            if load_data is not None:
+                year = load_year
+                strt_col = 4
+                load_col = len(pmss_data)
+                pmss_details['Load'] = PM_Facility('Load', 'Load', 0, 'L', len(pmss_data), 1)
+                pmss_data.append(load_data)
+                re_order.append('Load')
+        zone = ''
+        for col in range(strt_col, ws.max_column + 1):
+            try:
+                valu = ws.cell(row=typ_row, column=col).value.replace('-','')
+                i = tech_names.index(valu)
+            except:
+                continue
+            key = tech_names[i]
+            if key == 'Load':
+                load_col = len(pmss_data)
+                typ = 'L'
+                capacity = 0
+                fctr = 1
+            else:
+                if do_zone:
+                    cell = ws.cell(row=zone_row, column=col)
+                    if type(cell).__name__ != 'MergedCell':
+                        zone = ws.cell(row=zone_row, column=col).value
+                    if zone is not None and zone != '':
+                        key = zone + '.' + valu
+                elif len(self.re_capacity) > 0 and tech_names[i] not in self.re_capacity.keys():
+                    continue
+                try:
+                    capacity = float(ws.cell(row=icap_row, column=col).value)
+                except:
+                    continue
+                if capacity <= 0:
+                    continue
+                typ = 'R'
+                if not do_zone and tech_names[i] in self.re_capacity:
+                    fctr = self.re_capacity[tech_names[i]] / capacity
+                else:
+                    fctr = 1
+            pmss_details[key] = PM_Facility(key, tech_names[i], capacity, typ, len(pmss_data), fctr)
+            pmss_data.append([])
+            re_order.append(key)
+            for row in range(top_row + 1, ws.max_row + 1):
+                pmss_data[-1].append(ws.cell(row=row, column=col).value)
+        ts.close()
+        if load_col < 0:
+            self.setStatus('no load data')
+            return None
+        pmss_details['Load'].capacity = sum(pmss_data[load_col])
+        return year, pmss_details, pmss_data, re_order
+
+    def summary(self):
+        msg = self.getWorksheets(S)
+        if msg != '':
+            self.setStatus(msg)
+            return None
+        self.setOrder()
+        data = self.getData()
+        if data is None:
+            return None
+        year, pmss_details, pmss_data, re_order = data
+        dispatch_order = []
+        for gen in self.order:
+            try:
+                if self.generators[gen].capacity <= 0:
+                    continue
+            except KeyError as err:
+                self.setStatus('Key Error: No Generator entry for ' + str(err))
+                continue
+            dispatch_order.append(gen)
+            self.addGenerator(pmss_details, gen, gen, self.generators[gen].capacity)
+        return self.summaryDispatch(year, S, pmss_details, pmss_data, re_order, dispatch_order)
+
+    def batch(self):
+        # returns list of [model name, sp_data] for each batch model
+        msg = self.getWorksheets(B)
+        if msg != '':
+            self.setStatus(msg)
+            return None
+        self.setOrder()
+        data = self.getData()
+        if data is None:
+            return None
+        year, pmss_details, pmss_data, re_order = data
+        for gen in self.order:
+            if gen in self.generators.keys() and self.generators[gen].capacity > 0:
+                self.addGenerator(pmss_details, gen, gen, self.generators[gen].capacity)
+        results = []
+        load_columns = {year: pmss_details['Load'].col}
+        for sht in range(len(self.batch_models)):
+            dispatched = self.batchDispatch(year, pmss_details, pmss_data, re_order, self.batch_models[sht],
+                                            load_columns)
+            for model, capacities in self.batch_models[sht].items():
+                dispatch_order = self.setBatchModel(year, capacities, pmss_details, pmss_data, re_order,
+                                                    load_columns)
+                save_carbon_price = self.carbon_price
+                save_discount_rate = self.discount_rate
+                if 'Carbon Price' in capacities.keys():
+                    self.carbon_price = capacities['Carbon Price']
+                if 'Discount Rate' in capacities.keys():
+                    self.discount_rate = capacities['Discount Rate']
+                if dispatched is None:
+                    sp_data = self.summaryDispatch(year, B, pmss_details, pmss_data, re_order, dispatch_order)
+                else:
+                    sp_data = self.summaryDispatch(year, B, pmss_details, pmss_data, re_order, dispatch_order,
+                                                   dispatched=dispatched[model])
+                self.carbon_price = save_carbon_price
+                self.discount_rate = save_discount_rate
+                results.append([capacities['name'], sp_data])
+        return results
+
+
+def saveResults(results_file, sp_data, model=None):
+    # write summary table(s) as csv; for Batch the first column is the model
+    if model is None:
+        rows = [['', sp_data]]
+    else:
+        rows = sp_data
+    with open(results_file, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        fields = [hdr.replace('\n', ' ') for hdr in headers]
+        if model is not None:
+            fields.insert(0, 'Model')
+        writer.writerow(fields)
+        for name, data in rows:
+            for sp_d in data:
+                if isinstance(sp_d, str):
+                    sp_d = [sp_d.strip()]
+                line = [str(value).strip() for value in sp_d]
+                if model is not None:
+                    line.insert(0, name)
+                writer.writerow(line)
+
+
+if "__main__" == __name__:
+    config_file = None
+    option = 'summary'
+    load_year = None
+    results_file = ''
+    for arg in sys.argv[1:]:
+        if arg[:7] == 'option=':
+            option = arg[7:].lower()
+        elif arg[:10] == 'load_year=':
+            load_year = arg[10:]
+        elif arg[:8] == 'results=':
+            results_file = arg[8:]
+        elif arg[-4:] == '.ini':
+            config_file = arg
+    start_time = time.time()
+    pm = Powermatch(config_file)
+    if load_year is not None:
+        pm.load_year = load_year
+    if option[:1] == 'b':
+        sp_data = pm.batch()
+        model = True
+    else:
+        sp_data = pm.summary()
+        model = None
+    if sp_data is None:
+        sys.exit(4)
+    if results_file == '':
+        if model is None:
+            results_file = 'powermatch_summary.csv'
+        else:
+            results_file = 'powermatch_batch.csv'
+    saveResults(results_file, sp_data, model=model)
+    pm.setStatus('%s created (%.2f seconds)' % (results_file, time.time() - start_time))
@@ -0,0 +1,355 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2024 Sustainable Energy Now Inc., Angus King
+#
+#  pmdispatch.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Array based dispatch engine for Powermatch. The hourly data is held as a
+# single float64 array (one row per pmss_data column) and everything apart
+# from the storage state of charge is done as whole-of-year array operations.
+# The storage recurrence depends on the previous hour so it stays as a
+# single tight loop (compiled with Numba if it is installed).
+import numpy as np
+try:
+    from numba import njit
+except:
+    njit = None
+
+
+class DispatchData:
+    def __init__(self, pmss_data, hours=8760):
+        self.source = pmss_data
+        self.hours = hours
+        self.data = np.zeros((0, hours), dtype=np.float64)
+        self.refresh()
+
+    def refresh(self):
+    # pmss_data is only ever appended to (e.g. extra load years for Batch) so
+    # just pick up any new columns
+        if len(self.source) <= self.data.shape[0]:
+            return
+        new = np.zeros((len(self.source) - self.data.shape[0], self.hours), dtype=np.float64)
+        for c in range(self.data.shape[0], len(self.source)):
+            values = self.source[c][:self.hours]
+            new[c - self.data.shape[0], :len(values)] = values
+        self.data = np.vstack((self.data, new))
+
+    def column(self, col, multiplier=1.):
+        if multiplier == 1:
+            return self.data[col]
+        return self.data[col] * multiplier
+
+
+def reShortfall(pm_data, load_col, load_mult, facs, underlying_facs):
+    # shortfall after renewables and each renewable's contribution to load
+    # facs is a list of (fac, col, multiplier) in re_order
+    load = pm_data.column(load_col, load_mult)
+    shortfall = load.copy()
+    for fac, col, mult in facs:
+        if fac in underlying_facs:
+            continue
+        shortfall -= pm_data.data[col] * mult
+    alloc = np.ones(pm_data.hours, dtype=np.float64)
+    surplus = shortfall < 0
+    alloc[surplus] = load[surplus] / (load[surplus] - shortfall[surplus])
+    fac_tml = {}
+    for fac, col, mult in facs:
+        if fac in underlying_facs:
+            fac_tml[fac] = float(np.sum(pm_data.data[col] * mult))
+        else:
+            fac_tml[fac] = float(np.sum(pm_data.data[col] * mult * alloc))
+    return shortfall, fac_tml
+
+
+def loadContribution(load, shortfall):
+    # RE contribution to load; used for correlation
+    return np.where(shortfall < 0, load, load - shortfall)
+
+
+def maxHour(values):
+    # first hour with the maximum value (must be positive)
+    if len(values) == 0:
+        return 0, 0
+    hr = int(np.argmax(values))
+    if values[hr] > 0:
+        return float(values[hr]), hr
+    return 0, 0
+
+
+def shortfallSums(shortfall, load):
+    # shortfall, surplus and load totals
+    return [float(np.sum(shortfall[shortfall > 0])), float(np.sum(shortfall[shortfall <= 0])),
+            float(np.sum(load))]
+
+
+def storageKernel(sf, cs, do_corr, storage_cap, storage_carry, storage_min, recharge_cap, recharge_loss,
+                  discharge_cap, discharge_loss, parasite, min_run_time, warm_time, in_run0, in_run1):
+    # the storage recurrence for one storage facility; sf (and cs if do_corr) are updated in place
+    # this is compiled by Numba (sf and cs float64 arrays) if available otherwise it runs
+    # as Python (on lists, which is quicker than arrays for Python)
+    hours = len(sf)
+    recharge_fctr = 1 / (1 - recharge_loss)
+    discharge_fctr = 1 / (1 - discharge_loss)
+    storage_can = 0.
+    use_max = 0.
+    sto_max = storage_carry
+    tot_sto_loss = 0.
+    for row in range(hours):
+        storage_losses = 0.
+        if storage_carry > 0:
+            loss = storage_carry * parasite
+            storage_carry = storage_carry - loss
+            storage_losses -= loss
+        if sf[row] < 0:  # excess generation
+            if min_run_time > 0:
+                in_run0 = False
+            if warm_time > 0:
+                in_run1 = False
+            can_use = - (storage_cap - storage_carry) * recharge_fctr
+            if can_use < 0: # can use some
+                if sf[row] > can_use:
+                    can_use = sf[row]
+                if can_use < - recharge_cap * recharge_fctr:
+                    can_use = - recharge_cap
+            else:
+                can_use = 0.
+            storage_losses += can_use * recharge_loss
+            storage_carry -= (can_use * (1 - recharge_loss))
+            sf[row] -= can_use
+            if do_corr:
+                cs[row] += can_use
+        else: # shortfall
+            if min_run_time > 0 and sf[row] > 0:
+                if not in_run0:
+                    if row + min_run_time <= hours - 1:
+                        in_run0 = True
+                        for i in range(row + 1, row + min_run_time + 1):
+                            if sf[i] <= 0:
+                                in_run0 = False
+                                break
+            if in_run0:
+                can_use = sf[row] * discharge_fctr
+                can_use = min(can_use, discharge_cap)
+                if can_use > storage_carry - storage_min:
+                    can_use = storage_carry - storage_min
+                if warm_time > 0 and not in_run1:
+                    in_run1 = True
+                    can_use = can_use * (1 - warm_time)
+            else:
+                can_use = 0.
+            if can_use > 0:
+                storage_loss = can_use * discharge_loss
+                storage_losses -= storage_loss
+                storage_carry -= can_use
+                can_use = can_use - storage_loss
+                sf[row] -= can_use
+                if do_corr:
+                    cs[row] += can_use
+                if storage_carry < 0:
+                    storage_carry = 0.
+            else:
+                can_use = 0.
+        if can_use > use_max:
+            use_max = can_use
+        if storage_carry > sto_max:
+            sto_max = storage_carry
+        tot_sto_loss += storage_losses
+        if can_use > 0:
+            storage_can += can_use
+    return storage_can, use_max, sto_max, tot_sto_loss, in_run0, in_run1
+
+
+if njit is not None:
+    try:
+        compiledKernel = njit(cache=True)(storageKernel)
+    except:
+        compiledKernel = None
+else:
+    compiledKernel = None
+
+
+def runKernel(sf, cs, storage, recharge, discharge, parasite, min_run_time, warm_time, in_run):
+    # compiled kernel if we can (sf and cs are contiguous float64 arrays) otherwise Python
+    global compiledKernel
+    args = (float(storage[0]), float(storage[1]), float(storage[2]), float(recharge[0]), float(recharge[1]),
+            float(discharge[0]), float(discharge[1]), float(parasite), int(min_run_time), float(warm_time),
+            bool(in_run[0]), bool(in_run[1]))
+    if compiledKernel is not None:
+        try:
+            if cs is None:
+                result = compiledKernel(sf, np.zeros(0), False, *args)
+            else:
+                result = compiledKernel(sf, cs, True, *args)
+            in_run[0], in_run[1] = result[4:]
+            return result[:4]
+        except Exception as err:
+            print('PMD1: Numba kernel not used -', err)
+            compiledKernel = None
+    sfl = sf.tolist()
+    if cs is None:
+        csl = []
+        result = storageKernel(sfl, csl, False, *args)
+    else:
+        csl = cs.tolist()
+        result = storageKernel(sfl, csl, True, *args)
+        cs[:] = csl
+    sf[:] = sfl
+    in_run[0], in_run[1] = result[4:]
+    return result[:4]
+
+
+def storageDispatch(shortfall, storage, recharge, discharge, parasite, min_run_time,
+                    warm_time, in_run, corr_src=None):
+    # storage state of charge depends on the previous hour so process hour by hour
+    # storage is [capacity, initial, min level, max drain]; recharge and discharge are [cap, loss]
+    # returns storage used to meet load, max. discharge, max. balance and total losses
+    # shortfall (and corr_src) are updated in place
+    return runKernel(shortfall, corr_src, storage, recharge, discharge, parasite, min_run_time,
+                     warm_time, in_run)
+
+
+def generatorDispatch(shortfall, cap_capacity, min_gen):
+    # generator meets shortfall up to its capacity and runs at least at min_gen
+    # shortfall is updated in place; returns generation and max. generation
+    gen = np.where(shortfall >= 0, np.minimum(shortfall, cap_capacity), min_gen)
+    gen = np.where((shortfall >= 0) & (shortfall < cap_capacity) & (shortfall < min_gen), min_gen, gen)
+    shortfall -= gen
+    gen_max = max(0, float(np.max(gen))) if len(gen) > 0 else 0
+    return float(np.sum(gen)), gen_max
+
+
+# Batch versions. Each of N scenarios (e.g. the models in a Batch sheet) is a
+# row of an (N x hours) array; parameters that depend on capacity are length N
+# arrays. Zero capacity facilities leave the shortfall unchanged so all
+# scenarios can be dispatched in the same (combined) order
+def reShortfallBatch(pm_data, load_cols, load_mults, facs, underlying_facs):
+    # facs is a list of (fac, col, multipliers) in re_order
+    load = pm_data.data[load_cols] * np.asarray(load_mults, dtype=np.float64)[:, None]
+    shortfall = load.copy()
+    for fac, col, mults in facs:
+        if fac in underlying_facs:
+            continue
+        shortfall -= pm_data.data[col] * np.asarray(mults, dtype=np.float64)[:, None]
+    alloc = np.ones(shortfall.shape, dtype=np.float64)
+    surplus = shortfall < 0
+    alloc[surplus] = load[surplus] / (load[surplus] - shortfall[surplus])
+    fac_tml = {}
+    for fac, col, mults in facs:
+        mults = np.asarray(mults, dtype=np.float64)[:, None]
+        if fac in underlying_facs:
+            fac_tml[fac] = np.sum(pm_data.data[col] * mults, axis=1)
+        else:
+            fac_tml[fac] = np.sum(pm_data.data[col] * mults * alloc, axis=1)
+    return shortfall, fac_tml
+
+
+def storageDispatchBatch(shortfall, storage, recharge, discharge, parasite, min_run_time,
+                         warm_time, in_run, corr_src=None):
+    # as storageDispatch but steps all scenarios through each hour together
+    # storage[0..3], recharge[0], discharge[0] and in_run[0..1] can be length N arrays
+    scenarios, hours = shortfall.shape
+    if compiledKernel is not None: # quicker one scenario at a time
+        params = [np.zeros(scenarios) + storage[0], np.zeros(scenarios) + storage[1],
+                  np.zeros(scenarios) + storage[2], np.zeros(scenarios) + recharge[0],
+                  np.zeros(scenarios) + discharge[0], np.zeros(scenarios, dtype=bool) | in_run[0],
+                  np.zeros(scenarios, dtype=bool) | in_run[1]]
+        results = np.zeros((4, scenarios))
+        for n in range(scenarios):
+            if corr_src is None:
+                cs = None
+            else:
+                cs = corr_src[n]
+            results[:, n] = runKernel(shortfall[n], cs, [params[0][n], params[1][n], params[2][n]],
+                                      [params[3][n], recharge[1]], [params[4][n], discharge[1]], parasite,
+                                      min_run_time, warm_time, [params[5][n], params[6][n]])
+        return results[0], results[1], results[2], results[3]
+    sf = np.ascontiguousarray(shortfall.T) # hour by hour rows
+    if corr_src is not None:
+        cs = np.ascontiguousarray(corr_src.T)
+    capacity = np.zeros(scenarios) + storage[0]
+    min_level = np.zeros(scenarios) + storage[2]
+    recharge_cap = np.zeros(scenarios) + recharge[0]
+    discharge_cap = np.zeros(scenarios) + discharge[0]
+    recharge_fctr = 1 / (1 - recharge[1])
+    discharge_fctr = 1 / (1 - discharge[1])
+    in_run0 = np.zeros(scenarios, dtype=bool) | in_run[0]
+    in_run1 = np.zeros(scenarios, dtype=bool) | in_run[1]
+    storage_carry = np.zeros(scenarios) + storage[1]
+    storage_can = np.zeros(scenarios)
+    use_max = np.zeros(scenarios)
+    sto_max = storage_carry.copy()
+    tot_sto_loss = np.zeros(scenarios)
+    for row in range(hours):
+        sfr = sf[row]
+        loss = np.where(storage_carry > 0, storage_carry * parasite, 0.)
+        storage_carry = storage_carry - loss
+        storage_losses = -loss
+        excess = sfr < 0
+        if min_run_time > 0:
+            in_run0[excess] = False
+            if row + min_run_time <= hours - 1:
+                check = (~in_run0) & (sfr > 0)
+                if check.any():
+                    in_run0 |= check & np.all(sf[row + 1:row + min_run_time + 1] > 0, axis=0)
+        if warm_time > 0:
+            in_run1[excess] = False
+        # excess generation
+        can_use = - (capacity - storage_carry) * recharge_fctr
+        can_use = np.where(sfr > can_use, sfr, can_use)
+        can_use = np.where(can_use < - recharge_cap * recharge_fctr, - recharge_cap, can_use)
+        charge = np.where(excess & (- (capacity - storage_carry) * recharge_fctr < 0), can_use, 0.)
+        # shortfall
+        can_use = np.minimum(sfr * discharge_fctr, discharge_cap)
+        can_use = np.where(can_use > storage_carry - min_level, storage_carry - min_level, can_use)
+        use = (~excess) & in_run0
+        if warm_time > 0:
+            warm = use & (~in_run1)
+            in_run1 |= warm
+            can_use = np.where(warm, can_use * (1 - warm_time), can_use)
+        use &= can_use > 0
+        storage_loss = np.where(use, can_use * discharge[1], 0.)
+        draw = np.where(use, can_use, 0.)
+        supplied = np.where(use, can_use - storage_loss, 0.)
+        # apply whichever applies to each scenario
+        storage_losses = storage_losses + charge * recharge[1] - storage_loss
+        storage_carry = storage_carry - charge * (1 - recharge[1]) - draw
+        storage_carry = np.where(use & (storage_carry < 0), 0., storage_carry)
+        moved = np.where(excess, charge, supplied)
+        sf[row] = sfr - moved
+        if corr_src is not None:
+            cs[row] += moved
+        use_max = np.maximum(use_max, moved)
+        sto_max = np.maximum(sto_max, storage_carry)
+        tot_sto_loss += storage_losses
+        storage_can += np.where(moved > 0, moved, 0.)
+    shortfall[:] = sf.T
+    if corr_src is not None:
+        corr_src[:] = cs.T
+    return storage_can, use_max, sto_max, tot_sto_loss
+
+
+def generatorDispatchBatch(shortfall, cap_capacity, min_gen):
+    # as generatorDispatch; cap_capacity and min_gen can be length N arrays
+    cap_capacity = (np.zeros(shortfall.shape[0]) + cap_capacity)[:, None]
+    min_gen = (np.zeros(shortfall.shape[0]) + min_gen)[:, None]
+    gen = np.where(shortfall >= 0, np.minimum(shortfall, cap_capacity), min_gen)
+    gen = np.where((shortfall >= 0) & (shortfall < cap_capacity) & (shortfall < min_gen), min_gen, gen)
+    shortfall -= gen
+    if shortfall.shape[1] == 0:
+        return np.zeros(shortfall.shape[0]), np.zeros(shortfall.shape[0])
+    return np.sum(gen, axis=1), np.maximum(np.max(gen, axis=1), 0)
+
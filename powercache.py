@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2015-2023 Sustainable Energy Now Inc., Angus King
+#
+#  powercache.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+
+# Disk cache of station generation profiles. Each profile is saved as
+# a .npy file named by a hash of everything that went into producing it
+# so a changed station, weather file or setting simply misses the cache
+
+import configparser  # decode .ini file
+import hashlib
+import numpy as np
+import os
+import sys
+
+from getmodels import getModelFile
+from senutils import getParents, getUser
+
+
+def fileStamp(filename):
+    try:
+        stat = os.stat(filename)
+        return [filename, stat.st_mtime, stat.st_size]
+    except:
+        return [filename, None, None]
+
+
+class PowerCache():
+    def __init__(self, folder, max_size=500):
+        self.folder = folder
+        self.max_size = int(max_size * 1024 * 1024) # MB
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        cache_file = self.folder + '/' + key + '.npy'
+        try:
+            power = np.load(cache_file).tolist()
+            os.utime(cache_file) # least recently used go first
+        except:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return power
+
+    def put(self, key, power):
+        try:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            cache_file = self.folder + '/' + key + '.npy'
+            temp_file = cache_file + '.' + str(os.getpid()) + '.tmp'
+            with open(temp_file, 'wb') as npy:
+                np.save(npy, np.asarray(power, dtype=np.float64))
+            os.replace(temp_file, cache_file) # other processes only see complete files
+            if self.size is None:
+                self.size = self.cacheSize()
+            else:
+                self.size += os.path.getsize(cache_file)
+            if self.size > self.max_size:
+                self.trim()
+        except:
+            pass
+
+    def cacheFiles(self):
+        files = []
+        try:
+            for fil in os.listdir(self.folder):
+                if fil[-4:] != '.npy':
+                    continue
+                stat = os.stat(self.folder + '/' + fil)
+                files.append([stat.st_mtime, stat.st_size, fil])
+        except:
+            pass
+        return files
+
+    def cacheSize(self):
+        return sum([fil[1] for fil in self.cacheFiles()])
+
+    def trim(self):
+        files = sorted(self.cacheFiles())
+        self.size = sum([fil[1] for fil in files])
+        target = self.max_size * 0.9 # leave some room before trimming again
+        for mtime, size, fil in files:
+            if self.size <= target:
+                break
+            try:
+                os.remove(self.folder + '/' + fil)
+                self.size -= size
+            except:
+                pass
+
+    def clear(self):
+        removed = 0
+        for mtime, size, fil in self.cacheFiles():
+            try:
+                os.remove(self.folder + '/' + fil)
+                removed += 1
+            except:
+                pass
+        self.size = 0
+        return removed
+
+
+def getPowerCache(config_file=None):
+    config = configparser.RawConfigParser()
+    if config_file is None:
+        if len(sys.argv) > 1:
+            config_file = sys.argv[1]
+        else:
+            config_file = getModelFile('SIREN.ini')
+    config.read(config_file)
+    try:
+        folder = config.get('Power', 'power_cache')
+    except:
+        return None
+    if folder == '':
+        return None
+    parents = []
+    try:
+        parents = getParents(config.items('Parents'))
+    except:
+        pass
+    for key, value in parents:
+        folder = folder.replace(key, value)
+    folder = folder.replace('$USER$', getUser())
+    max_size = 500
+    try:
+        max_size = float(config.get('Power', 'power_cache_size'))
+    except:
+        pass
+    return PowerCache(folder, max_size)
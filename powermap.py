@@ -22,6 +22,7 @@
 
 import csv
 import math
+import multiprocessing
 import openpyxl as oxl
 import os
 import sys
@@ -45,6 +46,7 @@ import displaytable
 import displayobject
 import newstation
 from plotweather import PlotWeather
+from powercache import getPowerCache
 from powermodel import PowerModel
 from senutils import getParents, getUser, ssCol, techClean
 from station import Station, Stations
@@ -734,7 +736,8 @@ class MapView(QtWidgets.QGraphicsView):
                     j = i
                     centre = self.scene().load_centre[j][0]
             path = Shortest(self.scene().lines.lines, self.scene().lines.lines[li].coordinates[0],
-                   [self.scene().load_centre[j][1], self.scene().load_centre[j][2]], self.scene().grid_lines)
+                   [self.scene().load_centre[j][1], self.scene().load_centre[j][2]], self.scene().grid_lines,
+                   graph=self.scene().grid_graph)
             route = path.getPath()
             if len(route) < 1:
                 self.statusmsg.emit('No path to Load Centre %s for %s' % (centre, station.name))
@@ -1053,6 +1056,10 @@ class MainWindow(QtWidgets.QMainWindow):
         samver.setStatusTip('Query SAM Version')
         samver.triggered.connect(self.get_SAMVer)
         powerMenu.addAction(samver)
+        clearCache = QtWidgets.QAction(QtGui.QIcon('minus.png'), 'Clear Power Cache', self)
+        clearCache.setStatusTip('Remove cached station power')
+        clearCache.triggered.connect(self.clear_PowerCache)
+        powerMenu.addAction(clearCache)
         self.escape = QtWidgets.QAction(QtGui.QIcon('cancel.png'), 'Exit Visualise', self)
         self.escape.setStatusTip('Exit Visualise loop')
         self.escape.triggered.connect(self.escapeLoop)
@@ -1538,6 +1545,7 @@ class MainWindow(QtWidgets.QMainWindow):
             if self.view.scene()._stations.stations[i].scenario == scenario:
                 self.delStation(self.view.scene()._stations.stations[i])
                 del self.view.scene()._stations.stations[i]
+                self.view.scene()._stations.index.changed()
         self.view.scene().refreshGrid()
         for i in range(len(self.view.scene()._scenarios)):
             if self.view.scene()._scenarios[i][0] == scenario:
@@ -1654,6 +1662,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def addExisting(self):
         stations = Stations()
+        self.view.scene()._setupZones([st.lat for st in stations.stations], [st.lon for st in stations.stations])
         for st in stations.stations:
             self.view.scene()._stations.stations.append(st)
             self.view.scene().addStation(st)
@@ -2400,6 +2409,7 @@ class MainWindow(QtWidgets.QMainWindow):
                             self.view.scene()._scenarios[j][1] = True
                             break
                     del self.view.scene()._stations.stations[i]
+                    self.view.scene()._stations.index.changed()
                     self.view.scene().refreshGrid()
                     break
             self.altered_stations = True
@@ -2490,6 +2500,15 @@ class MainWindow(QtWidgets.QMainWindow):
             comment = 'Error accessing SAM SDK Core. Power modelling unavailable.'
         self.view.statusmsg.emit(comment)
 
+    def clear_PowerCache(self):
+        power_cache = getPowerCache(self.config_file)
+        if power_cache is None:
+            comment = 'No power cache (set power_cache in [Power])'
+        else:
+            removed = power_cache.clear()
+            comment = 'Power cache cleared (%d files removed from %s)' % (removed, power_cache.folder)
+        self.view.statusmsg.emit(comment)
+
     def list_Stations(self):
         ctr = [0, 0]
         try:
@@ -3443,4 +3462,5 @@ def main():
     sys.exit()
 
 if '__main__' == __name__:
+    multiprocessing.freeze_support()
     main()
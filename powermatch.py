@@ -30,6 +30,7 @@ from credits import fileVersion
 import glob
 from math import log10
 import matplotlib
+import multiprocessing
 if matplotlib.__version__ > '3.5.1':
     matplotlib.use('Qt5Agg')
 else:
@@ -46,10 +47,16 @@ from openpyxl.chart import (
     Reference,
     Series
 )
+import pmdispatch
+from pmcore import B, C, D, G, O, O1, R, S, T, headers, st_are, st_bal, st_cac, st_cap, st_cfa, \
+    st_cst, st_emc, st_emi, st_fac, st_lcc, st_lcg, st_lco, st_lec, st_lic, st_lie, st_max, \
+    st_rcf, st_rlc, st_sub, st_tml, target_fmats, target_keys, target_names, target_titles, \
+    tech_names, Constraint, Facility, get_load_data, Optimisation, optimiseFitness, PM_Facility, \
+    PowermatchCore
 import random
 import shutil
 import subprocess
-from senutils import ClickableQLabel, getParents, getUser, ListWidget, ssCol, techClean, WorkBook
+from senutils import ClickableQLabel, getConfig, getParents, getUser, ListWidget, ssCol, techClean, WorkBook
 from editini import EdtDialog, SaveIni
 from floaters import ProgressBar, FloatStatus
 from getmodels import getModelFile, commonprefix
@@ -60,63 +67,6 @@ try:
 except:
     pass
 
-tech_names = ['Load', 'Onshore Wind', 'Offshore Wind', 'Rooftop PV', 'Fixed PV', 'Single Axis PV',
-              'Dual Axis PV', 'Biomass', 'Geothermal', 'Other1', 'CST', 'Shortfall']
-# initialise tech_names from .ini file
-#            add dispatchable for re from [Grid] dispatchable?
-# load data file. If not in data file then include in order and flag as RE
-# tracking_pv is a synonym form dual_axis_pv
-# phes is a synonym for pumped_hydro
-# other1 is a synonym for other - or the other way around
-# [Grid]
-# dispatchable=pumped_hydro geothermal biomass solar_thermal cst
-# consider: hydrogen bess
-# [Power]
-# technologies=backtrack_pv bess biomass cst fixed_pv geothermal offshore_wind rooftop_pv single_axis_pv solar_thermal tracking_pv wave wind other other_wave
-#              add pumped_hydro hydrogen
-#              maybe drop bess?
-# fossil_technologies=fossil_ccgt fossil_coal fossil_cogen fossil_distillate fossil_gas fossil_mixed fossil_ocgt
-target_keys = ['lcoe', 'load_pct', 'surplus_pct', 're_pct', 'cost', 'co2']
-target_names = ['LCOE', 'Load%', 'Surplus%', 'RE%', 'Cost', 'CO2']
-target_fmats = ['$%.2f', '%.1f%%', '%.1f%%', '%.1f%%', '$%.1fpwr_chr', '%.1fpwr_chr']
-target_titles = ['LCOE ($)', 'Load met %', 'Surplus %', 'RE %', 'Total Cost ($)', 'tCO2e']
-headers = ['Facility', 'Capacity\n(Gen, MW;\nStor, MWh)', 'To meet\nLoad (MWh)',
-           'Subtotal\n(MWh)', 'CF', 'Cost ($/yr)', 'LCOG\nCost\n($/MWh)', 'LCOE\nCost\n($/MWh)',
-           'Emissions\n(tCO2e)', 'Emissions\nCost', 'LCOE With\nCO2 Cost\n($/MWh)', 'Max.\nMWH',
-           'Max.\nBalance', 'Capital\nCost', 'Lifetime\nCost', 'Lifetime\nEmissions',
-           'Lifetime\nEmissions\nCost', 'Area (km^2)', 'Reference\nLCOE', 'Reference\nCF']
-# set up columns for summary table. Hopefully to make it easier to add / alter columns
-st_fac = 0 # Facility
-st_cap = 1 # Capacity\n(Gen, MW;\nStor, MWh)
-st_tml = 2 # To meet\nLoad (MWh)
-st_sub = 3 # Subtotal\n(MWh)
-st_cfa = 4 # CF
-st_cst = 5 # Cost ($/yr)
-st_lcg = 6 # LCOG\nCost\n($/MWh)
-st_lco = 7 # LCOE\nCost\n($/MWh)
-st_emi = 8 # Emissions\n(tCO2e)
-st_emc = 9 # Emissions\nCost
-st_lcc = 10 # LCOE With\nCO2 Cost\n($/MWh)
-st_max = 11 # Max.\nMWH
-st_bal = 12 # Max.\nBalance'
-st_cac = 13 # Capital\nCost'
-st_lic = 14 # Lifetime\nCost'
-st_lie = 15 # Lifetime\nEmissions
-st_lec = 16 # Lifetime\nEmissions\nCost
-st_are = 17 # Area (km^2)
-st_rlc = 18 # Reference\nLCOE
-st_rcf = 19 # Reference\nCF
-
-# same order as self.file_labels
-C = 0 # Constraints - xls or xlsx
-G = 1 # Generators - xls or xlsx
-O = 2 # Optimisation - xls or xlsx
-D = 3 # Data - xlsx
-R = 4 # Results - xlsx
-B = 5 # Batch input - xlsx
-T = 6 # Transition input - xlsx
-S = 'S' # Summary
-O1 = 'O1'
 def get_value(ws, row, col):
     def get_range(text, alphabet=None, base=1):
         if len(text) < 1:
@@ -185,138 +135,6 @@ class MyQDialog(QtWidgets.QDialog):
   #      return super(Window, self).resizeEvent(event)
 
 
-class Constraint:
-    def __init__(self, name, category, capacity_min, capacity_max, rampup_max, rampdown_max,
-                 recharge_max, recharge_loss, discharge_max, discharge_loss, parasitic_loss,
-                 min_run_time, warm_time):
-        self.name = name.strip()
-        self.category = category
-        try:
-            self.capacity_min = float(capacity_min) # minimum run_rate for generator; don't drain below for storage
-        except:
-            self.capacity_min = 0.
-        try:
-            self.capacity_max = float(capacity_max) # maximum run_rate for generator; don't drain more than this for storage
-        except:
-            self.capacity_max = 1.
-        try:
-            self.recharge_max = float(recharge_max) # can't charge more than this per hour
-        except:
-            self.recharge_max = 1.
-        try:
-            self.recharge_loss = float(recharge_loss)
-        except:
-            self.recharge_loss = 0.
-        try:
-            self.discharge_max = float(discharge_max) # can't discharge more than this per hour
-        except:
-            self.discharge_max = 1.
-        try:
-            self.discharge_loss = float(discharge_loss)
-        except:
-            self.discharge_loss = 0.
-        try:
-            self.parasitic_loss = float(parasitic_loss) # daily parasitic loss / hourly ?
-        except:
-            self.parasitic_loss = 0.
-        try:
-            self.rampup_max = float(rampup_max)
-        except:
-            self.rampup_max = 1.
-        try:
-            self.rampdown_max = float(rampdown_max)
-        except:
-            self.rampdown_max = 1.
-        try:
-            self.min_run_time = int(min_run_time)
-        except:
-            self.min_run_time = 0
-        try:
-            self.warm_time = float(warm_time)
-            if self.warm_time >= 1:
-                self.warm_time = self.warm_time / 60
-                if self.warm_time > 1:
-                    self.warm_time = 1
-            elif self.warm_time > 0:
-                if self.warm_time <= 1 / 24.:
-                    self.warm_time = self.warm_time * 24
-        except:
-            self.warm_time = 0
-
-
-class Facility:
-    def __init__(self, **kwargs):
-        kwargs = {**kwargs}
-      #  return
-        self.name = ''
-        self.constraint = ''
-        self.order = 0
-        self.lifetime = 20
-        self.area = None
-        for attr in ['capacity', 'lcoe', 'lcoe_cf', 'emissions', 'initial', 'capex',
-                     'fixed_om', 'variable_om', 'fuel', 'disc_rate', 'lifetime', 'area']:
-            setattr(self, attr, 0.)
-        for key, value in kwargs.items():
-            if value != '' and value is not None:
-                if key == 'lifetime' and value == 0:
-                    setattr(self, key, 20)
-                else:
-                    setattr(self, key, value)
-
-class PM_Facility:
-    def __init__(self, name, generator, capacity, fac_type, col, multiplier):
-        self.name = name
-        if name.find('.') > 0:
-            self.zone = name[:name.find('.')]
-        else:
-            self.zone = ''
-        self.generator = generator
-        self.capacity = capacity
-        self.fac_type = fac_type
-        self.col = col
-        self.multiplier = multiplier
-
-
-class Optimisation:
-    def __init__(self, name, approach, values): #capacity=None, cap_min=None, cap_max=None, cap_step=None, caps=None):
-        self.name = name.strip()
-        self.approach = approach
-        if approach == 'Discrete':
-            caps = values.split()
-            self.capacities = []
-            cap_max = 0.
-            for cap in caps:
-                try:
-                    self.capacities.append(float(cap))
-                    cap_max += float(cap)
-                except:
-                    pass
-            self.capacity_min = 0
-            self.capacity_max = round(cap_max, 3)
-            self.capacity_step = None
-        elif approach == 'Range':
-            caps = values.split()
-            try:
-                self.capacity_min = float(caps[0])
-            except:
-                self.capacity_min = 0.
-            try:
-                self.capacity_max = float(caps[1])
-            except:
-                self.capacity_max = 0.
-            try:
-                self.capacity_step = float(caps[2])
-            except:
-                self.capacity_step = 0.
-            self.capacities = None
-        else:
-            self.capacity_min = 0.
-            self.capacity_max = 0.
-            self.capacity_step = 0.
-            self.capacities = None
-        self.capacity = 0.
-
-
 class Adjustments(MyQDialog):
     def setAdjValueUnits(self, key, typ, capacity):
         if key != 'Load':
@@ -845,25 +663,10 @@ class setTransition(MyQDialog):
     def getValues(self):
         return self._results
 
-class powerMatch(QtWidgets.QWidget):
+class powerMatch(QtWidgets.QWidget, PowermatchCore):
     log = QtCore.pyqtSignal()
     progress = QtCore.pyqtSignal()
 
-    def get_filename(self, filename):
-        if filename.find('/') == 0: # full directory in non-Windows
-            return filename
-        elif (sys.platform == 'win32' or sys.platform == 'cygwin') \
-          and filename[1:2] == ':/': # full directory for Windows
-            return filename
-        elif filename[:3] == '../': # directory upwards of scenarios
-            ups = filename.split('../')
-            scens = self.scenarios.split('/')
-            scens = scens[: -(len(ups) - 1)]
-            scens.append(ups[-1])
-            return '/'.join(scens)
-        else: # subdirectory of scenarios
-            return self.scenarios + filename
-
     def get_load_years(self):
         load_years = ['n/a']
         i = self.load_files.find('$YEAR$')
@@ -878,12 +681,11 @@ class powerMatch(QtWidgets.QWidget):
     def __init__(self, help='help.html'):
         super(powerMatch, self).__init__()
         self.help = help
-        config = configparser.RawConfigParser()
         if len(sys.argv) > 1:
             config_file = sys.argv[1]
         else:
             config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
+        config = getConfig(config_file)
         parents = []
         try:
             parents = getParents(config.items('Parents'))
@@ -951,6 +753,7 @@ class powerMatch(QtWidgets.QWidget):
         self.constraints = None
         self.generators = None
         self.optimisation = None
+        self.pm_array = None # pmss_data as an array for dispatch
         self.adjustto = None # adjust capacity to this
         self.adjust_cap = 25
         self.adjust_gen = False
@@ -961,6 +764,7 @@ class powerMatch(QtWidgets.QWidget):
         self.discount_rate = 0.
         self.load_folder = ''
         self.load_year = 'n/a'
+        self.optimise_cache = 5000
         self.optimise_choice = 'LCOE'
         self.optimise_generations = 20
         self.optimise_mutation = 0.005
@@ -1081,6 +885,11 @@ class powerMatch(QtWidgets.QWidget):
                 elif key == 'optimise_debug':
                     if value.lower() in ['true', 'on', 'yes']:
                         self.optimise_debug = True
+                elif key == 'optimise_cache':
+                    try:
+                        self.optimise_cache = int(value)
+                    except:
+                        pass
                 elif key == 'optimise_default':
                     self.optimise_default = value
                 elif key == 'optimise_choice':
@@ -1116,6 +925,11 @@ class powerMatch(QtWidgets.QWidget):
                 elif key == 'optimise_to_batch':
                     if value.lower() in ['false', 'off', 'no']:
                         self.optimise_to_batch = False
+                elif key == 'optimise_workers':
+                    try:
+                        self.optimise_workers = int(value)
+                    except:
+                        pass
                 elif key[:9] == 'optimise_':
                     try:
                         bits = value.split(',')
@@ -1697,59 +1511,18 @@ class powerMatch(QtWidgets.QWidget):
         dialr = EdtDialog(config_file, section='[Powermatch]')
         dialr.exec_()
      #   self.get_config()   # refresh config values
-        config = configparser.RawConfigParser()
-        config.read(config_file)
-        try:
-            st = config.get('Powermatch', 'save_tables')
-        except:
-            st = 'False'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.save_tables = True
-        else:
-            self.save_tables = False
-        try:
-            st = config.get('Powermatch', 'more_details')
-        except:
-            st = 'False'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.more_details = True
-        else:
-            self.more_details = False
-        try:
-            st = config.get('Powermatch', 'optimise_to_batch')
-        except:
-            st = 'True'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.optimise_to_batch = True
-        else:
-            self.optimise_to_batch = False
-        try:
-            st = config.get('Powermatch', 'show_multipliers')
-        except:
-            st = 'False'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.show_multipliers = True
-        else:
-            self.show_multipliers = False
-        try:
-            st = config.get('Powermatch', 'batch_new_file')
-        except:
-            st = 'False'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.batch_new_file = True
+        config = getConfig(config_file)
+        self.save_tables = config.getFlag('Powermatch', 'save_tables')
+        self.more_details = config.getFlag('Powermatch', 'more_details')
+        self.optimise_to_batch = config.getFlag('Powermatch', 'optimise_to_batch', default=True)
+        self.show_multipliers = config.getFlag('Powermatch', 'show_multipliers')
+        self.batch_new_file = config.getFlag('Powermatch', 'batch_new_file')
+        if self.batch_new_file:
             msg = '(check to replace an existing Results workbook)'
         else:
-            self.batch_new_file = False
             msg = '(check to replace last Results worksheet in Batch spreadsheet)'
         self.replace_last = QtWidgets.QCheckBox(msg, self)
-        try:
-            st = config.get('Powermatch', 'batch_prefix')
-        except:
-            st = 'False'
-        if st.lower() in ['true', 'yes', 'on']:
-            self.batch_prefix = True
-        else:
-            self.batch_prefix = False
+        self.batch_prefix = config.getFlag('Powermatch', 'batch_prefix')
         QtWidgets.QApplication.processEvents()
         self.setStatus(config_file + ' edited. Reload may be required.')
 
@@ -1909,368 +1682,6 @@ class powerMatch(QtWidgets.QWidget):
         if msg != '':
             self.setStatus(self.file_labels[it] + msg)
 
-    def getConstraints(self, ws):
-        if ws is None:
-            self.constraints = {}
-            self.constraints['<name>'] = Constraint('<name>', '<category>', 0., 1.,
-                                              1., 1., 1., 0., 1., 0., 0., 0, 0)
-            return
-        wait_col = -1
-        warm_col = -1
-        min_run_time = 0
-        warm_time = 0
-        if ws.cell_value(1, 0) == 'Name' and ws.cell_value(1, 1) == 'Category':
-            cat_col = 1
-            for col in range(ws.ncols):
-                if ws.cell_value(0, col)[:8] == 'Capacity':
-                    cap_col = [col, col + 1]
-                elif ws.cell_value(0, col)[:9] == 'Ramp Rate':
-                    ramp_col = [col, col + 1]
-                elif ws.cell_value(0, col)[:8] == 'Recharge':
-                    rec_col = [col, col + 1]
-                elif ws.cell_value(0, col)[:9] == 'Discharge':
-                    dis_col = [col, col + 1]
-                elif ws.cell_value(1, col)[:9] == 'Parasitic':
-                    par_col = col
-                elif ws.cell_value(1, col)[:9] == 'Wait Time':
-                    wait_col = col
-                elif ws.cell_value(1, col)[:11] == 'Warmup Time':
-                    warm_col = col
-            strt_row = 2
-        elif ws.cell_value(0, 0) == 'Name': # saved file
-            cap_col = [-1, -1]
-            ramp_col = [-1, -1]
-            rec_col = [-1, -1]
-            dis_col = [-1, -1]
-            for col in range(ws.ncols):
-                if ws.cell_value(0, col)[:8] == 'Category':
-                    cat_col = col
-                elif ws.cell_value(0, col)[:8] == 'Capacity':
-                    if ws.cell_value(0, col)[-3:] == 'Min':
-                        cap_col[0] = col
-                    else:
-                        cap_col[1] = col
-                elif ws.cell_value(0, col)[:6] == 'Rampup':
-                    ramp_col[0] = col
-                elif ws.cell_value(0, col)[:8] == 'Rampdown':
-                    ramp_col[1] = col
-                elif ws.cell_value(0, col)[:8] == 'Recharge':
-                    if ws.cell_value(0, col)[-3:] == 'Max':
-                        rec_col[0] = col
-                    else:
-                        rec_col[1] = col
-                elif ws.cell_value(0, col)[:9] == 'Discharge':
-                    if ws.cell_value(0, col)[-3:] == 'Max':
-                        dis_col[0] = col
-                    else:
-                        dis_col[1] = col
-                elif ws.cell_value(0, col)[:9] == 'Parasitic':
-                    par_col = col
-                elif ws.cell_value(0, col)[:9] == 'Wait Time':
-                    wait_col = col
-                elif ws.cell_value(0, col)[:12] == 'Min Run Time':
-                    wait_col = col
-                elif ws.cell_value(0, col)[:11] == 'Warmup Time':
-                    warm_col = col
-            strt_row = 1
-        else:
-            self.setStatus('Not a ' + self.file_labels[C] + ' worksheet.')
-            return
-        try:
-            cat_col = cat_col
-        except:
-            self.setStatus('Not a ' + self.file_labels[C] + ' worksheet.')
-            return
-        self.constraints = {}
-        for row in range(strt_row, ws.nrows):
-            if wait_col >= 0:
-                min_run_time = ws.cell_value(row, wait_col)
-            if warm_col >= 0:
-                warm_time = ws.cell_value(row, warm_col)
-            self.constraints[str(ws.cell_value(row, 0))] = Constraint(str(ws.cell_value(row, 0)),
-                                     str(ws.cell_value(row, cat_col)),
-                                     ws.cell_value(row, cap_col[0]), ws.cell_value(row, cap_col[1]),
-                                     ws.cell_value(row, ramp_col[0]), ws.cell_value(row, ramp_col[1]),
-                                     ws.cell_value(row, rec_col[0]), ws.cell_value(row, rec_col[1]),
-                                     ws.cell_value(row, dis_col[0]), ws.cell_value(row, dis_col[1]),
-                                     ws.cell_value(row, par_col), min_run_time, warm_time)
-        return
-
-    def getGenerators(self, ws):
-        if ws is None:
-            self.generators = {}
-            args = {'name': '<name>', 'constraint': '<constraint>'}
-            self.generators['<name>'] = Facility(**args)
-            return
-        if ws.cell_value(0, 0) != 'Name':
-            self.setStatus('Not a ' + self.file_labels[G] + ' worksheet.')
-            return
-        args = ['name', 'order', 'constraint', 'capacity', 'lcoe', 'lcoe_cf', 'emissions', 'initial',
-                'capex', 'fixed_om', 'variable_om', 'fuel', 'disc_rate', 'lifetime', 'area']
-        possibles = {'name': 0}
-        for col in range(ws.ncols):
-            try:
-                arg = ws.cell_value(0, col).lower()
-            except:
-                continue
-            if arg in args:
-                possibles[arg] = col
-            elif ws.cell_value(0, col)[:9] == 'Capital':
-                possibles['capex'] = col
-            elif ws.cell_value(0, col)[:8] == 'Discount':
-                possibles['disc_rate'] = col
-            elif ws.cell_value(0, col)[:8] == 'Dispatch':
-                possibles['order'] = col
-            elif ws.cell_value(0, col)[:9] == 'Emissions':
-                possibles['emissions'] = col
-            elif ws.cell_value(0, col) == 'FOM':
-                possibles['fixed_om'] = col
-            elif ws.cell_value(0, col) == 'LCOE CF':
-                possibles['lcoe_cf'] = col
-            elif ws.cell_value(0, col)[:4] == 'LCOE':
-                possibles['lcoe'] = col
-            elif ws.cell_value(0, col) == 'VOM':
-                possibles['variable_om'] = col
-        self.generators = {}
-        for row in range(1, ws.nrows):
-            if ws.cell_value(row, 0) is None:
-                continue
-            in_args = {}
-            for key, value in possibles.items():
-                in_args[key] = ws.cell_value(row, value)
-            self.generators[str(ws.cell_value(row, 0))] = Facility(**in_args)
-        return
-
-    def getOptimisation(self, ws):
-        if ws is None:
-            self.optimisation = {}
-            self.optimisation['<name>'] = Optimisation('<name>', 'None', None)
-            return
-        if ws.cell_value(0, 0) != 'Name':
-            self.setStatus('Not an ' + self.file_labels[O] + ' worksheet.')
-            return
-        cols = ['Name', 'Approach', 'Values', 'Capacity Max', 'Capacity Min',
-                'Capacity Step', 'Capacities']
-        coln = [-1] * len(cols)
-        for col in range(ws.ncols):
-            try:
-                i = cols.index(ws.cell_value(0, col))
-                coln[i] = col
-            except:
-                pass
-        if coln[0] < 0:
-            self.setStatus('Not an ' + self.file_labels[O] + ' worksheet.')
-            return
-        self.optimisation = {}
-        for row in range(1, ws.nrows):
-            tech = ws.cell_value(row, 0)
-            if tech is None:
-                continue
-            if coln[2] > 0: # values format
-                self.optimisation[tech] = Optimisation(tech,
-                                     ws.cell_value(row, coln[1]),
-                                     ws.cell_value(row, coln[2]))
-            else:
-                if ws.cell_value(row, coln[1]) == 'Discrete': # fudge values format
-                    self.optimisation[tech] = Optimisation(tech,
-                                         ws.cell_value(row, coln[1]),
-                                         ws.cell_value(row, coln[-1]))
-                else:
-                    self.optimisation[tech] = Optimisation(tech, '', '')
-                    for col in range(1, len(coln)):
-                        if coln[col] > 0:
-                            attr = cols[col].lower().replace(' ', '_')
-                            setattr(self.optimisation[tech], attr,
-                                    ws.cell_value(row, coln[col]))
-            try:
-                self.optimisation[tech].capacity = self.generators[tech].capacity
-            except:
-                pass
-        return
-
-    def getBatch(self, ws, option):
-        global columns, rows, values
-        def recurse(lvl):
-            if lvl >= len(rows) - 1:
-                return
-            for i in range(len(values[lvl])):
-                columns[lvl] = columns[lvl] + [values[lvl][i]] * cols[lvl+1]
-                recurse(lvl + 1)
-
-        def step_split(steps):
-            bits = steps.split(',')
-            if len(bits) == 1:
-                bits = steps.split(';')
-            try:
-                strt = int(bits[0])
-            except:
-                return 0, 0, 0, -1
-            try:
-                stop = int(bits[1])
-                step = int(bits[2])
-                try:
-                    frst = int(bits[3])
-                except:
-                    frst = -1
-            except:
-                return strt, strt, strt, frst
-            return strt, stop, step, frst
-
-        if ws is None:
-            self.setStatus(self.file_labels[B] + ' worksheet missing.')
-            return False
-        istrt = 0
-        year_row = -1
-        for row in range(3):
-            if ws.cell_value(row, 0) in ['Model', 'Model Label', 'Technology']:
-                istrt = row + 1
-                break
-        else:
-            self.setStatus('Not a ' + self.file_labels[B] + ' worksheet.')
-            return False
-        self.batch_models = [{}] # cater for a range of capacities
-        self.batch_report = [['Capacity (MW/MWh)', 1]]
-        self.batch_tech = []
-        istop = ws.nrows
-        inrows = False
-        for row in range(istrt, ws.nrows):
-            tech = ws.cell_value(row, 0)
-            if tech is not None and tech != '':
-                if year_row < 0 and tech[:4].lower() == 'year':
-                    year_row = row
-                    continue
-                inrows = True
-                if tech[:8].lower() != 'capacity':
-                    if tech.find('.') > 0:
-                        tech = tech[tech.find('.') + 1:]
-                    if tech != 'Total' and tech not in self.generators.keys():
-                        self.setStatus('Unknown technology - ' + tech + ' - in batch file.')
-                        return False
-                    self.batch_tech.append(ws.cell_value(row, 0))
-                else:
-                    self.batch_report[0][1] = row + 1
-            elif inrows:
-                istop = row
-                break
-            if tech[:5] == 'Total':
-                istop = row + 1
-                break
-        if len(self.batch_tech) == 0:
-            self.setStatus('No input technologies found in ' + self.file_labels[B] + ' worksheet (try opening and re-saving the workbook).')
-            return False
-        carbon_row = -1
-        discount_row = -1
-        for row in range(istop, ws.nrows):
-            if ws.cell_value(row, 0) is not None and ws.cell_value(row, 0) != '':
-                if ws.cell_value(row, 0).lower() in ['chart', 'graph', 'plot']:
-                    self.batch_report.append(['Chart', row + 1])
-                    break
-                if ws.cell_value(row, 0).lower() in ['carbon price', 'carbon price ($/tco2e)']:
-                    carbon_row = row
-                if ws.cell_value(row, 0).lower() == 'discount rate' or ws.cell_value(row, 0).lower() == 'wacc':
-                    discount_row = row
-                self.batch_report.append([techClean(ws.cell_value(row, 0), full=True), row + 1])
-        range_rows = {}
-        for col in range(1, ws.ncols):
-            model = ws.cell_value(istrt - 1, col)
-            if model is None:
-                break
-            self.batch_models[0][col] = {'name': model}
-            if option == T and year_row < 0:
-                self.batch_models[0][col]['year'] = str(model)
-            for row in range(istrt, istop):
-                if row == year_row:
-                    if ws.cell_value(row, col) is not None and ws.cell_value(row, col) != '':
-                        self.batch_models[0][col]['year'] = str(ws.cell_value(row, col))
-                    continue
-                tech = ws.cell_value(row, 0)
-                try:
-                    if ws.cell_value(row, col) > 0:
-                        self.batch_models[0][col][tech] = ws.cell_value(row, col)
-                except:
-                    if ws.cell_value(row, col) is None:
-                        pass
-                    elif ws.cell_value(row, col).find(',') >= 0 or ws.cell_value(row, col).find(';') >= 0:
-                        try:
-                            range_rows[col].append(row)
-                        except:
-                            range_rows[col] = [row]
-                        try:
-                            strt, stop, step, frst = step_split(ws.cell_value(row, col))
-                            self.batch_models[0][col][tech] = strt
-                            if frst >= 0 and len(range_rows[col]) > 1:
-                                del range_rows[col][-1]
-                                range_rows[col].insert(0, row)
-                        except:
-                            pass
-                    pass
-            if carbon_row >= 0:
-                if isinstance(ws.cell_value(carbon_row, col), float):
-                    self.batch_models[0][col]['Carbon Price'] = ws.cell_value(carbon_row, col)
-                elif isinstance(ws.cell_value(carbon_row, col), int):
-                    self.batch_models[0][col]['Carbon Price'] = float(ws.cell_value(carbon_row, col))
-            if discount_row >= 0:
-                if isinstance(ws.cell_value(discount_row, col), float):
-                    self.batch_models[0][col]['Discount Rate'] = ws.cell_value(discount_row, col)
-                elif isinstance(ws.cell_value(discount_row, col), int):
-                    self.batch_models[0][col]['Discount Rate'] = float(ws.cell_value(discount_row, col))
-        if len(self.batch_models[0]) == 0:
-            self.setStatus('No models found in ' + self.file_labels[B] + ' worksheet (try opening and re-saving the workbook).')
-            return False
-        if len(range_rows) == 0:
-            return True
-        # cater for ranges - so multiple batch_models lists
-        for rcol, ranges in range_rows.items():
-            rows = {}
-            for rw in ranges:
-                rows[rw] = ws.cell_value(rw, rcol)
-            if len(ranges) > 1: # create sheet for each range else one sheet
-                values = []
-                cols = [1]
-                for i in range(len(ranges) -1, 0, -1):
-                    strt, stop, step, frst = step_split(rows[ranges[i]])
-                    values.insert(0, [])
-                    for stp in range(strt, stop + step, step):
-                        values[0].append(stp)
-                    cols.insert(0, cols[0] * len(values[0]))
-                columns = [[]] * len(rows)
-                recurse(0)
-                my_tech = ws.cell_value(ranges[0], 0)
-                tech_2 = ws.cell_value(ranges[1], 0)
-              # produce new batch_models entry for first range tech
-                techs = {}
-                for c in range(1, len(ranges)):
-                    techs[ws.cell_value(ranges[c], 0)] = c - 1
-                bits = my_tech.split('.')
-                strt, stop, step, frst = step_split(rows[ranges[0]])
-                for sht in range(strt, stop + step, step):
-                    self.batch_models.append({})
-                    for c2 in range(len(columns[0])):
-                        self.batch_models[-1][c2] = {}
-                        for key, value in self.batch_models[0][rcol].items():
-                            self.batch_models[-1][c2][key] = value
-                        self.batch_models[-1][c2][my_tech] = sht
-                        for key, value in techs.items():
-                            self.batch_models[-1][c2][key] = columns[value][c2]
-                        self.batch_models[-1][c2]['name'] = f'{bits[-1]}_{sht}_{tech_2}'
-            else:
-                my_tech = ws.cell_value(ranges[0], 0)
-                self.batch_models.append({})
-                strt, stop, step, frst = step_split(rows[ranges[0]])
-                c2 = -1
-                for ctr in range(strt, stop + step, step):
-                    c2 += 1
-                    self.batch_models[-1][c2] = {}
-                    if c2 == 0:
-                        self.batch_models[-1][c2]['hdr'] = ws.cell_value(ranges[0], 0) # fudge to get header name
-                    for key, value in self.batch_models[0][rcol].items():
-                        self.batch_models[-1][c2][key] = value
-                    self.batch_models[-1][c2][my_tech] = ctr
-                #    for key, value in techs.items():
-                 #       self.batch_models[-1][c2][key] = columns[value][c2]
-                    self.batch_models[-1][c2]['name'] = f'Model {c2 + 1}'
-        return True
-
     def setOrder(self):
         self.order.clear()
         self.ignore.clear()
@@ -2390,31 +1801,6 @@ class powerMatch(QtWidgets.QWidget):
         wb.save(batch_report_file)
 
     def pmClicked(self):
-        def get_load_data(load_file):
-            try:
-                tf = open(load_file, 'r')
-                lines = tf.readlines()
-                tf.close()
-            except:
-                return None
-            load_data = []
-            bit = lines[0].rstrip().split(',')
-            if len(bit) > 0: # multiple columns
-                for b in range(len(bit)):
-                    if bit[b][:4].lower() == 'load':
-                        if bit[b].lower().find('kwh') > 0: # kWh not MWh
-                            for i in range(1, len(lines)):
-                                bit = lines[i].rstrip().split(',')
-                                load_data.append(float(bit[b]) * 0.001)
-                        else:
-                            for i in range(1, len(lines)):
-                                bit = lines[i].rstrip().split(',')
-                                load_data.append(float(bit[b]))
-            else:
-                for i in range(1, len(lines)):
-                    load_data.append(float(lines[i].rstrip()))
-            return load_data
-
         def get_batch_prefix(report_group):
             if report_group == 'Lifetime Emissions':
                 return 'LES_'
@@ -3192,6 +2578,10 @@ class powerMatch(QtWidgets.QWidget):
                     capex_table = {}
                     for fac in pmss_details.keys():
                         capex_table[fac] = {'cum': 0}
+                    dispatched = None
+                else: # dispatch the sheet's models together if there are enough
+                    dispatched = self.batchDispatch(year, pmss_details, pmss_data, re_order,
+                                                    self.batch_models[sht], load_columns)
                 for model, capacities in self.batch_models[sht].items():
                     if option == T:
                         if capacities['year'] != trn_year:
@@ -3205,65 +2595,28 @@ class powerMatch(QtWidgets.QWidget):
                                 pmss_data.append([])
                                 load_file = self.load_files.replace('$YEAR$', year)
                                 pmss_data[-1] = get_load_data(load_file)
-                    for fac in pmss_details.keys():
-                        if fac == 'Load':
-                            pmss_details['Load'].capacity = sum(pmss_data[load_columns[year]])
-                            pmss_details['Load'].col = load_columns[year]
-                            continue
-                        pmss_details[fac].multiplier = 0
                     if int(prgv) > prgv_int:
                         prgv_int = int(prgv)
                         self.progressbar.setValue(int(prgv))
                         QtWidgets.QApplication.processEvents()
                     prgv += incr
                     column += 1
-                    dispatch_order = []
-                    for key, capacity in capacities.items(): # cater for zones
-                        if key in ['Carbon Price', 'Discount Rate', 'Total']:
-                            continue
-                        if key == 'name' and model_row_no > 0:
-                            if model_key != '':
-                                bs.cell(row=model_row_no, column=column).value = f'{model_nme}{capacities[model_key]}'
-                            elif option == T:
-                                bs.cell(row=model_row_no, column=column).value = f'{capacity}'
-                            else:
-                                bs.cell(row=model_row_no, column=column).value = f'Model {model + 1}'
-                            bs.cell(row=model_row_no, column=column).font = normal
-                            bs.cell(row=model_row_no, column=column).alignment = oxl.styles.Alignment(wrap_text=True,
-                                    vertical='bottom', horizontal='center')
-                            continue
-                        if key == 'year':
-                            if capacity in load_columns.keys():
-                                pmss_details['Load'].col = load_columns[capacity]
-                            else:
-                                load_columns[capacity] = len(pmss_data)
-                                pmss_data.append([])
-                                load_file = self.load_files.replace('$YEAR$', capacity)
-                                pmss_data[-1] = get_load_data(load_file)
-                                pmss_details['Load'].col = load_columns[capacity]
-                            pmss_details['Load'].capacity = sum(pmss_data[pmss_details['Load'].col])
-                            continue
-                        if key not in re_order:
-                            dispatch_order.append(key)
-                        if key not in pmss_details.keys():
-                            gen = key[key.find('.') + 1:]
-                            if gen in re_order:
-                                typ = 'R'
-                            elif self.generators[gen].constraint in self.constraints and \
-                              self.constraints[self.generators[gen].constraint].category == 'Generator':
-                                typ = 'G'
-                            else:
-                                typ = 'S'
-                            pmss_details[key] = PM_Facility(key, gen, capacity, typ, -1, 1)
-                    for fac in pmss_details.keys():
-                        if fac == 'Load':
-                            continue
-                        gen = pmss_details[fac].generator
-                        try:
-                            pmss_details[fac].multiplier = capacities[fac] * 1.0 / pmss_details[fac].capacity
-                        except:
-                            pass
-                        if option == T:
+                    if 'name' in capacities.keys() and model_row_no > 0:
+                        if model_key != '':
+                            bs.cell(row=model_row_no, column=column).value = f'{model_nme}{capacities[model_key]}'
+                        elif option == T:
+                            bs.cell(row=model_row_no, column=column).value = f'{capacities["name"]}'
+                        else:
+                            bs.cell(row=model_row_no, column=column).value = f'Model {model + 1}'
+                        bs.cell(row=model_row_no, column=column).font = normal
+                        bs.cell(row=model_row_no, column=column).alignment = oxl.styles.Alignment(wrap_text=True,
+                                vertical='bottom', horizontal='center')
+                    dispatch_order = self.setBatchModel(year, capacities, pmss_details, pmss_data, re_order,
+                                                        load_columns)
+                    if option == T:
+                        for fac in pmss_details.keys():
+                            if fac == 'Load':
+                                continue
                             if fac not in capex_table.keys():
                                 capex_table[fac] = {'cum': 0}
                             if year not in capex_table[fac].keys():
@@ -3295,8 +2648,12 @@ class powerMatch(QtWidgets.QWidget):
                     if 'Discount Rate' in capacities.keys():
                         save_discount_rate = self.discount_rate
                         self.discount_rate = capacities['Discount Rate']
+                    if dispatched is None:
+                        model_dispatched = None
+                    else:
+                        model_dispatched = dispatched[model]
                     sp_data = self.doDispatch(year, option, pmss_details, pmss_data, re_order, dispatch_order,
-                              pm_data_file, data_file, title=capacities['name'])
+                              pm_data_file, data_file, title=capacities['name'], dispatched=model_dispatched)
                     if 'Carbon Price' in capacities.keys():
                         self.carbon_price = save_carbon_price
                     # first the Facility/technology table at the top of sp_data
@@ -3716,20 +3073,7 @@ class powerMatch(QtWidgets.QWidget):
                         pm_data_file, data_file)
 
     def doDispatch(self, year, option, pmss_details, pmss_data, re_order, dispatch_order,
-                   pm_data_file, data_file, title=None):
-        def calcLCOE(annual_output, capital_cost, annual_operating_cost, discount_rate, lifetime):
-            # Compute levelised cost of electricity
-            if discount_rate > 0:
-                annual_cost_capital = capital_cost * discount_rate * pow(1 + discount_rate, lifetime) / \
-                                      (pow(1 + discount_rate, lifetime) - 1)
-            else:
-                annual_cost_capital = capital_cost / lifetime
-            total_annual_cost = annual_cost_capital + annual_operating_cost
-            try:
-                return total_annual_cost / annual_output
-            except:
-                return total_annual_cost
-
+                   pm_data_file, data_file, title=None, dispatched=None):
         def format_period(per):
             hr = per % 24
             day = int((per - hr) / 24)
@@ -3739,124 +3083,6 @@ class powerMatch(QtWidgets.QWidget):
                 mth += 1
             return '{}-{:02d}-{:02d} {:02d}:00'.format(year, mth+1, day+1, hr)
 
-        def summary_totals(title=''):
-            sp_d = [' '] * len(headers)
-            sp_d[st_fac] = title + 'Total'
-            sp_d[st_cap] = cap_sum
-            sp_d[st_tml] = tml_sum
-            sp_d[st_sub] = gen_sum
-            sp_d[st_cst] = cost_sum
-            sp_d[st_lcg] = gs
-            sp_d[st_lco] = gsw
-            sp_d[st_emi] = co2_sum
-            sp_d[st_emc] = co2_cost_sum
-            sp_d[st_lcc] = gswc
-            sp_d[st_cac] = capex_sum
-            sp_d[st_lic] = lifetime_sum
-            sp_d[st_lie] = lifetime_co2_sum
-            sp_d[st_lec] = lifetime_co2_cost
-            sp_d[st_are] = total_area
-            sp_data.append(sp_d)
-            if (self.carbon_price > 0 or option == B or option == T):
-                sp_d = [' '] * len(headers)
-                cc = co2_sum * self.carbon_price
-                cl = cc * max_lifetime
-                if self.adjusted_lcoe and tml_sum > 0:
-                    cs = (cost_sum + cc) / tml_sum
-                else:
-                    if gen_sum > 0:
-                        cs = (cost_sum + cc) / gen_sum
-                    else:
-                        cs = ''
-                sp_d[st_fac] = title + 'Total incl. Carbon Cost'
-                sp_d[st_cst] = cost_sum + cc
-                sp_d[st_lic] = lifetime_sum + cl
-                sp_data.append(sp_d)
-            if tml_sum > 0:
-                sp_d = [' '] * len(headers)
-             #   sp_d[st_fac] = 'RE Direct Contribution to ' + title + 'Load'
-                sp_d[st_fac] = 'RE %age'
-                re_pct = (tml_sum - sto_sum - ff_sum) / tml_sum
-                sp_d[st_cap] = '{:.1f}%'.format(re_pct * 100.)
-                sp_d[st_tml] = tml_sum - ff_sum - sto_sum
-                sp_data.append(sp_d)
-                if sto_sum > 0:
-                    sp_d = [' '] * len(headers)
-                 #   sp_d[st_fac] = 'RE Contribution to ' + title + 'Load via Storage'
-                    sp_d[st_fac] = 'Storage %age'
-                    sp_d[st_cap] = '{:.1f}%'.format(sto_sum * 100. / tml_sum)
-                    sp_d[st_tml] = sto_sum
-                    sp_data.append(sp_d)
-            sp_data.append([' '])
-            sp_data.append([title + 'Load Analysis'])
-            if sp_load != 0:
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = title + 'Load met'
-                load_pct = (sp_load - sf_sums[0]) / sp_load
-                sp_d[st_cap] = '{:.1f}%'.format(load_pct * 100)
-                sp_d[st_tml] = sp_load - sf_sums[0]
-                sp_data.append(sp_d)
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = 'Shortfall'
-                sp_d[st_cap] = '{:.1f}%'.format(sf_sums[0] * 100 / sp_load)
-                sp_d[st_tml] = sf_sums[0]
-                sp_data.append(sp_d)
-                if option == B or option == T:
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = title + 'Total Load'
-                    sp_d[st_tml] = sp_load
-                    if title == '':
-                        sp_d[st_max] = load_max
-                    sp_data.append(sp_d)
-                else:
-                    load_mult = ''
-                    try:
-                        mult = round(pmss_details['Load'].multiplier, 3)
-                        if mult != 1:
-                            load_mult = ' x ' + str(mult)
-                    except:
-                        pass
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = 'Total ' + title + 'Load - ' + year + load_mult
-                    sp_d[st_tml] = sp_load
-                    if title == '' or option == S:
-                        sp_d[st_max] = load_max
-                        sp_d[st_bal] = ' (' + format_period(load_hr)[5:] + ')'
-                    sp_data.append(sp_d)
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = 'RE %age of Total ' + title + 'Load'
-                sp_d[st_cap] = '{:.1f}%'.format((sp_load - sf_sums[0] - ff_sum) * 100. / sp_load)
-                sp_data.append(sp_d)
-                sp_data.append(' ')
-                if tot_sto_loss != 0:
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = 'Storage losses'
-                    sp_d[st_sub] = tot_sto_loss
-                    sp_data.append(sp_d)
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = title + 'Surplus'
-                surp_pct = -sf_sums[1] / sp_load
-                sp_d[st_cap] = '{:.1f}%'.format(surp_pct * 100)
-                sp_d[st_sub] = -sf_sums[1]
-                sp_data.append(sp_d)
-            else:
-                load_pct = 0
-                surp_pct = 0
-                re_pct = 0
-            max_short = [0, 0]
-            for h in range(len(shortfall)):
-                if shortfall[h] > max_short[1]:
-                    max_short[0] = h
-                    max_short[1] = shortfall[h]
-            if max_short[1] > 0:
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = 'Largest Shortfall'
-                sp_d[st_sub] = round(max_short[1], 2)
-                sp_d[st_cfa] = ' (' + format_period(max_short[0])[5:] + ')'
-                sp_data.append(sp_d)
-            if option == O or option == O1:
-                return load_pct, surp_pct, re_pct
-
         def do_detail(fac, col, ss_row):
             if fac in self.generators.keys():
                 gen = fac
@@ -4288,9 +3514,62 @@ class powerMatch(QtWidgets.QWidget):
                         ':Detail!' + last_col + str(hrows + 8759) + ',0),0)&")"'
             return ss_row, ss_re_row
 
-    # The "guts" of Powermatch processing. Have a single calculation algorithm
-    # for Summary, Powermatch (detail), and Optimise. The detail makes it messy
-    # Note: For Batch pmss_data is reused so don't update it in doDispatch
+    # Summary, Optimise, Batch and Transition are done by summaryDispatch (pmcore.py)
+        if option != D:
+            sp_data = self.summaryDispatch(year, option, pmss_details, pmss_data, re_order, dispatch_order,
+                                           dispatched=dispatched)
+            if option == O or option == O1:
+                return sp_data
+            if option == B or option == T:
+                if self.optimise_debug:
+                    sp_pts = [0] * len(headers)
+                    for p in [st_cap, st_lcg, st_lco, st_lcc, st_max, st_bal, st_rlc, st_are]:
+                        sp_pts[p] = 2
+                    if self.show_correlation:
+                        sp_pts[st_cap] = 3 # compromise between capacity (2) and correlation (4)
+                    dialog = displaytable.Table(sp_data, title='Debug', fields=headers,
+                             save_folder=self.scenarios, sortby='', decpts=sp_pts)
+                    dialog.exec_()
+                return sp_data
+            span = None
+            if self.summary_sources: # want data sources
+                sp_data.append(' ')
+                sp_data.append('Data sources')
+                span = 'Data sources'
+                sp_data.append(['Scenarios folder', self.scenarios])
+                if pm_data_file[: len(self.scenarios)] == self.scenarios:
+                    pm_data_file = pm_data_file[len(self.scenarios):]
+                sp_data.append(['Powermatch data file', pm_data_file])
+                load_file = self.load_files.replace('$YEAR$', self.loadCombo.currentText())
+                if load_file[: len(self.scenarios)] == self.scenarios:
+                    load_file = load_file[len(self.scenarios):]
+                sp_data.append(['Load file', load_file])
+                sp_data.append(['Constraints worksheet', str(self.files[C].text()) \
+                                + '.' + str(self.sheets[C].currentText())])
+                sp_data.append(['Generators worksheet', str(self.files[G].text()) \
+                                + '.' + str(self.sheets[G].currentText())])
+            sp_pts = [0] * len(headers)
+            for p in [st_cap, st_lcg, st_lco, st_lcc, st_max, st_bal, st_rlc, st_are]:
+                sp_pts[p] = 2
+            if self.show_correlation:
+                sp_pts[st_cap] = 3 # compromise between capacity (2) and correlation (4)
+            self.setStatus(self.sender().text() + ' completed')
+            if title is not None:
+                atitle = title
+            elif self.results_prefix != '':
+                atitle = self.results_prefix + '_' + self.sender().text()
+            else:
+                atitle = self.sender().text()
+            dialog = displaytable.Table(sp_data, title=atitle, fields=headers,
+                     save_folder=self.scenarios, sortby='', decpts=sp_pts,
+                     span=span)
+            dialog.exec_()
+            self.progressbar.setValue(20)
+            self.progressbar.setHidden(True)
+            self.progressbar.setValue(0)
+            return
+    # The "guts" of the Detail spreadsheet. The dispatch itself is the same as
+    # summaryDispatch but the detail makes it messy
         the_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
         if self.surplus_sign < 0:
             sf_test = ['>', '<']
@@ -4300,7 +3579,6 @@ class powerMatch(QtWidgets.QWidget):
             sf_sign = ['-', '+']
         sp_cols = []
         sp_cap = []
-        shortfall = [0.] * 8760
         re_tml_sum = 0. # keep tabs on how much RE is used
         start_time = time.time()
         do_zone = False # could pass as a parameter
@@ -4336,23 +3614,17 @@ class powerMatch(QtWidgets.QWidget):
                 underlying_facs.append(fac)
                 continue
         load_col = pmss_details['Load'].col
-        for h in range(len(pmss_data[load_col])):
-            load_h = pmss_data[load_col][h] * pmss_details['Load'].multiplier
-            shortfall[h] = load_h
-            for fac in fac_tml.keys():
-                if fac in underlying_facs:
-                    continue
-                shortfall[h] -= pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-            if shortfall[h] >= 0:
-                alloc = 1.
-            else:
-                alloc = load_h / (load_h - shortfall[h])
-            for fac in fac_tml.keys():
-                if fac in underlying_facs:
-                    fac_tml[fac] += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                else:
-                    fac_tml[fac] += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier * alloc
-            line = ''
+        # hourly data as an array; only build it once for a set of pmss_data
+        if self.pm_array is None or self.pm_array.source is not pmss_data:
+            self.pm_array = pmdispatch.DispatchData(pmss_data)
+        else:
+            self.pm_array.refresh()
+        re_facs = []
+        for fac in fac_tml.keys():
+            re_facs.append([fac, pmss_details[fac].col, pmss_details[fac].multiplier])
+        shortfall, fac_tml = pmdispatch.reShortfall(self.pm_array, load_col, pmss_details['Load'].multiplier,
+                                                    re_facs, underlying_facs)
+        shortfall = shortfall.tolist() # detail works hour by hour
         fac_tml_sum = 0
         for fac in fac_tml.keys():
             fac_tml_sum += fac_tml[fac]
@@ -4365,12 +3637,8 @@ class powerMatch(QtWidgets.QWidget):
                 for h in range(len(pmss_data[col])):
                     tgt.append(pmss_data[col][h] * pmss_details['Load'].multiplier)
                 df1 = tgt
-            corr_src = []
-            for h in range(len(shortfall)):
-                if shortfall[h] < 0:
-                    corr_src.append(pmss_data[col][h])
-                else:
-                    corr_src.append(pmss_data[col][h] - shortfall[h])
+            corr_src = pmdispatch.loadContribution(self.pm_array.column(col), np.asarray(shortfall))
+            corr_src = corr_src.tolist()
             try:
                 corr = np.corrcoef(df1, corr_src)
                 if np.isnan(corr.item((0, 1))):
@@ -4383,245 +3651,193 @@ class powerMatch(QtWidgets.QWidget):
             corr_data.append(['RE Contribution', corr])
         else:
             corr_data = None
-        if option == D:
-            wb = oxl.Workbook()
-            ns = wb.active
-            ns.title = 'Detail'
-            normal = oxl.styles.Font(name='Arial')
-            bold = oxl.styles.Font(name='Arial', bold=True)
-            ss = wb.create_sheet('Summary', 0)
-            ns_re_sum = '=('
-            ns_tml_sum = '=('
-            ns_sto_sum = ''
-            ns_loss_sum = ''
-            ns_not_sum = ''
-            cap_row = 1
-            ns.cell(row=cap_row, column=2).value = 'Capacity (MW/MWh)' #headers[1].replace('\n', ' ')
-            ss.row_dimensions[3].height = 40
-            ss.cell(row=3, column=st_fac+1).value = headers[st_fac] # facility
-            ss.cell(row=3, column=st_cap+1).value = headers[st_cap] # capacity
-            ini_row = 2
-            ns.cell(row=ini_row, column=2).value = 'Initial Capacity'
-            tml_row = 3
-            ns.cell(row=tml_row, column=2).value = headers[st_tml].replace('\n', ' ')
-            ss.cell(row=3, column=st_tml+1).value = headers[st_tml] # to meet load
-            sum_row = 4
-            ns.cell(row=sum_row, column=2).value = headers[st_sub].replace('\n', ' ')
-            ss.cell(row=3, column=st_sub+1).value = headers[st_sub] # subtotal MWh
-            cf_row = 5
-            ns.cell(row=cf_row, column=2).value = headers[st_cfa].replace('\n', ' ')
-            ss.cell(row=3, column=st_cfa+1).value = headers[st_cfa] # CF
-            cost_row = 6
-            ns.cell(row=cost_row, column=2).value = headers[st_cst].replace('\n', ' ')
-            ss.cell(row=3, column=st_cst+1).value = headers[st_cst] # Cost / yr
-            lcoe_row = 7
-            ns.cell(row=lcoe_row, column=2).value = headers[st_lcg].replace('\n', ' ')
-            ss.cell(row=3, column=st_lcg+1).value = headers[st_lcg] # LCOG
-            ss.cell(row=3, column=st_lco+1).value = headers[st_lco] # LCOE
-            emi_row = 8
-            ns.cell(row=emi_row, column=2).value = headers[st_emi].replace('\n', ' ')
-            ss.cell(row=3, column=st_emi+1).value = headers[st_emi] # emissions
-            ss.cell(row=3, column=st_emc+1).value = headers[st_emc] # emissions cost
-            ss.cell(row=3, column=st_lcc+1).value = headers[st_lcc] # LCOE with CO2
-            ss.cell(row=3, column=st_max+1).value = headers[st_max] # max. MWh
-            ss.cell(row=3, column=st_bal+1).value = headers[st_bal] # max. balance
-            ss.cell(row=3, column=st_cac+1).value = headers[st_cac] # capital cost
-            ss.cell(row=3, column=st_lic+1).value = headers[st_lic] # lifetime cost
-            ss.cell(row=3, column=st_lie+1).value = headers[st_lie] # lifetime emissions
-            ss.cell(row=3, column=st_lec+1).value = headers[st_lec] # lifetime emissions cost
-            ss.cell(row=3, column=st_are+1).value = headers[st_are] # area
-            ss.cell(row=3, column=st_rlc+1).value = headers[st_rlc] # reference lcoe
-            ss.cell(row=3, column=st_rcf+1).value = headers[st_rcf] # reference cf
-            ss_row = 3
-            ss_re_fst_row = 4
-            fall_row = 9
-            ns.cell(row=fall_row, column=2).value = 'Shortfall periods'
-            max_row = 10
-            ns.cell(row=max_row, column=2).value = 'Maximum (MW/MWh)'
-            hrs_row = 11
-            ns.cell(row=hrs_row, column=2).value = 'Hours of usage'
-            if do_zone:
-                zone_row = 12
-                what_row = 13
-                hrows = 14
-                ns.cell(row=zone_row, column=1).value = 'Zone'
-            else:
-                what_row = 12
-                hrows = 13
-            ns.cell(row=what_row, column=1).value = 'Hour'
-            ns.cell(row=what_row, column=2).value = 'Period'
-            ns.cell(row=what_row, column=3).value = 'Load'
-            ns.cell(row=sum_row, column=3).value = '=SUM(' + ssCol(3) + str(hrows) + \
-                                                   ':' + ssCol(3) + str(hrows + 8759) + ')'
-            ns.cell(row=sum_row, column=3).number_format = '#,##0'
-            ns.cell(row=max_row, column=3).value = '=MAX(' + ssCol(3) + str(hrows) + \
-                                                   ':' + ssCol(3) + str(hrows + 8759) + ')'
-            ns.cell(row=max_row, column=3).number_format = '#,##0.00'
-            o = 4
-            col = 3
-            # hour, period
+            corr_src = None
+        wb = oxl.Workbook()
+        ns = wb.active
+        ns.title = 'Detail'
+        normal = oxl.styles.Font(name='Arial')
+        bold = oxl.styles.Font(name='Arial', bold=True)
+        ss = wb.create_sheet('Summary', 0)
+        ns_re_sum = '=('
+        ns_tml_sum = '=('
+        ns_sto_sum = ''
+        ns_loss_sum = ''
+        ns_not_sum = ''
+        cap_row = 1
+        ns.cell(row=cap_row, column=2).value = 'Capacity (MW/MWh)' #headers[1].replace('\n', ' ')
+        ss.row_dimensions[3].height = 40
+        ss.cell(row=3, column=st_fac+1).value = headers[st_fac] # facility
+        ss.cell(row=3, column=st_cap+1).value = headers[st_cap] # capacity
+        ini_row = 2
+        ns.cell(row=ini_row, column=2).value = 'Initial Capacity'
+        tml_row = 3
+        ns.cell(row=tml_row, column=2).value = headers[st_tml].replace('\n', ' ')
+        ss.cell(row=3, column=st_tml+1).value = headers[st_tml] # to meet load
+        sum_row = 4
+        ns.cell(row=sum_row, column=2).value = headers[st_sub].replace('\n', ' ')
+        ss.cell(row=3, column=st_sub+1).value = headers[st_sub] # subtotal MWh
+        cf_row = 5
+        ns.cell(row=cf_row, column=2).value = headers[st_cfa].replace('\n', ' ')
+        ss.cell(row=3, column=st_cfa+1).value = headers[st_cfa] # CF
+        cost_row = 6
+        ns.cell(row=cost_row, column=2).value = headers[st_cst].replace('\n', ' ')
+        ss.cell(row=3, column=st_cst+1).value = headers[st_cst] # Cost / yr
+        lcoe_row = 7
+        ns.cell(row=lcoe_row, column=2).value = headers[st_lcg].replace('\n', ' ')
+        ss.cell(row=3, column=st_lcg+1).value = headers[st_lcg] # LCOG
+        ss.cell(row=3, column=st_lco+1).value = headers[st_lco] # LCOE
+        emi_row = 8
+        ns.cell(row=emi_row, column=2).value = headers[st_emi].replace('\n', ' ')
+        ss.cell(row=3, column=st_emi+1).value = headers[st_emi] # emissions
+        ss.cell(row=3, column=st_emc+1).value = headers[st_emc] # emissions cost
+        ss.cell(row=3, column=st_lcc+1).value = headers[st_lcc] # LCOE with CO2
+        ss.cell(row=3, column=st_max+1).value = headers[st_max] # max. MWh
+        ss.cell(row=3, column=st_bal+1).value = headers[st_bal] # max. balance
+        ss.cell(row=3, column=st_cac+1).value = headers[st_cac] # capital cost
+        ss.cell(row=3, column=st_lic+1).value = headers[st_lic] # lifetime cost
+        ss.cell(row=3, column=st_lie+1).value = headers[st_lie] # lifetime emissions
+        ss.cell(row=3, column=st_lec+1).value = headers[st_lec] # lifetime emissions cost
+        ss.cell(row=3, column=st_are+1).value = headers[st_are] # area
+        ss.cell(row=3, column=st_rlc+1).value = headers[st_rlc] # reference lcoe
+        ss.cell(row=3, column=st_rcf+1).value = headers[st_rcf] # reference cf
+        ss_row = 3
+        ss_re_fst_row = 4
+        fall_row = 9
+        ns.cell(row=fall_row, column=2).value = 'Shortfall periods'
+        max_row = 10
+        ns.cell(row=max_row, column=2).value = 'Maximum (MW/MWh)'
+        hrs_row = 11
+        ns.cell(row=hrs_row, column=2).value = 'Hours of usage'
+        if do_zone:
+            zone_row = 12
+            what_row = 13
+            hrows = 14
+            ns.cell(row=zone_row, column=1).value = 'Zone'
+        else:
+            what_row = 12
+            hrows = 13
+        ns.cell(row=what_row, column=1).value = 'Hour'
+        ns.cell(row=what_row, column=2).value = 'Period'
+        ns.cell(row=what_row, column=3).value = 'Load'
+        ns.cell(row=sum_row, column=3).value = '=SUM(' + ssCol(3) + str(hrows) + \
+                                               ':' + ssCol(3) + str(hrows + 8759) + ')'
+        ns.cell(row=sum_row, column=3).number_format = '#,##0'
+        ns.cell(row=max_row, column=3).value = '=MAX(' + ssCol(3) + str(hrows) + \
+                                               ':' + ssCol(3) + str(hrows + 8759) + ')'
+        ns.cell(row=max_row, column=3).number_format = '#,##0.00'
+        o = 4
+        col = 3
+        # hour, period
+        for row in range(hrows, 8760 + hrows):
+            ns.cell(row=row, column=1).value = row - hrows + 1
+            ns.cell(row=row, column=2).value = format_period(row - hrows)
+        # and load
+        load_col = pmss_details['Load'].col
+        if pmss_details['Load'].multiplier == 1:
             for row in range(hrows, 8760 + hrows):
-                ns.cell(row=row, column=1).value = row - hrows + 1
-                ns.cell(row=row, column=2).value = format_period(row - hrows)
-            # and load
-            load_col = pmss_details['Load'].col
-            if pmss_details['Load'].multiplier == 1:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows]
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            else:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows] * \
-                            pmss_details['Load'].multiplier
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            # here we're processing renewables (so no storage)
-            for fac in re_order:
-                if fac == 'Load':
-                    continue
-                if fac in underlying_facs:
-                    continue
-                if pmss_details[fac].col <= 0:
-                    continue
-                ss_row += 1
-                col = do_detail(fac, col, ss_row)
-                ns_tml_sum, ns_re_sum = do_detail_summary(fac, col, ss_row, ns_tml_sum, ns_re_sum)
-            ss_re_lst_row = ss_row
-            col += 1
-            shrt_col = col
-            ns.cell(row=fall_row, column=shrt_col).value = '=COUNTIF(' + ssCol(shrt_col) \
-                            + str(hrows) + ':' + ssCol(shrt_col) + str(hrows + 8759) + \
-                            ',"' + sf_test[0] + '0")'
-            ns.cell(row=fall_row, column=shrt_col).number_format = '#,##0'
-            ns.cell(row=what_row, column=shrt_col).value = 'Shortfall (' + sf_sign[0] \
-                    + ') /\nSurplus (' + sf_sign[1] + ')'
-            ns.cell(row=max_row, column=shrt_col).value = '=MAX(' + ssCol(shrt_col) + str(hrows) + \
-                                           ':' + ssCol(shrt_col) + str(hrows + 8759) + ')'
-            ns.cell(row=max_row, column=shrt_col).number_format = '#,##0.00'
-            for col in range(3, shrt_col + 1):
-                ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
-                        vertical='bottom', horizontal='center')
-                ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
-                for col in range(3, shrt_col + 1):
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
+                ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows]
+                ns.cell(row=row, column=col).number_format = '#,##0.00'
+        else:
             for row in range(hrows, 8760 + hrows):
-                ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
+                ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows] * \
+                        pmss_details['Load'].multiplier
                 ns.cell(row=row, column=col).number_format = '#,##0.00'
-            col = shrt_col + 1
-            ns.cell(row=tml_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
-                                                   ':' + ssCol(col) + str(hrows + 8759) + ')'
-            ns.cell(row=tml_row, column=col).number_format = '#,##0'
-            ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + str(hrows) + \
-                                           ':' + ssCol(col) + str(hrows + 8759) + ')'
-            ns.cell(row=max_row, column=col).number_format = '#,##0.00'
-            ns.cell(row=hrs_row, column=col).value = '=COUNTIF(' + ssCol(col) + str(hrows) + \
-                                           ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
-            ns.cell(row=hrs_row, column=col).number_format = '#,##0'
-            ns.cell(row=what_row, column=col).value = 'RE Contrib.\nto Load'
+        # here we're processing renewables (so no storage)
+        for fac in re_order:
+            if fac == 'Load':
+                continue
+            if fac in underlying_facs:
+                continue
+            if pmss_details[fac].col <= 0:
+                continue
+            ss_row += 1
+            col = do_detail(fac, col, ss_row)
+            ns_tml_sum, ns_re_sum = do_detail_summary(fac, col, ss_row, ns_tml_sum, ns_re_sum)
+        ss_re_lst_row = ss_row
+        col += 1
+        shrt_col = col
+        ns.cell(row=fall_row, column=shrt_col).value = '=COUNTIF(' + ssCol(shrt_col) \
+                        + str(hrows) + ':' + ssCol(shrt_col) + str(hrows + 8759) + \
+                        ',"' + sf_test[0] + '0")'
+        ns.cell(row=fall_row, column=shrt_col).number_format = '#,##0'
+        ns.cell(row=what_row, column=shrt_col).value = 'Shortfall (' + sf_sign[0] \
+                + ') /\nSurplus (' + sf_sign[1] + ')'
+        ns.cell(row=max_row, column=shrt_col).value = '=MAX(' + ssCol(shrt_col) + str(hrows) + \
+                                       ':' + ssCol(shrt_col) + str(hrows + 8759) + ')'
+        ns.cell(row=max_row, column=shrt_col).number_format = '#,##0.00'
+        for col in range(3, shrt_col + 1):
             ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
                     vertical='bottom', horizontal='center')
-            for row in range(hrows, 8760 + hrows):
-                if shortfall[row - hrows] < 0:
-                    if pmss_details['Load'].multiplier == 1:
-                        rec = pmss_data[load_col][row - hrows]
-                    else:
-                        rec = pmss_data[load_col][row - hrows] * pmss_details['Load'].multiplier
-                else:
-                    if pmss_details['Load'].multiplier == 1:
-                        rec = pmss_data[load_col][row - hrows] - shortfall[row - hrows]
-                    else:
-                        rec = pmss_data[load_col][row - hrows] * pmss_details['Load'].multiplier - \
-                              shortfall[row - hrows]
-                ns.cell(row=row, column=col).value = rec
-               # the following formula will do the same computation
-               # ns.cell(row=row, column=col).value = '=IF(' + ssCol(shrt_col) + str(row) + '>0,' + \
-               #                            ssCol(3) + str(row) + ',' + ssCol(3) + str(row) + \
-               #                            '+' + ssCol(shrt_col) + str(row) + ')'
+            ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
+            for col in range(3, shrt_col + 1):
                 ns.cell(row=row, column=col).number_format = '#,##0.00'
-          #  shrt_col += 1
-           # col = shrt_col + 1
-            ul_re_sum = ns_re_sum
-            ul_tml_sum = ns_tml_sum
-            nsul_sums = ['C']
-            nsul_sum_cols = [3]
-            for fac in underlying_facs:
-                if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
-                    continue
-                col = do_detail(fac, col, -1)
-                nsul_sums.append(ssCol(col))
-                nsul_sum_cols.append(col)
-            if col > shrt_col + 1: # underlying
-                col += 1
-                ns.cell(row=what_row, column=col).value = 'Underlying\nLoad'
-                ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
-                        vertical='bottom', horizontal='center')
-                ns.cell(row=sum_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
-                                                         ':' + ssCol(col) + str(hrows + 8759) + ')'
-                ns.cell(row=sum_row, column=col).number_format = '#,##0'
-                ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + str(hrows) + \
-                                                         ':' + ssCol(col) + str(hrows + 8759) + ')'
-                ns.cell(row=max_row, column=col).number_format = '#,##0.00'
-                for row in range(hrows, 8760 + hrows):
-                    txt = '='
-                    for c in nsul_sums:
-                        txt += c + str(row) + '+'
-                    ns.cell(row=row, column=col).value = txt[:-1]
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            next_col = col
-            col += 1
-        else: # O, O1, B, T
-            sp_data = []
-            sp_load = 0. # load from load curve
-            hrows = 10
-            load_max = 0
-            load_hr = 0
-            tml = 0.
-            try:
-                load_col = pmss_details['Load'].col
-            except:
-                load_col = 0
-            if (option == B or option == T) and len(underlying_facs) > 0:
-                load_facs = underlying_facs[:]
-                load_facs.insert(0, 'Load')
-                for h in range(len(pmss_data[load_col])):
-                    amt = 0
-                    for fac in load_facs:
-                        amt += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                    if amt > load_max:
-                        load_max = amt
-                        load_hr = h
-                    sp_load += amt
-                underlying_facs = []
+        for row in range(hrows, 8760 + hrows):
+            ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
+            ns.cell(row=row, column=col).number_format = '#,##0.00'
+        col = shrt_col + 1
+        ns.cell(row=tml_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
+                                               ':' + ssCol(col) + str(hrows + 8759) + ')'
+        ns.cell(row=tml_row, column=col).number_format = '#,##0'
+        ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + str(hrows) + \
+                                       ':' + ssCol(col) + str(hrows + 8759) + ')'
+        ns.cell(row=max_row, column=col).number_format = '#,##0.00'
+        ns.cell(row=hrs_row, column=col).value = '=COUNTIF(' + ssCol(col) + str(hrows) + \
+                                       ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
+        ns.cell(row=hrs_row, column=col).number_format = '#,##0'
+        ns.cell(row=what_row, column=col).value = 'RE Contrib.\nto Load'
+        ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
+                vertical='bottom', horizontal='center')
+        for row in range(hrows, 8760 + hrows):
+            if shortfall[row - hrows] < 0:
+                if pmss_details['Load'].multiplier == 1:
+                    rec = pmss_data[load_col][row - hrows]
+                else:
+                    rec = pmss_data[load_col][row - hrows] * pmss_details['Load'].multiplier
             else:
-                fac = 'Load'
-                sp_load = sum(pmss_data[load_col]) * pmss_details[fac].multiplier
-                for h in range(len(pmss_data[load_col])):
-                    amt = pmss_data[load_col][h] * pmss_details[fac].multiplier
-                    if amt > load_max:
-                        load_max = amt
-                        load_hr = h
-            for fac in re_order:
-                if fac == 'Load' or fac in underlying_facs:
-                    continue
-                if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
-                    continue
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = fac
-                sp_d[st_cap] = pmss_details[fac].capacity * pmss_details[fac].multiplier
-                try:
-                    sp_d[st_tml] = fac_tml[fac]
-                except:
-                    pass
-                sp_d[st_sub] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
-                sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
-                sp_data.append(sp_d)
-       #     for h in range(len(shortfall)):
-        #        if shortfall[h] < 0:
-         #           tml += pmss_data[load_col][h] * pmss_details['Load'].multiplier
-          #      else:
-           #         tml += pmss_data[load_col][h] * pmss_details['Load'].multiplier - shortfall[h]
-        if option not in [O, O1, B, T]:
-            self.progressbar.setValue(6)
-            QtWidgets.QApplication.processEvents()
+                if pmss_details['Load'].multiplier == 1:
+                    rec = pmss_data[load_col][row - hrows] - shortfall[row - hrows]
+                else:
+                    rec = pmss_data[load_col][row - hrows] * pmss_details['Load'].multiplier - \
+                          shortfall[row - hrows]
+            ns.cell(row=row, column=col).value = rec
+           # the following formula will do the same computation
+           # ns.cell(row=row, column=col).value = '=IF(' + ssCol(shrt_col) + str(row) + '>0,' + \
+           #                            ssCol(3) + str(row) + ',' + ssCol(3) + str(row) + \
+           #                            '+' + ssCol(shrt_col) + str(row) + ')'
+            ns.cell(row=row, column=col).number_format = '#,##0.00'
+      #  shrt_col += 1
+       # col = shrt_col + 1
+        ul_re_sum = ns_re_sum
+        ul_tml_sum = ns_tml_sum
+        nsul_sums = ['C']
+        nsul_sum_cols = [3]
+        for fac in underlying_facs:
+            if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
+                continue
+            col = do_detail(fac, col, -1)
+            nsul_sums.append(ssCol(col))
+            nsul_sum_cols.append(col)
+        if col > shrt_col + 1: # underlying
+            col += 1
+            ns.cell(row=what_row, column=col).value = 'Underlying\nLoad'
+            ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
+                    vertical='bottom', horizontal='center')
+            ns.cell(row=sum_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
+                                                     ':' + ssCol(col) + str(hrows + 8759) + ')'
+            ns.cell(row=sum_row, column=col).number_format = '#,##0'
+            ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + str(hrows) + \
+                                                     ':' + ssCol(col) + str(hrows + 8759) + ')'
+            ns.cell(row=max_row, column=col).number_format = '#,##0.00'
+            for row in range(hrows, 8760 + hrows):
+                txt = '='
+                for c in nsul_sums:
+                    txt += c + str(row) + '+'
+                ns.cell(row=row, column=col).value = txt[:-1]
+                ns.cell(row=row, column=col).number_format = '#,##0.00'
+        next_col = col
+        col += 1
+        self.progressbar.setValue(6)
+        QtWidgets.QApplication.processEvents()
         storage_names = []
         # find any minimum generation for generators
         short_taken = {}
@@ -4646,7 +3862,6 @@ class powerMatch(QtWidgets.QWidget):
                     short_taken_tot += short_taken[gen]
                     for row in range(8760):
                         shortfall[row] = shortfall[row] - short_taken[gen]
-        tot_sto_loss = 0.
         for gen in dispatch_order:
          #   min_after = [0, 0, -1, 0, 0, 0] # initial, low balance, period, final, low after, period
          #  Min_after is there to see if storage is as full at the end as at the beginning
@@ -4664,9 +3879,8 @@ class powerMatch(QtWidgets.QWidget):
                 storage_names.append(gen)
                 storage = [0., 0., 0., 0.] # capacity, initial, min level, max drain
                 storage[0] = capacity
-                if option == D:
-                    ns.cell(row=cap_row, column=col + 2).value = capacity
-                    ns.cell(row=cap_row, column=col + 2).number_format = '#,##0.00'
+                ns.cell(row=cap_row, column=col + 2).value = capacity
+                ns.cell(row=cap_row, column=col + 2).number_format = '#,##0.00'
                 try:
                     storage[1] = self.generators[gen].initial * pmss_details[gen].multiplier
                 except:
@@ -4700,11 +3914,9 @@ class powerMatch(QtWidgets.QWidget):
                     in_run[0] = False
                 warm_time = self.constraints[self.generators[gen].constraint].warm_time
                 storage_carry = storage[1] # self.generators[gen].initial
-                if option == D:
-                    ns.cell(row=ini_row, column=col + 2).value = storage_carry
-                    ns.cell(row=ini_row, column=col + 2).number_format = '#,##0.00'
+                ns.cell(row=ini_row, column=col + 2).value = storage_carry
+                ns.cell(row=ini_row, column=col + 2).number_format = '#,##0.00'
                 storage_bal = []
-                storage_can = 0.
                 use_max = [0, None]
                 sto_max = storage_carry
                 for row in range(8760):
@@ -4773,59 +3985,42 @@ class powerMatch(QtWidgets.QWidget):
                     storage_bal.append(storage_carry)
                     if storage_bal[-1] > sto_max:
                         sto_max = storage_bal[-1]
-                    if option == D:
-                        if can_use > 0:
-                            ns.cell(row=row + hrows, column=col).value = 0
-                            ns.cell(row=row + hrows, column=col + 2).value = can_use * self.surplus_sign
-                        else:
-                            ns.cell(row=row + hrows, column=col).value = can_use * -self.surplus_sign
-                            ns.cell(row=row + hrows, column=col + 2).value = 0
-                        ns.cell(row=row + hrows, column=col + 1).value = storage_losses
-                        ns.cell(row=row + hrows, column=col + 3).value = storage_carry
-                        ns.cell(row=row + hrows, column=col + 4).value = (shortfall[row] + short_taken_tot) * -self.surplus_sign
-                        for ac in range(5):
-                            ns.cell(row=row + hrows, column=col + ac).number_format = '#,##0.00'
-                            ns.cell(row=max_row, column=col + ac).value = '=MAX(' + ssCol(col + ac) + \
-                                    str(hrows) + ':' + ssCol(col + ac) + str(hrows + 8759) + ')'
-                            ns.cell(row=max_row, column=col + ac).number_format = '#,##0.00'
+                    if can_use > 0:
+                        ns.cell(row=row + hrows, column=col).value = 0
+                        ns.cell(row=row + hrows, column=col + 2).value = can_use * self.surplus_sign
                     else:
-                        tot_sto_loss += storage_losses
-                        if can_use > 0:
-                            storage_can += can_use
-                if option == D:
-                    ns.cell(row=sum_row, column=col).value = '=SUMIF(' + ssCol(col) + \
-                            str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
-                    ns.cell(row=sum_row, column=col).number_format = '#,##0'
-                    ns.cell(row=sum_row, column=col + 1).value = '=SUMIF(' + ssCol(col + 1) + \
-                            str(hrows) + ':' + ssCol(col + 1) + str(hrows + 8759) + ',"<0")'
-                    ns.cell(row=sum_row, column=col + 1).number_format = '#,##0'
-                    ns.cell(row=sum_row, column=col + 2).value = '=SUMIF(' + ssCol(col + 2) + \
-                            str(hrows) + ':' + ssCol(col + 2) + str(hrows + 8759) + ',">0")'
-                    ns.cell(row=sum_row, column=col + 2).number_format = '#,##0'
-                    ns.cell(row=cf_row, column=col + 2).value = '=IF(' + ssCol(col + 2) + str(cap_row) + '>0,' + \
-                            ssCol(col + 2) + str(sum_row) + '/' + ssCol(col + 2) + '1/8760,"")'
-                    ns.cell(row=cf_row, column=col + 2).number_format = '#,##0.0%'
-                    ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + \
-                            str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ')'
-                    ns.cell(row=max_row, column=col).number_format = '#,##0.00'
-                    ns.cell(row=hrs_row, column=col + 2).value = '=COUNTIF(' + ssCol(col + 2) + \
-                            str(hrows) + ':' + ssCol(col + 2) + str(hrows + 8759) + ',">0")'
-                    ns.cell(row=hrs_row, column=col + 2).number_format = '#,##0'
-                    ns.cell(row=hrs_row, column=col + 3).value = '=' + ssCol(col + 2) + \
-                            str(hrs_row) + '/8760'
-                    ns.cell(row=hrs_row, column=col + 3).number_format = '#,##0.0%'
-                    col += 5
-                else:
-                    if storage[0] == 0:
-                        continue
-               #     tml_tot += storage_can
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = gen
-                    sp_d[st_cap] = storage[0]
-                    sp_d[st_tml] = storage_can
-                    sp_d[st_max] = use_max[0]
-                    sp_d[st_bal] = sto_max
-                    sp_data.append(sp_d)
+                        ns.cell(row=row + hrows, column=col).value = can_use * -self.surplus_sign
+                        ns.cell(row=row + hrows, column=col + 2).value = 0
+                    ns.cell(row=row + hrows, column=col + 1).value = storage_losses
+                    ns.cell(row=row + hrows, column=col + 3).value = storage_carry
+                    ns.cell(row=row + hrows, column=col + 4).value = (shortfall[row] + short_taken_tot) * -self.surplus_sign
+                    for ac in range(5):
+                        ns.cell(row=row + hrows, column=col + ac).number_format = '#,##0.00'
+                        ns.cell(row=max_row, column=col + ac).value = '=MAX(' + ssCol(col + ac) + \
+                                str(hrows) + ':' + ssCol(col + ac) + str(hrows + 8759) + ')'
+                        ns.cell(row=max_row, column=col + ac).number_format = '#,##0.00'
+                ns.cell(row=sum_row, column=col).value = '=SUMIF(' + ssCol(col) + \
+                        str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
+                ns.cell(row=sum_row, column=col).number_format = '#,##0'
+                ns.cell(row=sum_row, column=col + 1).value = '=SUMIF(' + ssCol(col + 1) + \
+                        str(hrows) + ':' + ssCol(col + 1) + str(hrows + 8759) + ',"<0")'
+                ns.cell(row=sum_row, column=col + 1).number_format = '#,##0'
+                ns.cell(row=sum_row, column=col + 2).value = '=SUMIF(' + ssCol(col + 2) + \
+                        str(hrows) + ':' + ssCol(col + 2) + str(hrows + 8759) + ',">0")'
+                ns.cell(row=sum_row, column=col + 2).number_format = '#,##0'
+                ns.cell(row=cf_row, column=col + 2).value = '=IF(' + ssCol(col + 2) + str(cap_row) + '>0,' + \
+                        ssCol(col + 2) + str(sum_row) + '/' + ssCol(col + 2) + '1/8760,"")'
+                ns.cell(row=cf_row, column=col + 2).number_format = '#,##0.0%'
+                ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + \
+                        str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ')'
+                ns.cell(row=max_row, column=col).number_format = '#,##0.00'
+                ns.cell(row=hrs_row, column=col + 2).value = '=COUNTIF(' + ssCol(col + 2) + \
+                        str(hrows) + ':' + ssCol(col + 2) + str(hrows + 8759) + ',">0")'
+                ns.cell(row=hrs_row, column=col + 2).number_format = '#,##0'
+                ns.cell(row=hrs_row, column=col + 3).value = '=' + ssCol(col + 2) + \
+                        str(hrs_row) + '/8760'
+                ns.cell(row=hrs_row, column=col + 3).number_format = '#,##0.0%'
+                col += 5
             else: # generator
                 try:
                     if self.constraints[self.generators[gen].constraint].capacity_max > 0:
@@ -4841,76 +4036,41 @@ class powerMatch(QtWidgets.QWidget):
                     min_gen = short_taken[gen]
                 else:
                     min_gen = 0
-                if option == D:
-                    ns.cell(row=cap_row, column=col).value = capacity
-                    ns.cell(row=cap_row, column=col).number_format = '#,##0.00'
-                    for row in range(8760):
-                        if shortfall[row] >= 0: # shortfall?
-                            if shortfall[row] >= cap_capacity:
-                                shortfall[row] = shortfall[row] - cap_capacity
-                                ns.cell(row=row + hrows, column=col).value = cap_capacity
-                            elif shortfall[row] < min_gen:
-                                ns.cell(row=row + hrows, column=col).value = min_gen
-                                shortfall[row] -= min_gen
-                            else:
-                                ns.cell(row=row + hrows, column=col).value = shortfall[row]
-                                shortfall[row] = 0
-                        else:
-                            shortfall[row] -= min_gen
+                ns.cell(row=cap_row, column=col).value = capacity
+                ns.cell(row=cap_row, column=col).number_format = '#,##0.00'
+                for row in range(8760):
+                    if shortfall[row] >= 0: # shortfall?
+                        if shortfall[row] >= cap_capacity:
+                            shortfall[row] = shortfall[row] - cap_capacity
+                            ns.cell(row=row + hrows, column=col).value = cap_capacity
+                        elif shortfall[row] < min_gen:
                             ns.cell(row=row + hrows, column=col).value = min_gen
-                        ns.cell(row=row + hrows, column=col + 1).value = (shortfall[row] + short_taken_tot) * -self.surplus_sign
-                        ns.cell(row=row + hrows, column=col).number_format = '#,##0.00'
-                        ns.cell(row=row + hrows, column=col + 1).number_format = '#,##0.00'
-                    ns.cell(row=sum_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
-                            ':' + ssCol(col) + str(hrows + 8759) + ')'
-                    ns.cell(row=sum_row, column=col).number_format = '#,##0'
-                    ns.cell(row=cf_row, column=col).value = '=IF(' + ssCol(col) + str(cap_row) + '>0,' + \
-                            ssCol(col) + str(sum_row) + '/' + ssCol(col) + str(cap_row) + '/8760,"")'
-                    ns.cell(row=cf_row, column=col).number_format = '#,##0.0%'
-                    ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + \
-                                str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ')'
-                    ns.cell(row=max_row, column=col).number_format = '#,##0.00'
-                    ns.cell(row=hrs_row, column=col).value = '=COUNTIF(' + ssCol(col) + \
-                            str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
-                    ns.cell(row=hrs_row, column=col).number_format = '#,##0'
-                    ns.cell(row=hrs_row, column=col + 1).value = '=' + ssCol(col) + \
-                            str(hrs_row) + '/8760'
-                    ns.cell(row=hrs_row, column=col + 1).number_format = '#,##0.0%'
-                    col += 2
-                else:
-                    gen_can = 0.
-                    gen_max = 0
-                    for row in range(8760):
-                        if shortfall[row] >= 0: # shortfall?
-                            if shortfall[row] >= cap_capacity:
-                                shortfall[row] = shortfall[row] - cap_capacity
-                                gen_can += cap_capacity
-                                if cap_capacity > gen_max:
-                                    gen_max = cap_capacity
-                            elif shortfall[row] < min_gen:
-                                gen_can += min_gen
-                                if min_gen > gen_max:
-                                    gen_max = min_gen
-                                shortfall[row] -= min_gen
-                            else:
-                                gen_can += shortfall[row]
-                                if shortfall[row] > gen_max:
-                                    gen_max = shortfall[row]
-                                shortfall[row] = 0
+                            shortfall[row] -= min_gen
                         else:
-                            if min_gen > gen_max:
-                                gen_max = min_gen
-                            gen_can += min_gen
-                            shortfall[row] -= min_gen # ??
-                    if capacity == 0:
-                        continue
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = gen
-                    sp_d[st_cap] = capacity
-                    sp_d[st_tml] = gen_can
-                    sp_d[st_sub] = gen_can
-                    sp_d[st_max] = gen_max
-                    sp_data.append(sp_d)
+                            ns.cell(row=row + hrows, column=col).value = shortfall[row]
+                            shortfall[row] = 0
+                    else:
+                        shortfall[row] -= min_gen
+                        ns.cell(row=row + hrows, column=col).value = min_gen
+                    ns.cell(row=row + hrows, column=col + 1).value = (shortfall[row] + short_taken_tot) * -self.surplus_sign
+                    ns.cell(row=row + hrows, column=col).number_format = '#,##0.00'
+                    ns.cell(row=row + hrows, column=col + 1).number_format = '#,##0.00'
+                ns.cell(row=sum_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
+                        ':' + ssCol(col) + str(hrows + 8759) + ')'
+                ns.cell(row=sum_row, column=col).number_format = '#,##0'
+                ns.cell(row=cf_row, column=col).value = '=IF(' + ssCol(col) + str(cap_row) + '>0,' + \
+                        ssCol(col) + str(sum_row) + '/' + ssCol(col) + str(cap_row) + '/8760,"")'
+                ns.cell(row=cf_row, column=col).number_format = '#,##0.0%'
+                ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + \
+                            str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ')'
+                ns.cell(row=max_row, column=col).number_format = '#,##0.00'
+                ns.cell(row=hrs_row, column=col).value = '=COUNTIF(' + ssCol(col) + \
+                        str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
+                ns.cell(row=hrs_row, column=col).number_format = '#,##0'
+                ns.cell(row=hrs_row, column=col + 1).value = '=' + ssCol(col) + \
+                        str(hrs_row) + '/8760'
+                ns.cell(row=hrs_row, column=col + 1).number_format = '#,##0.0%'
+                col += 2
 #        if option == D: # Currently calculated elsewhere
 #            if self.surplus_sign > 0:
 #                maxmin = 'MIN'
@@ -4919,9 +4079,8 @@ class powerMatch(QtWidgets.QWidget):
 #            ns.cell(row=max_row, column=col-1).value = '=' + maxmin + '(' + \
 #                    ssCol(col-1) + str(hrows) + ':' + ssCol(col - 1) + str(hrows + 8759) + ')'
 #            ns.cell(row=max_row, column=col-1).number_format = '#,##0.00'
-        if option not in [O, O1, B, T]:
-            self.progressbar.setValue(8)
-            QtWidgets.QApplication.processEvents()
+        self.progressbar.setValue(8)
+        QtWidgets.QApplication.processEvents()
         if corr_data is not None:
             try:
                 corr = np.corrcoef(df1, corr_src)
@@ -4933,12 +4092,7 @@ class powerMatch(QtWidgets.QWidget):
                 corr = 0
             corr_data.append(['RE plus Storage', corr])
             col = pmss_details['Load'].col
-            corr_src = []
-            for h in range(len(shortfall)):
-                if shortfall[h] < 0:
-                    corr_src.append(pmss_data[col][h])
-                else:
-                    corr_src.append(pmss_data[col][h] - shortfall[h])
+            corr_src = pmdispatch.loadContribution(self.pm_array.column(col), np.asarray(shortfall))
             try:
                 corr = np.corrcoef(df1, corr_src)
                 if np.isnan(corr.item((0, 1))):
@@ -4961,356 +4115,6 @@ class powerMatch(QtWidgets.QWidget):
                     corr_data[c].append('High')
                 else:
                     corr_data[c].append('Very high')
-        if option != D:
-            load_col = pmss_details['Load'].col
-            cap_sum = 0.
-            gen_sum = 0.
-            re_sum = 0.
-            tml_sum = 0.
-            ff_sum = 0.
-            sto_sum = 0.
-            cost_sum = 0.
-            co2_sum = 0.
-            co2_cost_sum = 0.
-            capex_sum = 0.
-            lifetime_sum = 0.
-            lifetime_co2_sum = 0.
-            lifetime_co2_cost = 0.
-            total_area = 0.
-            for sp in range(len(sp_data)):
-                gen = sp_data[sp][st_fac]
-                if gen in storage_names:
-                    sto_sum += sp_data[sp][2]
-                else:
-                    try:
-                        gen2 = gen[gen.find('.') + 1:]
-                    except:
-                        gen2 = gen
-                    if gen in tech_names or gen2 in tech_names:
-                        re_sum += sp_data[sp][st_sub]
-            for sp in range(len(sp_data)):
-                gen = sp_data[sp][st_fac]
-                if gen in storage_names:
-                    ndx = 2
-                else:
-                    if gen in self.generators.keys():
-                        pass
-                    else:
-                        try:
-                            gen = gen[gen.find('.') + 1:]
-                        except:
-                            pass
-                    ndx = 3
-                try:
-                    if sp_data[sp][st_cap] > 0:
-                        cap_sum += sp_data[sp][st_cap]
-                        if self.generators[gen].lcoe > 0:
-                            sp_data[sp][st_cfa] = sp_data[sp][ndx] / sp_data[sp][st_cap] / 8760 # need number for now
-                        else:
-                            sp_data[sp][st_cfa] = '{:.1f}%'.format(sp_data[sp][ndx] / sp_data[sp][st_cap] / 8760 * 100)
-                    gen_sum += sp_data[sp][st_sub]
-                except:
-                    pass
-                try:
-                    tml_sum += sp_data[sp][st_tml]
-                except:
-                    pass
-                if gen not in self.generators.keys():
-                    continue
-                ndx = 3
-                if gen in storage_names:
-                    ndx = 2
-                else:
-                    try:
-                        gen2 = gen[gen.find('.') + 1:]
-                    except:
-                        gen2 = gen
-                    if gen not in tech_names and gen2 not in tech_names:
-                        ff_sum += sp_data[sp][ndx]
-                if self.generators[gen].capex > 0 or self.generators[gen].fixed_om > 0 \
-                  or self.generators[gen].variable_om > 0 or self.generators[gen].fuel > 0:
-                    if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
-                        sp_data[sp][st_cst] = 0
-                        continue
-                    capex = sp_data[sp][st_cap] * self.generators[gen].capex
-                    capex_sum += capex
-                    opex = sp_data[sp][st_cap] * self.generators[gen].fixed_om \
-                           + sp_data[sp][ndx] * self.generators[gen].variable_om \
-                           + sp_data[sp][ndx] * self.generators[gen].fuel
-                    disc_rate = self.generators[gen].disc_rate
-                    if disc_rate == 0:
-                        disc_rate = self.discount_rate
-                    lifetime = self.generators[gen].lifetime
-                    sp_data[sp][st_lcg] = calcLCOE(sp_data[sp][ndx], capex, opex, disc_rate, lifetime)
-                    sp_data[sp][st_cst] = sp_data[sp][ndx] * sp_data[sp][st_lcg]
-                    if gen in tech_names or gen2 in tech_names:
-                        sp_data[sp][st_lco] = sp_data[sp][st_cst] / (sp_data[sp][st_tml] + (sto_sum * sp_data[sp][st_tml] / fac_tml_sum))
-                    else:
-                        sp_data[sp][st_lco] = sp_data[sp][st_lcg]
-                    cost_sum += sp_data[sp][st_cst]
-                    sp_data[sp][st_cac] = capex
-                elif self.generators[gen].lcoe > 0:
-                    if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
-                        sp_data[sp][st_cst] = 0
-                        continue
-                    if self.generators[gen].lcoe_cf > 0:
-                        lcoe_cf = self.generators[gen].lcoe_cf
-                    else:
-                        lcoe_cf = sp_data[sp][st_cfa]
-                    sp_data[sp][st_cst] = self.generators[gen].lcoe * lcoe_cf * 8760 * sp_data[sp][st_cap]
-                    if sp_data[sp][st_cfa] > 0:
-                        sp_data[sp][st_lcg] = sp_data[sp][st_cst] / sp_data[sp][ndx]
-                        sp_data[sp][st_lco] = sp_data[sp][st_lcg]
-                    sp_data[sp][st_cfa] = '{:.1f}%'.format(sp_data[sp][st_cfa] * 100.)
-                    cost_sum += sp_data[sp][st_cst]
-                    sp_data[sp][st_rlc] = self.generators[gen].lcoe
-                    sp_data[sp][st_rcf] = '{:.1f}%'.format(lcoe_cf * 100.)
-                elif self.generators[gen].lcoe_cf == 0: # no cost facility
-                    if option != T and self.remove_cost and sp_data[sp][ndx] == 0:
-                        sp_data[sp][st_cst] = 0
-                        continue
-                    lcoe_cf = sp_data[sp][st_cfa]
-                    sp_data[sp][st_cst] = 0
-                    cost_sum += sp_data[sp][st_cst]
-                sp_data[sp][st_lic] = sp_data[sp][st_cst] * max_lifetime
-                lifetime_sum += sp_data[sp][st_lic]
-                if self.generators[gen].emissions > 0 and sp_data[sp][st_tml]> 0:
-                    sp_data[sp][st_emi] = sp_data[sp][ndx] * self.generators[gen].emissions
-                    co2_sum += sp_data[sp][st_emi]
-                    sp_data[sp][st_emc] = sp_data[sp][st_emi] * self.carbon_price
-                    if sp_data[sp][st_cst] == 0:
-                        sp_data[sp][st_lcc] = sp_data[sp][st_emc] / sp_data[sp][st_tml]
-                    else:
-                        sp_data[sp][st_lcc] = sp_data[sp][st_lco] * ((sp_data[sp][st_cst] + sp_data[sp][st_emc]) / sp_data[sp][st_cst])
-                    co2_cost_sum += sp_data[sp][st_emc]
-                    sp_data[sp][st_lie] = sp_data[sp][st_emi] * max_lifetime
-                    lifetime_co2_sum += sp_data[sp][st_lie]
-                    sp_data[sp][st_lec] = sp_data[sp][st_lie] * self.carbon_price
-                    lifetime_co2_cost += sp_data[sp][st_lec]
-                else:
-                    sp_data[sp][st_lcc] = sp_data[sp][st_lco]
-                if self.generators[gen].area > 0:
-                    sp_data[sp][st_are] = sp_data[sp][st_cap] * self.generators[gen].area
-                    total_area += sp_data[sp][st_are]
-            sf_sums = [0., 0., 0.]
-            for sf in range(len(shortfall)):
-                if shortfall[sf] > 0:
-                    sf_sums[0] += shortfall[sf]
-                    sf_sums[2] += pmss_data[load_col][sf] * pmss_details['Load'].multiplier
-                else:
-                    sf_sums[1] += shortfall[sf]
-                    sf_sums[2] += pmss_data[load_col][sf] * pmss_details['Load'].multiplier
-            if gen_sum > 0:
-                gs = cost_sum / gen_sum
-            else:
-                gs = ''
-            if tml_sum > 0:
-                gsw = cost_sum / tml_sum # LCOE
-                gswc = (cost_sum + co2_cost_sum) / tml_sum
-            else:
-                gsw = ''
-                gswc = ''
-            if option == O or option == O1:
-                load_pct, surp_pct, re_pct = summary_totals()
-            else:
-                summary_totals()
-            do_underlying = False
-            if len(underlying_facs) > 0:
-                for fac in underlying_facs:
-                    if pmss_details[fac].capacity * pmss_details[fac].multiplier > 0:
-                        do_underlying = True
-                        break
-            if do_underlying:
-                sp_data.append(' ')
-                sp_data.append('Additional Underlying Load')
-                for fac in underlying_facs:
-                    if pmss_details[fac].capacity * pmss_details[fac].multiplier == 0:
-                        continue
-                    if fac in self.generators.keys():
-                        gen = fac
-                    else:
-                        gen = pmss_details[fac].generator
-                    col = pmss_details[fac].col
-                    sp_d = [' '] * len(headers)
-                    sp_d[st_fac] = fac
-                    sp_d[st_cap] = pmss_details[fac].capacity * pmss_details[fac].multiplier
-                    cap_sum += sp_d[st_cap]
-                    sp_d[st_tml] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
-                    tml_sum += sp_d[st_tml]
-                    sp_d[st_sub] = sp_d[st_tml]
-                    gen_sum += sp_d[st_tml]
-                    sp_load += sp_d[st_tml]
-                    sp_d[st_cfa] = '{:.1f}%'.format(sp_d[st_sub] / sp_d[st_cap] / 8760 * 100.)
-                    sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
-                    if self.generators[gen].capex > 0 or self.generators[gen].fixed_om > 0 \
-                      or self.generators[gen].variable_om > 0 or self.generators[gen].fuel > 0:
-                        capex = sp_d[st_cap] * self.generators[gen].capex
-                        capex_sum += capex
-                        opex = sp_d[st_cap] * self.generators[gen].fixed_om \
-                               + sp_d[st_tml] * self.generators[gen].variable_om \
-                               + sp_d[st_tml] * self.generators[gen].fuel
-                        disc_rate = self.generators[gen].disc_rate
-                        if disc_rate == 0:
-                            disc_rate = self.discount_rate
-                        lifetime = self.generators[gen].lifetime
-                        sp_d[st_lcg] = calcLCOE(sp_d[st_tml], capex, opex, disc_rate, lifetime)
-                        sp_d[st_cst] = sp_d[st_tml] * sp_d[st_lcg]
-                        cost_sum += sp_d[st_cst]
-                        sp_d[st_lco] = sp_d[st_lcg]
-                        sp_d[st_cac] = capex
-                    elif self.generators[gen].lcoe > 0:
-                        if self.generators[gen].lcoe_cf > 0:
-                            lcoe_cf = self.generators[gen].lcoe_cf
-                        else:
-                            lcoe_cf = sp_d[st_cfa]
-                        sp_d[st_cst] = self.generators[gen].lcoe * lcoe_cf * 8760 * sp_d[st_cap]
-                        cost_sum += sp_d[st_cst]
-                        if sp_d[st_cfa] > 0:
-                            sp_d[st_lcg] = sp_d[st_cst] / sp_d[st_tml]
-                            sp_d[st_lco] = sp_d[st_lcg]
-                        sp_d[st_cfa] = '{:.1f}%'.format(sp_d[st_cfa] * 100.)
-                        sp_d[st_rlc] = self.generators[gen].lcoe
-                        sp_d[st_rcf] = '{:.1f}%'.format(lcoe_cf * 100.)
-                    elif self.generators[gen].lcoe_cf == 0: # no cost facility
-                        sp_d[st_cst] = 0
-                        sp_d[st_lcg] = 0
-                        sp_d[st_lco] = 0
-                        sp_d[st_rlc] = self.generators[gen].lcoe
-                    sp_d[st_lic] = sp_d[st_cst] * max_lifetime
-                    lifetime_sum += sp_d[st_lic]
-                    if self.generators[gen].emissions > 0:
-                        sp_d[st_emi] = sp_d[st_tml] * self.generators[gen].emissions
-                        co2_sum += sp_d[st_emi]
-                        sp_d[st_emc] = sp_d[st_emi] * self.carbon_price
-                        if sp_d[st_cst] > 0:
-                            sp_d[st_lcc] = sp_d[st_lco] * ((sp_d[st_cst] + sp_d[st_emc]) / sp_d[st_cst])
-                        else:
-                            sp_d[st_lcc] = sp_d[st_emc] / sp_d[st_tml]
-                        co2_cost_sum += sp_d[st_emc]
-                        sp_d[st_lie] = sp_d[st_emi] * max_lifetime
-                        lifetime_co2_sum += sp_d[st_lie]
-                        sp_d[st_lec] = sp_d[st_lie] * self.carbon_price
-                        lifetime_co2_cost += sp_d[st_lec]
-                    else:
-                        sp_d[st_lcc] = sp_d[st_lco]
-                    if self.generators[gen].area > 0:
-                        sp_d[st_are] = sp_d[st_cap] * self.generators[gen].area
-                    sp_data.append(sp_d)
-                if gen_sum > 0:
-                    gs = cost_sum / gen_sum
-                else:
-                    gs = ''
-                if tml_sum > 0:
-                    gsw = cost_sum / tml_sum # LCOE
-                    gswc = (cost_sum + co2_cost_sum) / tml_sum
-                else:
-                    gsw = ''
-                    gswc = ''
-                # find maximum underlying load
-                if option == S:
-                    load_max = 0
-                    load_hr = 0
-                    load_col = pmss_details['Load'].col
-                    for h in range(len(pmss_data[load_col])):
-                        amt = pmss_data[load_col][h] * pmss_details['Load'].multiplier
-                        for fac in underlying_facs:
-                            amt += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                        if amt > load_max:
-                            load_max = amt
-                            load_hr = h
-                summary_totals('Underlying ')
-            if corr_data is not None:
-                sp_data.append(' ')
-                sp_data = sp_data + corr_data
-            sp_data.append(' ')
-            sp_data.append(['Static Variables'])
-            if self.carbon_price > 0:
-                sp_d = [' '] * len(headers)
-                sp_d[st_fac] = 'Carbon Price ($/tCO2e)'
-                sp_d[st_cap] = self.carbon_price
-                sp_data.append(sp_d)
-            sp_d = [' '] * len(headers)
-            sp_d[st_fac] = 'Lifetime (years)'
-            sp_d[st_cap] = max_lifetime
-            sp_data.append(sp_d)
-            sp_d = [' '] * len(headers)
-            sp_d[st_fac] = 'Discount Rate'
-            sp_d[st_cap] = '{:.2%}'.format(self.discount_rate)
-            sp_data.append(sp_d)
-            if option == B or option == T:
-                if self.optimise_debug:
-                    sp_pts = [0] * len(headers)
-                    for p in [st_cap, st_lcg, st_lco, st_lcc, st_max, st_bal, st_rlc, st_are]:
-                        sp_pts[p] = 2
-                    if corr_data is not None:
-                        sp_pts[st_cap] = 3 # compromise between capacity (2) and correlation (4)
-                    dialog = displaytable.Table(sp_data, title='Debug', fields=headers,
-                             save_folder=self.scenarios, sortby='', decpts=sp_pts)
-                    dialog.exec_()
-                return sp_data
-            if option == O or option == O1:
-                op_load_tot = pmss_details['Load'].capacity * pmss_details['Load'].multiplier
-                if gswc != '':
-                    lcoe = gswc
-                elif self.adjusted_lcoe:
-                    lcoe = gsw # target is lcoe
-                else:
-                    lcoe = gs
-                if gen_sum == 0:
-                    re_pct = 0
-                    load_pct = 0
-                    re_pct = 0
-                multi_value = {'lcoe': lcoe, #lcoe. lower better
-                    'load_pct': load_pct, #load met. 100% better
-                    'surplus_pct': surp_pct, #surplus. lower better
-                    're_pct': re_pct, # RE pct. higher better
-                    'cost': cost_sum, # cost. lower better
-                    'co2': co2_sum} # CO2. lower better
-                if option == O:
-                    if multi_value['lcoe'] == '':
-                        multi_value['lcoe'] = 0
-                    return multi_value, sp_data, None
-                else:
-                    extra = [gsw, op_load_tot, sto_sum, re_sum, re_pct, sf_sums]
-                    return multi_value, sp_data, extra
-        #    list(map(list, list(zip(*sp_data))))
-            span = None
-            if self.summary_sources: # want data sources
-                sp_data.append(' ')
-                sp_data.append('Data sources')
-                span = 'Data sources'
-                sp_data.append(['Scenarios folder', self.scenarios])
-                if pm_data_file[: len(self.scenarios)] == self.scenarios:
-                    pm_data_file = pm_data_file[len(self.scenarios):]
-                sp_data.append(['Powermatch data file', pm_data_file])
-                load_file = self.load_files.replace('$YEAR$', self.loadCombo.currentText())
-                if load_file[: len(self.scenarios)] == self.scenarios:
-                    load_file = load_file[len(self.scenarios):]
-                sp_data.append(['Load file', load_file])
-                sp_data.append(['Constraints worksheet', str(self.files[C].text()) \
-                                + '.' + str(self.sheets[C].currentText())])
-                sp_data.append(['Generators worksheet', str(self.files[G].text()) \
-                                + '.' + str(self.sheets[G].currentText())])
-            sp_pts = [0] * len(headers)
-            for p in [st_cap, st_lcg, st_lco, st_lcc, st_max, st_bal, st_rlc, st_are]:
-                sp_pts[p] = 2
-            if corr_data is not None:
-                sp_pts[st_cap] = 3 # compromise between capacity (2) and correlation (4)
-            self.setStatus(self.sender().text() + ' completed')
-            if title is not None:
-                atitle = title
-            elif self.results_prefix != '':
-                atitle = self.results_prefix + '_' + self.sender().text()
-            else:
-                atitle = self.sender().text()
-            dialog = displaytable.Table(sp_data, title=atitle, fields=headers,
-                     save_folder=self.scenarios, sortby='', decpts=sp_pts,
-                     span=span)
-            dialog.exec_()
-            self.progressbar.setValue(20)
-            self.progressbar.setHidden(True)
-            self.progressbar.setValue(0)
-            return # finish if not detailed spreadsheet
         col = next_col + 1
         is_storage = False
         ss_sto_rows = []
@@ -5843,6 +4647,10 @@ class powerMatch(QtWidgets.QWidget):
             self.floatstatus.log(text)
             QtWidgets.QApplication.processEvents()
 
+    def dispatchProgress(self, value):
+        self.progressbar.setValue(value)
+        QtWidgets.QApplication.processEvents()
+
     @QtCore.pyqtSlot(str)
     def getStatus(self, text):
         if text == 'goodbye':
@@ -5950,19 +4758,58 @@ class powerMatch(QtWidgets.QWidget):
             if self.debug:
                 self.popn += 1
                 self.chrom = 0
+            use_cache = option == O and self.optimise_cache > 0
+            chrom_multipliers = []
+            chrom_keys = [] # capacities for each chromosome
             for chromosome in population:
                 # now get random amount of generation per technology (both RE and non-RE)
+                multipliers = {}
+                key = []
                 for fac, value in opt_order.items():
                     capacity = value[2]
                     for c in range(value[0], value[1]):
                         if chromosome[c]:
                             capacity = capacity + capacities[c]
+                    key.append(capacity)
                     try:
-                        pmss_details[fac].multiplier = capacity / pmss_details[fac].capacity
+                        multipliers[fac] = capacity / pmss_details[fac].capacity
                     except:
                         print('PME2:', gen, capacity, pmss_details[fac].capacity)
-                multi_value, op_data, extra = self.doDispatch(year, option, pmss_details, pmss_data, re_order,
-                                              dispatch_order, pm_data_file, data_file)
+                chrom_multipliers.append(multipliers)
+                chrom_keys.append(tuple(key))
+            pool_values = {}
+            if fitness_pool[0] is not None and option == O:
+                to_pool = {} # only dispatch each new set of capacities once
+                for chrom, key in enumerate(chrom_keys):
+                    if key in to_pool or (use_cache and key in fitness_cache):
+                        continue
+                    to_pool[key] = chrom_multipliers[chrom]
+                try:
+                    values = fitness_pool[0].map(optimiseFitness, list(to_pool.values()))
+                    pool_values = dict(zip(to_pool.keys(), values))
+                except Exception as err:
+                    self.setStatus('Optimise processes failed - ' + str(err))
+                    fitness_pool[0].terminate()
+                    fitness_pool[0] = None
+            for chrom, multipliers in enumerate(chrom_multipliers):
+                key = chrom_keys[chrom]
+                for fac, multiplier in multipliers.items():
+                    pmss_details[fac].multiplier = multiplier
+                if use_cache and key in fitness_cache:
+                    multi_value = fitness_cache.pop(key)
+                    fitness_cache[key] = multi_value # now most recently used
+                    cache_stats[0] += 1
+                else:
+                    if key in pool_values:
+                        multi_value = pool_values[key]
+                    else:
+                        multi_value, op_data, extra = self.doDispatch(year, option, pmss_details, pmss_data,
+                                                      re_order, dispatch_order, pm_data_file, data_file)
+                    if use_cache:
+                        cache_stats[1] += 1
+                        fitness_cache[key] = multi_value
+                        if len(fitness_cache) > self.optimise_cache: # drop least recently used
+                            del fitness_cache[next(iter(fitness_cache))]
                 if multi_value['load_pct'] < self.targets['load_pct'][3]:
                     if multi_value['load_pct'] == 0:
                         print('PME3:', multi_value['lcoe'], self.targets['load_pct'][3], multi_value['load_pct'])
@@ -6266,6 +5113,9 @@ class powerMatch(QtWidgets.QWidget):
         pmss_data = in_pmss_data[:]
         re_order = in_re_order[:]
         dispatch_order = in_dispatch_order[:]
+        fitness_pool = [None] # process pool for calculate_fitness
+        fitness_cache = {} # multi_value for capacities already dispatched
+        cache_stats = [0, 0] # hits, misses
         if self.optimise_debug:
             self.debug = True
         else:
@@ -6607,6 +5457,7 @@ class powerMatch(QtWidgets.QWidget):
             self.db_file.write(line0 + '\n' + line1 + '\n' + line2 + '\n' + line3 + '\n')
             self.popn = 0
             self.chrom = 0
+        fitness_pool[0] = self.fitnessPool(year, pmss_details, pmss_data, re_order, dispatch_order)
         lcoe_scores, multi_scores, multi_values = calculate_fitness(population)
         if do_lcoe:
             try:
@@ -6759,6 +5610,11 @@ class powerMatch(QtWidgets.QWidget):
                 else:
                     mud = '<html>&uarr;</html>'
                 last_multi_score = best_multi
+        if fitness_pool[0] is not None:
+            fitness_pool[0].close()
+            fitness_pool[0] = None
+        if cache_stats[0] + cache_stats[1] > 0:
+            self.setStatus(f'Fitness cache: {cache_stats[0]:,} hits; {cache_stats[1]:,} misses')
         if self.debug:
             try:
                 self.db_file.close()
@@ -7244,6 +6100,7 @@ class powerMatch(QtWidgets.QWidget):
         return
 
 if "__main__" == __name__:
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     ex = powerMatch()
     app.exec_()
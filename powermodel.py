@@ -37,9 +37,8 @@ import ssc
 import time
 import xlwt
 
-import configparser  # decode .ini file
 
-from senutils import getParents, getUser, ssCol, techClean
+from senutils import getConfig, getParents, getUser, ssCol, techClean
 import displayobject
 import displaytable
 from editini import SaveIni
@@ -1034,12 +1033,11 @@ class PowerModel():
                                         ws.cell(row=type_row[-1] + h, column=tech_col[te]))
             ts.save(data_file)
 
-        config = configparser.RawConfigParser()
         if len(sys.argv) > 1:
             config_file = sys.argv[1]
         else:
             config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
+        config = getConfig(config_file)
         try:
             mapc = config.get('Map', 'map_choice')
         except:
@@ -2310,12 +2308,11 @@ class PowerModel():
         self.status = status
         self.stations = stations
         self.progress = progress
-        config = configparser.RawConfigParser()
         if len(sys.argv) > 1:
             config_file = sys.argv[1]
         else:
             config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
+        config = getConfig(config_file)
         self.expert = False
         try:
             expert = config.get('Base', 'expert_mode')
@@ -0,0 +1,355 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2015-2023 Sustainable Energy Now Inc., Angus King
+#
+#  resourcestore.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+
+# Binary store of weather files. makeweatherfiles can put the hourly values
+# for the sites it makes in a store folder (e.g. solar_weather_2014_csv.store)
+# as well as or instead of the weather files. Each variable is a .npy file of
+# sites x hours (memory-mapped when read), sites.csv lists the files with
+# their location and header and layout.csv says how to make each line, so a
+# weather file's text can be made again exactly when something needs a file
+
+import csv
+import hashlib
+import numpy as np
+import os
+import tempfile
+
+# SAM .smw fields
+smw_fields = ['tdry', 'tdew', 'twet', 'rhum', 'wspd', 'wdir', 'pres', 'ghi', 'dni', 'dhi', 'albedo', 'snow']
+stores = {}   # folder: [stamp, {store folder: ResourceStore}]
+
+
+def columnText(values, fmt=None):
+    # text of each value; str() (numpy values keep their own str), a format or int
+    if fmt == 'int':
+        return list(map(str, np.asarray(values).astype(np.int64).tolist()))
+    if fmt is not None:
+        return list(map(fmt.format, np.asarray(values).tolist()))
+    if isinstance(values, np.ndarray) and (values.dtype.kind in 'iu' or values.dtype == np.float64):
+        return list(map(str, values.tolist()))
+    return list(map(str, values))
+
+def textLines(parts):
+    # a line for each row; parts are text for every row or [values, format]
+    columns = []
+    rows = 0
+    for part in parts:
+        if isinstance(part, str):
+            columns.append(part)
+        else:
+            columns.append(columnText(part[0], part[1]))
+            rows = len(columns[-1])
+    for c in range(len(columns)):
+        if isinstance(columns[c], str):
+            columns[c] = [columns[c]] * rows
+    return [''.join(row) for row in zip(*columns)]
+
+def storeFolder(file_name):
+    # store for a weather file, e.g. solar_weather_2014_csv.store for solar_weather_-32.5000_115.5000_2014.csv
+    folder, fil = os.path.split(file_name)
+    bit = fil.split('_')
+    name = '_'.join(bit[:-3]) + '_' + bit[-1].replace('.', '_') + '.store'
+    return os.path.join(folder, name)
+
+def folderStores(folder):
+    # stores in a folder; read again if any of them change
+    stamp = []
+    try:
+        for fil in sorted(os.listdir(folder)):
+            if fil[-6:] == '.store':
+                try:
+                    stamp.append([fil, os.stat(folder + '/' + fil + '/sites.csv').st_mtime_ns])
+                except:
+                    pass
+    except:
+        pass
+    if folder in stores and stores[folder][0] == stamp:
+        return stores[folder][1]
+    found = {}
+    for fil, mtime in stamp:
+        try:
+            found[fil] = ResourceStore(folder + '/' + fil)
+        except:
+            pass
+    stores[folder] = [stamp, found]
+    return found
+
+def siteStore(folder, name):
+    # store with the weather file name, None if none have it
+    for store in folderStores(folder).values():
+        if name in store.sites:
+            return store
+    return None
+
+def listResources(folder):
+    # weather files in a folder including those in a store
+    fils = os.listdir(folder)
+    have = set(fils)
+    for store in folderStores(folder).values():
+        for fil in store.names:
+            if fil not in have:
+                fils.append(fil)
+                have.add(fil)
+    return fils
+
+def readLines(folder, name):
+    # lines of a weather file or those made from a store
+    if not os.path.exists(folder + '/' + name):
+        store = siteStore(folder, name)
+        if store is not None:
+            return store.lines(name)
+    tf = open(folder + '/' + name, 'r')
+    lines = tf.readlines()
+    tf.close()
+    return lines
+
+def sourceFile(folder, name):
+    # the weather file or the sites.csv of its store (for file stamps)
+    if not os.path.exists(folder + '/' + name):
+        store = siteStore(folder, name)
+        if store is not None:
+            return store.folder + '/sites.csv'
+    return folder + '/' + name
+
+def resourceFile(folder, name):
+    # path of a weather file; a file from a store is made in the temp folder when first needed
+    if os.path.exists(folder + '/' + name):
+        return folder + '/' + name
+    store = siteStore(folder, name)
+    if store is None:
+        return folder + '/' + name
+    text_folder = os.path.join(tempfile.gettempdir(), 'siren_resource',
+                               hashlib.sha1(os.path.abspath(store.folder).encode('utf-8')).hexdigest()[:16])
+    text_file = os.path.join(text_folder, name)
+    try:
+        if os.stat(text_file).st_mtime_ns >= store.stamp:
+            return text_file
+    except:
+        pass
+    if not os.path.exists(text_folder):
+        os.makedirs(text_folder, exist_ok=True)
+    temp_file = text_file + '.' + str(os.getpid()) + '.tmp'
+    store.writeText(name, temp_file)
+    os.replace(temp_file, text_file) # other processes only see complete files
+    return text_file
+
+
+class ResourceStore():
+    def fieldNames(self, header, fmat):
+        # a name for each field of a line
+        lines = header.splitlines()
+        if fmat == 'smw':
+            return smw_fields[:]
+        if fmat == 'srw' and len(lines) >= 5:
+            names = lines[2].split(',')
+            heights = lines[4].split(',')
+            return [names[i].lower() + '_' + heights[i] for i in range(min(len(names), len(heights)))]
+        if fmat == 'csv' and len(lines) > 0:
+            return [name.lower().replace(' ', '_') for name in lines[-1].split(',')]
+        return []
+
+    def __init__(self, folder, sites=0):
+        # a store to read or, if sites, one to write with room for that many sites
+        self.folder = folder
+        self.capacity = sites
+        self.layout = None
+        self.sites = {}   # file name: [row, header]
+        self.names = []
+        self.arrays = {}
+        self.shared = {}
+        self.hours = 0
+        self.stamp = 0
+        if sites > 0:
+            return
+        tf = open(self.folder + '/layout.csv', 'r', newline='')
+        self.layout = []
+        for row in csv.DictReader(tf):
+            part = {'text': row['Text'], 'var': row['Variable'], 'fmt': row['Format'], 'field': -1,
+                    'shared': row['Shared'] == 'True'}
+            if part['var'] == '':
+                part['var'] = None
+            else:
+                part['field'] = int(row['Field'])
+            if part['fmt'] == '':
+                part['fmt'] = None
+            self.layout.append(part)
+        tf.close()
+        tf = open(self.folder + '/sites.csv', 'r', newline='')
+        for row in csv.DictReader(tf):
+            self.sites[row['Filename']] = [int(row['Row']), row['Header']]
+            self.names.append(row['Filename'])
+        tf.close()
+        self.stamp = os.stat(self.folder + '/sites.csv').st_mtime_ns
+        for part in self.layout:
+            if part['var'] is not None:
+                self.arrays[part['var']] = np.load(self.folder + '/' + part['var'] + '.npy', mmap_mode='r')
+                if part['shared']:
+                    self.shared[part['var']] = self.arrays[part['var']]
+                else:
+                    self.hours = self.arrays[part['var']].shape[1]
+
+    def addSite(self, file_name, header, parts):
+        # save a site's values; parts as for textLines(). False if they don't fit the store
+        name = os.path.basename(file_name)
+        if name in self.sites or len(self.sites) >= self.capacity:
+            return False
+        if self.layout is None:
+            if not self.newLayout(name, header, parts):
+                return False
+        if len(parts) != len(self.layout):
+            return False
+        values = []
+        for part, layout in zip(parts, self.layout):
+            if isinstance(part, str):
+                if layout['var'] is not None or part != layout['text']:
+                    return False
+                continue
+            if layout['var'] is None or part[1] != layout['fmt']:
+                return False
+            valu = np.asarray(part[0])
+            if layout['shared']:
+                if not np.array_equal(valu, self.shared[layout['var']]):
+                    return False
+            elif valu.dtype != self.arrays[layout['var']].dtype or len(valu) != self.hours:
+                return False
+            else:
+                values.append([layout['var'], valu])
+        row = len(self.sites)
+        for var, valu in values:
+            self.arrays[var][row] = valu
+        self.sites[name] = [row, header]
+        self.names.append(name)
+        return True
+
+    def newLayout(self, name, header, parts):
+        # layout and arrays from the first site
+        names = self.fieldNames(header, name[name.rfind('.') + 1:])
+        layout = []
+        field = 0
+        self.hours = -1
+        for part in parts:
+            if isinstance(part, str):
+                layout.append({'text': part, 'var': None, 'fmt': None, 'field': -1, 'shared': False})
+                field += part.count(',')
+                continue
+            valu = np.asarray(part[0])
+            if len(valu) == 0 or (self.hours >= 0 and len(valu) != self.hours):
+                return False
+            self.hours = len(valu)
+            shared = valu.dtype.kind in 'SU'
+            if shared:   # e.g. the dates; the same for each site so kept once
+                width = str(valu[0]).count(',')
+                var = '_'.join(names[field:field + width])
+            else:
+                width = 0
+                var = ''
+                if field < len(names):
+                    var = names[field]
+            var = ''.join([c for c in var if c.isalnum() or c == '_'])
+            if var == '' or var in [p['var'] for p in layout]:
+                var = 'field' + str(field)
+            layout.append({'text': '', 'var': var, 'fmt': part[1], 'field': field, 'shared': shared})
+            field += width
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        for fil in os.listdir(self.folder):   # replace an older store
+            if fil[-4:] == '.npy' or fil in ['layout.csv', 'sites.csv']:
+                os.remove(self.folder + '/' + fil)
+        for layout_part, part in zip(layout, parts):
+            if layout_part['var'] is None:
+                continue
+            valu = np.asarray(part[0])
+            npy_file = self.folder + '/' + layout_part['var'] + '.npy'
+            if layout_part['shared']:
+                np.save(npy_file, valu)
+                self.shared[layout_part['var']] = valu
+            else:
+                self.arrays[layout_part['var']] = np.lib.format.open_memmap(npy_file, mode='w+',
+                                                  dtype=valu.dtype, shape=(self.capacity, self.hours))
+        self.layout = layout
+        return True
+
+    def close(self):
+        # finish a store being written
+        if self.layout is None:
+            return
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        tf = open(self.folder + '/layout.csv', 'w', newline='')
+        writer = csv.writer(tf)
+        writer.writerow(['Text', 'Variable', 'Format', 'Field', 'Shared'])
+        for part in self.layout:
+            if part['var'] is None:
+                writer.writerow([part['text'], '', '', '', ''])
+            else:
+                fmt = part['fmt']
+                if fmt is None:
+                    fmt = ''
+                writer.writerow(['', part['var'], fmt, part['field'], part['shared']])
+        tf.close()
+        tf = open(self.folder + '/sites.csv', 'w', newline='')
+        writer = csv.writer(tf)
+        writer.writerow(['Filename', 'Latitude', 'Longitude', 'Row', 'Header'])
+        for name in self.names:
+            bit = name.split('_')
+            writer.writerow([name, bit[-3], bit[-2], self.sites[name][0], self.sites[name][1]])
+        tf.close()
+
+    def parts(self, name):
+        # parts for textLines() for a site
+        row = self.sites[name][0]
+        parts = []
+        for part in self.layout:
+            if part['var'] is None:
+                parts.append(part['text'])
+            elif part['shared']:
+                parts.append([self.shared[part['var']].tolist(), part['fmt']])
+            else:
+                parts.append([self.arrays[part['var']][row], part['fmt']])
+        return parts
+
+    def header(self, name):
+        return self.sites[name][1].splitlines(True)
+
+    def lines(self, name):
+        # the lines of the weather file
+        return self.header(name) + textLines(self.parts(name))
+
+    def writeText(self, name, file_name):
+        tf = open(file_name, 'w')
+        tf.write(self.sites[name][1] + ''.join(textLines(self.parts(name))))
+        tf.close()
+
+    def field(self, name, col):
+        # values of a field (column) of the weather file's lines
+        for part in self.layout:
+            if part['field'] == col and part['var'] is not None and not part['shared']:
+                valu = self.arrays[part['var']][self.sites[name][0]]
+                if part['fmt'] == 'int':
+                    return valu.astype(np.int64).astype(np.float64)
+                if part['fmt'] is None:
+                    if valu.dtype.kind == 'f' and valu.dtype.itemsize < 8:   # as in the text
+                        return valu.astype(str).astype(np.float64)
+                    return np.asarray(valu, dtype=np.float64)
+                break
+        lines = textLines(self.parts(name))
+        return np.array([float(line.split(',')[col]) for line in lines])
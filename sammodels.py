@@ -31,6 +31,7 @@
 #
 
 from math import *
+import numpy as np
 
 
 def getDNI(ghi=0, hour=0, lat=0, lon=0, press=1013.25, zone=8, debug=False):
@@ -255,3 +256,149 @@ def getZenith(hour=0, lat=0, lon=0, zone=8, debug=False):
         print('hour_angle', hour_angle)
         print('zenith_angle', zenith_angle)
     return zenith_angle
+
+
+# Array versions of getDNI and getDHI. These take arrays (or lists) of GHI, pressure and
+# hour of year for a location and give the same results as calling getDNI and getDHI for
+# each hour. The solar geometry only depends on the hour, location and time zone so it can
+# be worked out once for a location-year and passed in.
+# The values keep their types as they do in getDNI and getDHI. There a numpy value (such as
+# float32 from NetCDF files) keeps its type when combined with a Python float, and the math
+# functions (pow and exp too) give Python floats. So float32 GHI, pressure or location is
+# worked in float32 at the same steps and gives the same float32 results.
+
+def asFloats(values):
+    # values as an array of their float type (float64 for Python numbers)
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        return values.astype(np.float64)
+    return values
+
+
+def getDNIGeometry(hours, lat=0, lon=0, zone=8):
+    hour_of_year = np.asarray(hours, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = asFloats(lon)
+    day_of_year = np.floor((hour_of_year - 1) / 24) + 1
+    day_angle = 6.283185 * (day_of_year - 1) / 365.
+    etr = 1370 * (1.00011 + 0.034221 * np.cos(day_angle) + 0.00128 * np.sin(day_angle) +
+          0.000719 * np.cos(2 * day_angle) + 0.000077 * np.sin(2 * day_angle))
+    dec = (0.006918 - 0.399912 * np.cos(day_angle) + 0.070257 * np.sin(day_angle) -
+          0.006758 * np.cos(2 * day_angle) + 0.000907 * np.sin(2 * day_angle) -
+          0.002697 * np.cos(3 * day_angle) + 0.00148 * np.sin(3 * day_angle)) * (180. / 3.14159)
+    eqt = (0.000075 + 0.001868 * np.cos(day_angle) - 0.032077 * np.sin(day_angle) -
+          0.014615 * np.cos(2 * day_angle) - 0.040849 * np.sin(2 * day_angle)) * (229.18)
+    hour_angle = (15 * ((hour_of_year - 12 - 0.5 + eqt / 60).astype(lon.dtype) +
+                 ((lon - zone * 15) * 4) / 60)).astype(np.float64)
+    zenith_angle = np.arccos(np.clip(np.cos(np.radians(dec)) * np.cos(np.radians(lat)) *
+                   np.cos(np.radians(hour_angle)) + np.sin(np.radians(dec)) * np.sin(np.radians(lat)),
+                   -1., 1.)) * (180. / 3.14159)
+    cos_zenith = np.cos(np.radians(zenith_angle))
+    up = zenith_angle < 80
+    am = np.zeros(zenith_angle.shape)   # air mass before the pressure correction
+    am[up] = 1 / (cos_zenith[up] + 0.15 / np.power(93.885 - zenith_angle[up], 1.253))
+    return {'etr': etr, 'cos_zenith': cos_zenith, 'am': am}
+
+
+def getDNIs(ghi, hours=None, lat=0, lon=0, press=1013.25, zone=8, geometry=None):
+    if geometry is None:
+        geometry = getDNIGeometry(hours, lat, lon, zone)
+    ghi = asFloats(ghi)
+    # a Python number (or whole numbers, as from valu(rnd=0)) gives a Python float air mass
+    # in getDNI, which then takes the type of the values it meets
+    weak = type(press) in [int, float] or np.asarray(press).dtype.kind in 'biu'
+    press = asFloats(press)
+    etr = geometry['etr']
+    if weak:
+        am = geometry['am'] * (press / 1013.25)
+    else:
+        am = geometry['am'].astype(press.dtype) * (press / 1013.25)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        kt = np.where(am > 0, ghi / (geometry['cos_zenith'] * etr).astype(ghi.dtype), 0.)
+        kt = np.where(kt > 0, kt, 0.)
+        hi = kt > 0.6
+        lo = (kt > 0) & (kt < 0.6)
+        ktype = kt.dtype
+        kt2 = np.power(kt.astype(np.float64), 2)   # math pow() gives a float
+        kt3 = np.power(kt.astype(np.float64), 3)
+        a = np.select([hi, lo], [-5.743 + 21.77 * kt - (27.49 * kt2).astype(ktype) + (11.56 * kt3).astype(ktype),
+                      0.512 - 1.56 * kt + (2.286 * kt2).astype(ktype) - (2.222 * kt3).astype(ktype)], 0.)
+        b = np.select([hi, lo], [41.4 - 118.5 * kt + (66.05 * kt2).astype(ktype) + (31.9 * kt3).astype(ktype),
+                      0.37 + 0.962 * kt], 0.)
+        c = np.select([hi, lo], [-47.01 + 184.2 * kt - (222 * kt2).astype(ktype) + (73.81 * kt3).astype(ktype),
+                      -0.28 + 0.932 * kt - (2.048 * kt2).astype(ktype)], 0.)
+        if weak:
+            kn = a + (b * np.exp((c * am.astype(ktype)).astype(np.float64)).astype(ktype))
+        else:
+            kn = a + (b * np.exp((c * am).astype(np.float64)).astype(ktype))   # exp() gives a float too
+        amf = am.astype(np.float64)
+        knc = 0.886 - 0.122 * am + (0.0121 * np.power(amf, 2)).astype(am.dtype) - \
+              (0.000653 * np.power(amf, 3)).astype(am.dtype) + (0.000014 * np.power(amf, 4)).astype(am.dtype)
+        if weak:
+            dni = etr.astype(ktype) * (knc.astype(ktype) - kn)
+        else:
+            dni = etr.astype(np.result_type(ghi, press)) * (knc - kn)
+    return np.where((kt > 0) & (dni >= 0), dni, 0.)
+
+
+def getDHIGeometry(hours, lat=0, azimuth=0., tilt=0.):
+    hour_of_year = np.asarray(hours)
+    day_of_year = np.floor((hour_of_year - 1) / 24) + 1   # H
+    declination_angle = np.arcsin(np.sin(-23.45 * pi / 180.) * np.cos(360. / 365. * (10.5 + day_of_year) *
+                        pi / 180.)) * 180. / pi
+    latitude = asFloats(lat)
+    lat_rad = (latitude * pi / 180.).astype(np.float64)   # in latitude's type first
+# I
+    hour_angle = np.where(hour_of_year % 24 != 0, (15 * (12 - hour_of_year % 24)) + 7.5, -172.5)
+# L
+    with np.errstate(invalid='ignore'):
+        sun_rise_hour_angle = np.arccos(-1 * np.tan(lat_rad) *
+                              np.tan(declination_angle * pi / 180.)) * 180. / pi
+    extreme = np.isnan(sun_rise_hour_angle)   # AK 2020-06-20 cater for "extreme" latitudes
+    dec_rad = declination_angle * pi / 180
+    sin_sun_elevation = np.sin(lat_rad) * np.sin(dec_rad) + np.cos(lat_rad) * np.cos(dec_rad) * \
+                        np.cos(hour_angle * pi / 180)
+# J
+    hour_angle_2 = np.where((np.abs(hour_angle) - 7.5 < sun_rise_hour_angle) &
+                   (np.abs(hour_angle) + 7.5 > sun_rise_hour_angle),
+                   np.abs(hour_angle) - 7.5 + (1 - (((np.abs(hour_angle) + 7.5) - sun_rise_hour_angle) / 15)) * 7.5,
+                   15 * (12 - hour_of_year % 24) + 7.5)
+# K
+    sun_rise_set_adjusted_hour_angle = np.where(hour_angle < 0, np.abs(hour_angle_2) * -1, hour_angle_2)
+# Q
+    altitude_angle = np.arcsin(np.clip((np.sin(lat_rad) * np.sin(declination_angle * pi / 180.)) +
+                     (np.cos(lat_rad) * np.cos(declination_angle * pi / 180.) *
+                     np.cos(sun_rise_set_adjusted_hour_angle * pi / 180.)), -1., 1.)) * 180. / pi
+# R
+    with np.errstate(divide='ignore', invalid='ignore'):
+        solar_azimuth = np.abs(np.arccos(np.clip(((np.cos(declination_angle * pi / 180.) *
+                        np.sin(lat_rad) * np.cos(sun_rise_set_adjusted_hour_angle * pi / 180.)) -
+                        (np.sin(declination_angle * pi / 180.) * np.cos(lat_rad))) /
+                        np.cos(altitude_angle * pi / 180.), -1., 1.)) * 180. / pi)
+    solar_azimuth = np.where(sun_rise_set_adjusted_hour_angle > 0, solar_azimuth, -1 * solar_azimuth)
+# S
+    incidence_angle = np.arccos(np.clip((np.cos(altitude_angle * pi / 180.) *
+        np.cos((solar_azimuth - azimuth) * pi / 180.) * np.sin(tilt * pi / 180.)) +
+        ((np.sin(altitude_angle * pi / 180.) * np.cos(tilt * pi / 180.))), -1., 1.)) * 180. / pi
+    return {'extreme': extreme, 'sin_sun_elevation': sin_sun_elevation, 'altitude_angle': altitude_angle,
+            'incidence_angle': incidence_angle, 'tilt': tilt}
+
+
+def getDHIs(ghi, dni, hours=None, lat=0, azimuth=0., tilt=0., reflectance=0.2, geometry=None):
+    if geometry is None:
+        geometry = getDHIGeometry(hours, lat, azimuth, tilt)
+    ghi = asFloats(ghi)
+    dni = asFloats(dni)
+    tilt = geometry['tilt']
+    altitude_angle = geometry['altitude_angle']
+# U
+    diffuse_component = np.where(altitude_angle > 0, (ghi - (dni * np.sin(altitude_angle * pi / 180.).astype(
+                        dni.dtype))) * pow(cos((tilt / 2) * pi / 180.), 2), 0.)
+# Y
+    dhi = np.where(diffuse_component < 0, 0., diffuse_component)
+    extreme = geometry['extreme']
+    if extreme.any():
+        dhi_extreme = ghi - dni * geometry['sin_sun_elevation'].astype(dni.dtype)
+        dhi = np.where(extreme, np.where(dhi_extreme < 0, 0., dhi_extreme), dhi)
+# Z
+    return np.round(dhi, 1)   # as getDHI's round() of a numpy value
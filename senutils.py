@@ -19,8 +19,10 @@
 #  <http://www.gnu.org/licenses/>.
 #
 
+import configparser   # decode .ini file
 import csv
 import math
+import numpy as np
 import openpyxl as oxl
 from openpyxl.formula import Tokenizer
 import os
@@ -29,7 +31,10 @@ try:
 except:
     pass
 import sys
-from PyQt5 import QtCore, QtWidgets
+try:
+    from PyQt5 import QtCore, QtWidgets
+except: # allow non-GUI use, e.g. pmcore.py
+    QtWidgets = None
 import xlrd
 if xlrd.__version__[:2][0] == '1.': # if xlsx files still supported
     if sys.version_info[1] >= 9: # python 3.9 onwards
@@ -40,132 +45,135 @@ try:
 except:
     odsr = None
 
-class ClickableQLabel(QtWidgets.QLabel):
-    clicked = QtCore.pyqtSignal()
-
-    def __init(self, parent):
-        QLabel.__init__(self, parent)
-
-    def mousePressEvent(self, event):
-        QtWidgets.QApplication.widgetAt(event.globalPos()).setFocus()
-        self.clicked.emit()
-
-# class to support  listwidget drag and drop between two lists
-# also supports using keys where drag and drop not working (e.g. Ubuntu 23.04)
-class ListWidget(QtWidgets.QListWidget):
-    def decode_data(self, bytearray):
-        data = []
-        ds = QtCore.QDataStream(bytearray)
-        while not ds.atEnd():
-            row = ds.readInt32()
-            column = ds.readInt32()
-            map_items = ds.readInt32()
-            for i in range(map_items):
-                key = ds.readInt32()
-                value = QtCore.QVariant()
-                ds >> value
-                data.append(value.value())
-        return data
-
-    def __init__(self, parent=None):
-        super(ListWidget, self).__init__(parent)
-        self.setDragDropMode(self.DragDrop)
-        self.setSelectionMode(self.ExtendedSelection)
-        self.setAcceptDrops(True)
-        self.updated = False
-        self._other = None
-        for child in self.parent().children():
-            if isinstance(child, ListWidget) and child != self: # will work if more than one ListWidget
-                self._other = child
-                self.setObjectName('Exclude')
-                child._other = self
-                child.setObjectName('Include')
-
-    def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.accept()
-        else:
-            super(ListWidget, self).dragEnterEvent(event)
+from getmodels import getModelFile
+
+if QtWidgets is not None:
+    class ClickableQLabel(QtWidgets.QLabel):
+        clicked = QtCore.pyqtSignal()
+
+        def __init(self, parent):
+            QLabel.__init__(self, parent)
+
+        def mousePressEvent(self, event):
+            QtWidgets.QApplication.widgetAt(event.globalPos()).setFocus()
+            self.clicked.emit()
+
+    # class to support  listwidget drag and drop between two lists
+    # also supports using keys where drag and drop not working (e.g. Ubuntu 23.04)
+    class ListWidget(QtWidgets.QListWidget):
+        def decode_data(self, bytearray):
+            data = []
+            ds = QtCore.QDataStream(bytearray)
+            while not ds.atEnd():
+                row = ds.readInt32()
+                column = ds.readInt32()
+                map_items = ds.readInt32()
+                for i in range(map_items):
+                    key = ds.readInt32()
+                    value = QtCore.QVariant()
+                    ds >> value
+                    data.append(value.value())
+            return data
+
+        def __init__(self, parent=None):
+            super(ListWidget, self).__init__(parent)
+            self.setDragDropMode(self.DragDrop)
+            self.setSelectionMode(self.ExtendedSelection)
+            self.setAcceptDrops(True)
+            self.updated = False
+            self._other = None
+            for child in self.parent().children():
+                if isinstance(child, ListWidget) and child != self: # will work if more than one ListWidget
+                    self._other = child
+                    self.setObjectName('Exclude')
+                    child._other = self
+                    child.setObjectName('Include')
+
+        def dragEnterEvent(self, event):
+            if event.mimeData().hasUrls():
+                event.accept()
+            else:
+                super(ListWidget, self).dragEnterEvent(event)
 
-    def dragMoveEvent(self, event):
-        if event.mimeData().hasUrls():
-            event.setDropAction(QtCore.Qt.CopyAction)
-            event.accept()
-        else:
-            super(ListWidget, self).dragMoveEvent(event)
+        def dragMoveEvent(self, event):
+            if event.mimeData().hasUrls():
+                event.setDropAction(QtCore.Qt.CopyAction)
+                event.accept()
+            else:
+                super(ListWidget, self).dragMoveEvent(event)
 
-    def dropEvent(self, event):
-        self.updated = True
-        if event.source() == self:
-            event.setDropAction(QtCore.Qt.MoveAction)
-            QtWidgets.QListWidget.dropEvent(self, event)
-        else:
-            ba = event.mimeData().data('application/x-qabstractitemmodeldatalist')
-            data_items = self.decode_data(ba)
-            event.setDropAction(QtCore.Qt.MoveAction)
-            event.source().deleteItems(data_items)
-            super(ListWidget, self).dropEvent(event)
-
-    def deleteItems(self, items):
-        for row in range(self.count() -1, -1, -1):
-            if self.item(row).text() in items:
-             #   r = self.row(item)
-                self.takeItem(row)
-
-    def keyPressEvent(self, event):
-        if self.currentRow() < 0:
-            return
-        action = ''
-        try:
-            if event.key() == 16777223:
-                action = 'Delete'
-            elif event.key() == 16777235:
-                action = 'Up'
-            elif event.key() == 16777237:
-                action = 'Down'
-            elif event.key() == 16777234:
-                if self.objectName == 'Include':
-                    return
-                action = 'Shift'
-            elif event.key() == 16777236:
-                if self.objectName == 'Exclude':
-                    return
-                action = 'Shift'
-            elif chr(event.key()) == 'U':
-                action = 'Up'
-            elif chr(event.key()) == 'D':
-                action = 'Down'
-            elif chr(event.key()) == '+' or chr(event.key()) == '=' or chr(event.key()) == 'I' or chr(event.key()) == 'L':
-                if self.objectName == 'Include':
-                    return
-                action = 'Shift'
-            elif chr(event.key()) == '-' or chr(event.key()) == 'E' or chr(event.key()) == 'R':
-                if self.objectName == 'Exclude':
-                    return
-                action = 'Shift'
+        def dropEvent(self, event):
             self.updated = True
-        except:
-            return
-        if action == 'Shift':
-            background = self.currentItem().background()
-            self._other.addItem(self.currentItem().text())
-            self._other.item(self._other.count() - 1).setBackground(background)
-            self.takeItem(self.currentRow())
-        elif action == 'Up':
-            if self.currentRow() > 0:
-                background = self.currentItem().background()
-                self.insertItem(self.currentRow() - 1, self.currentItem().text())
-                self.takeItem(self.currentRow())
-                self.setCurrentRow(self.currentRow() - 1)
-                self.currentItem().setBackground(background)
-        elif action == 'Down':
-            if self.currentRow() < self.count() - 1:
+            if event.source() == self:
+                event.setDropAction(QtCore.Qt.MoveAction)
+                QtWidgets.QListWidget.dropEvent(self, event)
+            else:
+                ba = event.mimeData().data('application/x-qabstractitemmodeldatalist')
+                data_items = self.decode_data(ba)
+                event.setDropAction(QtCore.Qt.MoveAction)
+                event.source().deleteItems(data_items)
+                super(ListWidget, self).dropEvent(event)
+
+        def deleteItems(self, items):
+            for row in range(self.count() -1, -1, -1):
+                if self.item(row).text() in items:
+                 #   r = self.row(item)
+                    self.takeItem(row)
+
+        def keyPressEvent(self, event):
+            if self.currentRow() < 0:
+                return
+            action = ''
+            try:
+                if event.key() == 16777223:
+                    action = 'Delete'
+                elif event.key() == 16777235:
+                    action = 'Up'
+                elif event.key() == 16777237:
+                    action = 'Down'
+                elif event.key() == 16777234:
+                    if self.objectName == 'Include':
+                        return
+                    action = 'Shift'
+                elif event.key() == 16777236:
+                    if self.objectName == 'Exclude':
+                        return
+                    action = 'Shift'
+                elif chr(event.key()) == 'U':
+                    action = 'Up'
+                elif chr(event.key()) == 'D':
+                    action = 'Down'
+                elif chr(event.key()) == '+' or chr(event.key()) == '=' or chr(event.key()) == 'I' or chr(event.key()) == 'L':
+                    if self.objectName == 'Include':
+                        return
+                    action = 'Shift'
+                elif chr(event.key()) == '-' or chr(event.key()) == 'E' or chr(event.key()) == 'R':
+                    if self.objectName == 'Exclude':
+                        return
+                    action = 'Shift'
+                self.updated = True
+            except:
+                return
+            if action == 'Shift':
                 background = self.currentItem().background()
-                self.insertItem(self.currentRow() + 2, self.currentItem().text())
-                row = self.currentRow()
+                self._other.addItem(self.currentItem().text())
+                self._other.item(self._other.count() - 1).setBackground(background)
                 self.takeItem(self.currentRow())
-                self.setCurrentRow(row + 1)
-                self.currentItem().setBackground(background)
+            elif action == 'Up':
+                if self.currentRow() > 0:
+                    background = self.currentItem().background()
+                    self.insertItem(self.currentRow() - 1, self.currentItem().text())
+                    self.takeItem(self.currentRow())
+                    self.setCurrentRow(self.currentRow() - 1)
+                    self.currentItem().setBackground(background)
+            elif action == 'Down':
+                if self.currentRow() < self.count() - 1:
+                    background = self.currentItem().background()
+                    self.insertItem(self.currentRow() + 2, self.currentItem().text())
+                    row = self.currentRow()
+                    self.takeItem(self.currentRow())
+                    self.setCurrentRow(row + 1)
+                    self.currentItem().setBackground(background)
 
 
 # Class to support input file as .csv, .xls, or .xlsx
@@ -390,6 +398,58 @@ def getUser():
     else:
         return os.environ.get("USERNAME")
 
+#
+# preferences files are parsed once per process and again only if they change
+siren_configs = {}   # config file: [stamp, SirenConfig]
+
+class SirenConfig(configparser.RawConfigParser):
+    # a parsed preferences file with its [Parents], $USER$ and $YEAR$ worked out.
+    # It is shared by everyone who asks for the file so only read from it
+    def __init__(self, config_file):
+        super(SirenConfig, self).__init__()
+        self.read(config_file)
+        try:
+            self.base_year = self.get('Base', 'year')
+        except:
+            self.base_year = '2012'
+        self.parents = []
+        try:
+            self.parents = getParents(self.items('Parents'))
+        except:
+            pass
+        self.user = getUser()
+
+    def getFile(self, section, option, year=None):
+        # raises the configparser errors if it isn't there, as get() does
+        value = self.get(section, option)
+        for key, parent in self.parents:
+            value = value.replace(key, parent)
+        value = value.replace('$USER$', self.user)
+        if year is None:
+            year = self.base_year
+        return value.replace('$YEAR$', year)
+
+    def getFlag(self, section, option, default=False):
+        try:
+            return self.get(section, option).lower() in ['true', 'on', 'yes']
+        except:
+            return default
+
+def getConfig(config_file=None):
+    if config_file is None:
+        if len(sys.argv) > 1:
+            config_file = sys.argv[1]
+        else:
+            config_file = getModelFile('SIREN.ini')
+    try:
+        stat = os.stat(config_file)
+        stamp = [stat.st_mtime_ns, stat.st_size]
+    except:
+        stamp = None
+    if config_file not in siren_configs or siren_configs[config_file][0] != stamp:
+        siren_configs[config_file] = [stamp, SirenConfig(config_file)]
+    return siren_configs[config_file][1]
+
 #
 # clean up tech names
 def techClean(tech, full=False):
@@ -417,7 +477,28 @@ def techClean(tech, full=False):
 
 #
 # add another windspeed height
-def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spread=None):
+# extrapolated wind data by (file, time, height, law, spread)
+wind_extrapolations = {}
+wind_extrapolations_max = 32
+
+def windSpeeds(speed, speed0, height, height0, tgt_height, law='logarithmic', wind_file=''):
+    # speed and speed0 are arrays of speeds at height and height0
+    if np.any((speed0 == 0) & (speed > 0)):
+        raise ZeroDivisionError('float division by zero')
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        alpha = np.where(speed0 >= speed, 1. / 7., # one-seventh power law
+                         np.log(speed / np.where(speed0 == 0, 1., speed0)) / math.log(height / height0))
+        z0 = np.exp(((np.power(height0, alpha) * math.log(height)) - np.power(height, alpha) * math.log(height0)) \
+                    / (np.power(height0, alpha) - np.power(height, alpha)))
+    for i in np.nonzero((z0 >= 1e-308) & (z0 < 1e-302))[0]:
+        print('(311)', i + 5, wind_file, z0[i])
+    z0 = np.where(z0 < 1e-302, 0.03, z0)
+    if law.lower()[0] == 'l': # law == 'logarithmic'
+        return np.log(tgt_height / z0) / np.log(height0 / z0) * speed0
+    else: # law == 'hellmann'
+        return np.power(tgt_height / height0, alpha) * speed0
+
+def windExtrapolation(wind_file, tgt_height, law='logarithmic', replace=False, spread=None):
     if tgt_height < 60:
         return False
     if not os.path.exists(wind_file):
@@ -430,13 +511,16 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
             return False
         else:
             return None
+    if not replace:
+        key = (wind_file, os.stat(wind_file).st_mtime_ns, tgt_height, law.lower()[0], spread)
+        if key in wind_extrapolations:
+            return wind_extrapolations[key]
     tf = open(wind_file, 'r')
     lines = tf.readlines()
     tf.close()
     fst_row = 5
     units = lines[3].rstrip(',\n').split(',')
     hghts = lines[4].rstrip(',\n').split(',')
-    col = -1
     heights_ms = []
     heights_dirn = []
     for j in range(len(units)):
@@ -452,9 +536,6 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
                      return None
         elif units[j] == 'degrees':
              heights_dirn.append([int(hghts[j]), j])
-    lines[2] = lines[2].rstrip(',\n') + ',Direction,Speed\n'
-    lines[3] = lines[3].rstrip(',\n') + ',degrees,m/s\n'
-    lines[4] = lines[4].rstrip(',\n') + ',' + str(tgt_height) + ',' + str(tgt_height) + '\n'
     heights_ms.sort(key=lambda x: x[0], reverse=True)
     heights_dirn.sort(key=lambda x: x[0], reverse=True)
     height = float(heights_ms[0][0])
@@ -467,30 +548,31 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
             return None
     col0 = heights_ms[1][1]
     cold = heights_dirn[0][1]
+    rows = [line.rstrip(',\n').split(',') for line in lines[fst_row:]]
+    speed = np.array([float(bits[col]) for bits in rows])
+    speed0 = np.array([float(bits[col0]) for bits in rows])
+    speeds = windSpeeds(speed, speed0, height, height0, tgt_height, law=law, wind_file=wind_file)
+    wind = {'lines': lines, 'rows': rows, 'cold': cold, 'speeds': speeds}
+    if not replace:
+        if len(wind_extrapolations) >= wind_extrapolations_max:
+            del wind_extrapolations[next(iter(wind_extrapolations))]
+        wind_extrapolations[key] = wind
+    return wind
+
+def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spread=None):
+    wind = windExtrapolation(wind_file, tgt_height, law=law, replace=replace, spread=spread)
+    if not isinstance(wind, dict):
+        return wind
+    fst_row = 5
+    lines = wind['lines'][:]
+    lines[2] = lines[2].rstrip(',\n') + ',Direction,Speed\n'
+    lines[3] = lines[3].rstrip(',\n') + ',degrees,m/s\n'
+    lines[4] = lines[4].rstrip(',\n') + ',' + str(tgt_height) + ',' + str(tgt_height) + '\n'
+    cold = wind['cold']
+    speeds = wind['speeds'].tolist()
     for i in range(fst_row, len(lines)):
-        bits = lines[i].rstrip(',\n').split(',')
-        speed = float(bits[col])
-        speed0 = float(bits[col0])
-        if speed0 >= speed:
-            alpha = 1. / 7. # one-seventh power law
-        else:
-         #   alpha = (math.log(speed)-math.log(speed0))/(math.log(height)-math.log(height0))
-            alpha = math.log(speed / speed0) / math.log(height / height0)
-        z0 = math.exp(((pow(height0, alpha) * math.log(height)) - pow(height, alpha) * math.log(height0)) \
-                      / ( pow(height0, alpha) - pow(height, alpha)))
-        # z1 = math.exp(((pow(height, alpha) * math.log(height0)) - pow(height0, alpha) * math.log(height)) \
-        #               / ( pow(height, alpha) - pow(height0, alpha)))
-        if z0 < 1e-308:
-            z0 = 0.03
-        elif z0 < 1e-302:
-            print('(311)', i, wind_file, z0)
-            z0 = 0.03
-        if law.lower()[0] == 'l': # law == 'logarithmic'
-            speedz = math.log(tgt_height / z0) / math.log(height0 / z0) * speed0
-            lines[i] = lines[i].strip() + ',' + bits[cold] + ',' + str(round(speedz, 4)) + '\n'
-        else: # law == 'hellmann'
-            speeda = pow(tgt_height / height0, alpha) * speed0
-            lines[i] = lines[i].strip() + ',' + bits[cold] + ',' + str(round(speeda, 4)) + '\n'
+        lines[i] = lines[i].strip() + ',' + wind['rows'][i - fst_row][cold] + ',' + \
+                   str(round(speeds[i - fst_row], 4)) + '\n'
     if replace:
         if os.path.exists(wind_file + '~'):
             os.remove(wind_file + '~')
@@ -502,16 +584,29 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
         return True
     else:
         return lines
-        array = [] # this doesn't work yet
-        for i in range(4):
-            bits = lines[i].split(',')
-            array.append(bits)
-        for i in range(fst_row, len(lines)):
-            bits = lines[i].split(',')
-            for j in range(len(bits)):
-                bits[j] = float(bits[j])
-            array.append(bits)
-        return array
+
+# extrapolated wind data in the form of the SAM wind_resource_data table
+def windResourceData(wind_file, tgt_height, law='logarithmic', spread=None):
+    wind = windExtrapolation(wind_file, tgt_height, law=law, spread=spread)
+    if not isinstance(wind, dict):
+        return None
+    codes = {'C': 1, 'atm': 2, 'm/s': 3, 'degrees': 4}
+    units = wind['lines'][3].rstrip(',\n').split(',')
+    hghts = wind['lines'][4].rstrip(',\n').split(',')
+    fields = []
+    for unit in units:
+        if unit not in codes:
+            return None
+        fields.append(codes[unit])
+    hdr = wind['lines'][0].rstrip(',\n').split(',')
+    ncols = len(fields)
+    data = np.empty((len(wind['rows']), ncols + 2))
+    data[:, :ncols] = np.array([bits[:ncols] for bits in wind['rows']], dtype=np.float64)
+    data[:, ncols] = data[:, wind['cold']]
+    data[:, ncols + 1] = np.round(wind['speeds'], 4)
+    return {'lat': float(hdr[5]), 'lon': float(hdr[6]), 'elev': float(hdr[7]),
+            'heights': [float(h) for h in hghts] + [float(tgt_height)] * 2,
+            'fields': fields + [4, 3], 'data': data.tolist()}
 
 # split a string
 def strSplit(string, char=',', dropquote=True):
@@ -24,10 +24,10 @@ import os
 import sys
 from math import radians, cos, sin, asin, sqrt, pow
 
-import configparser   # decode .ini file
 
+from geoindex import GeoIndex
 from getmodels import getModelFile
-from senutils import getParents, getUser, techClean, WorkBook
+from senutils import getConfig, techClean, WorkBook
 
 def within_map(y, x, poly):
     n = len(poly)
@@ -45,6 +45,9 @@ def within_map(y, x, poly):
         p1y, p1x = p2y, p2x
     return inside
 
+def isFossil(station):
+    return station.technology[:6] == 'Fossil'
+
 
 class Station:
     def __init__(self, name, technology, lat, lon, capacity, turbine, rotor, no_turbines, area, scenario,
@@ -86,7 +89,6 @@ class Station:
 
 class Stations:
     def get_config(self):
-        config = configparser.RawConfigParser()
         if __name__ == '__main__':
             for i in range(1, len(sys.argv)):
                 if sys.argv[i][-4:] == '.ini':
@@ -97,49 +99,25 @@ class Stations:
                 config_file = sys.argv[1]
             else:
                 config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
-        try:
-            self.base_year = config.get('Base', 'year')
-        except:
-            self.base_year = '2012'
-        parents = []
-        try:
-            parents = getParents(config.items('Parents'))
-        except:
-            pass
+        config = getConfig(config_file)
+        self.base_year = config.base_year
         try:
-            self.sam_file = config.get('Files', 'sam_turbines')
-            for key, value in parents:
-                self.sam_file = self.sam_file.replace(key, value)
-            self.sam_file = self.sam_file.replace('$USER$', getUser())
-            self.sam_file = self.sam_file.replace('$YEAR$', self.base_year)
+            self.sam_file = config.getFile('Files', 'sam_turbines')
         except:
             self.sam_file = ''
         try:
-            self.pow_dir = config.get('Files', 'pow_files')
-            for key, value in parents:
-                self.pow_dir = self.pow_dir.replace(key, value)
-            self.pow_dir = self.pow_dir.replace('$USER$', getUser())
-            self.pow_dir = self.pow_dir.replace('$YEAR$', self.base_year)
+            self.pow_dir = config.getFile('Files', 'pow_files')
         except:
             self.pow_dir = ''
         self.fac_files = []
         try:
-            fac_file = config.get('Files', 'grid_stations')
-            for key, value in parents:
-                fac_file = fac_file.replace(key, value)
-            fac_file = fac_file.replace('$USER$', getUser())
-            fac_file = fac_file.replace('$YEAR$', self.base_year)
+            fac_file = config.getFile('Files', 'grid_stations')
             self.fac_files.append(fac_file)
         except:
             pass
         if self.stations2:
             try:
-                fac_file = config.get('Files', 'grid_stations2')
-                for key, value in parents:
-                    fac_file = fac_file.replace(key, value)
-                fac_file = fac_file.replace('$USER$', getUser())
-                fac_file = fac_file.replace('$YEAR$', self.base_year)
+                fac_file = config.getFile('Files', 'grid_stations2')
                 self.fac_files.append(fac_file)
             except:
                 pass
@@ -157,10 +135,7 @@ class Stations:
             for item in technologies.split():
                 itm = techClean(item)
                 self.technologies.append(itm)
-                try:
-                    self.areas[itm] = float(config.get(itm, 'area'))
-                except:
-                    self.areas[itm] = 0.
+                self.areas[itm] = config.getNumber(itm, 'area', 0.)
         except:
             pass
         self.tech_missing = []
@@ -174,10 +149,7 @@ class Stations:
             technologies = config.get('Power', 'fossil_technologies')
             for item in technologies.split():
                 itm = techClean(item)
-                try:
-                    self.areas[itm] = float(config.get(itm, 'area'))
-                except:
-                    self.areas[itm] = 0.
+                self.areas[itm] = config.getNumber(itm, 'area', 0.)
         except:
             pass
         try:
@@ -231,6 +203,7 @@ class Stations:
             self.stations in locals()
         except:
             self.stations = []
+        self.index = GeoIndex(self.stations, skip=isFossil)
         if not existing:
             return
         if os.path.exists(self.sam_file):
@@ -571,40 +544,34 @@ class Stations:
     def Nearest(self, lat, lon, distance=False, fossil=False, ignore=None):
         hdr = ''
         distnce = 999999
-        for station in self.stations:
-            if station.technology[:6] == 'Fossil' and not fossil:
-                continue
+        for i in self.index.nearest(lat, lon, skip=not fossil, ignore=ignore):
+            station = self.stations[i]
             dist = self.haversine(lat, lon, station.lat, station.lon)
             if dist < distnce:
-                if ignore is not None and ignore == station.name:
-                    continue
                 hdr = station.name
                 distnce = dist
-        for station in self.stations:
-            if station.name == hdr:
-                if distance:
-                    return station, distnce
-                else:
-                    return station
+        station = self.index.get(hdr, check=False)
+        if station is not None:
+            if distance:
+                return station, distnce
+            else:
+                return station
         return None
 
     def Stn_Location(self, name):
-        for station in self.stations:
-            if station.name == name:
-                return str(station.lat) + ' ' + str(station.lon)
+        station = self.index.get(name)
+        if station is not None:
+            return str(station.lat) + ' ' + str(station.lon)
         return ''
 
     def Stn_Turbine(self, name):
-        for station in self.stations:
-            if station.name == name:
-                return station.turbine
+        station = self.index.get(name)
+        if station is not None:
+            return station.turbine
         return ''
 
     def Get_Station(self, name):
-        for station in self.stations:
-            if station.name == name:
-                return station
-        return None
+        return self.index.get(name)
 
     def Description(self):
         return self.description
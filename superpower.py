@@ -21,24 +21,54 @@
 
 from math import asin, ceil, cos, fabs, pow, radians, sin, sqrt, floor
 import csv
+import multiprocessing
 import os
 import sys
 import ssc
 import time
 
-import configparser  # decode .ini file
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from getmodels import getModelFile
-from senutils import getParents, getUser, techClean, extrapolateWind, WorkBook
+from powercache import fileStamp, getPowerCache
+from resourcestore import folderStores, listResources, readLines, resourceFile, sourceFile
+from senutils import getConfig, getParents, getUser, techClean, extrapolateWind, windResourceData, WorkBook
 from powerclasses import *
 # import Station
 from turbine import Turbine
 
 import tempfile # for wind extrapolate
+import numpy as np
+from geoindex import cKDTree, unitVectors
 
 the_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
+# SAM runs for stations in worker processes. Each worker has its own
+# SuperPower (and SSC data) and sends back its status messages to be
+# logged, in station order, by the main process
+sam_power = None
+
+class LogStatus():
+    def __init__(self):
+        self.messages = []
+
+    def log(self, text):
+        self.messages.append(['log', text])
+
+    def log2(self, text):
+        self.messages.append(['log2', text])
+
+def initSamPower(plots, year):
+    global sam_power
+    sam_power = SuperPower([], plots, False, year=year, status=LogStatus())
+
+def samStationPower(station):
+    sam_power.status.messages = []
+    power = sam_power.getStationPower(station)
+    if power is not None:
+        power = list(power)
+    return power, sam_power.status.messages
+
 class SuperPower():
     log = QtCore.pyqtSignal()
     log2 = QtCore.pyqtSignal()
@@ -63,9 +93,7 @@ class SuperPower():
         km = 6367 * c
         return km
 
-    def find_closest(self, latitude, longitude, wind=False):
-        dist = 99999
-        closest = ''
+    def closestIndex(self, wind=False):
         if wind:
             filetype = ['.srw']
             technology = 'wind_index'
@@ -77,28 +105,41 @@ class SuperPower():
             index_file = self.solar_index
             folder = self.solar_files
         if index_file == '':
-            fils = os.listdir(folder)
-            for fil in fils:
+            stamp_file = folder
+        else:
+            stamp_file = index_file
+            if not os.path.exists(stamp_file):
+                stamp_file = folder + '/' + index_file
+        try:
+            stamp = [stamp_file, os.stat(stamp_file).st_mtime_ns]
+        except:
+            stamp = [stamp_file, None]
+        if index_file == '' and stamp[1] is not None:   # and any resource stores there
+            stamp += [store.stamp for store in folderStores(folder).values()]
+        # weather files are only read again if the folder or index changes
+        if technology in self.closest_index and self.closest_index[technology]['stamp'] == stamp:
+            return self.closest_index[technology]
+        lats = []
+        lons = []
+        fils = []
+        if stamp[1] is None:
+            pass
+        elif index_file == '':
+            for fil in listResources(folder):
                 if fil[-4:] in filetype:
                     bit = fil.split('_')
                     if bit[-1][:4] == self.base_year:
-                        dist1 = self.haversine(float(bit[-3]), float(bit[-2]), latitude, longitude)
-                        if dist1 < dist:
-                            closest = fil
-                            dist = dist1
+                        try:
+                            lat = float(bit[-3])
+                            lon = float(bit[-2])
+                        except:
+                            continue
+                        lats.append(lat)
+                        lons.append(lon)
+                        fils.append(fil)
         else:
-            fils = []
-            if self.default_files[technology] is None:
-                dft_file = index_file
-                if os.path.exists(dft_file):
-                    pass
-                else:
-                    dft_file = folder + '/' + index_file
-                if os.path.exists(dft_file):
-                    self.default_files[technology] = WorkBook()
-                    self.default_files[technology].open_workbook(dft_file, )
-                else:
-                    return closest
+            self.default_files[technology] = WorkBook()
+            self.default_files[technology].open_workbook(stamp_file)
             var = {}
             worksheet = self.default_files[technology].sheet_by_index(0)
             num_rows = worksheet.nrows - 1
@@ -111,15 +152,53 @@ class SuperPower():
             curr_row = 0
             while curr_row < num_rows:
                 curr_row += 1
-                lat = worksheet.cell_value(curr_row, var['Latitude'])
-                lon = worksheet.cell_value(curr_row, var['Longitude'])
-                fil = worksheet.cell_value(curr_row, var['Filename'])
-                fils.append([lat, lon, fil])
-            for fil in fils:
-                dist1 = self.haversine(fil[0], fil[1], latitude, longitude)
-                if dist1 < dist:
-                    closest = fil[2]
-                    dist = dist1
+                lats.append(float(worksheet.cell_value(curr_row, var['Latitude'])))
+                lons.append(float(worksheet.cell_value(curr_row, var['Longitude'])))
+                fils.append(worksheet.cell_value(curr_row, var['Filename']))
+        index = {'stamp': stamp, 'files': fils, 'closest': {}, 'tree': None,
+                 'lat': np.radians(np.array(lats, dtype=np.float64)),
+                 'lon': np.radians(np.array(lons, dtype=np.float64))}
+        if cKDTree is not None and len(fils) > 0:
+            try: # nearest by chord on the unit sphere is nearest by great circle
+                index['tree'] = cKDTree(unitVectors(index['lat'], index['lon']))
+            except:
+                pass
+        self.closest_index[technology] = index
+        return index
+
+    def find_closest_all(self, latitudes, longitudes, wind=False):
+        index = self.closestIndex(wind=wind)
+        closest = [''] * len(latitudes)
+        if len(index['files']) == 0:
+            return closest
+        to_do = []
+        for i in range(len(latitudes)):
+            locn = (latitudes[i], longitudes[i])
+            if locn in index['closest']:
+                closest[i] = index['closest'][locn]
+            else:
+                to_do.append(i)
+        if len(to_do) == 0:
+            return closest
+        lat2 = np.radians(np.array([latitudes[i] for i in to_do], dtype=np.float64))
+        lon2 = np.radians(np.array([longitudes[i] for i in to_do], dtype=np.float64))
+        if index['tree'] is not None:
+            nearest = index['tree'].query(unitVectors(lat2, lon2))[1]
+        else:
+            nearest = []
+            for j in range(len(to_do)):
+                # haversine formula as in self.haversine()
+                a = np.sin((lat2[j] - index['lat']) / 2)**2 + np.cos(index['lat']) * np.cos(lat2[j]) * \
+                    np.sin((lon2[j] - index['lon']) / 2)**2
+                nearest.append(int(np.argmin(a)))
+        for j in range(len(to_do)):
+            i = to_do[j]
+            closest[i] = index['files'][int(nearest[j])]
+            index['closest'][(latitudes[i], longitudes[i])] = closest[i]
+        return closest
+
+    def find_closest(self, latitude, longitude, wind=False):
+        closest = self.find_closest_all([latitude], [longitude], wind=wind)[0]
         if __name__ == '__main__':
             print(closest)
         return closest
@@ -223,15 +302,16 @@ class SuperPower():
         self.stations = stations
         self.plots = plots
         self.power_summary = []
+        self.closest_index = {}
         self.selected = selected
         self.status = status
         self.progress = progress
-        config = configparser.RawConfigParser()
         if len(sys.argv) > 1:
             config_file = sys.argv[1]
         else:
             config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
+        config = getConfig(config_file)
+        self.config_file = config_file
         self.expert = False
         try:
             expert = config.get('Base', 'expert_mode')
@@ -546,6 +626,14 @@ class SuperPower():
                 self.debug = True
         except:
             pass
+        self.sam_workers = 1
+        try:
+            self.sam_workers = int(config.get('Power', 'sam_workers'))
+            if self.sam_workers <= 0:
+                self.sam_workers = os.cpu_count()
+        except:
+            pass
+        self.power_cache = getPowerCache(config_file)
         self.gen_pct = None
         ssc_api = ssc.API()
 # to supress messages
@@ -597,6 +685,22 @@ class SuperPower():
               and not self.plots['actual']:
                 continue
             to_do.append(st)
+        try: # look up weather files for all stations at once
+            for wind in [False, True]:
+                stns = []
+                for st in to_do:
+                    stn = self.stations[st]
+                    if stn.technology[:6] == 'Fossil' or stn.technology == 'Hydro':
+                        continue
+                    if wind and ('Wind' in stn.technology or stn.technology == 'Wave' \
+                      or stn.technology[:5] == 'Other'):
+                        stns.append(stn)
+                    elif not wind and 'Wind' not in stn.technology and stn.technology != 'Wave':
+                        stns.append(stn)
+                if len(stns) > 0:
+                    self.find_closest_all([stn.lat for stn in stns], [stn.lon for stn in stns], wind=wind)
+        except:
+            pass
         show_progress = False
         if self.show_progress:
             if self.progress_bar == 0:
@@ -605,6 +709,17 @@ class SuperPower():
             elif len(to_do) >= self.progress_bar:
                 show_progress = True
                 self.progress.barRange(0, len(to_do))
+        pool = None
+        results = None
+        if self.sam_workers is not None and self.sam_workers > 1 and len(to_do) > 1:
+            try: # spawn so workers don't inherit the GUI
+                pool = multiprocessing.get_context('spawn').Pool(min(self.sam_workers, len(to_do)),
+                       initializer=initSamPower, initargs=(self.plots, self.base_year))
+                results = pool.imap(samStationPower, [self.stations[st] for st in to_do])
+            except Exception as err:
+                if self.status:
+                    self.status.log('SAM processes not started - ' + str(err))
+                pool = None
         for st in range(len(to_do)):
   #      for st in range(len(self.stations)):
             stn = self.stations[to_do[st]]
@@ -616,6 +731,18 @@ class SuperPower():
                         break
                 except:
                     break
+            if results is not None: # results come back in station order
+                try:
+                    station_power, messages = next(results)
+                    if self.status:
+                        for method, text in messages:
+                            getattr(self.status, method)(text)
+                except Exception as err:
+                    if self.status:
+                        self.status.log('SAM processes failed - ' + str(err))
+                    pool.terminate()
+                    pool = None
+                    results = None
             if stn.technology[:6] == 'Fossil' and not self.plots['actual']:
                 continue
             if self.plots['by_station']:
@@ -658,7 +785,10 @@ class SuperPower():
                 self.stn_pows.append([])
             if self.plots['save_zone']:
                 self.stn_zone.append(stn.zone)
-            power = self.getStationPower(stn)
+            if results is None:
+                power = self.getStationPower(stn)
+            else:
+                power = station_power
             total_power = 0.
             total_energy = 0.
             if power is None:
@@ -692,47 +822,58 @@ class SuperPower():
             if self.plots['save_zone']:
                 pt.zone = stn.zone
             self.power_summary.append(pt)
+        if pool is not None:
+            pool.terminate()
         if show_progress:
             self.progress.barProgress(-1)
 
-    def getStationPower(self, station):
-        def do_module(modname, station, field):
-            if self.debug and self.status:
-                do_time = True
-                clock_start = time.time()
-            else:
-                do_time = False
-            module = ssc.Module(modname.encode('utf-8'))
-            if do_time:
-                time2 = time.time() - clock_start
-                self.status.log('Load (%.6f seconds)' % (time2))
-            if (module.exec_(self.data)):
-                if do_time:
-                    time3 = time.time() - clock_start - time2
-                    self.status.log('Execute (%.6f seconds)' % (time3))
-                if self.debug:
-                    self.debug_sam(station.name, station.technology, module, self.data, self.status)
-                farmpwr = self.data.get_array(field.encode('utf-8'))
-                if do_time:
-                    time4 = time.time() - clock_start - time2 - time3
-                    self.status.log('Get data (%.6f seconds)' % (time4))
-                del module
-                return farmpwr
-            else:
-                if self.status:
-                   self.status.log('Errors encountered processing ' + station.name)
-                idx = 0
-                msg = module.log(idx)
-                while (msg is not None):
-                    if self.status:
-                       self.status.log(modname + ' error [' + str(idx) + ']: ' + msg.decode())
-                    else:
-                        print(modname + ' error [', idx, ' ]: ', msg.decode())
-                    idx += 1
-                    msg = module.log(idx)
-                del module
+    def powerCacheKey(self, station):
+        parts = []
+        try:
+            ssc_api = ssc.API()
+            parts.append([ssc_api.version(), ssc_api.build_info().decode()])
+        except:
+            return None
+        for attr in ['technology', 'lat', 'lon', 'capacity', 'turbine', 'rotor', 'no_turbines', 'area',
+                     'scenario', 'direction', 'hub_height', 'storage_hours', 'tilt']:
+            parts.append(getattr(station, attr, None))
+        for attr in ['base_year', 'biomass_multiplier', 'geo_res', 'pv_dc_ac_ratio', 'pv_losses',
+                     'wave_cutout', 'wave_efficiency', 'wind_turbine_spacing', 'wind_row_spacing',
+                     'wind_offset_spacing', 'wind_farm_losses_percent', 'wind_hub_formula',
+                     'wind_hub_spread', 'wind_law', 'st_gross_net', 'st_tshours', 'st_volume',
+                     'cst_gross_net', 'cst_tshours', 'hydro_cf']:
+            parts.append(getattr(self, attr, None))
+        if 'Wind' in station.technology:
+            turbine = Turbine(station.turbine)
+            if not hasattr(turbine, 'capacity'):
                 return None
+            parts.append([turbine.capacity, turbine.rotor, turbine.cutin, turbine.speeds, turbine.powers])
+        if 'Wind' in station.technology or station.technology == 'Wave' \
+          or station.technology[:5] == 'Other':
+            parts.append(fileStamp(sourceFile(self.wind_files, self.find_closest(station.lat, station.lon, wind=True))))
+        if 'Wind' not in station.technology and station.technology not in ['Hydro', 'Wave']:
+            parts.append(fileStamp(sourceFile(self.solar_files, self.find_closest(station.lat, station.lon))))
+        if 'PV' in station.technology:
+            technology = 'PV'
+        elif 'Wind' in station.technology:
+            technology = 'Wind'
+        else:
+            technology = station.technology
+        if technology in self.defaults and self.defaults[technology] is not None:
+            parts.append(fileStamp(self.variable_files + '/' + self.defaults[technology]))
+        if station.technology in ['CST', 'Solar Thermal']:
+            for tech in ['optical_table', 'helio_positions']:
+                if tech in self.default_files and self.default_files[tech] is not None:
+                    parts.append(fileStamp(self.variable_files + '/' + self.default_files[tech]))
+        if station.technology[:5] == 'Other':
+            config = getConfig(self.config_file)
+            try:
+                parts.append(config.items(station.technology))
+            except:
+                pass
+        return self.power_cache.key(*parts)
 
+    def getStationPower(self, station):
         if self.plots['actual'] and self.actual_power != '':
             if self.default_files['actual'] is None:
                 if os.path.exists(self.scenarios + self.actual_power):
@@ -771,6 +912,62 @@ class SuperPower():
                 return farmpwr
         if station.capacity == 0:
             return None
+        cache_key = None
+        if self.power_cache is not None:
+            try:
+                cache_key = self.powerCacheKey(station)
+            except:
+                pass
+            if cache_key is not None:
+                farmpwr = self.power_cache.get(cache_key)
+                if farmpwr is not None:
+                    if self.status:
+                        self.status.log('Cached ' + station.name + ' (' + station.technology + ')')
+                    return farmpwr
+                farmpwr = self.getSamPower(station)
+                if farmpwr is not None and len(farmpwr) > 0:
+                    self.power_cache.put(cache_key, farmpwr)
+                return farmpwr
+        return self.getSamPower(station)
+
+    def getSamPower(self, station):
+        def do_module(modname, station, field):
+            if self.debug and self.status:
+                do_time = True
+                clock_start = time.time()
+            else:
+                do_time = False
+            module = ssc.Module(modname.encode('utf-8'))
+            if do_time:
+                time2 = time.time() - clock_start
+                self.status.log('Load (%.6f seconds)' % (time2))
+            if (module.exec_(self.data)):
+                if do_time:
+                    time3 = time.time() - clock_start - time2
+                    self.status.log('Execute (%.6f seconds)' % (time3))
+                if self.debug:
+                    self.debug_sam(station.name, station.technology, module, self.data, self.status)
+                farmpwr = self.data.get_array(field.encode('utf-8'))
+                if do_time:
+                    time4 = time.time() - clock_start - time2 - time3
+                    self.status.log('Get data (%.6f seconds)' % (time4))
+                del module
+                return farmpwr
+            else:
+                if self.status:
+                   self.status.log('Errors encountered processing ' + station.name)
+                idx = 0
+                msg = module.log(idx)
+                while (msg is not None):
+                    if self.status:
+                       self.status.log(modname + ' error [' + str(idx) + ']: ' + msg.decode())
+                    else:
+                        print(modname + ' error [', idx, ' ]: ', msg.decode())
+                    idx += 1
+                    msg = module.log(idx)
+                del module
+                return None
+
         if self.status:
             self.status.log('Processing ' + station.name + ' (' + station.technology + ')')
             QtWidgets.QApplication.processEvents()
@@ -786,7 +983,7 @@ class SuperPower():
             turbine = Turbine(station.turbine)
             if not hasattr(turbine, 'capacity'):
                 return None
-            wind_file = self.wind_files + '/' + closest
+            wind_file = resourceFile(self.wind_files, closest)
             hub_hght = 0
             if self.wind_hub_formula[wtyp] is not None: # if a hub height is specified
                 formula = self.wind_hub_formula[wtyp].replace('rotor', str(turbine.rotor))
@@ -795,21 +992,34 @@ class SuperPower():
                 except:
                     pass
             temp_file = None
+            wind_table = None
             if hub_hght > 0: # if a hub height is specified
-                try:
-                    wind_data = extrapolateWind(self.wind_files + '/' + closest, hub_hght, law=self.wind_law[wtyp],
-                                spread=self.wind_hub_spread[wtyp])
-                    if wind_data is not None:
-                        temp_dir = tempfile.gettempdir()
-                        temp_file = 'windfile.srw'
-                        wf = open(temp_dir + '/' + temp_file, 'w')
-                        for line in wind_data:
-                            wf.write(line)
-                        wf.close()
-                        wind_file = temp_dir + '/' + temp_file
+                try: # pass extrapolated data to SAM as arrays if possible
+                    if ssc.API().version() >= 209:
+                        wind_table = windResourceData(wind_file, hub_hght,
+                                     law=self.wind_law[wtyp], spread=self.wind_hub_spread[wtyp])
+                    if wind_table is None:
+                        wind_data = extrapolateWind(wind_file, hub_hght, law=self.wind_law[wtyp],
+                                    spread=self.wind_hub_spread[wtyp])
+                        if wind_data:
+                            tf, temp_file = tempfile.mkstemp(suffix='.srw', prefix='windfile')
+                            wf = os.fdopen(tf, 'w')
+                            for line in wind_data:
+                                wf.write(line)
+                            wf.close()
+                            wind_file = temp_file
                 except:
-                    pass
-            self.data.set_string(b'wind_resource_filename', wind_file.encode('utf-8'))
+                    wind_table = None
+            if wind_table is not None:
+                table = ssc.Data()
+                for key in ['lat', 'lon', 'elev']:
+                    table.set_number(key.encode('utf-8'), wind_table[key])
+                table.set_array(b'heights', wind_table['heights'])
+                table.set_array(b'fields', wind_table['fields'])
+                table.set_matrix(b'data', wind_table['data'])
+                self.data.set_table(b'wind_resource_data', table.get_data_handle())
+            else:
+                self.data.set_string(b'wind_resource_filename', wind_file.encode('utf-8'))
             no_turbines = int(station.no_turbines)
             if station.scenario == 'Existing' and (no_turbines * turbine.capacity) != (station.capacity * 1000):
                 loss = round(1. - (station.capacity * 1000) / (no_turbines * turbine.capacity), 2)
@@ -853,14 +1063,14 @@ class SuperPower():
             farmpwr = do_module('windpower', station, 'gen')
             if temp_file is not None: # if a hub height is specified
                 try:
-                    os.remove(temp_dir + '/' + temp_file)
+                    os.remove(temp_file)
                 except:
                     pass
             return farmpwr
         elif station.technology == 'CST':
             closest = self.find_closest(station.lat, station.lon)
             base_capacity = 104.
-            self.data.set_string(b'file_name', (self.solar_files + '/' + closest).encode('utf-8'))
+            self.data.set_string(b'file_name', resourceFile(self.solar_files, closest).encode('utf-8'))
             self.data.set_number(b'system_capacity', int(base_capacity * 1000))
             self.data.set_number(b'w_des', base_capacity / self.cst_gross_net)
             self.data.set_number(b'latitude', station.lat)
@@ -902,7 +1112,7 @@ class SuperPower():
         elif station.technology == 'Solar Thermal':
             closest = self.find_closest(station.lat, station.lon)
             base_capacity = 104
-            self.data.set_string(b'solar_resource_file', (self.solar_files + '/' + closest).encode('utf-8'))
+            self.data.set_string(b'solar_resource_file', resourceFile(self.solar_files, closest).encode('utf-8'))
             self.data.set_number(b'system_capacity', base_capacity * 1000)
             self.data.set_number(b'P_ref', base_capacity / self.st_gross_net)
             if station.storage_hours is None:
@@ -953,7 +1163,7 @@ class SuperPower():
             return farmpwr
         elif 'PV' in station.technology:
             closest = self.find_closest(station.lat, station.lon)
-            self.data.set_string(b'solar_resource_file', (self.solar_files + '/' + closest).encode('utf-8'))
+            self.data.set_string(b'solar_resource_file', resourceFile(self.solar_files, closest).encode('utf-8'))
             dc_ac_ratio = self.pv_dc_ac_ratio[0]
             if station.technology[:5] == 'Fixed':
                 dc_ac_ratio = self.pv_dc_ac_ratio[0]
@@ -999,7 +1209,7 @@ class SuperPower():
             return farmpwr
         elif station.technology == 'Biomass':
             closest = self.find_closest(station.lat, station.lon)
-            self.data.set_string(b'file_name', (self.solar_files + '/' + closest).encode('utf-8'))
+            self.data.set_string(b'file_name', resourceFile(self.solar_files, closest).encode('utf-8'))
             self.data.set_number(b'system_capacity', station.capacity * 1000)
             self.data.set_number(b'biopwr.plant.nameplate', station.capacity * 1000)
             feedstock = station.capacity * 1000 * self.biomass_multiplier
@@ -1012,7 +1222,7 @@ class SuperPower():
             return farmpwr
         elif station.technology == 'Geothermal':
             closest = self.find_closest(station.lat, station.lon)
-            self.data.set_string(b'file_name', (self.solar_files + '/' + closest).encode('utf-8'))
+            self.data.set_string(b'file_name', resourceFile(self.solar_files, closest).encode('utf-8'))
             self.data.set_number(b'nameplate', station.capacity * 1000)
             self.data.set_number(b'resource_potential', station.capacity * 10.)
             self.data.set_number(b'resource_type', self.geo_res)
@@ -1034,9 +1244,7 @@ class SuperPower():
             return farmpwr
         elif station.technology == 'Wave':   # fudge Wave using 10m wind speed
             closest = self.find_closest(station.lat, station.lon)
-            tf = open(self.solar_files + '/' + closest, 'r')
-            lines = tf.readlines()
-            tf.close()
+            lines = readLines(self.solar_files, closest)
             fst_row = len(lines) - 8760
             wnd_col = 4
             for i in range(fst_row, len(lines)):
@@ -1056,12 +1264,11 @@ class SuperPower():
                         farmpwr.append(pwr)
             return farmpwr
         elif station.technology[:5] == 'Other':
-            config = configparser.RawConfigParser()
             if len(sys.argv) > 1:
                 config_file = sys.argv[1]
             else:
                 config_file = getModelFile('SIREN.ini')
-            config.read(config_file)
+            config = getConfig(config_file)
             props = []
             propty = {}
             wnd50 = False
@@ -1070,9 +1277,7 @@ class SuperPower():
                 for key, value in props:
                     propty[key] = value
                 closest = self.find_closest(station.lat, station.lon)
-                tf = open(self.solar_files + '/' + closest, 'r')
-                lines = tf.readlines()
-                tf.close()
+                lines = readLines(self.solar_files, closest)
                 fst_row = len(lines) - 8760
                 if closest[-4:] == '.smw':
                     dhi_col = 9
@@ -1106,9 +1311,7 @@ class SuperPower():
                 propty['formula'] = formula
                 if formula.find('wind50') >= 0:
                     closest = self.find_closest(station.lat, station.lon, wind=True)
-                    tf = open(self.wind_files + '/' + closest, 'r')
-                    wlines = tf.readlines()
-                    tf.close()
+                    wlines = readLines(self.wind_files, closest)
                     if closest[-4:] == '.srw':
                         units = wlines[3].strip().split(',')
                         heights = wlines[4].strip().split(',')
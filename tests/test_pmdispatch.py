@@ -0,0 +1,220 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2024 Sustainable Energy Now Inc., Angus King
+#
+#  test_pmdispatch.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+#  The storage recurrence (storageKernel, as Python and compiled by Numba, and
+#  storageDispatchBatch) against the storage loop Powermatch's doDispatch had
+#  before it was moved to pmdispatch
+#
+
+import os
+import sys
+import random
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pmdispatch
+
+
+def doDispatchStorage(shortfall, corr_src, storage, recharge, discharge, parasite, min_run_time,
+                      warm_time, initial):
+    # the storage loop from Powermatch doDispatch (not option D); shortfall and corr_src are
+    # lists updated in place. Returns storage_can, max. use, max. balance, losses and in_run
+    tot_sto_loss = 0.
+    corr_data = corr_src
+    in_run = [False, False]
+    in_run[0] = True # start off in_run
+    if min_run_time > 0 and initial == 0:
+        in_run[0] = False
+    storage_carry = storage[1] # self.generators[gen].initial
+    storage_bal = []
+    storage_can = 0.
+    use_max = [0, None]
+    sto_max = storage_carry
+    for row in range(8760):
+        storage_loss = 0.
+        storage_losses = 0.
+        if storage_carry > 0:
+            loss = storage_carry * parasite
+            # for later: record parasitic loss
+            storage_carry = storage_carry - loss
+            storage_losses -= loss
+        if shortfall[row] < 0:  # excess generation
+            if min_run_time > 0:
+                in_run[0] = False
+            if warm_time > 0:
+                in_run[1] = False
+            can_use = - (storage[0] - storage_carry) * (1 / (1 - recharge[1]))
+            if can_use < 0: # can use some
+                if shortfall[row] > can_use:
+                    can_use = shortfall[row]
+                if can_use < - recharge[0] * (1 / (1 - recharge[1])):
+                    can_use = - recharge[0]
+            else:
+                can_use = 0.
+            # for later: record recharge loss
+            storage_losses += can_use * recharge[1]
+            storage_carry -= (can_use * (1 - recharge[1]))
+            shortfall[row] -= can_use
+            if corr_data is not None:
+                corr_src[row] += can_use
+        else: # shortfall
+            if min_run_time > 0 and shortfall[row] > 0:
+                if not in_run[0]:
+                    if row + min_run_time <= 8759:
+                        for i in range(row + 1, row + min_run_time + 1):
+                            if shortfall[i] <= 0:
+                                break
+                        else:
+                            in_run[0] = True
+            if in_run[0]:
+                can_use = shortfall[row] * (1 / (1 - discharge[1]))
+                can_use = min(can_use, discharge[0])
+                if can_use > storage_carry - storage[2]:
+                    can_use = storage_carry - storage[2]
+                if warm_time > 0 and not in_run[1]:
+                    in_run[1] = True
+                    can_use = can_use * (1 - warm_time)
+            else:
+                can_use = 0
+            if can_use > 0:
+                storage_loss = can_use * discharge[1]
+                storage_losses -= storage_loss
+                storage_carry -= can_use
+                can_use = can_use - storage_loss
+                shortfall[row] -= can_use
+                if corr_data is not None:
+                    corr_src[row] += can_use
+                if storage_carry < 0:
+                    storage_carry = 0
+            else:
+                can_use = 0.
+        if can_use < 0:
+            if use_max[1] is None or can_use < use_max[1]:
+                use_max[1] = can_use
+        elif can_use > use_max[0]:
+            use_max[0] = can_use
+        storage_bal.append(storage_carry)
+        if storage_bal[-1] > sto_max:
+            sto_max = storage_bal[-1]
+        tot_sto_loss += storage_losses
+        if can_use > 0:
+            storage_can += can_use
+    return [storage_can, use_max[0], sto_max, tot_sto_loss], in_run
+
+
+def scenarios():
+    # storage facilities covering each of the options, with shortfalls for them
+    random.seed(6)
+    rng = np.random.default_rng(6)
+    cases = []
+    for parasite in [0., 0.01 / 24.]:
+        for losses in [[0., 0.], [0.1, 0.15]]:
+            for min_run_time in [0, 3, 6]:
+                for warm_time in [0., 0.25]:
+                    cap = random.uniform(500, 5000)
+                    initial = cap * random.choice([0, 0.5])
+                    storage = [cap, initial, cap * random.choice([0, 0.1]), cap]
+                    recharge = [cap * random.choice([0.1, 0.5, 1]), losses[0]]   # caps and no caps
+                    discharge = [cap * random.choice([0.1, 0.5, 1]), losses[1]]
+                    shortfall = rng.uniform(-1000, 1000, 8760)
+                    shortfall[rng.integers(0, 8700):][:60] = 0.   # neither shortfall nor excess
+                    shortfall[rng.integers(0, 8700):][:48] = np.abs(shortfall[:48])   # a long run
+                    start = 8760 - min_run_time - random.choice([0, 1])   # and runs to the end of the year
+                    shortfall[start - 1] = - abs(shortfall[start - 1])
+                    shortfall[start:] = np.abs(shortfall[start:])
+                    corr_src = rng.uniform(0, 1000, 8760)
+                    cases.append([shortfall, corr_src, storage, recharge, discharge, parasite,
+                                  min_run_time, warm_time, initial])
+    return cases
+
+CASES = scenarios()
+
+
+def kernelArgs(storage, recharge, discharge, parasite, min_run_time, warm_time, in_run):
+    # as runKernel passes them
+    return (float(storage[0]), float(storage[1]), float(storage[2]), float(recharge[0]), float(recharge[1]),
+            float(discharge[0]), float(discharge[1]), float(parasite), int(min_run_time), float(warm_time),
+            bool(in_run[0]), bool(in_run[1]))
+
+
+def startRun(case):
+    return [case[6] == 0 or case[8] > 0, False]
+
+
+@pytest.mark.parametrize('case', range(len(CASES)))
+@pytest.mark.parametrize('corr', [False, True])
+@pytest.mark.parametrize('compiled', [False, True])
+def test_storage_kernel(case, corr, compiled):
+    shortfall, corr_src, storage, recharge, discharge, parasite, min_run_time, warm_time, initial = CASES[case]
+    ref_sf = shortfall.tolist()
+    ref_cs = corr_src.tolist() if corr else None
+    want, want_run = doDispatchStorage(ref_sf, ref_cs, storage, recharge, discharge, parasite, min_run_time,
+                                       warm_time, initial)
+    args = kernelArgs(storage, recharge, discharge, parasite, min_run_time, warm_time, startRun(CASES[case]))
+    if compiled:
+        if pmdispatch.compiledKernel is None:
+            pytest.skip('Numba not available')
+        sf = shortfall.copy()
+        cs = corr_src.copy() if corr else np.zeros(0)
+        result = pmdispatch.compiledKernel(sf, cs, corr, *args)
+    else:
+        sf = shortfall.tolist()
+        cs = corr_src.tolist() if corr else []
+        result = pmdispatch.storageKernel(sf, cs, corr, *args)
+    assert list(result[:4]) == want
+    assert list(result[4:]) == want_run
+    assert list(sf) == ref_sf
+    if corr:
+        assert list(cs) == ref_cs
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_storage_dispatch_batch(compiled, monkeypatch):
+    # scenarios of a Batch stepped through together (or one at a time if compiled)
+    if compiled and pmdispatch.compiledKernel is None:
+        pytest.skip('Numba not available')
+    if not compiled:
+        monkeypatch.setattr(pmdispatch, 'compiledKernel', None)
+    rng = np.random.default_rng(8)
+    shortfall = rng.uniform(-1000, 1000, (5, 8760))
+    shortfall[2, 4000:4100] = 0.
+    corr_src = rng.uniform(0, 1000, (5, 8760))
+    caps = np.array([0., 800., 2000., 3500., 5000.])
+    storage = [caps, caps * 0.5, caps * 0.1, caps]
+    recharge = [caps * 0.5, 0.1]
+    discharge = [caps * 0.4, 0.15]
+    parasite = 0.01 / 24.
+    for min_run_time, warm_time in [[0, 0.], [4, 0.25]]:
+        sf = shortfall.copy()
+        cs = corr_src.copy()
+        in_run = [(storage[1] > 0) | (min_run_time == 0), False]
+        results = pmdispatch.storageDispatchBatch(sf, storage, recharge, discharge, parasite, min_run_time,
+                                                  warm_time, in_run, cs)
+        for n in range(len(caps)):
+            ref_sf = shortfall[n].tolist()
+            ref_cs = corr_src[n].tolist()
+            want, want_run = doDispatchStorage(ref_sf, ref_cs, [storage[0][n], storage[1][n], storage[2][n]],
+                             [recharge[0][n], recharge[1]], [discharge[0][n], discharge[1]], parasite,
+                             min_run_time, warm_time, storage[1][n])
+            assert np.allclose([results[i][n] for i in range(4)], want, rtol=1e-12, atol=1e-9)
+            assert np.allclose(sf[n], ref_sf, rtol=1e-12, atol=1e-9)
+            assert np.allclose(cs[n], ref_cs, rtol=1e-12, atol=1e-9)
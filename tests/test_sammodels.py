@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2015-2024 Sustainable Energy Now Inc., Angus King
+#
+#  test_sammodels.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+#  getDNIs and getDHIs (and their geometry) against getDNI and getDHI an hour at a time,
+#  with values of the types makeweatherfiles passes (numpy values from NetCDF files)
+#
+
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sammodels import getDNI, getDHI, getDNIs, getDHIs, getDNIGeometry, getDHIGeometry
+
+# latitude, longitude, time zone; the last three have hours where the sun doesn't rise or set
+SITES = [(-32.25, 115.75, 8), (-12.5, 130.75, 9.5), (0., 0., 0), (51.5, -0.25, 0),
+         (70.5, 25., 1), (-78., 166.5, 12), (89., -45., -3)]
+
+
+def scalars(ghi, press, hours, lat, lon, zone):
+    # getDNI and getDHI for each hour; None where getDNI overflows in exp()
+    dnis = []
+    dhis = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for g, p, h in zip(ghi, press, hours.tolist()):
+            try:
+                dni = getDNI(g, hour=h, lat=lat, lon=lon, press=p, zone=zone)
+            except OverflowError:
+                dnis.append(None)
+                dhis.append(None)
+                continue
+            dnis.append(dni)
+            dhis.append(getDHI(g, dni, hour=h, lat=lat))
+    return dnis, dhis
+
+
+def hourValues(dtype, seed):
+    # random hours with GHI up to beyond clear sky (and some very high) and pressures
+    rng = np.random.default_rng(seed)
+    hours = np.sort(rng.choice(np.arange(1, 8761), 1500, replace=False))
+    ghi = rng.uniform(-5., 1300., len(hours)) * rng.integers(0, 2, len(hours))
+    ghi[rng.integers(0, len(hours), 40)] = rng.uniform(3000., 20000., 40)
+    press = rng.uniform(850., 1040., len(hours))
+    return hours, ghi.astype(dtype), press.astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('site', SITES)
+def test_arrays_match_scalars(dtype, site):
+    lat, lon, zone = site
+    hours, ghi, press = hourValues(dtype, SITES.index(site))
+    if dtype == np.float32:   # as from ERA5 files
+        lat = np.float32(lat)
+        lon = np.float32(lon)
+    dni, dhi = scalars(list(ghi), list(press), hours, lat, lon, zone)
+    dnis = getDNIs(ghi, hours, lat, lon, press, zone)
+    dhis = getDHIs(ghi, dnis, hours, lat)
+    assert dnis.dtype == dtype
+    assert dhis.dtype == dtype
+    done = np.array([d is not None for d in dni])
+    dni = np.array([d if d is not None else 0. for d in dni], dtype=dtype)
+    dhi = np.array([d if d is not None else 0. for d in dhi], dtype=dtype)
+    if dtype == np.float32:
+        # same type at each step so the same value
+        assert np.array_equal(dnis[done], dni[done])
+        assert np.array_equal(dhis[done], dhi[done])
+    else:
+        # numpy's float64 exp, acos, etc. can differ from math's in the last place
+        assert np.allclose(dnis[done], dni[done], rtol=1e-9, atol=1e-9)
+        assert np.all(np.abs(dhis[done] - dhi[done]) <= 0.1 + 1e-9)
+        assert np.mean(dhis[done] == dhi[done]) > 0.999
+    # where getDNI overflows in exp() DNI is 0
+    assert np.all(dnis[~done] == 0.)
+
+
+def test_mixed_types():
+    # float32 GHI and pressure with float64 locations, as from MERRA-2 files
+    lat, lon, zone = np.float64(-32.5), np.float64(115.625), 8
+    hours, ghi, press = hourValues(np.float32, 11)
+    dni, dhi = scalars(list(ghi), list(press), hours, lat, lon, zone)
+    dnis = getDNIs(ghi, hours, lat, lon, press, zone)
+    dhis = getDHIs(ghi, dnis, hours, lat)
+    done = np.array([d is not None for d in dni])
+    assert np.array_equal(dnis[done], np.array([d for d in dni if d is not None], dtype=np.float32))
+    assert np.array_equal(dhis[done], np.array([d for d in dhi if d is not None], dtype=np.float32))
+
+
+@pytest.mark.parametrize('site', SITES)
+def test_whole_pressures(site):
+    # float32 GHI with whole number pressures, as solar point files round them (and a Python
+    # float pressure); the air mass stays a Python float in getDNI so the results are float32
+    lat, lon, zone = site
+    hours, ghi, press = hourValues(np.float32, 31 + SITES.index(site))
+    press = np.round(press.astype(np.float64)).astype(np.int64)
+    dni, dhi = scalars(list(ghi), press.tolist(), hours, np.float32(lat), np.float32(lon), zone)
+    dnis = getDNIs(ghi, hours, np.float32(lat), np.float32(lon), press, zone)
+    dhis = getDHIs(ghi, dnis, hours, np.float32(lat))
+    assert dnis.dtype == np.float32
+    done = np.array([d is not None for d in dni])
+    assert np.array_equal(dnis[done], np.array([d for d in dni if d is not None], dtype=np.float32))
+    assert np.array_equal(dhis[done], np.array([d for d in dhi if d is not None], dtype=np.float32))
+    dni, dhi = scalars(list(ghi), [1013.25] * len(ghi), hours, lat, lon, zone)
+    dnis = getDNIs(ghi, hours, lat, lon, 1013.25, zone)
+    done = np.array([d is not None for d in dni])
+    assert np.array_equal(dnis[done], np.array([d for d in dni if d is not None], dtype=np.float32))
+
+
+def test_overflow():
+    # GHI far beyond clear sky at noon; getDNI stops in exp() and getDNIs gives 0
+    hours = np.array([12, 36, 4000, 4012])
+    ghi = np.array([20000., 20000., 15000., 25000.])
+    with pytest.raises(OverflowError):
+        getDNI(float(ghi[0]), hour=12, lat=-32.25, lon=115.75, press=1000., zone=8)
+    for dtype in [np.float32, np.float64]:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            dnis = getDNIs(ghi.astype(dtype), hours, -32.25, 115.75, 1000., 8)
+        assert np.all(dnis == 0.)
+
+
+def test_geometry():
+    # geometry worked out once gives the same values as that worked out for each call
+    lat, lon, zone = SITES[0]
+    hours, ghi, press = hourValues(np.float64, 21)
+    dnis = getDNIs(ghi, hours, lat, lon, press, zone)
+    dhis = getDHIs(ghi, dnis, hours, lat)
+    assert np.array_equal(getDNIs(ghi, press=press, geometry=getDNIGeometry(hours, lat, lon, zone)), dnis)
+    assert np.array_equal(getDHIs(ghi, dnis, geometry=getDHIGeometry(hours, lat)), dhis)
+
+
+def test_extreme_latitudes():
+    # the sun doesn't rise or set on some days near the poles
+    hours = np.arange(1, 8761)
+    for lat in [70.5, -78., 89.]:
+        extreme = getDHIGeometry(hours, lat)['extreme']
+        assert extreme.any() and not extreme.all()
+    assert not getDHIGeometry(hours, -32.25)['extreme'].any()
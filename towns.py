@@ -19,13 +19,11 @@
 #  <http://www.gnu.org/licenses/>.
 #
 
-import configparser    # decode .ini file
 import os
-import sys
 from math import radians, cos, sin, asin, sqrt
 
-from getmodels import getModelFile
-from senutils import getParents, getUser, WorkBook
+from geoindex import GeoIndex
+from senutils import getConfig, WorkBook
 
 
 class Town:
@@ -45,35 +43,14 @@ class Town:
 
 class Towns:
     def get_config(self):
-        config = configparser.RawConfigParser()
-        if len(sys.argv) > 1:
-            config_file = sys.argv[1]
-        else:
-            config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
-        try:
-            self.base_year = config.get('Base', 'year')
-        except:
-            self.base_year = '2012'
-        parents = []
+        config = getConfig()
+        self.base_year = config.base_year
         try:
-            parents = getParents(config.items('Parents'))
-        except:
-            pass
-        try:
-            self.bom_file = config.get('Files', 'bom')
-            for key, value in parents:
-                self.bom_file = self.bom_file.replace(key, value)
-            self.bom_file = self.bom_file.replace('$USER$', getUser())
-            self.bom_file = self.bom_file.replace('$YEAR$', self.base_year)
+            self.bom_file = config.getFile('Files', 'bom')
         except:
             self.bom_file = ''
         try:
-            self.town_file = config.get('Files', 'towns')
-            for key, value in parents:
-                self.town_file = self.town_file.replace(key, value)
-            self.town_file = self.town_file.replace('$USER$', getUser())
-            self.town_file = self.town_file.replace('$YEAR$', self.base_year)
+            self.town_file = config.getFile('Files', 'towns')
         except:
             self.town_file = ''
 
@@ -202,6 +179,7 @@ class Towns:
 
         self.get_config()
         self.towns = []
+        self.index = GeoIndex(self.towns, keys=['name', 'lid'])
 #   Process BOM stations first
         if os.path.exists(self.bom_file):
             get_towns(self.bom_file)
@@ -252,27 +230,28 @@ class Towns:
     def Nearest(self, lat, lon, distance=False):
         the_town = ''
         distnce = 999999
-        for twn in self.towns:
+        for i in self.index.nearest(lat, lon):
+            twn = self.towns[i]
             dist = self.haversine(lat, lon, twn.lat, twn.lon)
             if dist < distnce:
                 the_town = twn.name
                 distnce = dist
-        for twn in self.towns:
-            if twn.name == the_town:
-                if distance:
-                    return twn, distnce
-                else:
-                    return twn
+        twn = self.index.get(the_town, check=False)
+        if twn is not None:
+            if distance:
+                return twn, distnce
+            else:
+                return twn
         return
 
     def Stn_Location(self, lid):
-        for town in self.towns:
-            if town.lid == lid.lstrip('0'):
-                return str(town.lat) + ' ' + str(town.lon)
+        town = self.index.get(lid.lstrip('0'), key='lid')
+        if town is not None:
+            return str(town.lat) + ' ' + str(town.lon)
         return ''
 
     def Get_Town(self, name):
-        for town in self.towns:
-            if town.name == name:
-                return town
+        town = self.index.get(name)
+        if town is not None:
+            return town
         return ''
@@ -23,38 +23,58 @@ import matplotlib.pyplot as plt
 import numpy as np
 import csv
 import os
-import sys
 
-import configparser    # decode .ini file
+from powercache import fileStamp
+from senutils import getConfig
 
-from getmodels import getModelFile
-from senutils import getParents, getUser
+# turbines are read once per process and again only if their file changes
+sam_turbines = {}   # sam_turbines file: [stamp, {name: row}, {name: parsed turbine}]
+pow_curves = {}     # (pow file, poly): [stamp, fitted curve]
+pow_turbines = {}   # (pow file, poly): [stamp, sampled turbine]
+
+
+def samTurbine(sam_file, name):
+    # the turbine's parsed row from the SAM turbines file, or None if it isn't there
+    stamp = fileStamp(sam_file)
+    if sam_file not in sam_turbines or sam_turbines[sam_file][0] != stamp:
+        rows = {}
+        turb_fil = open(sam_file)
+        turbines = csv.DictReader(turb_fil)
+        for turbine in turbines:
+            if turbine['Name'].strip() not in rows:
+                rows[turbine['Name'].strip()] = turbine
+        turb_fil.close()
+        sam_turbines[sam_file] = [stamp, rows, {}]
+    rows, parsed = sam_turbines[sam_file][1:]
+    if name not in rows:
+        return None
+    if name not in parsed:
+        turbine = rows[name]
+        try:
+            capacity = float(turbine['KW Rating'])
+        except:
+            capacity = float(turbine['kW Rating'])
+        cutin = 0
+        powers = turbine['Power Curve Array'].split('|')
+        rotor = float(turbine['Rotor Diameter'])
+        speeds = turbine['Wind Speed Array'].split('|')
+        for i in range(len(powers)):
+            speeds[i] = float(speeds[i])
+            powers[i] = float(powers[i])
+            if powers[i] > 0 and cutin == 0:
+                cutin = speeds[i]
+        parsed[name] = {'capacity': capacity, 'cutin': cutin, 'rotor': rotor, 'speeds': speeds,
+                        'powers': powers, 'wind_class': turbine['IEC Wind Speed Class']}
+    return parsed[name]
 
 
 class Power_Curve:
 
     def get_config(self):
-        config = configparser.RawConfigParser()
-        if len(sys.argv) > 1:
-            config_file = sys.argv[1]
-        else:
-            config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
-        try:
-            self.base_year = config.get('Base', 'year')
-        except:
-            self.base_year = '2012'
-        parents = []
+        config = getConfig()
+        self.base_year = config.base_year
         try:
-            parents = getParents(config.items('Parents'))
-        except:
-            pass
-        try:
-            self.pow_dir = config.get('Files', 'pow_files')
-            for key, value in parents:
-                self.pow_dir = self.pow_dir.replace(key, value)
-            self.pow_dir = self.pow_dir.replace('$USER$', getUser())
-            self.pow_dir = self.pow_dir.replace('$YEAR$', self.base_year)
+            self.pow_dir = config.getFile('Files', 'pow_files')
         except:
             self.pow_dir = ''
     """Represents a Power Curve for a Wind Turbine."""
@@ -65,6 +85,12 @@ class Power_Curve:
         self.name = name
         pow_file = self.pow_dir + '/' + self.name + '.pow'
         if os.path.exists(pow_file):
+            self.pow_file = pow_file
+            self.stamp = fileStamp(pow_file)
+            if (pow_file, poly) in pow_curves and pow_curves[(pow_file, poly)][0] == self.stamp:
+                for key, value in pow_curves[(pow_file, poly)][1].items():
+                    setattr(self, key, value)
+                return
             tf = open(pow_file, 'r')
             lines = tf.readlines()
             tf.close()
@@ -90,6 +116,9 @@ class Power_Curve:
             self.cutout = ln - 5
             self.power_curve = np.polyfit(x, y, poly)
             self.capacity = last_valu
+            pow_curves[(pow_file, poly)] = [self.stamp, {'capacity': self.capacity, 'cutin': self.cutin,
+                                            'rotor': self.rotor, 'cutout': self.cutout,
+                                            'power_curve': self.power_curve}]
         else:
             print('No', pow_file)
             return None
@@ -110,27 +139,10 @@ class Turbine:
     """Specifications for a Wind Turbine (Power Curve, ...)."""
 
     def get_config(self):
-        config = configparser.RawConfigParser()
-        if len(sys.argv) > 1:
-            config_file = sys.argv[1]
-        else:
-            config_file = getModelFile('SIREN.ini')
-        config.read(config_file)
-        try:
-          self.base_year = config.get('Base', 'year')
-        except:
-          self.base_year = '2012'
-        parents = []
+        config = getConfig()
+        self.base_year = config.base_year
         try:
-            parents = getParents(config.items('Parents'))
-        except:
-            pass
-        try:
-            self.sam_file = config.get('Files', 'sam_turbines')
-            for key, value in parents:
-                self.sam_file = self.sam_file.replace(key, value)
-            self.sam_file = self.sam_file.replace('$USER$', getUser())
-            self.sam_file = self.sam_file.replace('$YEAR$', self.base_year)
+            self.sam_file = config.getFile('Files', 'sam_turbines')
         except:
             self.sam_file = ''
 
@@ -140,48 +152,35 @@ class Turbine:
         self.name = name
         self.maxp = 0
         if os.path.exists(self.sam_file):
-             turb_fil = open(self.sam_file)
-             turbines = csv.DictReader(turb_fil)
-             for turbine in turbines:
-                 if turbine['Name'].strip()  == name:
-                     try:
-                         self.capacity = float(turbine['KW Rating'])
-                     except:
-                         self.capacity = float(turbine['kW Rating'])
-                     self.cutin = 0
-                     self.powers = turbine['Power Curve Array'].split('|')
-                     self.rotor = float(turbine['Rotor Diameter'])
-                     self.speeds = turbine['Wind Speed Array'].split('|')
-                     for i in range(len(self.powers)):
-                         self.speeds[i] = float(self.speeds[i])
-                         self.powers[i] = float(self.powers[i])
-                         if self.powers[i] > 0 and self.cutin == 0:
-                             self.cutin = self.speeds[i]
-                     self.wind_class = turbine['IEC Wind Speed Class']
-                     turb_fil.close()
-                     break
-             else:
-                 turb_fil.close()
-                 pow_turbine = Power_Curve(name, poly)
-                 if not hasattr(pow_turbine, 'capacity'):
-                     return None
-                 self.capacity = pow_turbine.capacity
-                 self.cutin = pow_turbine.cutin
-                 self.rotor = pow_turbine.rotor
-                 self.wind_class = '?'
-                 self.powers = []
-                 self.speeds = []
-                 last_pow = 0
-                 for ws in range(161):   # 0 to 40 by 0.25
-                     self.speeds.append(ws / 4.)
-                     powr = round(pow_turbine.Power(ws / 4.), 2)
-                     if powr > 0:
-                         if powr > last_pow:
-                             last_pow = powr
-                         self.powers.append(last_pow)
-                     else:
-                         self.powers.append(powr)
-
+            turbine = samTurbine(self.sam_file, name)
+            if turbine is None:
+                pow_turbine = Power_Curve(name, poly)
+                if not hasattr(pow_turbine, 'capacity'):
+                    return None
+                key = (pow_turbine.pow_file, poly)
+                if key not in pow_turbines or pow_turbines[key][0] != pow_turbine.stamp:
+                    powers = []
+                    speeds = []
+                    last_pow = 0
+                    for ws in range(161):   # 0 to 40 by 0.25
+                        speeds.append(ws / 4.)
+                        powr = round(pow_turbine.Power(ws / 4.), 2)
+                        if powr > 0:
+                            if powr > last_pow:
+                                last_pow = powr
+                            powers.append(last_pow)
+                        else:
+                            powers.append(powr)
+                    pow_turbines[key] = [pow_turbine.stamp, {'capacity': pow_turbine.capacity,
+                                         'cutin': pow_turbine.cutin, 'rotor': pow_turbine.rotor,
+                                         'speeds': speeds, 'powers': powers, 'wind_class': '?'}]
+                turbine = pow_turbines[key][1]
+            self.capacity = turbine['capacity']
+            self.cutin = turbine['cutin']
+            self.powers = turbine['powers'][:]
+            self.rotor = turbine['rotor']
+            self.speeds = turbine['speeds'][:]
+            self.wind_class = turbine['wind_class']
 
     def Power(self):
         """return power curve values for wind speed."""
@@ -32,15 +32,14 @@ except:
 from towns import Towns
 from getmodels import getModelFile
 from grid import Grid, Grid_Area, Grid_Boundary, Grid_Zones, Line
-from senutils import getParents, getUser, techClean, WorkBook
+from senutils import getConfig, getParents, getUser, techClean, WorkBook
 from station import Station, Stations
-from dijkstra_4 import Shortest
+from dijkstra_4 import GridGraph, Shortest
 
 
 class WAScene(QtWidgets.QGraphicsScene):
 
     def get_config(self):
-        config = configparser.RawConfigParser()
         if len(sys.argv) > 1:
             config_file = sys.argv[1]
             if config_file.rfind('/') >= 0:
@@ -52,7 +51,7 @@ class WAScene(QtWidgets.QGraphicsScene):
         else:
             config_file = getModelFile('SIREN.ini')
             self.config_file = 'SIREN.ini'
-        config.read(config_file)
+        config = getConfig(config_file)
         try:
             self.base_year = config.get('Base', 'year')
         except:
@@ -759,6 +758,7 @@ class WAScene(QtWidgets.QGraphicsScene):
             self._stationCircles[key] = []
         if self.existing:
             self._stations = Stations()
+            self._setupZones([st.lat for st in self._stations.stations], [st.lon for st in self._stations.stations])
             for st in self._stations.stations:
                 self.addStation(st)
             self._scenarios.append(['Existing', False, 'Existing stations'])
@@ -793,6 +793,17 @@ class WAScene(QtWidgets.QGraphicsScene):
             while curr_col < num_cols:
                 curr_col += 1
                 var[worksheet.cell_value(curr_row, curr_col)] = curr_col
+            lats = []
+            lons = []
+            for row in range(curr_row + 1, num_rows + 1):
+                try:
+                    lat = float(worksheet.cell_value(row, var['Latitude']))
+                    lon = float(worksheet.cell_value(row, var['Longitude']))
+                except:
+                    continue
+                lats.append(lat)
+                lons.append(lon)
+            self._setupZones(lats, lons)
             while curr_row < num_rows:
                 curr_row += 1
                 try:
@@ -915,6 +926,7 @@ class WAScene(QtWidgets.QGraphicsScene):
         self.lines = Grid()
         do_them(self.lines.lines)
         self.grid_lines = len(self.lines.lines)
+        self.grid_graph = GridGraph(self.lines.lines, self.grid_lines)
         lines = Grid_Boundary()
         if len(lines.lines) > 0:
             lines.lines[0].style = self.colors['grid_boundary']
@@ -931,7 +943,16 @@ class WAScene(QtWidgets.QGraphicsScene):
             if len(linesa.lines) > 0:
                 do_them(linesa.lines, grid_lines='a', opacity=self.area_opacity)
 
+    def _setupZones(self, lats, lons):
+        # zones for a lot of stations at once (addStation then just looks them up)
+        try:
+            if len(self.linesz.lines) > 0:
+                self.linesz.getZones(lats, lons)
+        except:
+            pass
+
     def addStation(self, st):
+        self._stations.index.changed()   # new, moved or altered
         self._stationGroups[st.name] = []
         p = self.mapFromLonLat(QtCore.QPointF(st.lon, st.lat))
         try:
@@ -1142,7 +1163,7 @@ class WAScene(QtWidgets.QGraphicsScene):
                             nearest = thisone
                             j = i
                     path = Shortest(self.lines.lines, dims[0], [self.load_centre[j][1],
-                           self.load_centre[j][2]], self.grid_lines)
+                           self.load_centre[j][2]], self.grid_lines, graph=self.grid_graph)
                     line = path.getLines()
                     for li in line:
                         if self.lines.lines[li].peak_load is None: